@@ -1,7 +1,10 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Form, Request
+from fastapi.responses import RedirectResponse
 from fastapi.templating import Jinja2Templates
 from pathlib import Path
 
+from proyecto.api.auth import claims_from_request, login, set_login_cookie
+
 router = APIRouter()
 TEMPLATES_DIR = Path(__file__).resolve().parents[1] / "templates"  # proyecto/templates
 templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
@@ -9,4 +12,25 @@ templates = Jinja2Templates(directory=str(TEMPLATES_DIR))
 
 @router.get("/admin", include_in_schema=False)
 def admin_index(request: Request):
-    return templates.TemplateResponse("admin.html", {"request": request})
\ No newline at end of file
+    # The console's API calls reuse the login cookie, so only admins get past here
+    claims = claims_from_request(request)
+    if claims is None or claims["role"] != "admin":
+        return RedirectResponse("/admin/login", status_code=303)
+    return templates.TemplateResponse(request, "admin.html")
+
+
+@router.get("/admin/login", include_in_schema=False)
+def admin_login_form(request: Request):
+    return templates.TemplateResponse(request, "login.html")
+
+
+@router.post("/admin/login", include_in_schema=False)
+async def admin_login(request: Request, username: str = Form(...), password: str = Form(...)):
+    result = await login(username, password)
+    if result is None or result["user"]["role"] != "admin":
+        return templates.TemplateResponse(request, "login.html", {"username": username,
+                                                                  "error": "Usuario o contraseña incorrectos"},
+                                          status_code=401)
+    response = RedirectResponse("/admin", status_code=303)
+    set_login_cookie(response, result["token"])
+    return response
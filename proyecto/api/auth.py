@@ -0,0 +1,190 @@
+from typing import Any, Callable, Dict, Optional
+import anyio.to_thread
+from anyio import CapacityLimiter
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.requests import HTTPConnection
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from proyecto import config
+from proyecto.app import auth
+from proyecto.app.database.database import SessionLocal, get_db
+from proyecto.modelo.user import User
+
+# Login, token revocation and user management (see app/auth.py); the dependencies below
+# protect the mutating and admin routes of the other routers
+router = APIRouter()
+
+COOKIE_NAME = "access_token"
+# Claims seen by every route when PROYECTO_AUTH_ENABLED=0
+ANONYMOUS: auth.Claims = {"sub": None, "username": "anonymous", "role": "admin", "jti": None}
+
+# Reads "Authorization: Bearer ..." (and documents the login flow in /docs)
+_bearer = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token", auto_error=False)
+_hash_limiter: Optional[CapacityLimiter] = None
+
+
+async def run_hashing(fn: Callable, *args) -> Any:
+    """Run a bcrypt-bound call in a worker thread, at most AUTH_HASH_WORKERS at once.
+
+    A burst of logins then waits for its own slots instead of taking every threadpool
+    thread from the sync routes.
+    """
+    global _hash_limiter
+    if _hash_limiter is None:
+        _hash_limiter = CapacityLimiter(config.AUTH_HASH_WORKERS)
+    return await anyio.to_thread.run_sync(fn, *args, limiter=_hash_limiter)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(status_code=401, detail=detail, headers={"WWW-Authenticate": "Bearer"})
+
+
+def claims_from_request(request: HTTPConnection, token: Optional[str] = None) -> Optional[auth.Claims]:
+    """Claims of the bearer token (or the login cookie), None if missing or invalid; works for websockets too"""
+    if not config.AUTH_ENABLED:
+        return ANONYMOUS
+    token = token or request.cookies.get(COOKIE_NAME)
+    if not token:
+        return None
+    try:
+        return auth.get_default_tokens().verify(token)
+    except auth.InvalidToken:
+        return None
+
+
+async def require_user(request: Request, token: Optional[str] = Depends(_bearer)) -> auth.Claims:
+    """Dependency: claims of the caller (any role); 401 if the token is missing, invalid or revoked.
+
+    Async on purpose: verification is a cache lookup in the common case and must not pay a
+    threadpool hop per request.
+    """
+    if not config.AUTH_ENABLED:
+        return ANONYMOUS
+    token = token or request.cookies.get(COOKIE_NAME)
+    if not token:
+        raise _unauthorized("Not authenticated")
+    try:
+        return auth.get_default_tokens().verify(token)
+    except auth.InvalidToken as e:
+        raise _unauthorized(f"Invalid token: {e}")
+
+
+# API routes that answer without a token; app/main.py applies require_user_except_public to
+# every other route of the API routers
+PUBLIC_ROUTES = frozenset({"/api/v1/health", "/api/v1/auth/token"})
+
+
+async def require_user_except_public(request: Request, token: Optional[str] = Depends(_bearer)) -> Optional[auth.Claims]:
+    """Router-level dependency: ``require_user`` for every route not listed in PUBLIC_ROUTES"""
+    path, root = request.scope["path"], request.scope.get("root_path", "")
+    if root and path.startswith(root):
+        path = path[len(root):]
+    if path in PUBLIC_ROUTES:
+        return None
+    return await require_user(request, token)
+
+
+async def require_admin(claims: auth.Claims = Depends(require_user)) -> auth.Claims:
+    if claims["role"] != "admin":
+        raise HTTPException(status_code=403, detail="Admin role required")
+    return claims
+
+
+def set_login_cookie(response: Response, token: str):
+    # SameSite=strict: the cookie is never sent on cross-site requests (no CSRF through it)
+    response.set_cookie(COOKIE_NAME, token, max_age=config.ACCESS_TOKEN_TTL, httponly=True,
+                        samesite="strict", secure=config.AUTH_COOKIE_SECURE)
+
+
+async def login(username: str, password: str) -> Optional[Dict[str, Any]]:
+    """(token, claims) for valid credentials, None otherwise; bcrypt runs off the event loop"""
+    user = await run_hashing(auth.authenticate, username, password)
+    if user is None:
+        return None
+    token, claims = auth.get_default_tokens().issue(user)
+    return {"token": token, "claims": claims, "user": user}
+
+
+@router.post("/auth/token", tags=["auth"])
+async def issue_token(response: Response, form: OAuth2PasswordRequestForm = Depends()) -> Dict[str, Any]:
+    """Exchange username/password (form fields) for a bearer token; also sets the login cookie."""
+    result = await login(form.username, form.password)
+    if result is None:
+        raise _unauthorized("Incorrect username or password")
+    set_login_cookie(response, result["token"])
+    return {
+        "access_token": result["token"],
+        "token_type": "bearer",
+        "expires_in": config.ACCESS_TOKEN_TTL,
+        "role": result["user"]["role"],
+    }
+
+
+@router.post("/auth/logout", tags=["auth"])
+async def logout(response: Response, claims: auth.Claims = Depends(require_user)) -> Dict[str, Any]:
+    """Revoke the caller's token and clear the login cookie."""
+    if claims.get("jti"):
+        # writes the revocation to the DB for the other workers
+        await run_in_threadpool(auth.get_default_tokens().revoke, claims)
+    response.delete_cookie(COOKIE_NAME)
+    return {"revoked": bool(claims.get("jti"))}
+
+
+@router.get("/auth/me", tags=["auth"])
+async def whoami(claims: auth.Claims = Depends(require_user)) -> Dict[str, Any]:
+    return {"id": claims["sub"], "username": claims["username"], "role": claims["role"],
+            "expires_at": claims.get("exp")}
+
+
+@router.get("/auth/users", tags=["auth"], dependencies=[Depends(require_admin)])
+def list_users(db: Session = Depends(get_db)) -> Dict[str, Any]:
+    users = db.execute(select(User).order_by(User.username)).scalars().all()
+    return {"users": [u.to_dict() for u in users]}
+
+
+def _create_user(payload: Dict[str, Any]) -> Dict[str, Any]:
+    with SessionLocal() as db:
+        return auth.create_user(db, payload.get("username"), payload.get("password") or "",
+                                payload.get("role", "operator")).to_dict()
+
+
+@router.post("/auth/users", tags=["auth"], status_code=201, dependencies=[Depends(require_admin)])
+async def create_user(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Create a user: {"username", "password", "role": "admin"|"operator"}."""
+    if not isinstance(payload.get("username"), str) or not isinstance(payload.get("password"), str):
+        raise HTTPException(status_code=400, detail="username and password are required")
+    try:
+        return await run_hashing(_create_user, payload)
+    except auth.UserExists as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _update_user(user_id: str, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    with SessionLocal() as db:
+        user = auth.update_user(db, user_id, role=payload.get("role"), is_active=payload.get("is_active"),
+                                password=payload.get("password"))
+        return user.to_dict() if user is not None else None
+
+
+@router.put("/auth/users/{user_id}", tags=["auth"], dependencies=[Depends(require_admin)])
+async def update_user(user_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Change "role", "is_active" and/or "password"; the user's existing tokens are revoked."""
+    if "password" in payload and not isinstance(payload["password"], str):
+        raise HTTPException(status_code=400, detail="password must be a string")
+    try:
+        user = await run_hashing(_update_user, user_id, payload)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user
+
+
+@router.get("/auth/stats", tags=["auth"], dependencies=[Depends(require_admin)])
+async def token_stats() -> Dict[str, Any]:
+    return auth.get_default_tokens().stats()
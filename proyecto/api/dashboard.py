@@ -0,0 +1,54 @@
+from typing import Any, Dict, Optional
+from datetime import datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+
+from proyecto.app.database.database import get_db
+from proyecto.app.rollups import GRANULARITIES, query_series, query_totals
+
+# Threat dashboard data, served from the pre-aggregated rollups (never the raw threats table)
+router = APIRouter()
+
+
+def _naive_utc(ts: Optional[datetime]) -> Optional[datetime]:
+    """Rollup buckets are naive UTC; offsets in the query (e.g. ``+02:00``) are converted"""
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _window(hours: int, since: Optional[datetime], until: Optional[datetime]):
+    since, until = _naive_utc(since), _naive_utc(until)
+    until = until or datetime.utcnow()
+    since = since or until - timedelta(hours=hours)
+    if since >= until:
+        raise HTTPException(status_code=400, detail="since must be before until")
+    return since, until
+
+
+@router.get("/dashboard/threats/timeseries", tags=["dashboard"])
+def threats_timeseries(
+    hours: int = Query(24, ge=1, le=24 * 3650),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    granularity: Optional[str] = Query(None, description="m, h or d; chosen from the window when omitted"),
+    by: Optional[str] = Query(None, pattern="^(type|severity)$"),
+    type: Optional[str] = None,
+    severity: Optional[str] = None,
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    if granularity is not None and granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="granularity must be one of m, h, d")
+    since, until = _window(hours, since, until)
+    return query_series(db, since, until, granularity=granularity, by=by, type=type, severity=severity)
+
+
+@router.get("/dashboard/threats/summary", tags=["dashboard"])
+def threats_summary(
+    hours: int = Query(24, ge=1, le=24 * 3650),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+) -> Dict[str, Any]:
+    since, until = _window(hours, since, until)
+    return query_totals(db, since, until)
@@ -0,0 +1,79 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Path
+from fastapi.responses import Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from proyecto.api.auth import require_user
+from proyecto.api.endpoints import DEVICE_COLUMNS, DEVICE_KEYS
+from proyecto.api.responses import DeviceDeleted, DeviceOut, dumps_rows
+from proyecto.app.database.database import get_async_db
+from proyecto.app.pubsub import publish
+from proyecto.modelo.device import Device
+
+# Async twins of the /devices routes in endpoints.py (mounted under /api/v1/async)
+router = APIRouter()
+
+
+async def _get_or_404(db: AsyncSession, device_id: int) -> Device:
+    d = await db.get(Device, device_id)
+    if not d:
+        raise HTTPException(status_code=404, detail="Device not found")
+    return d
+
+
+@router.get("/devices", tags=["devices"])
+async def list_devices(db: AsyncSession = Depends(get_async_db)):
+    rows = (await db.execute(select(*DEVICE_COLUMNS).order_by(Device.id.desc()))).all()
+    return Response(b'{"devices":' + dumps_rows(DEVICE_KEYS, rows) + b"}", media_type="application/json")
+
+
+@router.post("/devices", tags=["devices"], response_model=DeviceOut, dependencies=[Depends(require_user)])
+async def create_device(payload: Dict[str, Any], db: AsyncSession = Depends(get_async_db)):
+    hostname = payload.get("hostname")
+    if not hostname:
+        raise HTTPException(status_code=400, detail="hostname is required")
+    d = Device(
+        hostname=hostname,
+        ip_address=payload.get("ip_address"),
+        os=payload.get("os"),
+        active=bool(payload.get("active", True)),
+    )
+    db.add(d)
+    await db.commit()
+    await db.refresh(d)
+    device = d.to_dict()
+    publish("devices", device, key=f"device:{d.id}", type="created")
+    return device
+
+
+@router.get("/devices/{device_id}", tags=["devices"], response_model=DeviceOut)
+async def get_device(device_id: int = Path(..., ge=1), db: AsyncSession = Depends(get_async_db)):
+    return (await _get_or_404(db, device_id)).to_dict()
+
+
+@router.put("/devices/{device_id}", tags=["devices"], response_model=DeviceOut, dependencies=[Depends(require_user)])
+async def update_device(device_id: int, payload: Dict[str, Any], db: AsyncSession = Depends(get_async_db)):
+    d = await _get_or_404(db, device_id)
+    if "hostname" in payload:
+        d.hostname = payload["hostname"]
+    if "ip_address" in payload:
+        d.ip_address = payload["ip_address"]
+    if "os" in payload:
+        d.os = payload["os"]
+    if "active" in payload:
+        d.active = bool(payload["active"])
+    await db.commit()
+    await db.refresh(d)
+    device = d.to_dict()
+    publish("devices", device, key=f"device:{d.id}", type="updated")
+    return device
+
+
+@router.delete("/devices/{device_id}", tags=["devices"], response_model=DeviceDeleted, dependencies=[Depends(require_user)])
+async def delete_device(device_id: int, db: AsyncSession = Depends(get_async_db)):
+    d = await _get_or_404(db, device_id)
+    await db.delete(d)
+    await db.commit()
+    publish("devices", {"id": device_id}, key=f"device:{device_id}", type="deleted")
+    return {"deleted": True, "id": device_id}
@@ -1,34 +1,52 @@
-from typing import Any, Dict, List
-from fastapi import APIRouter, Depends, BackgroundTasks, HTTPException, Path
+from typing import Any, Dict, List, Optional
+import logging
+import pathlib
+import threading
+from collections import Counter
+from datetime import datetime
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from proyecto.app.database.database import get_db
-from proyecto.app.features import get_all_features, set_feature
+from proyecto import config
+from proyecto.app.database.database import SessionLocal, get_db
+from proyecto.app.features import get_all_features, is_feature_enabled, set_feature
+from proyecto.app.pubsub import publish
+from proyecto.api.auth import require_admin, require_user
+from proyecto.app.device_import import DEFAULT_CHUNK_SIZE, parse_csv, parse_json_array, upsert_devices
+from proyecto.api.responses import DeviceDeleted, DeviceOut, DevicePage, dumps, dumps_line, dumps_rows
+from proyecto.api.streaming import (DEFAULT_BATCH_SIZE, FILE_OPERATION_FIELDS, PACKET_FIELDS, NDJSONError,
+                                    RejectedRecords, check_fields, iter_ndjson_batches)
+from proyecto.services.registry import ServiceUnavailable, registry
 
 # Import Device model
 from proyecto.modelo.device import Device
+from proyecto.modelo.seguridad import SecurityPolicy
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# Try to detect if real service modules exist; fall back to flags (no heavy placeholders)
-_services_available = {}
-try:
-    from proyecto.services.ransomware_protection import RansomwareProtectionService  # type: ignore
-    _services_available["ransomware"] = True
-except Exception:
-    _services_available["ransomware"] = False
+# Services are imported and built on first use (see proyecto.services.registry)
+# The shared network service keeps sliding-window state: one batch is analyzed at a time
+_network_detector_lock = threading.Lock()
 
-try:
-    from proyecto.services.endpoint_protection import EndpointProtectionService  # type: ignore
-    _services_available["endpoint_protection"] = True
-except Exception:
-    _services_available["endpoint_protection"] = False
 
-try:
-    from proyecto.services.network_defense import NetworkAttackDefenseService  # type: ignore
-    _services_available["network_defense"] = True
-except Exception:
-    _services_available["network_defense"] = False
+def _service(name: str, label: str):
+    """Shared service instance, or 503 when its module (or a dependency) is not available"""
+    try:
+        return registry.get(name)
+    except ServiceUnavailable:
+        raise HTTPException(status_code=503, detail=f"{label} not available")
+
+
+def require_feature(feature_key: str):
+    """Dependency: 503 while ``feature_key`` is switched off under /features"""
+    async def check():
+        if not is_feature_enabled(feature_key):
+            raise HTTPException(status_code=503, detail=f"Feature '{feature_key}' is disabled")
+    return check
 
 
 @router.get("/health", tags=["system"])
@@ -39,7 +57,13 @@ def api_health() -> Dict[str, Any]:
 @router.get("/services/status", tags=["services"])
 def services_status() -> Dict[str, Any]:
     """Return availability of internal service modules (for UI)."""
-    return {"services": _services_available}
+    return {"services": registry.status()}
+
+
+@router.get("/threat-intel/stats", tags=["services"])
+def threat_intel_stats() -> Dict[str, Any]:
+    """IOC index version and hash prefilter counters (exact lookups avoided by the bloom filter)."""
+    return _service("threat_intel", "Threat intelligence").stats()
 
 
 @router.get("/features", tags=["system"])
@@ -51,7 +75,7 @@ def features_list() -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.put("/features/{feature_key}", tags=["system"])
+@router.put("/features/{feature_key}", tags=["system"], dependencies=[Depends(require_admin)])
 def features_set(feature_key: str, payload: dict):
     if "enabled" not in payload:
         raise HTTPException(status_code=400, detail="Missing 'enabled' in request body")
@@ -62,31 +86,353 @@ def features_set(feature_key: str, payload: dict):
     return {"feature": feature_key, "enabled": enabled}
 
 
-@router.post("/ransomware/scan", tags=["ransomware"])
-def start_ransomware_scan(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Trigger a background scan if service available (demo-safe)."""
-    if not _services_available.get("ransomware"):
-        return {"started": False, "reason": "ransomware service not available"}
-    def _scan():
+def _scan_path(path: str) -> Optional[str]:
+    """Existing ``path`` with symlinks and ``..`` resolved, if it lies under a configured scan root"""
+    try:
+        target = pathlib.Path(path).resolve(strict=True)
+    except (OSError, RuntimeError):
+        return None
+    if any(target.is_relative_to(root.resolve()) for root in config.SCAN_ROOTS):
+        return str(target)
+    return None
+
+
+@router.post("/ransomware/scan", tags=["ransomware"], status_code=202,
+             dependencies=[Depends(require_user), Depends(require_feature("ransomware"))])
+def start_ransomware_scan(payload: Dict[str, Any]):
+    """Queue a scan of files on disk for an endpoint; poll it under /jobs/{job_id}."""
+    scheduler = _service("scan_jobs", "ransomware service")
+    endpoint_id = payload.get("endpoint_id")
+    paths = payload.get("paths")
+    if not endpoint_id or not isinstance(endpoint_id, str):
+        raise HTTPException(status_code=400, detail="endpoint_id is required")
+    if not paths or not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        raise HTTPException(status_code=400, detail="paths must be a non-empty list of strings")
+    resolved = [_scan_path(p) for p in paths]
+    outside = [p for p, r in zip(paths, resolved) if r is None]
+    if outside:
+        raise HTTPException(status_code=400,
+                            detail=f"paths not found or outside the scan roots: {', '.join(outside[:10])}")
+    from proyecto.app.jobs import JobQueueFull
+
+    try:
+        return scheduler.submit(endpoint_id, resolved)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+
+
+@router.get("/jobs", tags=["jobs"], dependencies=[Depends(require_user)])
+def list_jobs(
+    status: Optional[str] = Query(None, pattern="^(QUEUED|RUNNING|COMPLETED|FAILED|CANCELLED)$"),
+    endpoint_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+) -> Dict[str, Any]:
+    """Scan jobs newest first; running jobs report their live progress."""
+    scheduler = _service("scan_jobs", "ransomware service")
+    return {"jobs": scheduler.list(status, endpoint_id, limit), "scheduler": scheduler.stats()}
+
+
+@router.get("/jobs/{job_id}", tags=["jobs"], dependencies=[Depends(require_user)])
+def get_job(job_id: str):
+    job = _service("scan_jobs", "ransomware service").get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.post("/jobs/{job_id}/cancel", tags=["jobs"], dependencies=[Depends(require_user)])
+def cancel_job(job_id: str):
+    """Cancel a queued or running job; chunks already scanning stop at the next file."""
+    job = _service("scan_jobs", "ransomware service").cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job["finished_at"] and job["status"] != "CANCELLED":
+        raise HTTPException(status_code=409, detail=f"Job already {job['status']}")
+    return job
+
+
+# Security policies (rules evaluated by the compiled policy engine)
+
+def _policy_dict(policy) -> Dict[str, Any]:
+    return {"id": policy.id, "name": policy.name, "policy_type": policy.policy_type,
+            "settings": policy.settings, "is_active": policy.is_active}
+
+
+def _validated_policy_fields(payload: Dict[str, Any], partial: bool) -> Dict[str, Any]:
+    from proyecto.services.policy_engine import POLICY_TYPES, PolicyError, compile_rules
+
+    fields = {}
+    if "name" in payload or not partial:
+        if not isinstance(payload.get("name"), str) or not payload["name"]:
+            raise HTTPException(status_code=400, detail="name is required")
+        fields["name"] = payload["name"]
+    if "policy_type" in payload or not partial:
+        if payload.get("policy_type") not in POLICY_TYPES:
+            raise HTTPException(status_code=400, detail=f"policy_type must be one of {', '.join(POLICY_TYPES)}")
+        fields["policy_type"] = payload["policy_type"]
+    if "settings" in payload:
         try:
-            svc = RansomwareProtectionService(db)  # type: ignore
-            if hasattr(svc, "scan"):
-                svc.scan()
-        except Exception:
-            pass
-    background_tasks.add_task(_scan)
-    return {"started": True}
+            compile_rules(payload["settings"])
+        except PolicyError as e:
+            raise HTTPException(status_code=400, detail=f"invalid settings: {e}")
+        fields["settings"] = payload["settings"]
+    if "is_active" in payload:
+        fields["is_active"] = bool(payload["is_active"])
+    return fields
+
+
+@router.get("/policies", tags=["policies"], dependencies=[Depends(require_user)])
+def list_policies(policy_type: Optional[str] = None, db: Session = Depends(get_db)) -> Dict[str, Any]:
+    _service("policy_engine", "Policy engine")
+    stmt = select(SecurityPolicy).order_by(SecurityPolicy.name)
+    if policy_type is not None:
+        stmt = stmt.where(SecurityPolicy.policy_type == policy_type)
+    return {"policies": [_policy_dict(p) for p in db.execute(stmt).scalars()]}
+
+
+@router.post("/policies", tags=["policies"], status_code=201, dependencies=[Depends(require_admin)])
+def create_policy(payload: Dict[str, Any], db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Create a policy; its rules are validated by compiling them first."""
+    _service("policy_engine", "Policy engine")
+    policy = SecurityPolicy(**_validated_policy_fields(payload, partial=False))
+    db.add(policy)
+    db.commit()
+    db.refresh(policy)
+    return _policy_dict(policy)
+
+
+@router.put("/policies/{policy_id}", tags=["policies"], dependencies=[Depends(require_admin)])
+def update_policy(policy_id: str, payload: Dict[str, Any], db: Session = Depends(get_db)) -> Dict[str, Any]:
+    """Update name, settings or is_active; only this policy is recompiled."""
+    _service("policy_engine", "Policy engine")
+    policy = db.get(SecurityPolicy, policy_id)
+    if policy is None:
+        raise HTTPException(status_code=404, detail="Policy not found")
+    for key, value in _validated_policy_fields(payload, partial=True).items():
+        setattr(policy, key, value)
+    db.commit()
+    db.refresh(policy)
+    return _policy_dict(policy)
+
+
+@router.post("/policies/{policy_type}/evaluate", tags=["policies"], dependencies=[Depends(require_user)])
+def evaluate_policies(policy_type: str, events: Any = Body(...)) -> Dict[str, Any]:
+    """Evaluate one event (object) or a batch (array) against the active policies of a type."""
+    engine = _service("policy_engine", "Policy engine")
+    from proyecto.services.policy_engine import POLICY_TYPES
+
+    if policy_type not in POLICY_TYPES:
+        raise HTTPException(status_code=404, detail="Unknown policy type")
+    batch = events if isinstance(events, list) else [events]
+    if not all(isinstance(e, dict) for e in batch):
+        raise HTTPException(status_code=400, detail="events must be JSON objects")
+    results = engine.evaluate_batch(policy_type, batch)
+    return {"results": results, "matched": sum(1 for r in results if r)}
+
+
+@router.get("/policies/stats", tags=["policies"], dependencies=[Depends(require_user)])
+def policy_engine_stats() -> Dict[str, Any]:
+    """Compiled rule counts, invalid policies and evaluation counters."""
+    return _service("policy_engine", "Policy engine").stats()
+
+
+@router.get("/endpoints/status", tags=["endpoints"], dependencies=[Depends(require_feature("endpoint_protection"))])
+def fleet_security_status(
+    ids: Optional[str] = Query(None, description="Comma-separated endpoint ids; whole fleet when omitted"),
+    db: Session = Depends(get_db),
+):
+    """Security status for many endpoints from one aggregated query pass per table (cached)."""
+    svc = _service("endpoint_protection", "Endpoint protection service")
+    endpoint_ids = [i for i in ids.split(",") if i] if ids else None
+    return svc.get_fleet_security_status(db, endpoint_ids)
+
+
+@router.get("/endpoints/risk/top", tags=["endpoints"], dependencies=[Depends(require_feature("endpoint_protection"))])
+def riskiest_endpoints(k: int = Query(10, ge=1, le=1000)) -> Dict[str, Any]:
+    """Top-K endpoints by risk score, served from the scoring engine's heap (no table scan)."""
+    return {"endpoints": _service("risk_scoring", "Risk scoring").top_k(k)}
+
+
+@router.get("/endpoints/{endpoint_id}/status", tags=["endpoints"],
+            dependencies=[Depends(require_feature("endpoint_protection"))])
+def endpoint_security_status(endpoint_id: str, db: Session = Depends(get_db)):
+    """Security status of one endpoint computed from its threats and ransomware incidents (cached)."""
+    svc = _service("endpoint_protection", "Endpoint protection service")
+    status = svc.get_endpoint_security_status(db, endpoint_id)
+    if status["overall_status"] == "UNKNOWN":
+        raise HTTPException(status_code=404, detail="Endpoint not found")
+    return status
+
+
+# Streaming telemetry ingestion (NDJSON, one record per line)
+
+_check_packet = check_fields(PACKET_FIELDS)
+_check_file_operation = check_fields(FILE_OPERATION_FIELDS)
+
+
+def _analyze_packets(svc, packets: List[Dict[str, Any]]) -> Dict[str, Any]:
+    with _network_detector_lock:
+        return svc.analyze_network_traffic({"packets": packets})
+
+
+@router.post("/network/traffic/stream", tags=["network"],
+             dependencies=[Depends(require_user), Depends(require_feature("network_defense"))])
+async def ingest_network_traffic(request: Request, batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=100000)):
+    """Analyze an NDJSON stream of packets in batches as it arrives.
+
+    Records with fields of the wrong type are skipped and reported under ``rejected``.
+    """
+    # first use imports the service (numpy) off the event loop
+    svc = await run_in_threadpool(_service, "network_defense", "network defense service")
+    records = batches = blocked = 0
+    threats_by_type: Counter = Counter()
+    rejected = RejectedRecords()
+    try:
+        async for batch in iter_ndjson_batches(request.stream(), batch_size, validate=_check_packet, rejected=rejected):
+            result = await run_in_threadpool(_analyze_packets, svc, batch)
+            records += len(batch)
+            batches += 1
+            blocked += result["connections_blocked"]
+            threats_by_type.update(t["threat_type"] for t in result["threats_detected"])
+    except NDJSONError as e:
+        raise HTTPException(status_code=400, detail=f"{e} (processed {records} records)")
+    return {
+        "records": records,
+        "batches": batches,
+        "connections_blocked": blocked,
+        "threats_by_type": dict(threats_by_type),
+        "recommended_actions": svc._get_network_recommendations([{"threat_type": t} for t in threats_by_type]),
+        "rejected": rejected.count,
+        "rejected_records": rejected.samples,
+    }
+
+
+def _record_stream_incident(svc, endpoint_id: str, suspicious: int, protected: int,
+                            backup_snapshot: Optional[str]) -> Optional[str]:
+    """One incident per stream, with the last backup snapshot taken while processing it"""
+    try:
+        with SessionLocal() as db:
+            return svc.record_incident(db, endpoint_id, suspicious, protected, backup_snapshot=backup_snapshot).id
+    except Exception:
+        logger.exception("could not record ransomware incident for %s", endpoint_id)
+        return None
+
+
+@router.post("/ransomware/file-operations/stream", tags=["ransomware"],
+             dependencies=[Depends(require_user), Depends(require_feature("ransomware"))])
+async def ingest_file_operations(
+    request: Request,
+    endpoint_id: str = Query(..., min_length=1),
+    batch_size: int = Query(DEFAULT_BATCH_SIZE, ge=1, le=100000),
+):
+    """Monitor an NDJSON stream of file operations for one endpoint.
+
+    Records with fields of the wrong type are skipped and reported under ``rejected``.
+    """
+    svc = await run_in_threadpool(_service, "ransomware", "ransomware service")
+    records = batches = suspicious = protected = 0
+    backup_snapshot = None
+    rejected = RejectedRecords()
+    try:
+        async for batch in iter_ndjson_batches(request.stream(), batch_size, validate=_check_file_operation,
+                                               rejected=rejected):
+            result = await run_in_threadpool(svc.monitor_file_operations, endpoint_id, batch)
+            records += len(batch)
+            batches += 1
+            suspicious += len(result["suspicious_activities"])
+            protected += result["files_protected"]
+            backup_snapshot = result.get("backup_snapshot") or backup_snapshot
+            publish("scans", {"endpoint_id": endpoint_id, "records": records, "suspicious_activities": suspicious,
+                              "files_protected": protected, "done": False}, key=f"scan:{endpoint_id}", type="progress")
+    except NDJSONError as e:
+        raise HTTPException(status_code=400, detail=f"{e} (processed {records} records)")
+    summary = {
+        "endpoint_id": endpoint_id,
+        "records": records,
+        "batches": batches,
+        "suspicious_activities": suspicious,
+        "files_protected": protected,
+        "threat_level": "HIGH" if suspicious else "LOW",
+        "rejected": rejected.count,
+    }
+    if suspicious:
+        summary["incident_id"] = await run_in_threadpool(_record_stream_incident, svc, endpoint_id, suspicious,
+                                                         protected, backup_snapshot)
+    publish("scans", {**summary, "done": True}, key=f"scan:{endpoint_id}", type="progress")
+    return {**summary, "rejected_records": rejected.samples}
 
 
 # Devices CRUD
 
-@router.get("/devices", tags=["devices"])
-def list_devices(db: Session = Depends(get_db)) -> Dict[str, Any]:
-    devices = db.query(Device).order_by(Device.id.desc()).all()
-    return {"devices": [d.to_dict() for d in devices]}
+# Columns selected for listings; result tuples are serialized to JSON without ORM hydration
+DEVICE_COLUMNS = (Device.id, Device.hostname, Device.ip_address, Device.os, Device.last_seen,
+                   func.coalesce(Device.active, False).label("active"))
+DEVICE_KEYS = ("id", "hostname", "ip_address", "os", "last_seen", "active")
+DEVICE_PAGE_SIZE = 100
+DEVICE_PAGE_MAX = 1000
+
+
+def device_page_body(rows, next_cursor: Optional[int]) -> bytes:
+    """``DevicePage`` JSON built straight from the selected tuples"""
+    return b'{"devices":' + dumps_rows(DEVICE_KEYS, rows) + b',"next_cursor":' + dumps(next_cursor) + b"}"
+
+
+def _device_listing_query(cursor, active, os, hostname_prefix, seen_after, seen_before):
+    stmt = select(*DEVICE_COLUMNS).order_by(Device.id.desc())
+    if cursor is not None:
+        stmt = stmt.where(Device.id < cursor)
+    if active is not None:
+        stmt = stmt.where(Device.active == active)
+    if os is not None:
+        stmt = stmt.where(Device.os == os)
+    if hostname_prefix:
+        # Range instead of LIKE so SQLite can use the hostname index
+        stmt = stmt.where(Device.hostname >= hostname_prefix, Device.hostname < hostname_prefix + "\uffff")
+    if seen_after is not None:
+        stmt = stmt.where(Device.last_seen >= seen_after)
+    if seen_before is not None:
+        stmt = stmt.where(Device.last_seen < seen_before)
+    return stmt
+
+
+@router.get("/devices", tags=["devices"], response_model=DevicePage)
+def list_devices(
+    cursor: Optional[int] = Query(None, ge=1, description="Return devices with id lower than this (next_cursor)"),
+    limit: Optional[int] = Query(None, ge=1, le=DEVICE_PAGE_MAX),
+    active: Optional[bool] = None,
+    os: Optional[str] = None,
+    hostname_prefix: Optional[str] = None,
+    seen_after: Optional[datetime] = None,
+    seen_before: Optional[datetime] = None,
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    db: Session = Depends(get_db),
+):
+    """List devices newest first with keyset pagination on id.
 
+    With ``format=ndjson`` the matching rows are streamed one JSON object per line and
+    ``limit`` is optional (all remaining rows are sent).
+    """
+    stmt = _device_listing_query(cursor, active, os, hostname_prefix, seen_after, seen_before)
+    if format == "ndjson":
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return StreamingResponse(_stream_devices(stmt), media_type="application/x-ndjson")
 
-@router.post("/devices", tags=["devices"])
+    limit = limit or DEVICE_PAGE_SIZE
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return Response(device_page_body(rows, rows[-1].id if has_more else None), media_type="application/json")
+
+
+def _stream_devices(stmt):
+    # Own session: the request-scoped one may be closed before the body is fully sent
+    with SessionLocal() as db:
+        for partition in db.execute(stmt.execution_options(yield_per=1000)).partitions():
+            yield b"".join(dumps_line(dict(zip(DEVICE_KEYS, r))) for r in partition)
+
+
+@router.post("/devices", tags=["devices"], response_model=DeviceOut, dependencies=[Depends(require_user)])
 def create_device(payload: Dict[str, Any], db: Session = Depends(get_db)):
     hostname = payload.get("hostname")
     if not hostname:
@@ -100,10 +446,43 @@ def create_device(payload: Dict[str, Any], db: Session = Depends(get_db)):
     db.add(d)
     db.commit()
     db.refresh(d)
-    return d.to_dict()
+    device = d.to_dict()
+    publish("devices", device, key=f"device:{d.id}", type="created")
+    return device
 
 
-@router.get("/devices/{device_id}", tags=["devices"])
+@router.post("/devices/bulk", tags=["devices"], dependencies=[Depends(require_user)])
+async def bulk_upsert_devices(
+    request: Request,
+    key: str = Query("hostname", pattern="^(hostname|ip_address)$"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=50000),
+    db: Session = Depends(get_db),
+):
+    """Upsert devices from a JSON array, NDJSON or CSV body (chosen by Content-Type)."""
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+    results: List[Dict[str, Any]] = []
+    try:
+        if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+            async for batch in iter_ndjson_batches(request.stream(), chunk_size):
+                results.extend(await run_in_threadpool(upsert_devices, db, batch, key, chunk_size, len(results)))
+        else:
+            body = await request.body()
+            rows = parse_csv(body) if content_type in ("text/csv", "application/csv") else parse_json_array(body)
+            results = await run_in_threadpool(upsert_devices, db, rows, key, chunk_size)
+    except (NDJSONError, ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(status_code=400, detail=f"{e} (processed {len(results)} rows)")
+    summary = Counter(r["status"] for r in results)
+    counts = {
+        "created": summary.get("created", 0),
+        "updated": summary.get("updated", 0),
+        "errors": summary.get("error", 0),
+    }
+    # one event for the whole import; clients reload the list instead of applying each row
+    publish("devices", counts, key="devices:bulk", type="bulk")
+    return {**counts, "results": results}
+
+
+@router.get("/devices/{device_id}", tags=["devices"], response_model=DeviceOut)
 def get_device(device_id: int = Path(..., ge=1), db: Session = Depends(get_db)):
     d = db.query(Device).filter(Device.id == device_id).first()
     if not d:
@@ -111,7 +490,7 @@ def get_device(device_id: int = Path(..., ge=1), db: Session = Depends(get_db)):
     return d.to_dict()
 
 
-@router.put("/devices/{device_id}", tags=["devices"])
+@router.put("/devices/{device_id}", tags=["devices"], response_model=DeviceOut, dependencies=[Depends(require_user)])
 def update_device(device_id: int, payload: Dict[str, Any], db: Session = Depends(get_db)):
     d = db.query(Device).filter(Device.id == device_id).first()
     if not d:
@@ -127,14 +506,17 @@ def update_device(device_id: int, payload: Dict[str, Any], db: Session = Depends
     db.add(d)
     db.commit()
     db.refresh(d)
-    return d.to_dict()
+    device = d.to_dict()
+    publish("devices", device, key=f"device:{d.id}", type="updated")
+    return device
 
 
-@router.delete("/devices/{device_id}", tags=["devices"])
+@router.delete("/devices/{device_id}", tags=["devices"], response_model=DeviceDeleted, dependencies=[Depends(require_user)])
 def delete_device(device_id: int, db: Session = Depends(get_db)):
     d = db.query(Device).filter(Device.id == device_id).first()
     if not d:
         raise HTTPException(status_code=404, detail="Device not found")
     db.delete(d)
     db.commit()
+    publish("devices", {"id": device_id}, key=f"device:{device_id}", type="deleted")
     return {"deleted": True, "id": device_id}
\ No newline at end of file
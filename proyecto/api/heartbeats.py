@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+
+from proyecto import config
+from proyecto.api.auth import require_user
+from proyecto.api.responses import loads
+from proyecto.app.heartbeats import KINDS, MAX_STATUS_LENGTH, get_default_buffer
+
+# Agent check-ins, absorbed in memory and written back in batches (see app/heartbeats.py)
+router = APIRouter()
+
+MAX_BATCH = 10000
+# Unknown ids echoed back per request
+MAX_UNKNOWN_SAMPLES = 20
+
+
+def _parse_beat(item: Any, index: int) -> Tuple[str, Any, Optional[str]]:
+    if not isinstance(item, dict):
+        raise ValueError(f"item {index}: expected an object")
+    kind = item.get("kind", "endpoint")
+    if kind not in KINDS:
+        raise ValueError(f"item {index}: kind must be one of {', '.join(KINDS)}")
+    key = item.get("id")
+    if kind == "device":
+        if isinstance(key, bool) or not isinstance(key, int) or key < 1:
+            raise ValueError(f"item {index}: device id must be a positive integer")
+    elif not isinstance(key, str) or not key:
+        raise ValueError(f"item {index}: endpoint id must be a non-empty string")
+    status = item.get("status")
+    if status is not None and (not isinstance(status, str) or len(status) > MAX_STATUS_LENGTH):
+        raise ValueError(f"item {index}: status must be a string of at most {MAX_STATUS_LENGTH} characters")
+    return kind, key, status
+
+
+@router.post("/heartbeats", tags=["heartbeats"], dependencies=[Depends(require_user)])
+async def ingest_heartbeats(request: Request) -> Dict[str, Any]:
+    """Record one check-in object or a JSON array of them: {"kind", "id", "status"?}.
+
+    Only the in-memory map is touched; ``last_seen`` (server time) and status reach the
+    database with the next periodic flush. Check-ins for ids that do not exist are dropped
+    and counted under ``unknown``.
+    """
+    try:
+        payload = loads(await request.body())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"invalid JSON: {e}")
+    items: List[Any] = payload if isinstance(payload, list) else [payload]
+    if len(items) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"at most {MAX_BATCH} heartbeats per request")
+    try:
+        beats = [_parse_beat(item, i) for i, item in enumerate(items)]
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    unknown: List[Tuple[str, Any]] = []
+    accepted = await run_in_threadpool(get_default_buffer().record_many, beats, None, unknown)
+    return {
+        "accepted": accepted,
+        "unknown": len(unknown),
+        "unknown_ids": [{"kind": kind, "id": key} for kind, key in unknown[:MAX_UNKNOWN_SAMPLES]],
+    }
+
+
+@router.get("/heartbeats/online", tags=["heartbeats"])
+def online_now(
+    kind: str = Query("endpoint", pattern="^(device|endpoint)$"),
+    within: float = Query(config.HEARTBEAT_ONLINE_WINDOW, gt=0, le=config.HEARTBEAT_RETENTION, description="seconds"),
+    limit: int = Query(1000, ge=0, le=100000),
+) -> Dict[str, Any]:
+    """Devices or endpoints that checked in during the last ``within`` seconds (served from memory)."""
+    online = get_default_buffer().online(kind, within)
+    return {"kind": kind, "within": within, "count": len(online), "items": online[:limit]}
+
+
+@router.get("/heartbeats/stats", tags=["heartbeats"])
+def heartbeat_stats() -> Dict[str, Any]:
+    return get_default_buffer().stats()
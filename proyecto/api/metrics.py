@@ -0,0 +1,49 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+
+from proyecto import config
+from proyecto.api.auth import require_admin, require_user
+from proyecto.app.metrics import metrics
+from proyecto.app.profiler import ProfilerBusy, collapsed, get_default_profiler, summary
+from proyecto.app.pubsub import broker
+
+# Observability: Prometheus scrape target and the opt-in sampling profiler (see app/metrics.py)
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+metrics.callback("pubsub_subscribers", "Open change-event subscriptions (websockets)", lambda: len(broker))
+metrics.callback("pubsub_published_total", "Change events published", lambda: broker.published, kind="counter")
+
+
+@router.get("/metrics", include_in_schema=False, dependencies=[Depends(require_user)])
+def prometheus_metrics():
+    """Scrapers authenticate with a bearer token (``authorization`` in the Prometheus scrape config)"""
+    return Response(metrics.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/debug/profile", include_in_schema=False, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(10.0, gt=0),
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    format: str = Query("collapsed", pattern="^(collapsed|json)$"),
+    idle: bool = Query(False, description="keep threads blocked in waits"),
+) -> Any:
+    """Sample every thread of this worker for ``seconds`` and return collapsed stacks (flamegraph input).
+
+    Admins only, and disabled unless PROYECTO_PROFILER_ENABLED=1; one profile at a time per worker.
+    """
+    if not config.PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if seconds > config.PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be at most {config.PROFILER_MAX_SECONDS:g}")
+    try:
+        result = await run_in_threadpool(get_default_profiler().profile, seconds, interval_ms / 1000, idle)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if format == "json":
+        body: Dict[str, Any] = summary(result)
+        return body
+    return Response(collapsed(result), media_type="text/plain; charset=utf-8")
@@ -0,0 +1,79 @@
+"""JSON response fast paths.
+
+``ORJSONResponse`` is the app's default response class, so the final dump is done by
+orjson. Routes with a typed ``response_model`` are converted by Pydantic's compiled
+serializer instead of the generic ``jsonable_encoder`` walk, and large listings build
+their body with ``dumps_rows`` straight from the SQL result tuples, skipping per-row
+dicts built by hand, ``isoformat()`` calls and the encoder entirely.
+
+orjson is optional; without it the standard library ``json`` module is used.
+"""
+import json
+from datetime import date, datetime
+from typing import Any, Iterable, List, Optional, Sequence
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _default(o: Any):
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Compact JSON bytes; naive datetimes come out as ``isoformat()`` would write them"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def dumps_rows(keys: Sequence[str], rows: Iterable[Sequence[Any]]) -> bytes:
+    """JSON array of objects from result tuples, without building intermediate row objects"""
+    return dumps([dict(zip(keys, row)) for row in rows])
+
+
+def dumps_line(content: Any) -> bytes:
+    """One NDJSON line"""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_APPEND_NEWLINE)
+    return dumps(content) + b"\n"
+
+
+def loads(body: bytes) -> Any:
+    """Parse a JSON request body (orjson when available)"""
+    if orjson is not None:
+        return orjson.loads(body)
+    return json.loads(body)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+# Typed response models (also documented in the OpenAPI schema)
+
+class DeviceOut(BaseModel):
+    id: int
+    hostname: str
+    ip_address: Optional[str] = None
+    os: Optional[str] = None
+    last_seen: Optional[datetime] = None
+    active: bool
+
+
+class DevicePage(BaseModel):
+    devices: List[DeviceOut]
+    next_cursor: Optional[int] = None
+
+
+class DeviceDeleted(BaseModel):
+    deleted: bool
+    id: int
@@ -0,0 +1,146 @@
+"""Helpers for NDJSON (newline-delimited JSON) request bodies.
+
+The body is consumed chunk by chunk and handed out in fixed-size batches, so memory
+stays bounded by ``batch_size`` records plus one partial line regardless of upload size.
+The caller pulls the next batch only after processing the previous one, which
+propagates backpressure to the client through the ASGI receive channel.
+"""
+import json
+import math
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Tuple
+
+# Upper bound for a single NDJSON record; larger lines are rejected instead of buffered
+MAX_LINE_BYTES = 1 << 20
+DEFAULT_BATCH_SIZE = 5000
+# Rejected records reported back (line number and reason); the rest are only counted
+MAX_REJECTED_SAMPLES = 20
+
+# JSON types accepted per field of the telemetry records; null means "not reported"
+PACKET_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "src": (str,),
+    "dst": (str,),
+    "protocol": (str,),
+    "flags": (dict,),
+    "src_port": (int,),
+    "dst_port": (int,),
+    "attempt_count": (int,),
+    "timestamp": (int, float),
+}
+FILE_OPERATION_FIELDS: Dict[str, Tuple[type, ...]] = {
+    "operation_type": (str,),
+    "file_name": (str,),
+    "file_path": (str,),
+    "old_name": (str,),
+    "new_name": (str,),
+    "file_count": (int,),
+    "sha256": (str,),
+    "pid": (int, str),
+    "process_name": (str,),
+    "timestamp": (int, float),
+    "entropy": (int, float),
+}
+_TYPE_NAMES = {str: "a string", int: "an integer", float: "a number", dict: "an object"}
+_INT64 = 1 << 63
+
+
+class NDJSONError(ValueError):
+    """Raised when the body contains an invalid or oversized record."""
+
+    def __init__(self, line_no: int, message: str):
+        super().__init__(f"line {line_no}: {message}")
+        self.line_no = line_no
+
+
+class RejectedRecords:
+    """Records skipped by a validator: how many, plus the first few line numbers and reasons."""
+
+    def __init__(self, max_samples: int = MAX_REJECTED_SAMPLES):
+        self.count = 0
+        self.max_samples = max_samples
+        self.samples: List[Dict[str, Any]] = []
+
+    def add(self, line_no: int, reason: str):
+        self.count += 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append({"line": line_no, "error": reason})
+
+
+def check_fields(fields: Mapping[str, Tuple[type, ...]]) -> Callable[[Dict[str, Any]], Optional[str]]:
+    """Validator for iter_ndjson_batches: the first field with an unexpected JSON type, or None.
+
+    bool is not accepted as an integer, numbers must be finite (Python's json accepts NaN)
+    and integers must fit in 64 bits (the batch detectors use int64 columns). Null fields
+    are removed from the record, so consumers see them as not reported and get their defaults.
+    """
+    def check(record: Dict[str, Any]) -> Optional[str]:
+        for name, types in fields.items():
+            value = record.get(name)
+            if value is None:
+                record.pop(name, None)
+                continue
+            if isinstance(value, bool) or not isinstance(value, types):
+                return f"'{name}' must be {' or '.join(_TYPE_NAMES[t] for t in types)}"
+            if isinstance(value, int) and not -_INT64 <= value < _INT64:
+                return f"'{name}' is out of range"
+            if isinstance(value, float) and not math.isfinite(value):
+                return f"'{name}' must be finite"
+        return None
+
+    return check
+
+
+async def iter_ndjson_batches(
+    chunks: AsyncIterator[bytes],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    max_line_bytes: int = MAX_LINE_BYTES,
+    validate: Optional[Callable[[Dict[str, Any]], Optional[str]]] = None,
+    rejected: Optional[RejectedRecords] = None,
+) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Parse an async stream of byte chunks into batches of JSON objects.
+
+    With ``validate``, records for which it returns an error message are left out of the
+    batches and recorded in ``rejected`` instead of aborting the stream.
+    """
+    if validate is not None and rejected is None:
+        raise ValueError("validate requires a RejectedRecords to report skipped records")
+    pending = b""
+    batch: List[Dict[str, Any]] = []
+    line_no = 0
+
+    def parse(raw: bytes):
+        nonlocal line_no
+        line_no += 1
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            record = json.loads(raw)
+        except ValueError as e:
+            raise NDJSONError(line_no, f"invalid JSON ({e})")
+        if not isinstance(record, dict):
+            raise NDJSONError(line_no, "each record must be a JSON object")
+        if validate is not None:
+            error = validate(record)
+            if error is not None:
+                rejected.add(line_no, error)
+                return
+        batch.append(record)
+
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        data = pending + chunk
+        lines = data.split(b"\n")
+        pending = lines.pop()
+        if len(pending) > max_line_bytes:
+            raise NDJSONError(line_no + 1, "record exceeds maximum line size")
+        for raw in lines:
+            parse(raw)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+
+    if pending:
+        parse(pending)
+    if batch:
+        yield batch
@@ -0,0 +1,374 @@
+"""Users, password hashing and JWT access tokens with cached verification.
+
+bcrypt only runs at login (and when a password is set): ``authenticate`` is deliberately
+slow, so callers run it in a worker thread. Every other request only verifies its bearer
+token. The decoded claims are kept in an LRU+TTL cache keyed by the token string, so the
+signature check (~60 µs with python-jose) happens once per token per ``AUTH_CACHE_TTL``, never
+past the token's ``exp``. A cache hit costs a dict lookup plus the two revocation checks below.
+
+Revocation is checked in memory:
+
+- single tokens by ``jti`` (logout), until they expire;
+- per-user cutoffs (user disabled, password or role changed) that reject every token of
+  that user issued up to the cutoff second (a new login in that same second is rejected too).
+
+With a ``session_factory`` both are also written to the ``token_revocations`` table, and
+``start`` polls it every AUTH_REVOCATION_SYNC_INTERVAL seconds, so a token revoked on one
+worker is rejected by the others after at most that delay.
+
+passlib's bcrypt handler is broken with bcrypt >= 4.1. It reads ``bcrypt.__about__`` and its
+self-test hashes a password longer than 72 bytes, which bcrypt 5 rejects. So ``bcrypt`` is
+called directly.
+
+Create the first admin with ``python -m proyecto.app.auth <username> --role admin``.
+"""
+import argparse
+import getpass
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import bcrypt
+from jose import JWTError, jwt
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from proyecto import config
+from proyecto.app.cache import TTLCache
+from proyecto.app.database.database import SessionLocal
+from proyecto.modelo.user import ROLES, TokenRevocation, User
+
+logger = logging.getLogger(__name__)
+
+# bcrypt only uses the first 72 bytes; bcrypt 5 refuses longer inputs instead of truncating
+MAX_PASSWORD_BYTES = 72
+MIN_PASSWORD_LENGTH = 8
+MAX_USERNAME_LENGTH = 150
+
+Claims = Dict[str, Any]
+
+
+class InvalidToken(ValueError):
+    """Malformed, badly signed, expired or revoked access token"""
+
+
+class UserExists(ValueError):
+    """The username is already taken"""
+
+
+# Passwords
+
+def hash_password(password: str, rounds: Optional[int] = None) -> str:
+    data = password.encode()
+    if len(password) < MIN_PASSWORD_LENGTH:
+        raise ValueError(f"password must have at least {MIN_PASSWORD_LENGTH} characters")
+    if len(data) > MAX_PASSWORD_BYTES:
+        raise ValueError(f"password must be at most {MAX_PASSWORD_BYTES} bytes")
+    return bcrypt.hashpw(data, bcrypt.gensalt(rounds or config.BCRYPT_ROUNDS)).decode()
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    data = password.encode()
+    if len(data) > MAX_PASSWORD_BYTES:
+        return False
+    try:
+        return bcrypt.checkpw(data, password_hash.encode())
+    except ValueError:  # malformed hash
+        return False
+
+
+_dummy_hash: Optional[str] = None
+
+
+def _dummy_password_hash() -> str:
+    """Hash checked for unknown users so their logins cost the same as real ones"""
+    global _dummy_hash
+    if _dummy_hash is None:
+        _dummy_hash = bcrypt.hashpw(secrets.token_bytes(16).hex().encode(),
+                                    bcrypt.gensalt(config.BCRYPT_ROUNDS)).decode()
+    return _dummy_hash
+
+
+# Users (blocking: bcrypt and DB; run them off the event loop)
+
+def authenticate(username: str, password: str,
+                 session_factory: Callable[[], Session] = SessionLocal) -> Optional[Dict[str, Any]]:
+    """User dict when the credentials are valid and the user is active, else None"""
+    with session_factory() as db:
+        user = db.execute(select(User).where(User.username == username)).scalar_one_or_none()
+        if user is None or not user.is_active:
+            verify_password(password, _dummy_password_hash())
+            return None
+        if not verify_password(password, user.password_hash):
+            return None
+        user.last_login = datetime.utcnow()
+        db.commit()
+        return user.to_dict()
+
+
+def create_user(db: Session, username: str, password: str, role: str = "operator") -> User:
+    """Raises ValueError for an invalid username/password/role, UserExists if the name is taken"""
+    if not username or len(username) > MAX_USERNAME_LENGTH:
+        raise ValueError(f"username must have 1 to {MAX_USERNAME_LENGTH} characters")
+    if role not in ROLES:
+        raise ValueError(f"role must be one of {', '.join(ROLES)}")
+    user = User(username=username, password_hash=hash_password(password), role=role)
+    db.add(user)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise UserExists(f"username '{username}' already exists")
+    db.refresh(user)
+    return user
+
+
+def update_user(db: Session, user_id: str, role: Optional[str] = None, is_active: Optional[bool] = None,
+                password: Optional[str] = None, tokens: Optional["TokenService"] = None) -> Optional[User]:
+    """Change role/status/password; tokens issued before the change stop being accepted"""
+    user = db.get(User, user_id)
+    if user is None:
+        return None
+    if role is not None and role not in ROLES:
+        raise ValueError(f"role must be one of {', '.join(ROLES)}")
+    changed = False
+    if role is not None and role != user.role:
+        user.role = role
+        changed = True
+    if is_active is not None and bool(is_active) != bool(user.is_active):
+        user.is_active = bool(is_active)
+        changed = True
+    if password is not None:
+        user.password_hash = hash_password(password)
+        changed = True
+    db.commit()
+    if changed:
+        (tokens or get_default_tokens()).revoke_user(user.id)
+    return user
+
+
+# Tokens
+
+class TokenService:
+    def __init__(self, secret: str, algorithm: str = "HS256", ttl: int = 3600,
+                 cache: Optional[TTLCache] = None, clock: Callable[[], float] = time.time,
+                 session_factory: Optional[Callable[[], Session]] = None):
+        self._secret = secret
+        self.algorithm = algorithm
+        self.ttl = ttl
+        self._clock = clock
+        # revocations are shared with the other workers through the DB (None: this process only)
+        self.session_factory = session_factory
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        # token -> decoded claims; entries never outlive the token's exp
+        self.cache = cache if cache is not None else TTLCache(config.AUTH_CACHE_SIZE, config.AUTH_CACHE_TTL)
+        self._lock = threading.Lock()
+        # jti -> exp of tokens revoked before expiring
+        self._revoked: Dict[str, float] = {}
+        # user id -> tokens with iat up to this second are rejected (iat has 1 s resolution)
+        self._revoked_before: Dict[str, int] = {}
+        self.issued = 0
+        self.decoded = 0
+        self.rejected = 0
+
+    def issue(self, user: Dict[str, Any]) -> Tuple[str, Claims]:
+        now = int(self._clock())
+        claims = {
+            "sub": user["id"],
+            "username": user["username"],
+            "role": user["role"],
+            "iat": now,
+            "exp": now + self.ttl,
+            "jti": uuid.uuid4().hex,
+        }
+        self.issued += 1
+        return jwt.encode(claims, self._secret, algorithm=self.algorithm), claims
+
+    def verify(self, token: str) -> Claims:
+        """Claims of a valid token (shared with the cache: do not modify); raises InvalidToken"""
+        claims = self.cache.get(token)
+        now = self._clock()
+        if claims is None:
+            try:
+                claims = jwt.decode(token, self._secret, algorithms=[self.algorithm],
+                                    options={"require_exp": True, "require_iat": True,
+                                             "require_sub": True, "require_jti": True})
+            except JWTError as e:
+                self.rejected += 1
+                raise InvalidToken(str(e)) from e
+            self.decoded += 1
+            self.cache.set(token, claims, ttl=min(self.cache.ttl, claims["exp"] - now))
+        elif claims["exp"] <= now:  # the cache clock is monotonic; exp is wall time
+            self.rejected += 1
+            raise InvalidToken("Signature has expired.")
+        if claims["jti"] in self._revoked or claims["iat"] <= self._revoked_before.get(claims["sub"], -1):
+            self.rejected += 1
+            raise InvalidToken("Token has been revoked.")
+        return claims
+
+    def revoke(self, claims: Claims):
+        """Reject this token from now on (logout); blocking when revocations are persisted"""
+        self._persist(TokenRevocation(jti=claims["jti"], cutoff=int(claims["exp"]), expires_at=int(claims["exp"])))
+        self._apply([(claims["jti"], None, claims["exp"])])
+
+    def revoke_user(self, user_id: str):
+        """Reject every token of the user issued up to the current second"""
+        now = int(self._clock())
+        self._persist(TokenRevocation(user_id=user_id, cutoff=now, expires_at=now + self.ttl))
+        self._apply([(None, user_id, now)])
+
+    def _persist(self, row: TokenRevocation):
+        if self.session_factory is None:
+            return
+        with self.session_factory() as db:
+            db.add(row)
+            db.commit()
+
+    def _apply(self, revocations):
+        """Add (jti, user_id, cutoff) revocations to the in-memory sets"""
+        with self._lock:
+            now = self._clock()
+            if len(self._revoked) >= 1024:
+                self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > now}
+            # cutoffs older than the token lifetime no longer reject anything
+            if len(self._revoked_before) >= 1024:
+                self._revoked_before = {u: t for u, t in self._revoked_before.items() if t > now - self.ttl}
+            for jti, user_id, cutoff in revocations:
+                if jti is not None:
+                    self._revoked[jti] = cutoff
+                else:
+                    self._revoked_before[user_id] = max(cutoff, self._revoked_before.get(user_id, cutoff))
+
+    def sync(self) -> int:
+        """Load the revocations other workers persisted (and drop expired rows); returns how many are active"""
+        if self.session_factory is None:
+            return 0
+        now = int(self._clock())
+        with self.session_factory() as db:
+            db.execute(delete(TokenRevocation).where(TokenRevocation.expires_at < now))
+            db.commit()
+            rows = db.execute(select(TokenRevocation.jti, TokenRevocation.user_id, TokenRevocation.cutoff)).all()
+        self._apply(rows)
+        return len(rows)
+
+    def start(self, interval: float):
+        """Background thread that runs ``sync`` now and then every ``interval`` seconds"""
+        if self._thread is not None or self.session_factory is None:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.sync()
+                except Exception:
+                    logger.exception("token revocation sync failed")
+                if self._stop.wait(interval):
+                    return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="token-revocations", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "issued": self.issued,
+            "decoded": self.decoded,
+            "rejected": self.rejected,
+            "revoked_tokens": len(self._revoked),
+            "revoked_users": len(self._revoked_before),
+            "cache": self.cache.stats(),
+        }
+
+
+def _load_secret() -> str:
+    """PROYECTO_JWT_SECRET, or a key generated once into JWT_SECRET_FILE (shared by all workers)"""
+    if config.JWT_SECRET:
+        return config.JWT_SECRET
+    path = config.JWT_SECRET_FILE
+    if path.exists():
+        return path.read_text().strip()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        f.write(secrets.token_urlsafe(48))
+    try:
+        os.link(tmp, path)  # atomic and fails if another worker created it first
+        logger.warning("generated a JWT signing key in %s; set PROYECTO_JWT_SECRET to manage it yourself", path)
+    except FileExistsError:
+        pass
+    finally:
+        os.unlink(tmp)
+    return path.read_text().strip()
+
+
+_default_tokens: Optional[TokenService] = None
+_default_lock = threading.Lock()
+
+
+def get_default_tokens() -> TokenService:
+    """Process-wide token service (one claims cache per worker; revocations shared through the DB)"""
+    global _default_tokens
+    if _default_tokens is None:
+        with _default_lock:
+            if _default_tokens is None:
+                from proyecto.app.metrics import metrics
+
+                tokens = TokenService(_load_secret(), config.JWT_ALGORITHM, config.ACCESS_TOKEN_TTL,
+                                      session_factory=SessionLocal)
+                metrics.callback("auth_token_cache_hits_total", "Access tokens verified from the claims cache",
+                                 lambda: tokens.cache.hits, kind="counter")
+                metrics.callback("auth_token_decodes_total", "Access token signature checks (cache misses)",
+                                 lambda: tokens.decoded, kind="counter")
+                metrics.callback("auth_token_rejected_total", "Invalid, expired or revoked access tokens",
+                                 lambda: tokens.rejected, kind="counter")
+                _default_tokens = tokens
+    return _default_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create an API user, or reset its password/role if it exists")
+    parser.add_argument("username")
+    parser.add_argument("--role", choices=ROLES, default="admin")
+    parser.add_argument("--password-stdin", action="store_true", help="read the password from stdin")
+    args = parser.parse_args()
+    if args.password_stdin:
+        password = sys.stdin.readline().rstrip("\n")
+    else:
+        password = getpass.getpass(f"Password for {args.username}: ")
+        if getpass.getpass("Repeat password: ") != password:
+            raise SystemExit("passwords do not match")
+
+    from proyecto.app.database.database import init_db
+
+    init_db()
+    try:
+        with SessionLocal() as db:
+            user = db.execute(select(User).where(User.username == args.username)).scalar_one_or_none()
+            if user is None:
+                user = create_user(db, args.username, password, args.role)
+                print(f"created {user.role} '{user.username}' ({user.id})")
+            else:
+                update_user(db, user.id, role=args.role, is_active=True, password=password)
+                print(f"updated {args.role} '{user.username}' ({user.id})")
+    except ValueError as e:
+        raise SystemExit(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+from collections import OrderedDict
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire ``ttl`` seconds after being stored.
+
+    Lookups move the entry to the most-recently-used end; when ``maxsize`` is exceeded the
+    least recently used entry is dropped. Expired entries are removed lazily on access.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is not _MISSING:
+                expires, value = item
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data[key] = (self._clock() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, keys: Iterable[Hashable]) -> int:
+        """Drop the given keys; returns how many were present"""
+        removed = 0
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, _MISSING) is not _MISSING:
+                    removed += 1
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,23 @@
+"""Create missing tables and indexes, e.g. once per deploy before starting the API workers.
+
+Usage: python -m proyecto.app.database
+Set PROYECTO_INIT_DB_ON_STARTUP=0 on the workers so they skip the check at startup.
+"""
+from pathlib import Path
+import sys
+
+REPO_ROOT = Path(__file__).resolve().parents[3]  # workspace root
+if str(REPO_ROOT) not in sys.path:
+    sys.path.insert(0, str(REPO_ROOT))
+
+from proyecto.app.database.database import Base, engine, init_db
+
+
+def main():
+    init_db()
+    url = engine.url.render_as_string(hide_password=True)
+    print(f"{len(Base.metadata.tables)} tables ready in {url}")
+
+
+if __name__ == "__main__":
+    main()
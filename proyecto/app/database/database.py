@@ -1,7 +1,9 @@
 from pathlib import Path
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
+from importlib import import_module
 
 # Locate proyecto/ as BASE_DIR (this file is proyecto/app/database/database.py)
 BASE_DIR = Path(__file__).resolve().parents[2]
@@ -12,11 +14,72 @@ try:
 except Exception:
     from modelo.seguridad import Base
 
-DATABASE_URL = f"sqlite:///{BASE_DIR / 'data.db'}"
+try:
+    from proyecto import config
+except Exception:
+    import config
+
+from proyecto.app.metrics import instrument_engine
+
+DATABASE_URL = config.DATABASE_URL
+ASYNC_DATABASE_URL = config.ASYNC_DATABASE_URL
+
 
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+def _engine_options(url: str) -> dict:
+    """Pool/connect options for the given URL (shared by the sync and async engines)."""
+    u = make_url(url)
+    if u.get_backend_name() != "sqlite":
+        return {
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_pre_ping": True,
+        }
+    if not u.database or u.database == ":memory:":
+        return {"connect_args": {"check_same_thread": False}}
+    return {
+        "connect_args": {"check_same_thread": False, "timeout": config.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+    }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """WAL lets readers proceed while a writer commits; NORMAL sync is safe under WAL."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL))
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine is created on first use so the async driver stays optional
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        _async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+        if _async_engine.dialect.name == "sqlite":
+            event.listen(_async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        instrument_engine(_async_engine.sync_engine)
+        _AsyncSessionLocal = async_sessionmaker(_async_engine, autoflush=False, expire_on_commit=False)
+    return _async_engine
+
 
 def get_db():
     """Dependency generator for FastAPI routes"""
@@ -27,10 +90,24 @@ def get_db():
         db.close()
 
 
+async def get_async_db():
+    """Async dependency generator for FastAPI routes (SQLAlchemy asyncio)"""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
+
+
+# Model modules whose tables live in Base.metadata besides proyecto.modelo.seguridad
+MODEL_MODULES = ("proyecto.modelo.device", "proyecto.modelo.rollup", "proyecto.modelo.job", "proyecto.modelo.user")
+
+
 def init_db():
-    """Create DB tables if not present"""
+    """Create DB tables if not present (run once at startup or via ``python -m proyecto.app.database``)"""
+    for module in MODEL_MODULES:
+        import_module(module)
     Base.metadata.create_all(bind=engine)
+    # create_all skips indexes of tables that already exist; add any new ones
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
-
-# initialize on import so tables exist
-init_db()
\ No newline at end of file
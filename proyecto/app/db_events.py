@@ -0,0 +1,154 @@
+"""Callbacks fired after a commit that inserted rows of a given model.
+
+The attribute values of new ORM objects are captured in ``after_flush`` (when they are
+known to be inserted) and handed to the callbacks in ``after_commit``, so listeners only see
+data that is visible to other sessions and never trigger a refresh of expired instances;
+a rollback discards them. Core ``insert()`` statements bypass the unit of work and are not
+reported.
+
+``on_change`` works the same way for inserts, updates and deletes, for models whose rows are
+edited in place (e.g. policies toggled on and off). Only attribute assignments are seen:
+in-place mutation of a JSON value must be reassigned (or flagged) to count as a change.
+With ``core=True`` the callback also gets Core ``insert()`` / ``update()`` / ``delete()``
+statements executed through a Session (bulk loads, mass status changes): inserts with one
+dict per parameter set, anything else as a single ``(op, {})`` meaning "unknown rows".
+Statements executed directly on an engine connection are never reported.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Tuple, Type
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# callback(rows) with one {attribute: value} dict per committed instance of the model
+InsertCallback = Callable[[List[Dict[str, Any]]], None]
+# callback(changes) with one (op, {attribute: value}) per committed insert/update/delete
+ChangeCallback = Callable[[List[Tuple[str, Dict[str, Any]]]], None]
+
+_callbacks: Dict[Type, List[InsertCallback]] = {}
+_change_callbacks: Dict[Type, List[ChangeCallback]] = {}
+# on_change callbacks registered with core=True (also fed Core DML run through a Session)
+_core_callbacks: Dict[Type, List[ChangeCallback]] = {}
+_lock = threading.Lock()
+_installed = False
+_PENDING_KEY = "db_events_inserted"
+_CHANGES_KEY = "db_events_changed"
+_CORE_KEY = "db_events_core_changed"
+
+
+def _install():
+    global _installed
+    if not _installed:
+        event.listen(Session, "after_flush", _after_flush)
+        event.listen(Session, "after_commit", _after_commit)
+        event.listen(Session, "after_rollback", _after_rollback)
+        event.listen(Session, "do_orm_execute", _do_orm_execute)
+        _installed = True
+
+
+def _register(registry: Dict[Type, List], model: Type, callback) -> Callable[[], None]:
+    with _lock:
+        registry.setdefault(model, []).append(callback)
+        _install()
+
+    def unregister():
+        with _lock:
+            if callback in registry.get(model, []):
+                registry[model].remove(callback)
+
+    return unregister
+
+
+def on_insert(model: Type, callback: InsertCallback) -> Callable[[], None]:
+    """Register ``callback`` for committed inserts of ``model``; returns an unregister function"""
+    return _register(_callbacks, model, callback)
+
+
+def on_change(model: Type, callback: ChangeCallback, core: bool = False) -> Callable[[], None]:
+    """Register ``callback`` for committed inserts, updates and deletes of ``model``
+
+    ``core=True`` also reports Core DML statements on the model's table (see the module docstring).
+    """
+    unregister = _register(_change_callbacks, model, callback)
+    if not core:
+        return unregister
+    unregister_core = _register(_core_callbacks, model, callback)
+
+    def unregister_both():
+        unregister()
+        unregister_core()
+
+    return unregister_both
+
+
+def _values(obj) -> Dict[str, Any]:
+    return {k: v for k, v in inspect(obj).dict.items() if not k.startswith('_')}
+
+
+def _after_flush(session: Session, flush_context):
+    watched = _callbacks
+    for obj in session.new:
+        if type(obj) in watched:
+            session.info.setdefault(_PENDING_KEY, []).append((type(obj), _values(obj)))
+    changed = _change_callbacks
+    if changed:
+        ops = (("insert", session.new), ("update", session.dirty), ("delete", session.deleted))
+        for op, objs in ops:
+            for obj in objs:
+                if type(obj) in changed and (op != "update" or session.is_modified(obj)):
+                    session.info.setdefault(_CHANGES_KEY, []).append((type(obj), op, _values(obj)))
+
+
+def _do_orm_execute(state):
+    if not _core_callbacks or not (state.is_insert or state.is_update or state.is_delete):
+        return
+    table = getattr(state.statement, "table", None)
+    model = next((m for m in _core_callbacks if m.__table__.name == getattr(table, "name", None)), None)
+    if model is None:
+        return
+    op = "insert" if state.is_insert else "update" if state.is_update else "delete"
+    params = state.parameters
+    rows = params if isinstance(params, list) else [params] if params else []
+    changes = [(model, op, dict(row)) for row in rows] if op == "insert" else []
+    state.session.info.setdefault(_CORE_KEY, []).extend(changes or [(model, op, {})])
+
+
+def _dispatch(changes, registry: Dict[Type, List[ChangeCallback]]):
+    by_model: Dict[Type, List[Tuple[str, Dict[str, Any]]]] = {}
+    for model, op, values in changes:
+        by_model.setdefault(model, []).append((op, values))
+    for model, rows in by_model.items():
+        for callback in list(registry.get(model, [])):
+            try:
+                callback(rows)
+            except Exception:
+                logger.exception("change callback for %s failed", model.__name__)
+
+
+def _after_commit(session: Session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if pending:
+        by_model: Dict[Type, List[Dict[str, Any]]] = {}
+        for model, values in pending:
+            by_model.setdefault(model, []).append(values)
+        for model, rows in by_model.items():
+            for callback in list(_callbacks.get(model, [])):
+                try:
+                    callback(rows)
+                except Exception:
+                    logger.exception("insert callback for %s failed", model.__name__)
+    changes = session.info.pop(_CHANGES_KEY, None)
+    if changes:
+        _dispatch(changes, _change_callbacks)
+    core_changes = session.info.pop(_CORE_KEY, None)
+    if core_changes:
+        _dispatch(core_changes, _core_callbacks)
+
+
+def _after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
+    session.info.pop(_CHANGES_KEY, None)
+    session.info.pop(_CORE_KEY, None)
@@ -0,0 +1,124 @@
+"""Bulk device import: parsing of JSON/NDJSON/CSV payloads and chunked upserts."""
+import csv
+import io
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.orm import Session
+
+from proyecto.modelo.device import Device
+
+UPSERT_KEYS = ("hostname", "ip_address")
+DEVICE_FIELDS = ("hostname", "ip_address", "os", "active")
+DEFAULT_CHUNK_SIZE = 2000
+
+_TRUE = {"1", "true", "yes", "y", "si", "sí", "on"}
+
+
+def _to_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in _TRUE
+    return bool(value)
+
+
+def parse_json_array(body: bytes) -> List[Dict[str, Any]]:
+    data = json.loads(body or b"[]")
+    if isinstance(data, dict) and isinstance(data.get("devices"), list):
+        data = data["devices"]
+    if not isinstance(data, list):
+        raise ValueError("expected a JSON array of devices")
+    return data
+
+
+def parse_csv(body: bytes) -> List[Dict[str, Any]]:
+    """CSV with a header row; unknown columns are ignored."""
+    reader = csv.DictReader(io.StringIO(body.decode("utf-8-sig")))
+    return [{k.strip(): v for k, v in row.items() if k} for row in reader]
+
+
+def _clean(row: Any) -> Dict[str, Any]:
+    if not isinstance(row, dict):
+        raise ValueError("row must be an object")
+    values = {}
+    for field in DEVICE_FIELDS:
+        if field in row and row[field] not in (None, ""):
+            values[field] = _to_bool(row[field]) if field == "active" else str(row[field]).strip()
+    return values
+
+
+def upsert_devices(
+    db: Session,
+    rows: Iterable[Any],
+    key: str = "hostname",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    row_offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """Insert or update devices matched by ``key``, one transaction per chunk.
+
+    Existing devices are looked up with one SELECT per chunk, new ones are inserted with a
+    single executemany INSERT ... RETURNING and matches are updated with one bulk UPDATE by
+    primary key. Returns one result dict per input row, in input order.
+    """
+    if key not in UPSERT_KEYS:
+        raise ValueError(f"key must be one of {UPSERT_KEYS}")
+    rows = list(rows)
+    results: List[Dict[str, Any]] = []
+    for start in range(0, len(rows), chunk_size):
+        results.extend(_upsert_chunk(db, rows[start:start + chunk_size], key, row_offset + start))
+    return results
+
+
+def _upsert_chunk(db: Session, rows: List[Any], key: str, row_offset: int) -> List[Dict[str, Any]]:
+    key_col = getattr(Device, key)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+    # key value -> merged values and the rows that referenced it (later rows win)
+    pending: Dict[str, Dict[str, Any]] = {}
+    for i, raw in enumerate(rows):
+        try:
+            values = _clean(raw)
+        except ValueError as e:
+            results[i] = {"row": row_offset + i, "status": "error", "error": str(e)}
+            continue
+        if not values.get(key):
+            results[i] = {"row": row_offset + i, "status": "error", "error": f"{key} is required"}
+            continue
+        entry = pending.setdefault(values[key], {"values": {}, "rows": []})
+        entry["values"].update(values)
+        entry["rows"].append(i)
+
+    if pending:
+        existing: Dict[str, int] = {}
+        for device_id, key_value in db.execute(
+            select(Device.id, key_col).where(key_col.in_(list(pending))).order_by(Device.id)
+        ):
+            existing.setdefault(key_value, device_id)
+
+        to_insert = [k for k in pending if k not in existing]
+        to_update = [k for k in pending if k in existing]
+        ids = dict(existing)
+
+        if to_insert:
+            new_rows = []
+            for k in to_insert:
+                values = pending[k]["values"]
+                if "hostname" not in values:
+                    for i in pending[k]["rows"]:
+                        results[i] = {"row": row_offset + i, "status": "error", "error": "hostname is required"}
+                    continue
+                new_rows.append(dict(values, active=values.get("active", True)))
+            if new_rows:
+                inserted = db.scalars(insert(Device).returning(Device.id, sort_by_parameter_order=True), new_rows).all()
+                for values, device_id in zip(new_rows, inserted):
+                    ids[values[key]] = device_id
+        if to_update:
+            db.execute(update(Device), [dict(pending[k]["values"], id=existing[k]) for k in to_update])
+        db.commit()
+
+        for k, entry in pending.items():
+            if k not in ids:
+                continue
+            status = "updated" if k in existing else "created"
+            for n, i in enumerate(entry["rows"]):
+                results[i] = {"row": row_offset + i, "status": status if n == 0 else "updated", "id": ids[k]}
+    return results  # type: ignore[return-value]
@@ -1,13 +1,15 @@
 from pathlib import Path
 import json
+import os
+import tempfile
 import threading
-from typing import Dict
+import time
+from typing import Callable, Dict, List, Optional
 
 BASE_DIR = Path(__file__).resolve().parents[1]  # proyecto/
 DATA_DIR = BASE_DIR / "data"
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 FILE = DATA_DIR / "features.json"
-_LOCK = threading.Lock()
 
 DEFAULT_FEATURES: Dict[str, Dict] = {
     "ransomware": {"name": "Protección multicapa contra ransomware", "enabled": True},
@@ -16,39 +18,166 @@ DEFAULT_FEATURES: Dict[str, Dict] = {
     "cloud_security": {"name": "Seguridad basada en la nube", "enabled": True},
 }
 
+# How often (seconds) readers stat the file to pick up edits made by other processes
+CHECK_INTERVAL = 1.0
 
-def _read() -> Dict[str, Dict]:
-    if not FILE.exists():
-        _write(DEFAULT_FEATURES)
-        return DEFAULT_FEATURES.copy()
-    try:
-        with FILE.open("r", encoding="utf-8") as f:
-            data = json.load(f)
+# callback(changes, version) where changes maps feature key -> new info dict
+Subscriber = Callable[[Dict[str, Dict], int], None]
+
+
+class FeatureStore:
+    """Process-wide feature flags served from an in-memory snapshot.
+
+    Reads never take a lock: the snapshot dict is replaced as a whole on every change and
+    never mutated in place. Writes go through a lock and are persisted with temp file +
+    rename, so other processes never observe a half-written file. Edits made by other
+    workers (or by hand) are detected through the file mtime, checked at most once per
+    ``check_interval`` seconds.
+    """
+
+    def __init__(self, path: Path, defaults: Dict[str, Dict], check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.defaults = defaults
+        self.check_interval = check_interval
+        self._write_lock = threading.Lock()
+        self._subscribers: List[Subscriber] = []
+        self._snapshot: Dict[str, Dict] = {}
+        self._stamp: Optional[tuple] = None
+        self._next_check = 0.0
+        self.version = 0
+        with self._write_lock:
+            self._load()
+
+    # -- persistence -----------------------------------------------------
+
+    def _file_stamp(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def _merge(self, data: Dict[str, Dict]) -> Dict[str, Dict]:
         # merge with defaults to ensure keys exist
-        merged = {k: dict(DEFAULT_FEATURES[k]) for k in DEFAULT_FEATURES}
+        merged = {k: dict(v) for k, v in self.defaults.items()}
         for k, v in data.items():
-            if k in merged:
+            if k in merged and isinstance(v, dict):
                 merged[k].update(v)
         return merged
-    except Exception:
-        return DEFAULT_FEATURES.copy()
 
+    def _load(self) -> Dict[str, Dict]:
+        """Reload the snapshot from disk (caller holds the write lock); returns changes."""
+        stamp = self._file_stamp()
+        if stamp is None:
+            self._persist(self.defaults)
+            data = self._merge({})
+        else:
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    data = self._merge(json.load(f))
+            except (OSError, ValueError):
+                # keep serving the last good snapshot while the file is unreadable
+                data = self._snapshot or self._merge({})
+            self._stamp = stamp
+        return self._swap(data)
+
+    def _persist(self, data: Dict[str, Dict]):
+        fd, tmp = tempfile.mkstemp(prefix=".features-", suffix=".json", dir=str(self.path.parent))
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+        self._stamp = self._file_stamp()
+
+    def _swap(self, data: Dict[str, Dict]) -> Dict[str, Dict]:
+        old = self._snapshot
+        changes = {k: v for k, v in data.items() if old.get(k) != v}
+        if changes or not old:
+            self._snapshot = data
+            self.version += 1
+        return changes
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        if self._file_stamp() == self._stamp:
+            return
+        with self._write_lock:
+            changes = self._load()
+            version = self.version
+        self._notify(changes, version)
+
+    # -- public API --------------------------------------------------------
 
-def _write(data: Dict[str, Dict]):
-    with FILE.open("w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
+    def snapshot(self) -> Dict[str, Dict]:
+        """Current flags; treat the returned mapping as read-only."""
+        self._maybe_reload()
+        return self._snapshot
+
+    def is_enabled(self, key: str) -> bool:
+        info = self.snapshot().get(key)
+        return bool(info and info.get("enabled"))
+
+    def set(self, key: str, enabled: bool) -> bool:
+        with self._write_lock:
+            # pick up external edits first so they are not overwritten
+            if self._file_stamp() != self._stamp:
+                self._load()
+            current = self._snapshot
+            if key not in current:
+                return False
+            data = dict(current)
+            data[key] = dict(current[key], enabled=bool(enabled))
+            self._persist(data)
+            changes = self._swap(data)
+            version = self.version
+        self._notify(changes, version)
+        return True
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Register ``callback`` for flag changes; returns a function that unsubscribes it."""
+        with self._write_lock:
+            self._subscribers = self._subscribers + [callback]
+
+        def unsubscribe():
+            with self._write_lock:
+                self._subscribers = [s for s in self._subscribers if s is not callback]
+        return unsubscribe
+
+    def _notify(self, changes: Dict[str, Dict], version: int):
+        if not changes:
+            return
+        for callback in self._subscribers:
+            try:
+                callback(changes, version)
+            except Exception:
+                pass
+
+
+store = FeatureStore(FILE, DEFAULT_FEATURES)
 
 
 def get_all_features() -> Dict[str, Dict]:
-    with _LOCK:
-        return _read()
+    return {k: dict(v) for k, v in store.snapshot().items()}
+
+
+def is_feature_enabled(feature_key: str) -> bool:
+    return store.is_enabled(feature_key)
 
 
 def set_feature(feature_key: str, enabled: bool) -> bool:
-    with _LOCK:
-        data = _read()
-        if feature_key not in data:
-            return False
-        data[feature_key]["enabled"] = bool(enabled)
-        _write(data)
-        return True
\ No newline at end of file
+    return store.set(feature_key, enabled)
+
+
+def subscribe(callback: Subscriber) -> Callable[[], None]:
+    return store.subscribe(callback)
@@ -0,0 +1,298 @@
+"""Agent heartbeats buffered in memory and written back in one batch per interval.
+
+Every check-in only updates an in-memory map (latest ``last_seen`` and reported status per
+device or endpoint), so thousands of agents reporting every few seconds cost no database
+writes on the request path. A background thread flushes the entries that changed since
+the previous flush with one executemany ``UPDATE`` per table inside a single transaction,
+i.e. one write transaction per ``interval`` regardless of the heartbeat rate. "Online now"
+queries are answered from the map; ``bootstrap`` seeds it from the tables at startup.
+
+Only ids that exist in their table are accepted: unknown ids are looked up once per batch
+(one ``SELECT ... IN``) and dropped if missing, and agents silent for longer than
+``retention`` are evicted, so the map is bounded by the live fleet.
+
+A crash loses at most one interval of ``last_seen`` updates, which the next heartbeats
+overwrite anyway.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+from proyecto import config
+from proyecto.app import db_events
+from proyecto.app.database.database import SessionLocal
+from proyecto.modelo.device import Device
+from proyecto.modelo.seguridad import Endpoint
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("device", "endpoint")
+# Endpoint.status is a String(20)
+MAX_STATUS_LENGTH = 20
+
+# Ids per SELECT when checking that heartbeat ids exist
+LOOKUP_BATCH = 500
+
+# Latest check-in of one device/endpoint: (last_seen, status)
+Beat = Tuple[datetime, Optional[str]]
+_TABLES = {"device": Device.__table__, "endpoint": Endpoint.__table__}
+
+
+class HeartbeatBuffer:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal,
+                 on_endpoints_flushed: Optional[Callable[[Dict[str, datetime]], None]] = None,
+                 retention: float = config.HEARTBEAT_RETENTION):
+        self.session_factory = session_factory
+        self.retention = retention
+        # called after each flush with {endpoint_id: last_seen} of the endpoints written
+        self.on_endpoints_flushed = on_endpoints_flushed
+        self._lock = threading.Lock()
+        self._latest: Dict[str, Dict[Any, Beat]] = {kind: {} for kind in KINDS}
+        self._dirty: Dict[str, Dict[Any, Beat]] = {kind: {} for kind in KINDS}
+        # ids confirmed to exist in their table (dropped again when the agent is evicted)
+        self._known: Dict[str, set] = {kind: set() for kind in KINDS}
+        self._next_evict = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.received = 0
+        self.unknown = 0
+        self.evicted = 0
+        self.flushes = 0
+        self.rows_written = 0
+        self.last_flush_seconds = 0.0
+
+    def record(self, kind: str, key: Any, status: Optional[str] = None, now: Optional[datetime] = None):
+        self.record_many([(kind, key, status)], now)
+
+    def record_many(self, beats: Iterable[Tuple[str, Any, Optional[str]]], now: Optional[datetime] = None,
+                    unknown: Optional[List[Tuple[str, Any]]] = None) -> int:
+        """Register check-ins ``(kind, id, status)`` at ``now`` (server time); returns how many.
+
+        Check-ins for ids missing from their table are dropped (appended to ``unknown``).
+        """
+        now = now or datetime.utcnow()
+        beats = list(beats)
+        with self._lock:
+            missing = {(kind, key) for kind, key, _ in beats if key not in self._known[kind]}
+        if missing:
+            found = self._existing(missing)
+            with self._lock:
+                for kind, key in found:
+                    self._known[kind].add(key)
+        n = 0
+        with self._lock:
+            latest, dirty, known = self._latest, self._dirty, self._known
+            for kind, key, status in beats:
+                if key not in known[kind]:
+                    self.unknown += 1
+                    if unknown is not None:
+                        unknown.append((kind, key))
+                    continue
+                if status is None:
+                    previous = latest[kind].get(key)
+                    status = previous[1] if previous is not None else None
+                beat = (now, status)
+                latest[kind][key] = beat
+                dirty[kind][key] = beat
+                n += 1
+            self.received += n
+        return n
+
+    def _existing(self, keys: Iterable[Tuple[str, Any]]) -> List[Tuple[str, Any]]:
+        """The ``(kind, id)`` pairs that have a row in their table"""
+        by_kind: Dict[str, List[Any]] = {kind: [] for kind in KINDS}
+        for kind, key in keys:
+            by_kind[kind].append(key)
+        found = []
+        with self.session_factory() as db:
+            for kind, ids in by_kind.items():
+                table = _TABLES[kind]
+                for i in range(0, len(ids), LOOKUP_BATCH):
+                    chunk = ids[i:i + LOOKUP_BATCH]
+                    found.extend((kind, key) for key in db.execute(select(table.c.id).where(table.c.id.in_(chunk))).scalars())
+        return found
+
+    def forget(self, kind: str, key: Any):
+        """Drop a deleted device/endpoint; later heartbeats for it are rejected"""
+        with self._lock:
+            self._known[kind].discard(key)
+            self._latest[kind].pop(key, None)
+            self._dirty[kind].pop(key, None)
+
+    def evict(self, now: Optional[datetime] = None) -> int:
+        """Drop agents silent for longer than ``retention`` (they are offline for every query)"""
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.retention)
+        evicted = 0
+        with self._lock:
+            for kind in KINDS:
+                latest, dirty, known = self._latest[kind], self._dirty[kind], self._known[kind]
+                stale = [key for key, (ts, _) in latest.items() if ts < cutoff and key not in dirty]
+                for key in stale:
+                    del latest[key]
+                    known.discard(key)  # re-checked against the table if it reports again
+                evicted += len(stale)
+            self.evicted += evicted
+        return evicted
+
+    def last_seen(self, kind: str, key: Any) -> Optional[Beat]:
+        return self._latest[kind].get(key)
+
+    def online(self, kind: str, within: float, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Devices or endpoints with a heartbeat in the last ``within`` seconds, newest first"""
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=within)
+        with self._lock:
+            items = list(self._latest[kind].items())
+        online = [(key, ts, status) for key, (ts, status) in items if ts >= cutoff]
+        online.sort(key=lambda item: item[1], reverse=True)
+        return [{"id": key, "last_seen": ts, "status": status} for key, ts, status in online]
+
+    def count_online(self, kind: str, within: float, now: Optional[datetime] = None) -> int:
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=within)
+        with self._lock:
+            values = list(self._latest[kind].values())
+        return sum(1 for ts, _ in values if ts >= cutoff)
+
+    def flush(self) -> int:
+        """Write pending heartbeats in one transaction; returns the number of rows updated"""
+        now = time.monotonic()
+        if now >= self._next_evict:
+            # a full pass over the map, so at most once per minute (or retention, if shorter)
+            self._next_evict = now + min(60.0, self.retention)
+            self.evict()
+        with self._lock:
+            dirty = self._dirty
+            if not any(dirty.values()):
+                return 0
+            self._dirty = {kind: {} for kind in KINDS}
+        t0 = time.perf_counter()
+        devices = [{"b_id": key, "b_seen": ts} for key, (ts, _) in dirty["device"].items()]
+        with_status = [{"b_id": key, "b_seen": ts, "b_status": status}
+                       for key, (ts, status) in dirty["endpoint"].items() if status is not None]
+        without_status = [{"b_id": key, "b_seen": ts}
+                          for key, (ts, status) in dirty["endpoint"].items() if status is None]
+        device_table, endpoint_table = Device.__table__, Endpoint.__table__
+        statements = [
+            (update(device_table).where(device_table.c.id == bindparam("b_id"))
+             .values(last_seen=bindparam("b_seen")), devices),
+            (update(endpoint_table).where(endpoint_table.c.id == bindparam("b_id"))
+             .values(last_seen=bindparam("b_seen"), status=bindparam("b_status")), with_status),
+            (update(endpoint_table).where(endpoint_table.c.id == bindparam("b_id"))
+             .values(last_seen=bindparam("b_seen")), without_status),
+        ]
+        written = 0
+        try:
+            with self.session_factory() as db:
+                for stmt, params in statements:
+                    if params:
+                        written += max(db.execute(stmt, params).rowcount, 0)
+                db.commit()
+        except Exception:
+            # put the batch back unless newer heartbeats replaced it meanwhile
+            with self._lock:
+                for kind in KINDS:
+                    for key, beat in dirty[kind].items():
+                        self._dirty[kind].setdefault(key, beat)
+            raise
+        self.flushes += 1
+        self.rows_written += written
+        self.last_flush_seconds = time.perf_counter() - t0
+        if self.on_endpoints_flushed is not None and dirty["endpoint"]:
+            try:
+                self.on_endpoints_flushed({key: ts for key, (ts, _) in dirty["endpoint"].items()})
+            except Exception:
+                logger.exception("heartbeat flush listener failed")
+        return written
+
+    def bootstrap(self, db: Session, within: float = 3600.0) -> int:
+        """Seed the map with rows seen in the last ``within`` seconds so online queries work after a restart"""
+        since = datetime.utcnow() - timedelta(seconds=within)
+        n = 0
+        with self._lock:
+            for key, ts in db.execute(select(Device.id, Device.last_seen).where(Device.last_seen >= since)):
+                self._latest["device"].setdefault(key, (ts, None))
+                self._known["device"].add(key)
+                n += 1
+            for key, ts, status in db.execute(
+                select(Endpoint.id, Endpoint.last_seen, Endpoint.status).where(Endpoint.last_seen >= since)
+            ):
+                self._latest["endpoint"].setdefault(key, (ts, status))
+                self._known["endpoint"].add(key)
+                n += 1
+        return n
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "received": self.received,
+                "unknown": self.unknown,
+                "evicted": self.evicted,
+                "tracked": {kind: len(entries) for kind, entries in self._latest.items()},
+                "pending": {kind: len(entries) for kind, entries in self._dirty.items()},
+                "flushes": self.flushes,
+                "rows_written": self.rows_written,
+                "last_flush_ms": round(self.last_flush_seconds * 1000, 3),
+            }
+
+    def start(self, interval: float = config.HEARTBEAT_FLUSH_INTERVAL):
+        """Background thread that flushes every ``interval`` seconds"""
+        if self._thread is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.flush()
+                except Exception:
+                    logger.exception("heartbeat flush failed")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="heartbeat-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+
+_default_buffer: Optional[HeartbeatBuffer] = None
+
+
+def get_default_buffer() -> HeartbeatBuffer:
+    """Process-wide buffer; flushed endpoint check-ins also refresh their risk score"""
+    global _default_buffer
+    if _default_buffer is None:
+        on_endpoints_flushed = None
+        try:
+            from proyecto.services.risk_scoring import get_default_engine
+        except Exception:
+            get_default_engine = None
+        if get_default_engine is not None:
+            engine = get_default_engine()
+
+            def on_endpoints_flushed(seen: Dict[str, datetime]):
+                for endpoint_id, ts in seen.items():
+                    engine.touch(endpoint_id, ts)
+
+        buffer = HeartbeatBuffer(on_endpoints_flushed=on_endpoints_flushed)
+
+        def forget_deleted(kind: str):
+            def callback(changes):
+                for op, row in changes:
+                    if op == "delete":
+                        buffer.forget(kind, row.get("id"))
+            return callback
+
+        # deletes committed in this process; other processes' deletes are caught on eviction
+        db_events.on_change(Device, forget_deleted("device"))
+        db_events.on_change(Endpoint, forget_deleted("endpoint"))
+        _default_buffer = buffer
+    return _default_buffer
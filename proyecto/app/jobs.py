@@ -0,0 +1,438 @@
+"""Background scan jobs: a bounded worker pool with per-endpoint limits and cancellation.
+
+A job is persisted in ``scan_jobs`` and runs as small work units on a fixed thread pool
+(hashing in ``hashlib`` releases the GIL, so threads overlap I/O and hashing without
+forking the API process):
+
+1. a planning unit lists the files under the requested paths and splits them into chunks;
+2. each chunk is scanned by ``RansomwareProtectionService.scan_files``.
+
+At most ``workers`` units are in flight in total and at most ``per_endpoint`` for one
+endpoint; units are handed out round-robin across jobs, so one large scan cannot starve
+the others. Progress is kept in memory (what ``get`` returns for live jobs), written to the
+table at most every ``PROGRESS_INTERVAL`` seconds and published on the ``scans`` topic.
+Cancelling drops the pending chunks and stops the running ones between files.
+
+One scheduler is meant to own the table: ``start`` marks jobs left QUEUED/RUNNING by a
+previous process as FAILED.
+"""
+import logging
+import os
+import stat
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from proyecto import config
+from proyecto.app.database.database import SessionLocal
+from proyecto.app.pubsub import publish
+from proyecto.modelo.job import ScanJob
+
+logger = logging.getLogger(__name__)
+
+LIVE_STATUSES = ("QUEUED", "RUNNING")
+PROGRESS_INTERVAL = 0.5
+# Suspicious / known-malicious files kept in the job row
+MAX_FINDINGS = 100
+_PLAN = object()
+
+
+class JobQueueFull(Exception):
+    """Raised by ``submit`` when too many jobs are already queued or running"""
+
+
+class _Job:
+    __slots__ = ("id", "endpoint_id", "paths", "status", "pending", "in_flight", "planned", "cancelled",
+                 "created_at", "started_at", "finished_at", "files_total", "files_scanned", "bytes_scanned",
+                 "chunks_total", "chunks_done", "suspicious_files", "known_malicious", "findings", "error",
+                 "files_protected", "backup_snapshot", "version", "persisted_version", "persisted_at", "persist_lock")
+
+    def __init__(self, row: ScanJob):
+        self.id = row.id
+        self.endpoint_id = row.endpoint_id
+        self.paths = list(row.paths)
+        self.status = "QUEUED"
+        self.pending: Deque[Any] = deque([_PLAN])
+        self.in_flight = 0
+        self.planned = False
+        self.cancelled = False
+        self.created_at = row.created_at
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.files_total = self.files_scanned = self.bytes_scanned = 0
+        self.chunks_total = self.chunks_done = 0
+        self.suspicious_files = self.known_malicious = 0
+        self.findings: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+        # in memory only: they go into the incident, not into the scan_jobs row
+        self.files_protected = 0
+        self.backup_snapshot: Optional[str] = None
+        self.version = 0
+        self.persisted_version = 0
+        self.persisted_at = 0.0
+        self.persist_lock = threading.Lock()
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "endpoint_id": self.endpoint_id,
+            "status": self.status,
+            "paths": self.paths,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "files_total": self.files_total,
+            "files_scanned": self.files_scanned,
+            "bytes_scanned": self.bytes_scanned,
+            "chunks_total": self.chunks_total,
+            "chunks_done": self.chunks_done,
+            "suspicious_files": self.suspicious_files,
+            "known_malicious": self.known_malicious,
+            "findings": list(self.findings),
+            "error": self.error,
+            "cancel_requested": self.cancelled,
+        }
+
+
+def _scannable(path: str, max_bytes: int) -> bool:
+    """Regular file (not a symlink, FIFO, device or socket) no larger than ``max_bytes``"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISREG(st.st_mode) and st.st_size <= max_bytes
+
+
+def list_files(paths: List[str], limit: int, should_stop: Optional[Callable[[], bool]] = None,
+               max_bytes: int = config.HASH_MAX_FILE_BYTES) -> List[str]:
+    """Regular files under ``paths`` (files or directories), sorted per directory.
+
+    Symlinks are never followed or returned, and special files (FIFOs, devices, sockets) and
+    files over ``max_bytes`` are skipped, so hashing a listed file cannot block or run unbounded.
+    """
+    files: List[str] = []
+    for path in paths:
+        try:
+            st = os.lstat(path)
+        except OSError:
+            continue
+        if stat.S_ISREG(st.st_mode):
+            if st.st_size <= max_bytes:
+                files.append(path)
+            continue
+        if not stat.S_ISDIR(st.st_mode):
+            continue
+        for root, dirs, names in os.walk(path):
+            if should_stop is not None and should_stop():
+                return files
+            dirs.sort()
+            files.extend(p for p in (os.path.join(root, name) for name in sorted(names)) if _scannable(p, max_bytes))
+            if len(files) > limit:
+                raise ValueError(f"more than {limit} files to scan")
+    return files
+
+
+class ScanScheduler:
+    def __init__(
+        self,
+        service=None,
+        workers: int = config.SCAN_WORKERS,
+        per_endpoint: int = config.SCAN_MAX_PER_ENDPOINT,
+        chunk_size: int = config.SCAN_CHUNK_SIZE,
+        max_jobs: int = config.SCAN_MAX_PENDING_JOBS,
+        max_files: int = config.SCAN_MAX_FILES,
+        session_factory: Callable[[], Session] = SessionLocal,
+        service_factory: Optional[Callable[[], Any]] = None,
+    ):
+        # scanning service, or a factory called when the first chunk runs so that importing
+        # the service is not paid by processes that never scan
+        self._service = service
+        self._service_factory = service_factory
+        self.workers = workers
+        self.per_endpoint = per_endpoint
+        self.chunk_size = chunk_size
+        self.max_jobs = max_jobs
+        self.max_files = max_files
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._jobs: Dict[str, _Job] = {}
+        # live jobs in round-robin order
+        self._queue: Deque[_Job] = deque()
+        self._in_flight = 0
+        self._running_per_endpoint: Counter = Counter()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def service(self):
+        if self._service is None:
+            with self._lock:
+                if self._service is None:
+                    self._service = self._service_factory()
+        return self._service
+
+    def start(self, recover: bool = True):
+        if self._executor is not None:
+            return
+        if recover:
+            with self.session_factory() as db:
+                n = db.execute(
+                    update(ScanJob).where(ScanJob.status.in_(LIVE_STATUSES))
+                    .values(status="FAILED", error="interrupted by restart", finished_at=datetime.utcnow())
+                ).rowcount
+                db.commit()
+            if n:
+                logger.warning("marked %d interrupted scan job(s) as failed", n)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan-job")
+
+    def stop(self):
+        """Cancel live jobs and wait for the running units to return"""
+        if self._executor is None:
+            return
+        for job_id in list(self._jobs):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=True)
+        self._executor = None
+
+    def submit(self, endpoint_id: str, paths: List[str]) -> Dict[str, Any]:
+        """Persist a QUEUED job and schedule it; raises JobQueueFull when at capacity"""
+        if self._executor is None:
+            self.start()
+        with self._lock:
+            if len(self._jobs) >= self.max_jobs:
+                raise JobQueueFull(f"{len(self._jobs)} scan jobs already queued or running")
+        with self.session_factory() as db:
+            row = ScanJob(endpoint_id=endpoint_id, paths=list(paths), status="QUEUED")
+            db.add(row)
+            db.commit()
+            job = _Job(row)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._queue.append(job)
+            self._dispatch_locked()
+            snapshot = job.snapshot()
+        self._announce(snapshot)
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.snapshot()
+        with self.session_factory() as db:
+            row = db.get(ScanJob, job_id)
+            return row.to_dict() if row is not None else None
+
+    def list(self, status: Optional[str] = None, endpoint_id: Optional[str] = None,
+             limit: int = 50) -> List[Dict[str, Any]]:
+        """Newest jobs first; live jobs show their in-memory progress"""
+        stmt = select(ScanJob).order_by(ScanJob.created_at.desc()).limit(limit)
+        if status is not None:
+            stmt = stmt.where(ScanJob.status == status)
+        if endpoint_id is not None:
+            stmt = stmt.where(ScanJob.endpoint_id == endpoint_id)
+        with self.session_factory() as db:
+            rows = [row.to_dict() for row in db.execute(stmt).scalars()]
+        with self._lock:
+            return [self._jobs[r["id"]].snapshot() if r["id"] in self._jobs else r for r in rows]
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Cancel a queued or running job; finished jobs are returned unchanged"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.cancelled = True
+                job.pending.clear()
+                if job.in_flight == 0:
+                    self._finish_locked(job)
+                snapshot, version = job.snapshot(), job.version
+        if job is None:
+            # not owned by this scheduler: the owner sees the status change on its next write
+            with self.session_factory() as db:
+                db.execute(update(ScanJob).where(ScanJob.id == job_id, ScanJob.status.in_(LIVE_STATUSES))
+                           .values(status="CANCELLED", finished_at=datetime.utcnow()))
+                db.commit()
+                row = db.get(ScanJob, job_id)
+                return row.to_dict() if row is not None else None
+        if snapshot["finished_at"]:
+            self._persist(job, snapshot, version, force=True)
+        self._announce(snapshot)
+        return snapshot
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until no job is live (benchmarks, shutdown scripts)"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._jobs, timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "per_endpoint": self.per_endpoint,
+                "live_jobs": len(self._jobs),
+                "units_in_flight": self._in_flight,
+                "units_pending": sum(len(job.pending) for job in self._queue),
+            }
+
+    # Scheduling
+
+    def _dispatch_locked(self):
+        while self._in_flight < self.workers and self._queue:
+            picked = None
+            for _ in range(len(self._queue)):
+                job = self._queue[0]
+                self._queue.rotate(-1)
+                if job.pending and self._running_per_endpoint[job.endpoint_id] < self.per_endpoint:
+                    picked = job
+                    break
+            if picked is None:
+                return
+            unit = picked.pending.popleft()
+            picked.in_flight += 1
+            self._running_per_endpoint[picked.endpoint_id] += 1
+            self._in_flight += 1
+            self._executor.submit(self._run_unit, picked, unit)
+
+    def _run_unit(self, job: _Job, unit):
+        files: Optional[List[str]] = None
+        result: Optional[Dict[str, Any]] = None
+        error: Optional[str] = None
+        try:
+            if job.cancelled:
+                pass
+            elif unit is _PLAN:
+                files = list_files(job.paths, self.max_files, should_stop=lambda: job.cancelled)
+            else:
+                result = self.service.scan_files(job.endpoint_id, unit, should_stop=lambda: job.cancelled)
+        except Exception as e:
+            logger.exception("scan job %s failed", job.id)
+            error = str(e) or type(e).__name__
+
+        with self._lock:
+            job.in_flight -= 1
+            self._in_flight -= 1
+            self._running_per_endpoint[job.endpoint_id] -= 1
+            if self._running_per_endpoint[job.endpoint_id] <= 0:
+                del self._running_per_endpoint[job.endpoint_id]
+            if error is not None and job.error is None:
+                job.error = error
+                job.pending.clear()
+            if files is not None:
+                self._plan_locked(job, files)
+            if result is not None:
+                self._merge_locked(job, result)
+            job.version += 1
+            done = job.in_flight == 0 and (job.cancelled or job.error is not None or (job.planned and not job.pending))
+            if done:
+                self._finish_locked(job)
+            self._dispatch_locked()
+            snapshot, version = job.snapshot(), job.version
+        if self._persist(job, snapshot, version, force=done) or done:
+            self._announce(snapshot)
+        if done and snapshot["status"] == "COMPLETED" and (job.suspicious_files or job.known_malicious):
+            self._record_incident(job)
+
+    def _plan_locked(self, job: _Job, files: List[str]):
+        size = self.chunk_size
+        job.pending.extend(files[i:i + size] for i in range(0, len(files), size))
+        job.planned = True
+        job.status = "RUNNING"
+        job.started_at = datetime.utcnow()
+        job.files_total = len(files)
+        job.chunks_total = len(job.pending)
+
+    def _merge_locked(self, job: _Job, result: Dict[str, Any]):
+        job.chunks_done += 1
+        job.files_scanned += result["files_scanned"]
+        job.bytes_scanned += result["bytes_scanned"]
+        job.suspicious_files += len(result["suspicious_activities"])
+        job.known_malicious += len(result["known_malicious"])
+        job.files_protected += result.get("files_protected", 0)
+        job.backup_snapshot = result.get("backup_snapshot") or job.backup_snapshot
+        for kind in ("suspicious_activities", "known_malicious"):
+            for op in result[kind]:
+                if len(job.findings) >= MAX_FINDINGS:
+                    return
+                job.findings.append({"file_path": op["file_path"], "sha256": op.get("sha256"),
+                                     "reason": "suspicious" if kind == "suspicious_activities" else "known_malicious"})
+
+    def _finish_locked(self, job: _Job):
+        if job.error is not None:
+            job.status = "FAILED"
+        elif job.cancelled:
+            job.status = "CANCELLED"
+        else:
+            job.status = "COMPLETED"
+        job.finished_at = datetime.utcnow()
+        job.version += 1
+        self._jobs.pop(job.id, None)
+        try:
+            self._queue.remove(job)
+        except ValueError:
+            pass
+        if not self._jobs:
+            self._idle.notify_all()
+
+    # Persistence and events
+
+    def _persist(self, job: _Job, snapshot: Dict[str, Any], version: int, force: bool = False) -> bool:
+        """Write the snapshot unless a newer one was written or the last write was too recent"""
+        now = time.monotonic()
+        with job.persist_lock:
+            if job.persisted_version >= version:
+                return False
+            if not force and now - job.persisted_at < PROGRESS_INTERVAL:
+                return False
+            values = {k: v for k, v in snapshot.items() if k not in ("id", "endpoint_id", "paths", "created_at", "cancel_requested")}
+            for key in ("started_at", "finished_at"):
+                values[key] = datetime.fromisoformat(values[key]) if values[key] else None
+            with self.session_factory() as db:
+                # a job cancelled from another process is no longer live in the table
+                updated = db.execute(
+                    update(ScanJob).where(ScanJob.id == job.id, ScanJob.status.in_(LIVE_STATUSES)).values(**values)
+                ).rowcount
+                db.commit()
+            job.persisted_version = version
+            job.persisted_at = now
+        if not updated and not job.cancelled:
+            job.cancelled = True
+        return True
+
+    def _announce(self, snapshot: Dict[str, Any]):
+        done = snapshot["finished_at"] is not None
+        publish("scans", {**snapshot, "job_id": snapshot["id"], "done": done,
+                          "suspicious_activities": snapshot["suspicious_files"] + snapshot["known_malicious"]},
+                key=f"scan-job:{snapshot['id']}", type="progress")
+
+    def _record_incident(self, job: _Job):
+        try:
+            with self.session_factory() as db:
+                self.service.record_incident(db, job.endpoint_id, job.suspicious_files + job.known_malicious,
+                                             job.files_protected, backup_snapshot=job.backup_snapshot,
+                                             encryption_attempts=job.suspicious_files)
+        except Exception:
+            logger.exception("could not record incident for scan job %s", job.id)
+
+
+_default_scheduler: Optional[ScanScheduler] = None
+
+
+def _default_service():
+    from proyecto.services.ransomware_protection import RansomwareProtectionService
+    return RansomwareProtectionService()
+
+
+def get_default_scheduler(service=None, service_factory: Optional[Callable[[], Any]] = None) -> ScanScheduler:
+    """Process-wide scheduler; the first call may pass the scanning service (or its factory) to use"""
+    global _default_scheduler
+    if _default_scheduler is None:
+        if service is None and service_factory is None:
+            service_factory = _default_service
+        _default_scheduler = ScanScheduler(service, service_factory=service_factory)
+    return _default_scheduler
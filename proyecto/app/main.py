@@ -9,7 +9,11 @@ if str(REPO_ROOT) not in sys.path:
 # Base project dir (proyecto/)
 BASE_DIR = Path(__file__).resolve().parents[1]
 
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+import asyncio
+
+from fastapi import Depends, FastAPI, WebSocket, WebSocketDisconnect, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
@@ -21,28 +25,100 @@ except Exception:
     # explicit error to make failures clearer
     raise ImportError("Cannot import proyecto.api.endpoints. Ensure you're running from workspace root.")
 
+try:
+    from proyecto.api.auth import router as auth_router
+except Exception:
+    auth_router = None
+
 try:
     from proyecto.api.admin import router as admin_router
 except Exception:
     admin_router = None
 
 try:
-    from proyecto.app.database.database import init_db
+    from proyecto.api.dashboard import router as dashboard_router
+except Exception:
+    dashboard_router = None
+
+try:
+    from proyecto.api.heartbeats import router as heartbeats_router
+except Exception:
+    heartbeats_router = None
+
+try:
+    from proyecto.api.metrics import router as metrics_router
+except Exception:
+    metrics_router = None
+
+try:
+    from proyecto.api.devices_async import router as devices_async_router
+except Exception:
+    # SQLAlchemy asyncio extension (greenlet) not available
+    devices_async_router = None
+
+try:
+    from proyecto.app.database.database import SessionLocal, init_db
 except Exception:
     raise ImportError("Cannot import proyecto.app.database.database.init_db")
 
-# Ensure device model is loaded so its table is created before init_db()
+from proyecto import config
+from proyecto.api.auth import claims_from_request, require_user_except_public
+from proyecto.app.auth import get_default_tokens
+from proyecto.api.responses import ORJSONResponse
+from proyecto.app.metrics import MetricsMiddleware
+
+from proyecto.app.pubsub import TOPICS, broker
+
+from proyecto.services.registry import registry
+
 try:
-    import proyecto.modelo.device  # noqa: F401
+    from proyecto.app.heartbeats import get_default_buffer as get_heartbeat_buffer
 except Exception:
-    # ignore if missing; init_db will still create existing tables
-    pass
+    get_heartbeat_buffer = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema check runs once here instead of at import (skip it with PROYECTO_INIT_DB_ON_STARTUP=0)
+    if config.INIT_DB_ON_STARTUP:
+        await run_in_threadpool(init_db)
+    # Token revocations made by the other workers (logouts, disabled users)
+    tokens = get_default_tokens() if config.AUTH_ENABLED else None
+    if tokens is not None:
+        tokens.start(config.AUTH_REVOCATION_SYNC_INTERVAL)
+    # Risk scores: aggregates are loaded once, then kept current from committed inserts
+    risk_engine = registry.get_optional("risk_scoring")
+    if risk_engine is not None:
+        with SessionLocal() as db:
+            await run_in_threadpool(risk_engine.bootstrap, db)
+        risk_engine.start(config.RISK_FLUSH_INTERVAL)
+    # Scan job worker pool; jobs left running by a previous process are marked failed
+    scan_scheduler = registry.get_optional("scan_jobs")
+    if scan_scheduler is not None:
+        await run_in_threadpool(scan_scheduler.start)
+    # Heartbeats: "online now" is answered from memory, seeded with recent last_seen values
+    heartbeat_buffer = None
+    if get_heartbeat_buffer is not None:
+        heartbeat_buffer = get_heartbeat_buffer()
+        with SessionLocal() as db:
+            await run_in_threadpool(heartbeat_buffer.bootstrap, db, config.HEARTBEAT_ONLINE_WINDOW)
+        heartbeat_buffer.start(config.HEARTBEAT_FLUSH_INTERVAL)
+    yield
+    if heartbeat_buffer is not None:
+        await run_in_threadpool(heartbeat_buffer.stop)
+    if scan_scheduler is not None:
+        await run_in_threadpool(scan_scheduler.stop)
+    if risk_engine is not None:
+        await run_in_threadpool(risk_engine.stop)
+    if tokens is not None:
+        await run_in_threadpool(tokens.stop)
 
-# Initialize DB (creates tables if needed)
-init_db()
 
 # Create app
 app = FastAPI(
+    lifespan=lifespan,
+    # Final JSON dump with orjson (response models are still validated by Pydantic)
+    default_response_class=ORJSONResponse,
     title="Iquique Ciberseguridad",
     version="1.0.0",
     description="Plataforma de seguridad digital para PYMEs de Iquique",
@@ -57,19 +133,77 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Added last so it is outermost: times the whole request, CORS included
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
 
 # Static files and templates (relative to proyecto/)
 templates = Jinja2Templates(directory=str(BASE_DIR / "templates"))
 app.mount("/static", StaticFiles(directory=str(BASE_DIR / "static")), name="static")
 
-# Include routers
-app.include_router(api_router, prefix="/api/v1")
+# Include routers; every API route requires a user except the ones in auth.PUBLIC_ROUTES
+_authenticated = [Depends(require_user_except_public)]
+app.include_router(api_router, prefix="/api/v1", dependencies=_authenticated)
+if dashboard_router is not None:
+    app.include_router(dashboard_router, prefix="/api/v1", dependencies=_authenticated)
+if heartbeats_router is not None:
+    app.include_router(heartbeats_router, prefix="/api/v1", dependencies=_authenticated)
+if auth_router is not None:
+    app.include_router(auth_router, prefix="/api/v1", dependencies=_authenticated)
+if devices_async_router is not None:
+    app.include_router(devices_async_router, prefix="/api/v1/async", dependencies=_authenticated)
 if admin_router is not None:
     app.include_router(admin_router)  # serves /admin
+if metrics_router is not None:
+    app.include_router(metrics_router)  # serves /metrics and /debug/profile
 
 @app.get("/", include_in_schema=False)
 async def root():
     return {
         "message": "Bienvenido a Iquique Ciberseguridad",
         "version": app.version,
-    }
\ No newline at end of file
+    }
+
+@app.websocket("/ws/events")
+async def events_socket(websocket: WebSocket):
+    """Push change events (devices, features, threats, scans) as JSON arrays of events.
+
+    ``?topics=devices,features`` limits the subscription. A ``resync`` event means the
+    client fell behind and events were dropped, so it should reload its data.
+
+    The handshake must carry a valid token: the login cookie (browsers), ``?token=`` or an
+    ``Authorization: Bearer`` header; otherwise it is rejected with close code 1008.
+    """
+    token = websocket.query_params.get("token")
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    if not token and scheme.lower() == "bearer":
+        token = credentials
+    if claims_from_request(websocket, token) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    topics = [t for t in websocket.query_params.get("topics", "").split(",") if t in TOPICS] or None
+    await websocket.accept()
+    sub = broker.subscribe(topics)
+
+    async def pump():
+        try:
+            while True:
+                batch = await sub.get()
+                await websocket.send_text("[" + ",".join(batch) + "]")
+        except (WebSocketDisconnect, RuntimeError):
+            return
+
+    async def drain():
+        # only used to notice the client going away
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    tasks = [asyncio.create_task(pump()), asyncio.create_task(drain())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in tasks:
+            task.cancel()
+        sub.close()
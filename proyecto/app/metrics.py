@@ -0,0 +1,325 @@
+"""In-process metrics rendered in the Prometheus text format (``GET /metrics``).
+
+Kept deliberately small instead of depending on ``prometheus_client``: counters and
+fixed-bucket histograms keyed by a tuple of label values, each guarded by its own lock
+(an observation is a dict lookup, a bisect and two additions), plus callback metrics
+evaluated only when scraped.
+
+What is recorded:
+
+- HTTP requests, by ``MetricsMiddleware``: latency histogram and count per method and route
+  template (``/api/v1/devices/{device_id}``, never the raw path, so cardinality is bounded),
+  and the number of DB queries each request issued;
+- SQL statements, by engine events (``instrument_engine``): count and duration per
+  statement kind;
+- detectors in the services, via ``observe_detector``: time spent, events analyzed and
+  detections, per service and detector.
+
+``PROYECTO_METRICS_ENABLED=0`` turns all of it off (no middleware, no engine listeners).
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+from proyecto import config
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in items]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, labels: Labels = ()):
+        i = bisect_left(self.buckets, value)  # buckets are "less than or equal"
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        series = self._series.get(labels)
+        return sum(series[0]) if series is not None else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._series.items())
+        lines = []
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose value is read from ``fn`` at scrape time.
+
+    ``fn`` returns a number, or ``{label values tuple: number}`` when ``labelnames`` is set.
+    """
+
+    def __init__(self, name: str, help: str, fn: Callable[[], Any], kind: str = "gauge",
+                 labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> List[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []
+        items = sorted(value.items()) if isinstance(value, dict) else [((), value)]
+        return [f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}" for labels, v in items]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"metric {metric.name} already registered as {existing.kind}")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def callback(self, name: str, help: str, fn: Callable[[], Any], kind: str = "gauge",
+                 labelnames: Sequence[str] = ()) -> CallbackMetric:
+        """Register (or replace) a metric computed when scraped"""
+        metric = CallbackMetric(name, help, fn, kind, labelnames)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            samples = metric.samples()
+            if not samples:
+                continue
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+HTTP_DURATION = metrics.histogram(
+    "http_request_duration_seconds", "Time to send the full response, by route template",
+    ("method", "route"))
+HTTP_REQUESTS = metrics.counter(
+    "http_requests_total", "Requests handled, by route template and status code",
+    ("method", "route", "status"))
+HTTP_DB_QUERIES = metrics.histogram(
+    "http_request_db_queries", "SQL statements executed while handling one request",
+    ("method", "route"), COUNT_BUCKETS)
+DB_DURATION = metrics.histogram(
+    "db_query_duration_seconds", "SQL statement execution time (cursor execute to result)",
+    ("operation",))
+DB_ERRORS = metrics.counter("db_query_errors_total", "SQL statements that raised", ("operation",))
+DETECTOR_DURATION = metrics.histogram(
+    "detector_duration_seconds", "Time spent in one detector call", ("service", "detector"))
+DETECTOR_EVENTS = metrics.counter(
+    "detector_events_total", "Events (packets, file operations, endpoints) analyzed", ("service", "detector"))
+DETECTOR_DETECTIONS = metrics.counter(
+    "detector_detections_total", "Events flagged by the detector", ("service", "detector"))
+
+_started = time.time()
+metrics.callback("process_start_time_seconds", "Unix time the process started", lambda: _started)
+metrics.callback("python_threads", "Live Python threads", threading.active_count)
+
+
+def observe_detector(service: str, detector: str, seconds: float, events: int, detections: int = 0):
+    """Record one detector call; a no-op when metrics are disabled"""
+    if not config.METRICS_ENABLED:
+        return
+    labels = (service, detector)
+    DETECTOR_DURATION.observe(seconds, labels)
+    DETECTOR_EVENTS.inc(events, labels)
+    if detections:
+        DETECTOR_DETECTIONS.inc(detections, labels)
+
+
+# SQL statements
+
+# [statements, seconds] of the request being handled (shared with its threadpool calls)
+_request_queries: ContextVar[Optional[list]] = ContextVar("request_queries", default=None)
+_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE")
+_START_KEY = "metrics_query_start"
+
+
+def _operation(statement: str) -> str:
+    head = statement.lstrip()[:6].upper()
+    return head if head in _OPERATIONS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault(_START_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get(_START_KEY)
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    DB_DURATION.observe(elapsed, (_operation(statement),))
+    stats = _request_queries.get()
+    if stats is not None:
+        stats[0] += 1
+        stats[1] += elapsed
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get(_START_KEY):
+        conn.info[_START_KEY].pop()
+    DB_ERRORS.inc(1, (_operation(exception_context.statement or ""),))
+
+
+def instrument_engine(engine):
+    """Count and time every statement of a (sync) engine; call once per engine"""
+    if not config.METRICS_ENABLED:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+# HTTP requests
+
+def route_label(scope) -> str:
+    """Route template of the matched endpoint, including the prefix of its router.
+
+    Routers included with a prefix may report the template without it
+    (``/devices/{device_id}`` for ``/api/v1/devices/7``), so the prefix is recovered as
+    the part of the request path before the segment where the template matches.
+    """
+    route = scope.get("route")
+    template = getattr(route, "path", None)
+    if not template:
+        # unmatched paths share one label so scanners cannot blow up the series count
+        return "<unmatched>"
+    path = scope.get("path", "")
+    regex = getattr(route, "path_regex", None)
+    if regex is None or regex.match(path):
+        return template
+    i = path.find("/", 1)
+    while i != -1:
+        if regex.match(path[i:]):
+            return path[:i] + template
+        i = path.find("/", i + 1)
+    return template
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each HTTP request until its last body chunk is sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        queries = [0, 0.0]
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_queries.reset(token)
+            labels = (scope["method"], route_label(scope))
+            HTTP_DURATION.observe(elapsed, labels)
+            HTTP_DB_QUERIES.observe(queries[0], labels)
+            HTTP_REQUESTS.inc(1, labels + (str(status[0]),))
+
@@ -0,0 +1,143 @@
+"""Sampling profiler for a live worker (``GET /debug/profile``, opt-in).
+
+A background thread reads the stack of every other thread with ``sys._current_frames()``
+every ``interval`` seconds for ``duration`` seconds. Nothing is hooked into the profiled
+code, so the overhead is one stack walk per thread per sample and disappears when no profile
+is running. Output is either "collapsed" stacks (one ``frame;frame;... count`` line per
+distinct stack, root first), which flamegraph.pl, speedscope and inferno read directly, or
+the same counts as JSON with the hottest leaf functions.
+
+Threads parked in a wait (idle pool workers, the event loop selecting, queue gets) are left
+out unless ``include_idle`` is set, so the graph shows where CPU time goes.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+# (module, function) of leaf frames that mean the thread is blocked, not working
+IDLE_LEAVES = {
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("selectors", "select"),
+    ("queue", "get"),
+    ("concurrent.futures.thread", "_worker"),
+    ("asyncio.base_events", "_run_once"),
+}
+MAX_DEPTH = 128
+
+
+class ProfilerBusy(RuntimeError):
+    """Another profile is already running in this process"""
+
+
+def _module_name(frame) -> str:
+    name = frame.f_globals.get("__name__")
+    if name:
+        return name
+    return os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+
+
+def _stack(frame) -> Tuple[Tuple[str, str], ...]:
+    """(module, function) pairs from the root of the stack to ``frame``"""
+    frames = []
+    while frame is not None and len(frames) < MAX_DEPTH:
+        frames.append((_module_name(frame), frame.f_code.co_name))
+        frame = frame.f_back
+    frames.reverse()
+    return tuple(frames)
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def profile(self, duration: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+        """Sample all threads for ``duration`` seconds; blocks the caller meanwhile.
+
+        Raises ProfilerBusy if a profile is already running.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("a profile is already running")
+        try:
+            return self._sample(duration, interval, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, duration: float, interval: float, include_idle: bool) -> Dict[str, Any]:
+        own = threading.get_ident()
+        stacks: Counter = Counter()
+        samples = idle = 0
+        start = time.perf_counter()
+        deadline = start + duration
+        next_tick = start
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_tick:
+                time.sleep(next_tick - now)
+            next_tick += interval
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = _stack(frame)
+                if not include_idle and stack and stack[-1] in IDLE_LEAVES:
+                    idle += 1
+                    continue
+                stacks[(names.get(ident, str(ident)),) + stack] += 1
+            samples += 1
+        return {
+            "duration": time.perf_counter() - start,
+            "interval": interval,
+            "samples": samples,
+            "idle_skipped": idle,
+            "stacks": stacks,
+        }
+
+
+def collapsed(profile: Dict[str, Any]) -> str:
+    """Brendan Gregg's folded format: ``thread:name;module:function;... count``"""
+    lines = []
+    for key, count in profile["stacks"].most_common():
+        thread, frames = key[0], key[1:]
+        path = ";".join([f"thread:{thread}"] + [f"{module}:{function}" for module, function in frames])
+        lines.append(f"{path} {count}")
+    return "\n".join(lines) + ("\n" if lines else "")
+
+
+def summary(profile: Dict[str, Any], top: int = 30) -> Dict[str, Any]:
+    """JSON view: sample counts, hottest leaf functions and the collapsed stacks"""
+    leaves: Counter = Counter()
+    for key, count in profile["stacks"].items():
+        if len(key) > 1:
+            module, function = key[-1]
+            leaves[f"{module}:{function}"] += count
+    total = sum(profile["stacks"].values())
+    return {
+        "duration": round(profile["duration"], 3),
+        "interval": profile["interval"],
+        "samples": profile["samples"],
+        "stack_samples": total,
+        "idle_skipped": profile["idle_skipped"],
+        "top_leaves": [{"frame": frame, "count": n, "share": round(n / total, 4)}
+                       for frame, n in leaves.most_common(top)],
+        "collapsed": collapsed(profile).splitlines(),
+    }
+
+
+_default_profiler: Optional[SamplingProfiler] = None
+
+
+def get_default_profiler() -> SamplingProfiler:
+    global _default_profiler
+    if _default_profiler is None:
+        _default_profiler = SamplingProfiler()
+    return _default_profiler
@@ -0,0 +1,179 @@
+"""In-process pub/sub used to push change events to WebSocket clients.
+
+Producers call ``publish(topic, data, key=...)`` from any thread; it never blocks on
+subscribers. Each event is serialized once and appended to a shared ring buffer; every
+subscription only keeps a cursor into it, so publishing costs the same with 10 or 10k
+clients and clients that are not reading cost nothing. When a client reads:
+
+- events with the same ``key`` (``device:42``, ``feature:ransomware``) are coalesced, so a
+  slow client only receives the latest state of each object;
+- a client that fell further behind than the ring (or than its own ``maxsize`` after
+  coalescing) gets a single ``resync`` event telling it to reload, instead of an unbounded
+  backlog.
+
+Published topics: ``devices``, ``features``, ``threats`` and ``scans``.
+"""
+import asyncio
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from proyecto.app import db_events
+from proyecto.app.features import subscribe as subscribe_features
+from proyecto.modelo.seguridad import Threat
+
+TOPICS = ("devices", "features", "threats", "scans")
+# Events kept in the shared ring; a client lagging more than this must resync
+RING_SIZE = 8192
+# Max events delivered to a client in one batch after coalescing
+DEFAULT_QUEUE_SIZE = 256
+_RESYNC = json.dumps({"topic": "system", "type": "resync"})
+
+
+def _encode(event: Dict[str, Any]) -> str:
+    return json.dumps(event, default=lambda o: o.isoformat() if isinstance(o, datetime) else str(o))
+
+
+class Subscription:
+    """One client's position in the event ring; read with ``await get()``"""
+
+    def __init__(self, broker: "Broker", topics: Optional[Set[str]], maxsize: int, cursor: int):
+        self.broker = broker
+        self.topics = topics
+        self.maxsize = maxsize
+        self.loop = asyncio.get_running_loop()
+        self.cursor = cursor
+        self.delivered = 0
+        self.coalesced = 0
+        self.resyncs = 0
+
+    def lag(self) -> int:
+        return self.broker._head - self.cursor
+
+    async def get(self) -> List[str]:
+        """Wait for events and return the pending ones (already JSON encoded), coalesced"""
+        while True:
+            broker = self.broker
+            with broker._lock:
+                head = broker._head
+                if head == self.cursor:
+                    waiter = broker._waiters.get(self.loop)
+                    if waiter is None or waiter.done():
+                        waiter = broker._waiters[self.loop] = self.loop.create_future()
+                    entries = None
+                elif head - self.cursor > broker.ring_size:
+                    entries = []
+                else:
+                    ring, size = broker._ring, broker.ring_size
+                    entries = [ring[seq % size] for seq in range(self.cursor, head)]
+            if entries is None:
+                await waiter
+                continue
+            if not entries:
+                # overwritten before this client read them
+                self.cursor = head
+                self.resyncs += 1
+                return [_RESYNC]
+            self.cursor = head
+            batch = self._coalesce(entries)
+            if not batch:
+                continue
+            if len(batch) > self.maxsize:
+                self.resyncs += 1
+                return [_RESYNC]
+            self.delivered += len(batch)
+            return batch
+
+    def _coalesce(self, entries) -> List[str]:
+        topics = self.topics
+        pending: "OrderedDict[Any, str]" = OrderedDict()
+        for seq, topic, key, payload in entries:
+            if topics is not None and topic not in topics:
+                continue
+            if key is None:
+                pending[seq] = payload
+            else:
+                if key in pending:
+                    # keep only the latest state, at the position of the latest change
+                    del pending[key]
+                    self.coalesced += 1
+                pending[key] = payload
+        return list(pending.values())
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    def __init__(self, ring_size: int = RING_SIZE, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.ring_size = ring_size
+        self.queue_size = queue_size
+        self._ring: List[Any] = [None] * ring_size
+        self._head = 0
+        self._lock = threading.Lock()
+        # one future per event loop, shared by all of its waiting subscriptions
+        self._waiters: Dict[asyncio.AbstractEventLoop, asyncio.Future] = {}
+        self._subscriptions: Set[Subscription] = set()
+        self.published = 0
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, maxsize: Optional[int] = None) -> Subscription:
+        """New subscription starting at the next event (call from the loop that will read it)"""
+        with self._lock:
+            sub = Subscription(self, set(topics) if topics else None, maxsize or self.queue_size, self._head)
+            self._subscriptions.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            self._subscriptions.discard(sub)
+
+    def publish(self, topic: str, data: Dict[str, Any], key: Optional[str] = None, type: str = "changed") -> int:
+        """Append an event to the ring and wake waiting readers; returns its sequence number"""
+        payload = _encode({"topic": topic, "type": type, "key": key, "data": data})
+        with self._lock:
+            seq = self._head
+            self._ring[seq % self.ring_size] = (seq, topic, key, payload)
+            self._head = seq + 1
+            waiters = self._waiters
+            self._waiters = {}
+            self.published += 1
+        if waiters:
+            try:
+                running = asyncio.get_running_loop()
+            except RuntimeError:
+                running = None
+            for loop, waiter in waiters.items():
+                if loop is running:
+                    _wake(waiter)
+                elif not loop.is_closed():
+                    loop.call_soon_threadsafe(_wake, waiter)
+        return seq
+
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+broker = Broker()
+publish = broker.publish
+
+
+def _on_features_changed(changes: Dict[str, Dict], version: int):
+    for feature_key, info in changes.items():
+        publish("features", {**info, "version": version}, key=f"feature:{feature_key}")
+
+
+def _on_threats_committed(rows: List[Dict[str, Any]]):
+    for row in rows:
+        publish("threats", {k: row.get(k) for k in ("id", "name", "type", "severity", "status",
+                                                     "endpoint_id", "detection_time")}, type="created")
+
+
+subscribe_features(_on_features_changed)
+db_events.on_insert(Threat, _on_threats_committed)
@@ -0,0 +1,303 @@
+"""Pre-aggregated threat counts per minute/hour/day bucket, type and severity.
+
+Committed ``Threat`` inserts are folded into the buckets incrementally (see ``db_events``);
+rows loaded with Core ``insert()`` or written by other processes are picked up by the
+backfill command, which recomputes whole days from the raw table:
+
+    python -m proyecto.app.rollups backfill [--since 2024-01-01] [--until 2024-02-01]
+    python -m proyecto.app.rollups prune
+"""
+from pathlib import Path
+import sys
+import argparse
+import logging
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+if __name__ == "__main__":
+    REPO_ROOT = Path(__file__).resolve().parents[2]  # workspace root
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from proyecto import config
+from proyecto.app import db_events
+from proyecto.modelo.rollup import ThreatRollup
+from proyecto.modelo.seguridad import Threat
+from proyecto.app.database.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {"m": timedelta(minutes=1), "h": timedelta(hours=1), "d": timedelta(days=1)}
+# Each coarser level is computed from the finer one during backfill
+_PARENT = {"h": "m", "d": "h"}
+
+# SQLite stores DateTime as text; buckets must match SQLAlchemy's format to compare equal
+_SQLITE_FORMATS = {"m": "%Y-%m-%d %H:%M:00.000000", "h": "%Y-%m-%d %H:00:00.000000", "d": "%Y-%m-%d 00:00:00.000000"}
+_PG_UNITS = {"m": "minute", "h": "hour", "d": "day"}
+_MYSQL_FORMATS = {"m": "%Y-%m-%d %H:%i:00", "h": "%Y-%m-%d %H:00:00", "d": "%Y-%m-%d 00:00:00"}
+
+RollupKey = Tuple[str, datetime, str, str]
+
+
+def bucket_start(ts: datetime, granularity: str) -> datetime:
+    if granularity == "m":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "h":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+# Dialects whose backfill buckets rows in SQL; any other database buckets them in Python
+_SQL_BUCKET_DIALECTS = ("sqlite", "postgresql", "mysql", "mariadb")
+
+
+def _bucket_sql(dialect: str, granularity: str, column):
+    if dialect == "sqlite":
+        return func.strftime(_SQLITE_FORMATS[granularity], column)
+    if dialect == "postgresql":
+        return func.date_trunc(_PG_UNITS[granularity], column)
+    return func.date_format(column, _MYSQL_FORMATS[granularity])
+
+
+def _upsert(db: Session, counts: Dict[RollupKey, int]):
+    """Add ``counts`` to the stored buckets (INSERT ... ON CONFLICT DO UPDATE where available)"""
+    if not counts:
+        return
+    rows = [
+        {"granularity": g, "bucket_start": b, "type": t, "severity": s, "count": n}
+        for (g, b, t, s), n in counts.items()
+    ]
+    table = ThreatRollup.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in table.primary_key.columns],
+            set_={"count": table.c.count + stmt.excluded["count"]},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        result = db.execute(
+            update(table)
+            .where(table.c.granularity == row["granularity"], table.c.bucket_start == row["bucket_start"],
+                   table.c.type == row["type"], table.c.severity == row["severity"])
+            .values(count=table.c.count + row["count"])
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table), row)
+
+
+def record_threats(rows: Iterable[Dict[str, Any]], session_factory: Callable[[], Session] = SessionLocal) -> int:
+    """Fold new threats (dicts with detection_time, type, severity) into every granularity"""
+    counts: Dict[RollupKey, int] = Counter()
+    for row in rows:
+        ts = row.get("detection_time") or datetime.utcnow()
+        kind, severity = row.get("type") or "", row.get("severity") or ""
+        for granularity in GRANULARITIES:
+            counts[(granularity, bucket_start(ts, granularity), kind, severity)] += 1
+    if not counts:
+        return 0
+    with session_factory() as db:
+        _upsert(db, counts)
+        db.commit()
+    return len(counts)
+
+
+def _on_threats_committed(rows: List[Dict[str, Any]]):
+    record_threats(rows)
+
+
+db_events.on_insert(Threat, _on_threats_committed)
+
+
+def backfill(db: Session, since: Optional[datetime] = None, until: Optional[datetime] = None,
+             step: timedelta = timedelta(days=1)) -> int:
+    """Recompute the buckets of whole days in [since, until) from the threats table.
+
+    Minute buckets come from one GROUP BY over the raw rows of each day (an index range scan
+    on detection_time); hour and day buckets are then summed from the finer rollups. On
+    databases without a bucketing function here the day's rows are streamed and counted in
+    Python instead. Each day is replaced and committed on its own. Returns the number of
+    threats covered.
+    """
+    if since is None or until is None:
+        lo, hi = db.execute(select(func.min(Threat.detection_time), func.max(Threat.detection_time))).one()
+        if lo is None:
+            return 0
+        since = since or lo
+        until = until or hi + GRANULARITIES["d"]
+    since = bucket_start(since, "d")
+    if until != bucket_start(until, "d"):
+        until = bucket_start(until, "d") + GRANULARITIES["d"]
+
+    dialect = db.get_bind().dialect.name
+    columns = ["granularity", "bucket_start", "type", "severity", "count"]
+    retention = _retention_cutoffs(datetime.utcnow())
+    total = 0
+    start = since
+    while start < until:
+        end = min(start + step, until)
+        db.execute(delete(ThreatRollup).where(ThreatRollup.bucket_start >= start, ThreatRollup.bucket_start < end))
+        if dialect in _SQL_BUCKET_DIALECTS:
+            _backfill_sql(db, dialect, columns, start, end)
+        else:
+            _backfill_python(db, start, end)
+        total += db.execute(select(func.coalesce(func.sum(ThreatRollup.count), 0)).where(
+            ThreatRollup.granularity == "d", ThreatRollup.bucket_start >= start, ThreatRollup.bucket_start < end
+        )).scalar_one()
+        # finer buckets past their retention were only needed to build the coarser ones
+        for granularity, cutoff in retention.items():
+            if end <= cutoff:
+                db.execute(delete(ThreatRollup).where(
+                    ThreatRollup.granularity == granularity,
+                    ThreatRollup.bucket_start >= start, ThreatRollup.bucket_start < end,
+                ))
+        db.commit()
+        start = end
+    return total
+
+
+def _backfill_sql(db: Session, dialect: str, columns: List[str], start: datetime, end: datetime):
+    kind, severity = func.coalesce(Threat.type, ""), func.coalesce(Threat.severity, "")
+    bucket = _bucket_sql(dialect, "m", Threat.detection_time)
+    db.execute(insert(ThreatRollup).from_select(columns, select(
+        literal("m"), bucket, kind, severity, func.count()
+    ).where(Threat.detection_time >= start, Threat.detection_time < end).group_by(bucket, kind, severity)))
+    for granularity, parent in _PARENT.items():
+        bucket = _bucket_sql(dialect, granularity, ThreatRollup.bucket_start)
+        db.execute(insert(ThreatRollup).from_select(columns, select(
+            literal(granularity), bucket, ThreatRollup.type, ThreatRollup.severity, func.sum(ThreatRollup.count)
+        ).where(
+            ThreatRollup.granularity == parent, ThreatRollup.bucket_start >= start, ThreatRollup.bucket_start < end
+        ).group_by(bucket, ThreatRollup.type, ThreatRollup.severity)))
+
+
+def _backfill_python(db: Session, start: datetime, end: datetime):
+    """Portable backfill of one range: stream the raw rows and count buckets with ``bucket_start``"""
+    counts: Dict[RollupKey, int] = Counter()
+    rows = db.execute(
+        select(Threat.detection_time, Threat.type, Threat.severity)
+        .where(Threat.detection_time >= start, Threat.detection_time < end)
+        .execution_options(yield_per=10_000)
+    )
+    for ts, kind, severity in rows:
+        for granularity in GRANULARITIES:
+            counts[(granularity, bucket_start(ts, granularity), kind or "", severity or "")] += 1
+    _upsert(db, counts)
+
+
+def _retention_cutoffs(now: datetime) -> Dict[str, datetime]:
+    return {
+        "m": now - timedelta(days=config.ROLLUP_MINUTE_RETENTION_DAYS),
+        "h": now - timedelta(days=config.ROLLUP_HOUR_RETENTION_DAYS),
+    }
+
+
+def prune(db: Session, now: Optional[datetime] = None) -> int:
+    """Drop minute/hour buckets older than their retention; day buckets are kept"""
+    removed = 0
+    for granularity, cutoff in _retention_cutoffs(now or datetime.utcnow()).items():
+        removed += db.execute(delete(ThreatRollup).where(
+            ThreatRollup.granularity == granularity, ThreatRollup.bucket_start < cutoff
+        )).rowcount
+    db.commit()
+    return removed
+
+
+def choose_granularity(since: datetime, until: datetime, now: Optional[datetime] = None) -> str:
+    """Finest granularity that keeps the series short and is still within retention"""
+    cutoffs = _retention_cutoffs(now or datetime.utcnow())
+    span = until - since
+    if span <= timedelta(hours=6) and since >= cutoffs["m"]:
+        return "m"
+    if span <= timedelta(days=14) and since >= cutoffs["h"]:
+        return "h"
+    return "d"
+
+
+def _filtered(stmt, granularity: str, since: datetime, until: datetime,
+              type: Optional[str], severity: Optional[str]):
+    stmt = stmt.where(
+        ThreatRollup.granularity == granularity,
+        ThreatRollup.bucket_start >= bucket_start(since, granularity),
+        ThreatRollup.bucket_start < until,
+    )
+    if type is not None:
+        stmt = stmt.where(ThreatRollup.type == type)
+    if severity is not None:
+        stmt = stmt.where(ThreatRollup.severity == severity)
+    return stmt
+
+
+def query_series(db: Session, since: datetime, until: datetime, granularity: Optional[str] = None,
+                 by: Optional[str] = None, type: Optional[str] = None,
+                 severity: Optional[str] = None) -> Dict[str, Any]:
+    """Bucketed counts in [since, until), optionally split by ``type`` or ``severity``"""
+    granularity = granularity or choose_granularity(since, until)
+    key = getattr(ThreatRollup, by) if by else None
+    columns = [ThreatRollup.bucket_start] + ([key] if key is not None else []) + [func.sum(ThreatRollup.count)]
+    stmt = _filtered(select(*columns), granularity, since, until, type, severity)
+    stmt = stmt.group_by(*columns[:-1]).order_by(ThreatRollup.bucket_start)
+    points = []
+    for row in db.execute(stmt):
+        point = {"bucket": row[0], "count": int(row[-1])}
+        if key is not None:
+            point[by] = row[1]
+        points.append(point)
+    return {"granularity": granularity, "since": since, "until": until, "points": points}
+
+
+def query_totals(db: Session, since: datetime, until: datetime, type: Optional[str] = None,
+                 severity: Optional[str] = None) -> Dict[str, Any]:
+    """Totals by type and by severity over [since, until) (aligned to the chosen buckets)"""
+    granularity = choose_granularity(since, until)
+    stmt = _filtered(
+        select(ThreatRollup.type, ThreatRollup.severity, func.sum(ThreatRollup.count)),
+        granularity, since, until, type, severity,
+    ).group_by(ThreatRollup.type, ThreatRollup.severity)
+    by_type: Dict[str, int] = Counter()
+    by_severity: Dict[str, int] = Counter()
+    for kind, sev, count in db.execute(stmt):
+        by_type[kind] += int(count)
+        by_severity[sev] += int(count)
+    return {
+        "granularity": granularity,
+        "since": since,
+        "until": until,
+        "total": sum(by_type.values()),
+        "by_type": dict(by_type),
+        "by_severity": dict(by_severity),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the threat rollup buckets")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_backfill = sub.add_parser("backfill", help="recompute whole days from the threats table")
+    p_backfill.add_argument("--since", type=datetime.fromisoformat, default=None)
+    p_backfill.add_argument("--until", type=datetime.fromisoformat, default=None)
+    sub.add_parser("prune", help="drop minute/hour buckets past their retention")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        if args.command == "backfill":
+            n = backfill(db, args.since, args.until)
+            print(f"backfilled {n:,} threats in {time.perf_counter() - t0:.1f} s")
+        else:
+            n = prune(db)
+            print(f"pruned {n:,} buckets in {time.perf_counter() - t0:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Andamiaje común de los benchmarks (se ejecutan con ``python -m proyecto.benchmarks.<nombre>``).
+
+``temp_env`` debe llamarse antes de importar ``proyecto.config`` (directa o indirectamente):
+crea un directorio temporal y apunta ahí la base SQLite y la clave JWT, sin pisar las
+variables PROYECTO_* que ya vengan del entorno. Los demás son helpers de medición.
+"""
+from pathlib import Path
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Callable, List, Sequence, Tuple
+
+REPO_ROOT = Path(__file__).resolve().parents[2]  # raíz del workspace
+
+
+def temp_env(prefix: str, **env: str) -> str:
+    """Directorio temporal con la base y la clave JWT del benchmark; devuelve su ruta.
+
+    ``env`` agrega variables con el nombre sin el prefijo ``PROYECTO_`` (p. ej.
+    ``AUTH_ENABLED="0"``); también se fijan solo si no vienen del entorno.
+    """
+    tmpdir = tempfile.mkdtemp(prefix=prefix)
+    os.environ.setdefault("PROYECTO_DATABASE_URL", f"sqlite:///{tmpdir}/bench.db")
+    # la clave generada no se escribe en proyecto/data
+    os.environ.setdefault("PROYECTO_JWT_SECRET_FILE", f"{tmpdir}/jwt_secret")
+    for name, value in env.items():
+        os.environ.setdefault(f"PROYECTO_{name}", value)
+    return tmpdir
+
+
+def timings(fn: Callable[[], Any], n: int) -> List[float]:
+    """Duración en segundos de ``n`` llamadas a ``fn``"""
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def median_ms(fn: Callable[[], Any], repeat: int, warmup: bool = False) -> float:
+    """Mediana en ms de ``repeat`` llamadas (con ``warmup``, una llamada previa sin medir)"""
+    if warmup:
+        fn()
+    return statistics.median(timings(fn, repeat)) * 1e3
+
+
+def best_of(fn: Callable[[], Any], repeat: int) -> Tuple[float, Any]:
+    """Mejor tiempo en segundos de ``repeat`` llamadas y el resultado de la última"""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Percentil ``q`` (0..1) por rango más cercano; NaN si no hay valores"""
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
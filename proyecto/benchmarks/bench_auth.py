@@ -0,0 +1,127 @@
+"""Costo de la autenticación: login (bcrypt), verificación de tokens y overhead por petición.
+
+- bcrypt  : ``hash_password`` con PROYECTO_BCRYPT_ROUNDS (solo al crear usuarios / cambiar contraseñas)
+- login   : ``authenticate`` completo (consulta + bcrypt + last_login); se paga una vez por sesión
+- verify  : ``TokenService.verify`` con el token ya en la cache de claims y sin ella (firma HS256)
+- petición: dos rutas FastAPI idénticas, una abierta y otra con ``Depends(require_user)``,
+  llamadas directamente como app ASGI (sin red) y de forma intercalada. La diferencia de p99 es
+  el costo que la autenticación agrega a cada petición con un token válido.
+
+Sale con código 1 si esa diferencia supera --budget-us.
+
+Uso: python -m proyecto.benchmarks.bench_auth --requests 20000 --budget-us 100
+"""
+import os
+import argparse
+import asyncio
+import statistics
+import time
+
+from proyecto.benchmarks._common import percentile, temp_env, timings
+
+temp_env("bench_auth_")
+os.environ["PROYECTO_AUTH_ENABLED"] = "1"  # es lo que se mide
+
+from fastapi import Depends, FastAPI
+
+from proyecto import config
+from proyecto.api.auth import require_user
+from proyecto.app.auth import TokenService, authenticate, create_user, get_default_tokens, hash_password
+from proyecto.app.database.database import SessionLocal, init_db
+
+USERNAME, PASSWORD = "bench", "bench-password"
+
+
+def _percentiles(samples):
+    return {"p50": statistics.median(samples), "p99": percentile(samples, 0.99)}
+
+
+def _timed(fn, n: int):
+    return _percentiles(timings(fn, n))
+
+
+def _bench_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/bench/open")
+    async def bench_open():
+        return {"ok": True}
+
+    @app.get("/bench/auth", dependencies=[Depends(require_user)])
+    async def bench_auth():
+        return {"ok": True}
+
+    return app
+
+
+async def _drive(app, token: str, n: int):
+    """Peticiones intercaladas abierta/autenticada; devuelve las latencias de cada ruta"""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    statuses = []
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            statuses.append(message["status"])
+
+    def scope(path, headers):
+        return {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+                "query_string": b"", "headers": headers, "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    samples = {"/bench/open": [], "/bench/auth": []}
+    for i in range(n * 2):
+        path = "/bench/open" if i % 2 == 0 else "/bench/auth"
+        t0 = time.perf_counter()
+        await app(scope(path, headers), receive, send)
+        samples[path].append(time.perf_counter() - t0)
+    if set(statuses) != {200}:
+        raise SystemExit(f"respuestas inesperadas: {sorted(set(statuses))}")
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure login cost and per-request token verification overhead")
+    parser.add_argument("--logins", type=int, default=10)
+    parser.add_argument("--verifies", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=20000, help="peticiones por ruta")
+    parser.add_argument("--budget-us", type=float, default=100.0, help="overhead p99 máximo por petición")
+    args = parser.parse_args()
+
+    init_db()
+    with SessionLocal() as db:
+        create_user(db, USERNAME, PASSWORD, role="operator")
+
+    t = _timed(lambda: hash_password(PASSWORD), max(1, args.logins // 2))
+    print(f"bcrypt   : {t['p50'] * 1e3:8.1f} ms por hash (rounds={config.BCRYPT_ROUNDS})")
+    t = _timed(lambda: authenticate(USERNAME, PASSWORD), args.logins)
+    print(f"login    : {t['p50'] * 1e3:8.1f} ms p50 {t['p99'] * 1e3:8.1f} ms p99")
+
+    user = authenticate(USERNAME, PASSWORD)
+    service = TokenService("bench-secret", config.JWT_ALGORITHM, config.ACCESS_TOKEN_TTL)
+    bench_token, _ = service.issue(user)
+    service.verify(bench_token)
+    cached = _timed(lambda: service.verify(bench_token), args.verifies)
+    # sin cache: se vacía tras cada llamada, así cada verify decodifica y comprueba la firma
+    uncached = _timed(lambda: (service.verify(bench_token), service.cache.clear()), max(1, args.verifies // 10))
+    print(f"verify   : {cached['p50'] * 1e6:8.2f} µs p50 {cached['p99'] * 1e6:8.2f} µs p99 en cache, "
+          f"{uncached['p50'] * 1e6:8.2f} µs p50 {uncached['p99'] * 1e6:8.2f} µs p99 sin cache")
+
+    token, _ = get_default_tokens().issue(user)
+    app = _bench_app()
+    asyncio.run(_drive(app, token, 1000))  # calentamiento
+    samples = asyncio.run(_drive(app, token, args.requests))
+    open_t, auth_t = _percentiles(samples["/bench/open"]), _percentiles(samples["/bench/auth"])
+    overhead = (auth_t["p99"] - open_t["p99"]) * 1e6
+    print(f"petición : {open_t['p50'] * 1e6:8.2f} µs p50 {open_t['p99'] * 1e6:8.2f} µs p99 abierta, "
+          f"{auth_t['p50'] * 1e6:8.2f} µs p50 {auth_t['p99'] * 1e6:8.2f} µs p99 con require_user")
+    print(f"overhead : +{(auth_t['p50'] - open_t['p50']) * 1e6:.2f} µs p50, +{overhead:.2f} µs p99 "
+          f"(presupuesto {args.budget_us:g} µs)")
+    if overhead > args.budget_us:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
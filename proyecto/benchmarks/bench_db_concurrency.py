@@ -0,0 +1,78 @@
+"""Latencia p50/p99 de las rutas de dispositivos sync vs async con muchos clientes concurrentes.
+
+Usa una base SQLite temporal (o PROYECTO_DATABASE_URL si está definida) para no tocar data.db.
+
+Uso: python -m proyecto.benchmarks.bench_db_concurrency --clients 200 --requests 50
+"""
+import os
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from proyecto.benchmarks._common import percentile, temp_env
+
+# sin autenticación: se mide la base de datos, no la verificación de tokens (ver bench_auth)
+temp_env("bench_db_", AUTH_ENABLED="0")
+
+import httpx
+
+from proyecto.app.main import app
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.device import Device
+
+
+def seed(n: int):
+    with SessionLocal() as db:
+        db.query(Device).delete()
+        db.add_all(Device(hostname=f"host-{i}", ip_address=f"10.0.{i // 256 % 256}.{i % 256}", os="Linux") for i in range(n))
+        db.commit()
+        return [row.id for row in db.query(Device.id)]
+
+
+async def run_mode(prefix: str, ids, clients: int, requests: int, write_ratio: float):
+    latencies = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def worker(w):
+            rnd = random.Random(w)
+            for _ in range(requests):
+                t0 = time.perf_counter()
+                if rnd.random() < write_ratio:
+                    device_id = rnd.choice(ids)
+                    r = await client.put(f"{prefix}/devices/{device_id}", json={"os": rnd.choice(["Linux", "Windows"])})
+                else:
+                    r = await client.get(f"{prefix}/devices/{rnd.choice(ids)}")
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(w) for w in range(clients)))
+        elapsed = time.perf_counter() - t0
+    return latencies, elapsed
+
+
+async def main_async(args):
+    ids = seed(args.devices)
+    print(f"db: {os.environ['PROYECTO_DATABASE_URL']}  clients: {args.clients}  requests/client: {args.requests}"
+          f"  write ratio: {args.write_ratio}")
+    for name, prefix in (("sync ", "/api/v1"), ("async", "/api/v1/async")):
+        latencies, elapsed = await run_mode(prefix, ids, args.clients, args.requests, args.write_ratio)
+        print(f"{name}: p50 {statistics.median(latencies) * 1e3:7.1f} ms  p99 {percentile(latencies, 0.99) * 1e3:7.1f} ms"
+              f"  throughput {len(latencies) / elapsed:,.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async device routes under concurrency")
+    parser.add_argument("--clients", type=int, default=128)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+    init_db()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
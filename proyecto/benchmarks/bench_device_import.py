@@ -0,0 +1,53 @@
+"""Tiempo de importación masiva de dispositivos (alta + re-importación como actualización).
+
+Uso: python -m proyecto.benchmarks.bench_device_import --devices 100000 --format csv
+"""
+import argparse
+import json
+import time
+
+from proyecto.benchmarks._common import temp_env
+
+# sin autenticación: se mide la importación, no la verificación de tokens (ver bench_auth)
+temp_env("bench_import_", AUTH_ENABLED="0")
+
+from fastapi.testclient import TestClient
+
+from proyecto.app.database.database import init_db
+from proyecto.app.main import app
+
+
+def make_body(n: int, fmt: str, os_name: str):
+    rows = [{"hostname": f"host-{i}", "ip_address": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}", "os": os_name}
+            for i in range(n)]
+    if fmt == "csv":
+        lines = ["hostname,ip_address,os"] + [f"{r['hostname']},{r['ip_address']},{r['os']}" for r in rows]
+        return "\n".join(lines).encode(), "text/csv"
+    if fmt == "ndjson":
+        return "\n".join(json.dumps(r) for r in rows).encode(), "application/x-ndjson"
+    return json.dumps(rows).encode(), "application/json"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bulk device upsert")
+    parser.add_argument("--devices", type=int, default=100_000)
+    parser.add_argument("--format", choices=["json", "ndjson", "csv"], default="json")
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    args = parser.parse_args()
+    init_db()
+
+    client = TestClient(app)
+    for phase, os_name in (("insert", "Linux"), ("update", "Windows")):
+        body, content_type = make_body(args.devices, args.format, os_name)
+        t0 = time.perf_counter()
+        r = client.post(f"/api/v1/devices/bulk?chunk_size={args.chunk_size}", content=body,
+                        headers={"Content-Type": content_type})
+        elapsed = time.perf_counter() - t0
+        r.raise_for_status()
+        j = r.json()
+        print(f"{phase}: {args.devices:,} devices ({args.format}) in {elapsed:.2f} s"
+              f"  ({args.devices / elapsed:,.0f} rows/s)  created={j['created']} updated={j['updated']} errors={j['errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Serialización del listado de dispositivos: ruta anterior vs ruta rápida (orjson desde tuplas).
+
+Para 1k/10k/100k dispositivos mide, a través de la app (TestClient, sin red):
+
+- antes   : ORM + ``Device.to_dict()`` por fila + ``jsonable_encoder`` + ``json.dumps``
+- columnas: tuplas de columnas + dict por fila con ``isoformat()`` + ``jsonable_encoder``
+- rápida  : tuplas de columnas -> bytes JSON con ``dumps_rows`` (lo que hace /api/v1/devices)
+
+y el costo de solo serializar (sin HTTP ni SQL). Usa una base SQLite temporal.
+
+Uso: python -m proyecto.benchmarks.bench_device_listing --sizes 1000,10000,100000
+"""
+import argparse
+import json
+
+from proyecto.benchmarks._common import median_ms, temp_env
+
+temp_env("bench_devices_")
+
+from datetime import datetime, timedelta
+from fastapi import Depends, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from proyecto.api.endpoints import DEVICE_COLUMNS, device_page_body
+from proyecto.app.database.database import SessionLocal, get_db, init_db
+from proyecto.app.main import app
+from proyecto.modelo.device import Device
+
+
+def _legacy_row(row):
+    return {
+        "id": row.id,
+        "hostname": row.hostname,
+        "ip_address": row.ip_address,
+        "os": row.os,
+        "last_seen": row.last_seen.isoformat() if row.last_seen else None,
+        "active": bool(row.active),
+    }
+
+
+def legacy_orm(limit: int = Query(...), db: Session = Depends(get_db)):
+    devices = db.query(Device).order_by(Device.id.desc()).limit(limit).all()
+    return {"devices": [d.to_dict() for d in devices], "next_cursor": None}
+
+
+def legacy_columns(limit: int = Query(...), db: Session = Depends(get_db)):
+    rows = db.execute(select(*DEVICE_COLUMNS).order_by(Device.id.desc()).limit(limit)).all()
+    return {"devices": [_legacy_row(r) for r in rows], "next_cursor": None}
+
+
+def fast(limit: int = Query(...), db: Session = Depends(get_db)):
+    rows = db.execute(select(*DEVICE_COLUMNS).order_by(Device.id.desc()).limit(limit)).all()
+    return Response(device_page_body(rows, None), media_type="application/json")
+
+
+# rutas sin el tope de DEVICE_PAGE_MAX, con la clase de respuesta de cada variante
+app.add_api_route("/bench/devices/orm", legacy_orm, response_class=JSONResponse)
+app.add_api_route("/bench/devices/columns", legacy_columns, response_class=JSONResponse)
+app.add_api_route("/bench/devices/fast", fast)
+
+
+def seed(n: int):
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(insert(Device), [
+            {"hostname": f"host-{i:06d}", "ip_address": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+             "os": ("Linux", "Windows", "macOS")[i % 3], "last_seen": now - timedelta(seconds=i), "active": i % 7 != 0}
+            for i in range(n)
+        ])
+        db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark device listing serialization")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    init_db()
+    sizes = [int(s) for s in args.sizes.split(",")]
+
+    seed(max(sizes))
+    with TestClient(app) as client, SessionLocal() as db:
+        bodies = {path: client.get(f"/bench/devices/{path}", params={"limit": 10}).json()
+                  for path in ("orm", "columns", "fast")}
+        assert bodies["orm"] == bodies["columns"] == bodies["fast"]
+
+        print(f"{'filas':>8} {'antes ms':>10} {'columnas ms':>12} {'rápida ms':>10} {'x':>6}   "
+              f"{'solo serializar: antes ms':>26} {'rápida ms':>10}")
+        for n in sizes:
+            times = {path: median_ms(lambda: client.get(f"/bench/devices/{path}", params={"limit": n}),
+                                     args.repeat, warmup=True)
+                     for path in ("orm", "columns", "fast")}
+            rows = db.execute(select(*DEVICE_COLUMNS).order_by(Device.id.desc()).limit(n)).all()
+            ser_old = median_ms(lambda: json.dumps(jsonable_encoder({"devices": [_legacy_row(r) for r in rows]}),
+                                                   separators=(",", ":")), args.repeat, warmup=True)
+            ser_new = median_ms(lambda: device_page_body(rows, None), args.repeat, warmup=True)
+            print(f"{n:>8,} {times['orm']:>10.1f} {times['columns']:>12.1f} {times['fast']:>10.1f} "
+                  f"{times['orm'] / times['fast']:>6.1f}   {ser_old:>26.1f} {ser_new:>10.1f}")
+
+        t = median_ms(lambda: client.get("/api/v1/devices", params={"limit": 1000}), args.repeat, warmup=True)
+        print(f"/api/v1/devices?limit=1000: {t:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Estado de seguridad de la flota: N+1 consultas por endpoint vs una pasada agregada vs cache.
+
+Usa una base SQLite temporal (o PROYECTO_DATABASE_URL si está definida) para no tocar data.db.
+
+Uso: python -m proyecto.benchmarks.bench_endpoint_status --endpoints 10000 --threats 200000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from proyecto.benchmarks._common import temp_env
+
+temp_env("bench_status_")
+
+from sqlalchemy import insert
+
+from proyecto.app.cache import TTLCache
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.seguridad import Endpoint, RansomwareIncident, Threat
+from proyecto.services.endpoint_protection import EndpointProtectionService
+
+
+def seed(n_endpoints: int, n_threats: int, n_incidents: int):
+    rnd = random.Random(14)
+    now = datetime.utcnow()
+    ids = [f"ep-{i:06d}" for i in range(n_endpoints)]
+    with SessionLocal() as db:
+        db.query(Threat).delete()
+        db.query(RansomwareIncident).delete()
+        db.query(Endpoint).delete()
+        db.execute(insert(Endpoint), [
+            {"id": i, "name": i, "hostname": i, "last_seen": now - timedelta(hours=rnd.randint(0, 72))} for i in ids
+        ])
+        db.execute(insert(Threat), [{
+            "id": f"t-{k}", "name": "bench", "type": rnd.choice(["MALWARE", "RANSOMWARE", "PHISHING"]),
+            "severity": rnd.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"]),
+            "status": "ACTIVE" if rnd.random() < 0.02 else "BLOCKED",
+            "endpoint_id": rnd.choice(ids), "detection_time": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 40)),
+        } for k in range(n_threats)])
+        db.execute(insert(RansomwareIncident), [{
+            "id": f"r-{k}", "endpoint_id": rnd.choice(ids), "files_targeted": rnd.randint(1, 500),
+            "files_protected": rnd.randint(0, 500), "encryption_attempts": rnd.randint(0, 50),
+            "detection_time": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 40)),
+        } for k in range(n_incidents)])
+        db.commit()
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark fleet security status aggregation")
+    parser.add_argument("--endpoints", type=int, default=10_000)
+    parser.add_argument("--threats", type=int, default=200_000)
+    parser.add_argument("--incidents", type=int, default=20_000)
+    parser.add_argument("--sample", type=int, default=1_000, help="endpoints consultados uno a uno (N+1)")
+    args = parser.parse_args()
+    init_db()
+
+    t0 = time.perf_counter()
+    ids = seed(args.endpoints, args.threats, args.incidents)
+    print(f"seed          : {time.perf_counter() - t0:.1f} s ({args.endpoints:,} endpoints, {args.threats:,} threats)")
+
+    with SessionLocal() as db:
+        svc = EndpointProtectionService(cache=TTLCache(maxsize=0))  # sin cache
+        sample = ids[: args.sample]
+        t0 = time.perf_counter()
+        for endpoint_id in sample:
+            svc.get_endpoint_security_status(db, endpoint_id)
+        per_call = (time.perf_counter() - t0) / len(sample)
+        print(f"N+1           : {per_call * 1e3:.2f} ms/endpoint -> {per_call * len(ids):.1f} s estimados para la flota")
+
+        t0 = time.perf_counter()
+        fleet = svc.get_fleet_security_status(db)
+        print(f"una pasada    : {time.perf_counter() - t0:.2f} s para {fleet['total']:,} endpoints {fleet['summary']}")
+
+        svc = EndpointProtectionService(cache=TTLCache(maxsize=args.endpoints * 2, ttl=60))
+        svc.get_fleet_security_status(db)
+        t0 = time.perf_counter()
+        svc.get_fleet_security_status(db)
+        print(f"flota en cache: {(time.perf_counter() - t0) * 1e3:.3f} ms")
+        t0 = time.perf_counter()
+        for endpoint_id in sample:
+            svc.get_endpoint_security_status(db, endpoint_id)
+        print(f"uno en cache  : {(time.perf_counter() - t0) / len(sample) * 1e6:.1f} µs/endpoint")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Heartbeats: tasa sostenida absorbida con escrituras agrupadas vs UPDATE + commit por latido.
+
+Siembra --agents dispositivos y --agents endpoints en una base SQLite temporal y mide:
+
+- directo  : un UPDATE + commit por latido (lo que costaría sin buffer)
+- buffer   : HeartbeatBuffer.record_many con el hilo de flush activo (--interval)
+- HTTP     : POST /api/v1/heartbeats en lotes de --batch a través de la app (TestClient)
+
+Para el buffer y HTTP se cuentan las transacciones de escritura (commits) por segundo.
+
+Uso: python -m proyecto.benchmarks.bench_heartbeats --agents 10000 --seconds 10 --interval 2
+"""
+import argparse
+import random
+import time
+
+from proyecto.benchmarks._common import temp_env
+
+# sin autenticación: se mide la ingesta de heartbeats, no la verificación de tokens (ver bench_auth)
+temp_env("bench_heartbeats_", AUTH_ENABLED="0")
+
+from datetime import datetime
+from sqlalchemy import event, insert, update
+
+from proyecto.app.database.database import SessionLocal, engine, init_db
+from proyecto.app.heartbeats import HeartbeatBuffer
+from proyecto.modelo.device import Device
+from proyecto.modelo.seguridad import Endpoint
+
+_commits = 0
+
+
+def _count_commit(conn):
+    global _commits
+    _commits += 1
+
+
+event.listen(engine, "commit", _count_commit)
+
+
+def seed(agents: int):
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.execute(insert(Device), [{"id": i + 1, "hostname": f"host-{i}", "last_seen": now} for i in range(agents)])
+        db.execute(insert(Endpoint), [{"id": f"ep-{i:06d}", "name": f"ep-{i}", "last_seen": now} for i in range(agents)])
+        db.commit()
+
+
+def _beats(rnd, agents, n):
+    return [("device", rnd.randint(1, agents), None) if rnd.random() < 0.5
+            else ("endpoint", f"ep-{rnd.randrange(agents):06d}", "PROTECTED") for _ in range(n)]
+
+
+def direct(agents: int, seconds: float) -> float:
+    rnd = random.Random(20)
+    n = 0
+    deadline = time.perf_counter() + seconds
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        while time.perf_counter() < deadline:
+            db.execute(update(Device).where(Device.id == rnd.randint(1, agents)).values(last_seen=datetime.utcnow()))
+            db.commit()
+            n += 1
+    return n / (time.perf_counter() - t0)
+
+
+def buffered(agents: int, seconds: float, interval: float, batch: int):
+    global _commits
+    rnd = random.Random(20)
+    pool = [_beats(rnd, agents, batch) for _ in range(200)]
+    buffer = HeartbeatBuffer()
+    buffer.start(interval)
+    _commits = 0
+    n = 0
+    deadline = time.perf_counter() + seconds
+    t0 = time.perf_counter()
+    while time.perf_counter() < deadline:
+        n += buffer.record_many(pool[n // batch % len(pool)])
+    elapsed = time.perf_counter() - t0
+    commits = _commits
+    buffer.stop()
+    return n / elapsed, commits / elapsed, buffer.stats()
+
+
+def http(agents: int, seconds: float, interval: float, batch: int):
+    global _commits
+    from fastapi.testclient import TestClient
+    from proyecto.app import heartbeats
+    from proyecto.app.main import app
+
+    rnd = random.Random(20)
+    bodies = [[{"kind": k, "id": i, **({"status": s} if s else {})} for k, i, s in _beats(rnd, agents, batch)]
+              for _ in range(50)]
+    heartbeats._default_buffer = HeartbeatBuffer()
+    with TestClient(app) as client:
+        heartbeats._default_buffer.stop()
+        heartbeats._default_buffer.start(interval)
+        _commits = 0
+        n = requests = 0
+        deadline = time.perf_counter() + seconds
+        t0 = time.perf_counter()
+        while time.perf_counter() < deadline:
+            r = client.post("/api/v1/heartbeats", json=bodies[requests % len(bodies)])
+            n += r.json()["accepted"]
+            requests += 1
+        elapsed = time.perf_counter() - t0
+        commits = _commits
+        online = client.get("/api/v1/heartbeats/online", params={"kind": "endpoint", "limit": 0}).json()["count"]
+    return n / elapsed, requests / elapsed, commits / elapsed, online
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark heartbeat ingestion with write coalescing")
+    parser.add_argument("--agents", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=2.0, help="segundos entre flushes")
+    parser.add_argument("--batch", type=int, default=100, help="latidos por llamada/petición")
+    args = parser.parse_args()
+
+    init_db()
+    seed(args.agents)
+    print(f"directo : {direct(args.agents, min(args.seconds, 5.0)):>10,.0f} latidos/s (1 commit por latido)")
+    rate, tx, stats = buffered(args.agents, args.seconds, args.interval, args.batch)
+    print(f"buffer  : {rate:>10,.0f} latidos/s, {tx:.2f} transacciones/s, "
+          f"flush de {stats['rows_written'] // max(stats['flushes'], 1):,} filas en {stats['last_flush_ms']:.0f} ms")
+    rate, rps, tx, online = http(args.agents, args.seconds, args.interval, args.batch)
+    print(f"HTTP    : {rate:>10,.0f} latidos/s ({rps:,.0f} peticiones/s de {args.batch}), {tx:.2f} transacciones/s, "
+          f"{online:,} endpoints en línea")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Costo de verificar nombres de archivo según la cantidad de indicadores cargados.
+
+Compara el bucle de substrings original contra IndicatorMatcher con 4..10k patrones.
+
+Uso: python -m proyecto.benchmarks.bench_indicator_matcher --names 100000
+"""
+import argparse
+import random
+import string
+import time
+
+from proyecto.services.indicators import DEFAULT_EXTENSION_KEYWORDS, IndicatorMatcher
+
+
+def _word(rnd, lo, hi):
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(lo, hi)))
+
+
+def make_patterns(n, rnd):
+    patterns = list(DEFAULT_EXTENSION_KEYWORDS)
+    while len(patterns) < n:
+        patterns.append(_word(rnd, 5, 10))
+    return patterns[:n]
+
+
+def naive_check(names, patterns):
+    hits = 0
+    for name in names:
+        ext = name.split('.')[-1].lower()
+        if any(p in ext for p in patterns):
+            hits += 1
+    return hits
+
+
+def matcher_check(names, matcher):
+    hits = 0
+    for name in names:
+        if matcher.is_ransomware_extension(name) or matcher.is_ransom_note(name):
+            hits += 1
+    return hits
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled ransomware indicator matching")
+    parser.add_argument("--names", type=int, default=100_000)
+    args = parser.parse_args()
+
+    rnd = random.Random(7)
+    names = [f"{_word(rnd, 4, 12)}.{rnd.choice(['docx', 'xlsx', 'pdf', 'txt', 'locked', 'jpg'])}" for _ in range(args.names)]
+    print(f"{'patterns':>9} {'build ms':>9} {'naive ns/name':>14} {'matcher ns/name':>16}")
+    for n in (4, 100, 1_000, 10_000):
+        patterns = make_patterns(n, rnd)
+        t0 = time.perf_counter()
+        # mitad como keywords de extensión, mitad como patrones de notas de rescate
+        matcher = IndicatorMatcher(extension_keywords=patterns[: max(4, n // 2)], note_patterns=patterns[n // 2:])
+        build = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        matcher_check(names, matcher)
+        t_matcher = time.perf_counter() - t0
+
+        sample = names if n <= 100 else names[: max(1000, args.names // (n // 10))]
+        t0 = time.perf_counter()
+        naive_check(sample, patterns)
+        t_naive = time.perf_counter() - t0
+
+        print(f"{n:>9} {build * 1e3:>9.1f} {t_naive / len(sample) * 1e9:>14,.0f} {t_matcher / len(names) * 1e9:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
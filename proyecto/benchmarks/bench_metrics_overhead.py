@@ -0,0 +1,83 @@
+"""Costo de la instrumentación de métricas por petición HTTP y por sentencia SQL.
+
+- petición: la misma app ASGI mínima (una respuesta vacía, sin red) llamada directamente y
+  envuelta en MetricsMiddleware (histograma de latencia, conteo por ruta y de consultas)
+- SQL     : ``SELECT 1`` en un engine SQLite en memoria con y sin los eventos de
+  ``instrument_engine``
+- detector: una llamada a ``observe_detector``
+
+Las diferencias son el costo agregado por petición / sentencia / lote analizado.
+
+Uso: python -m proyecto.benchmarks.bench_metrics_overhead --requests 50000 --queries 50000
+"""
+import argparse
+import asyncio
+import time
+
+from sqlalchemy import create_engine, text
+
+from proyecto.app.metrics import MetricsMiddleware, instrument_engine, observe_detector
+
+
+class _Route:
+    path = "/api/v1/devices/{device_id}"
+    path_regex = None
+
+
+async def _endpoint(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _drive(app, n: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app({"type": "http", "method": "GET", "path": "/api/v1/devices/7"}, receive, send)
+    return (time.perf_counter() - t0) / n
+
+
+def _queries(engine, n: int) -> float:
+    stmt = text("SELECT 1")
+    with engine.connect() as conn:
+        t0 = time.perf_counter()
+        for _ in range(n):
+            conn.execute(stmt).scalar()
+        return (time.perf_counter() - t0) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the overhead of request/SQL/detector metrics")
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=50000)
+    args = parser.parse_args()
+
+    bare = asyncio.run(_drive(_endpoint, args.requests))
+    wrapped = asyncio.run(_drive(MetricsMiddleware(_endpoint), args.requests))
+    print(f"petición : {bare * 1e6:6.2f} µs sin métricas, {wrapped * 1e6:6.2f} µs con MetricsMiddleware "
+          f"(+{(wrapped - bare) * 1e6:.2f} µs)")
+
+    plain = create_engine("sqlite://")
+    instrumented = create_engine("sqlite://")
+    instrument_engine(instrumented)
+    _queries(plain, 1000), _queries(instrumented, 1000)  # calentamiento (cache de sentencias)
+    base = _queries(plain, args.queries)
+    timed = _queries(instrumented, args.queries)
+    print(f"SQL      : {base * 1e6:6.2f} µs sin eventos, {timed * 1e6:6.2f} µs con instrument_engine "
+          f"(+{(timed - base) * 1e6:.2f} µs por sentencia)")
+
+    n = args.requests
+    t0 = time.perf_counter()
+    for _ in range(n):
+        observe_detector("bench", "detector", 0.001, 500, 3)
+    print(f"detector : {(time.perf_counter() - t0) / n * 1e6:6.2f} µs por observe_detector")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Compara el análisis paquete a paquete con el modo batch vectorizado.
+
+Uso: python -m proyecto.benchmarks.bench_network_batch --packets 200000
+"""
+import argparse
+import random
+
+from proyecto.benchmarks._common import best_of
+
+from proyecto.services.network_defense import NetworkAttackDefenseService, packets_to_columns
+
+
+def make_packets(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    protocols = ["TCP", "UDP", "SSH", "RDP", "HTTP"]
+    packets = []
+    for i in range(n):
+        packets.append({
+            "src": f"10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+            "dst": f"192.168.1.{rnd.randint(1, 254)}",
+            "protocol": rnd.choice(protocols),
+            "attempt_count": rnd.randint(0, 10),
+            "flags": {"syn": rnd.random() < 0.1, "ack": rnd.random() < 0.5},
+        })
+    return packets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-packet vs batch network analysis")
+    parser.add_argument("--packets", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    svc = NetworkAttackDefenseService()
+    packets = make_packets(args.packets)
+    columns = packets_to_columns(packets)
+
+    t_loop, r_loop = best_of(lambda: svc.analyze_network_traffic({"packets": packets}), args.repeat)
+    t_conv, _ = best_of(lambda: packets_to_columns(packets), args.repeat)
+    t_batch, r_batch = best_of(lambda: svc.analyze_network_traffic_batch(columns), args.repeat)
+
+    assert r_loop["connections_blocked"] == r_batch["connections_blocked"]
+    assert r_loop["threats_detected"] == r_batch["threats_detected"]
+
+    n = args.packets
+    print(f"packets: {n}  threats: {r_batch['connections_blocked']}  rule_counts: {r_batch['rule_counts']}")
+    print(f"per-packet : {t_loop * 1e3:9.1f} ms  ({n / t_loop:,.0f} pkt/s)")
+    print(f"batch      : {t_batch * 1e3:9.1f} ms  ({n / t_batch:,.0f} pkt/s)  x{t_loop / t_batch:.1f}")
+    print(f"batch+conv : {(t_batch + t_conv) * 1e3:9.1f} ms  (dict -> columns included)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Motor de políticas: costo por evento con --policies políticas activas, interpretado vs compilado.
+
+Genera políticas NETWORK sintéticas (protocolo/puerto/umbrales, una fracción --duplicates
+de reglas equivalentes escritas de otra forma) y paquetes aleatorios, y mide:
+
+- interpretado: recorre todas las políticas y evalúa cada regla desde el JSON de ``settings``
+- compilado   : PolicyEngine.evaluate_batch (reglas fusionadas, índice de anclas, memo)
+
+Verifica que ambos detecten los mismos tipos de amenaza por evento y mide también el costo
+de desactivar una sola política (commit + recompilación vía db_events) frente a una carga completa.
+
+Uso: python -m proyecto.benchmarks.bench_policy_engine --policies 1000 --events 20000
+"""
+import argparse
+import random
+import time
+
+from proyecto.benchmarks._common import temp_env
+
+temp_env("bench_policies_")
+
+from proyecto.app import db_events
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.seguridad import SecurityPolicy
+from proyecto.services.policy_engine import PolicyEngine
+
+PROTOCOLS = ["SSH", "RDP", "HTTP", "HTTPS", "SMB", "FTP", "DNS", "SMTP", "TELNET", "LDAP"]
+
+
+def make_rule(rnd: random.Random, i: int, duplicate_of=None):
+    if duplicate_of is not None:
+        # misma regla con otra forma: eq en vez de in de un elemento y campos en otro orden
+        match = dict(reversed(list(duplicate_of["match"].items())))
+        match = {k: (v["in"][0] if isinstance(v, dict) and list(v) == ["in"] and len(v["in"]) == 1 else v)
+                 for k, v in match.items()}
+        return dict(duplicate_of, name=f"dup-{i}", match=match)
+    kind = rnd.random()
+    if kind < 0.5:
+        match = {"protocol": {"in": rnd.sample(PROTOCOLS, rnd.randint(1, 2))},
+                 "attempt_count": {"gt": rnd.randint(3, 50)}}
+    elif kind < 0.8:
+        match = {"dst_port": {"in": [rnd.randint(1, 1024)]}, "flags.syn": True, "bytes": {"gte": rnd.randint(0, 5000)}}
+    elif kind < 0.95:
+        match = {"src": {"in": [f"10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}" for _ in range(3)]}}
+    else:
+        match = {"bytes": {"gt": rnd.randint(60000, 65000)}, "flags.ack": {"ne": True}}
+    return {"name": f"rule-{i}", "match": match, "threat_type": f"T{i % 40}", "severity": "HIGH", "action": "BLOCKED"}
+
+
+def make_policies(rnd: random.Random, n: int, duplicates: float):
+    policies, rules = [], []
+    for i in range(n):
+        rule_list = []
+        for j in range(rnd.randint(1, 3)):
+            dup = rnd.choice(rules) if rules and rnd.random() < duplicates else None
+            rule = make_rule(rnd, i * 10 + j, dup)
+            rules.append(rule)
+            rule_list.append(rule)
+        policies.append({"name": f"policy-{i}", "policy_type": "NETWORK", "settings": {"rules": rule_list},
+                         "is_active": True})
+    return policies
+
+
+def make_events(rnd: random.Random, n: int):
+    return [{
+        "src": f"10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+        "dst": "192.168.0.1",
+        "dst_port": rnd.randint(1, 1024),
+        "protocol": rnd.choice(PROTOCOLS),
+        "attempt_count": rnd.randint(0, 60),
+        "bytes": rnd.randint(40, 65535),
+        "flags": {"syn": rnd.random() < 0.3, "ack": rnd.random() < 0.7},
+    } for _ in range(n)]
+
+
+# -- evaluación interpretada (referencia) ---------------------------------------------------
+
+def _value(event, field):
+    for part in field.split("."):
+        if not isinstance(event, dict):
+            return None
+        event = event.get(part)
+    return event
+
+
+def _check(x, op, v):
+    if op == "eq":
+        return x == v
+    if op == "ne":
+        return x != v
+    if op == "in":
+        return x in v
+    if op == "not_in":
+        return x not in v
+    if op == "exists":
+        return (x is not None) == v
+    if op in ("suffix", "contains"):
+        values = [v] if isinstance(v, str) else v
+        if not isinstance(x, str):
+            return False
+        s = x.lower()
+        return any(s.endswith(p.lower()) if op == "suffix" else p.lower() in s for p in values)
+    if isinstance(x, bool) or not isinstance(x, (int, float)):
+        return False
+    return {"gt": x > v, "gte": x >= v, "lt": x < v, "lte": x <= v}[op]
+
+
+def interpreted(policies, event):
+    found = []
+    for policy in policies:
+        for rule in policy["settings"]["rules"]:
+            if all(_check(_value(event, field), op, v)
+                   for field, spec in rule["match"].items()
+                   for op, v in (spec.items() if isinstance(spec, dict) else [("eq", spec)])):
+                found.append(rule["threat_type"])
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark compiled security policy evaluation")
+    parser.add_argument("--policies", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--duplicates", type=float, default=0.3, help="fracción de reglas equivalentes")
+    parser.add_argument("--batch", type=int, default=500, help="eventos por evaluate_batch")
+    args = parser.parse_args()
+
+    rnd = random.Random(21)
+    policies = make_policies(rnd, args.policies, args.duplicates)
+    events = make_events(rnd, args.events)
+
+    init_db()
+    with SessionLocal() as db:
+        db.add_all(SecurityPolicy(**p) for p in policies)
+        db.commit()
+    engine = PolicyEngine()
+    t0 = time.perf_counter()
+    with SessionLocal() as db:
+        engine.load(db)
+    full_load = time.perf_counter() - t0
+    db_events.on_change(SecurityPolicy, engine.apply_changes)
+    stats = engine.stats()
+    print(f"{stats['active']:,} políticas activas, {stats['rules']:,} reglas -> "
+          f"{stats['compiled_rules']['NETWORK']:,} fusionadas ({stats['unanchored_rules']['NETWORK']} sin ancla), "
+          f"{stats['conditions']:,} condiciones distintas")
+
+    sample = events[:min(2000, len(events))]
+    t0 = time.perf_counter()
+    expected = [interpreted(policies, e) for e in sample]
+    naive_us = (time.perf_counter() - t0) / len(sample) * 1e6
+
+    got = engine.evaluate_batch("NETWORK", sample)
+    for want, matches in zip(expected, got):
+        assert sorted(set(want)) == sorted({m["threat_type"] for m in matches}), (want, matches)
+
+    t0 = time.perf_counter()
+    matched = 0
+    for i in range(0, len(events), args.batch):
+        matched += sum(1 for r in engine.evaluate_batch("NETWORK", events[i:i + args.batch]) if r)
+    compiled_us = (time.perf_counter() - t0) / len(events) * 1e6
+    print(f"interpretado: {naive_us:>9.1f} µs/evento")
+    print(f"compilado   : {compiled_us:>9.2f} µs/evento ({naive_us / compiled_us:.0f}x), "
+          f"{matched / len(events):.1%} de eventos con coincidencias")
+
+    with SessionLocal() as db:
+        policy = db.query(SecurityPolicy).first()
+        policy.is_active = False
+        t0 = time.perf_counter()
+        db.commit()  # db_events.on_change -> apply_changes
+        toggle = time.perf_counter() - t0
+    stats = engine.stats()
+    assert stats["active"] == args.policies - 1
+    print(f"carga completa: {full_load * 1e3:.1f} ms; desactivar 1 política (commit incluido): {toggle * 1e3:.1f} ms "
+          f"(índice reconstruido en {stats['last_rebuild_ms']:.1f} ms, "
+          f"{stats['policies_compiled'] - args.policies} política recompilada)")
+
+
+if __name__ == "__main__":
+    main()
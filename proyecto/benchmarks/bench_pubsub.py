@@ -0,0 +1,143 @@
+"""Carga del canal de eventos: 5k suscriptores inactivos + 500 activos.
+
+Los inactivos nunca leen (clientes lentos o colgados); los activos consumen continuamente.
+Un hilo productor (como las rutas síncronas) publica eventos de dispositivos con clave
+(coalescibles) y amenazas sin clave. Se mide el costo de publish, la latencia extremo a
+extremo en los activos y que un inactivo que vuelve a leer reciba un lote acotado.
+
+Modo --websocket: levanta la app con uvicorn y conecta clientes reales a /ws/events.
+
+Uso: python -m proyecto.benchmarks.bench_pubsub --idle 5000 --active 500 --events 2000 [--websocket]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import threading
+import time
+
+from proyecto.benchmarks._common import percentile, temp_env
+
+temp_env("bench_pubsub_", AUTH_ENABLED="0")
+
+from proyecto.app.database.database import init_db
+from proyecto.app.pubsub import Broker
+
+
+def produce(broker, events, rate, publish_times):
+    rnd = random.Random(17)
+    interval = 1.0 / rate if rate else 0.0
+    for i in range(events):
+        data = {"sent": time.perf_counter(), "i": i}
+        t0 = time.perf_counter()
+        if rnd.random() < 0.8:
+            broker.publish("devices", data, key=f"device:{rnd.randint(1, 200)}", type="updated")
+        else:
+            broker.publish("threats", data, type="created")
+        publish_times.append(time.perf_counter() - t0)
+        if interval:
+            time.sleep(interval)
+
+
+def report(publish_times, latencies, received, elapsed):
+    print(f"publish    : p50 {statistics.median(publish_times) * 1e6:,.0f} µs  p99 {percentile(publish_times, 0.99) * 1e6:,.0f} µs"
+          f"  ({len(publish_times) / elapsed:,.0f} eventos/s)")
+    print(f"entrega    : p50 {statistics.median(latencies) * 1e3:.1f} ms  p99 {percentile(latencies, 0.99) * 1e3:.1f} ms"
+          f"  ({received:,} eventos recibidos por los activos)")
+
+
+async def run_broker(args):
+    broker = Broker(ring_size=args.ring_size, queue_size=args.queue_size)
+    idle = [broker.subscribe() for _ in range(args.idle)]
+    latencies, publish_times = [], []
+    received = 0
+
+    async def consumer():
+        nonlocal received
+        sub = broker.subscribe()
+        while True:
+            batch = await sub.get()
+            now = time.perf_counter()
+            for payload in batch:
+                data = json.loads(payload).get("data") or {}
+                if "sent" in data:
+                    latencies.append(now - data["sent"])
+                    received += 1
+
+    tasks = [asyncio.create_task(consumer()) for _ in range(args.active)]
+    await asyncio.sleep(0)
+    t0 = time.perf_counter()
+    await asyncio.to_thread(produce, broker, args.events, args.rate, publish_times)
+    await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - t0
+    for task in tasks:
+        task.cancel()
+    report(publish_times, latencies, received, elapsed)
+    batch = await idle[0].get()
+    print(f"inactivo   : al leer recibe {len(batch)} evento(s) "
+          f"({'resync' if idle[0].resyncs else f'{idle[0].coalesced:,} coalescidos'}), retraso era {args.events:,}")
+
+
+async def run_websocket(args):
+    import uvicorn
+    import websockets
+    from proyecto.app.main import app
+    from proyecto.app.pubsub import broker
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning",
+                                           ws="websockets", backlog=8192))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        await asyncio.sleep(0.05)
+    url = f"ws://127.0.0.1:{args.port}/ws/events"
+
+    t0 = time.perf_counter()
+    idle = []
+    for i in range(0, args.idle, 250):
+        # los inactivos se conectan pero no leen nunca
+        idle.extend(await asyncio.gather(*(websockets.connect(url, max_queue=1) for _ in range(min(250, args.idle - i)))))
+    active = [await websockets.connect(url) for _ in range(args.active)]
+    print(f"conexiones : {len(idle) + len(active):,} en {time.perf_counter() - t0:.1f} s ({len(broker):,} suscripciones)")
+
+    latencies, publish_times = [], []
+    received = 0
+
+    async def consumer(ws):
+        nonlocal received
+        async for message in ws:
+            now = time.perf_counter()
+            for event in json.loads(message):
+                if "sent" in (event.get("data") or {}):
+                    latencies.append(now - event["data"]["sent"])
+                    received += 1
+
+    tasks = [asyncio.create_task(consumer(ws)) for ws in active]
+    t0 = time.perf_counter()
+    await asyncio.to_thread(produce, broker, args.events, args.rate, publish_times)
+    await asyncio.sleep(2.0)
+    elapsed = time.perf_counter() - t0
+    for task in tasks:
+        task.cancel()
+    report(publish_times, latencies, received, elapsed)
+    server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the WebSocket event fan-out")
+    parser.add_argument("--idle", type=int, default=5000)
+    parser.add_argument("--active", type=int, default=500)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=500.0, help="eventos/s publicados (0 = sin pausa)")
+    parser.add_argument("--queue-size", type=int, default=256)
+    parser.add_argument("--ring-size", type=int, default=8192)
+    parser.add_argument("--websocket", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    init_db()
+    asyncio.run(run_websocket(args) if args.websocket else run_broker(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Escalamiento del análisis de operaciones de archivo con hashing en pool de procesos.
+
+Crea un árbol sintético de archivos (por defecto 100k) y mide monitor_file_operations
+(serial) contra monitor_file_operations_parallel con 1..N procesos. El árbol hace de raíz
+de archivos de los agentes (``files_root``): las rutas de las operaciones son relativas a él.
+
+Uso: python -m proyecto.benchmarks.bench_ransomware_parallel --files 100000 --size-kb 16
+"""
+from pathlib import Path
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from proyecto.services.ransomware_protection import RansomwareProtectionService
+
+EXTENSIONS = ("docx", "xlsx", "pdf", "pptx", "txt")
+
+
+def make_tree(root: Path, files: int, size: int, per_dir: int = 1000):
+    payload = os.urandom(size)
+    operations = []
+    for i in range(files):
+        d = root / f"d{i // per_dir:04d}"
+        if i % per_dir == 0:
+            d.mkdir(parents=True, exist_ok=True)
+        name = f"file{i}.{EXTENSIONS[i % len(EXTENSIONS)]}"
+        with open(d / name, "wb") as f:
+            f.write(payload[: size - (i % 97)])
+        operations.append({"operation_type": "WRITE", "file_name": name, "file_path": f"{d.name}/{name}"})
+    return operations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel file-operation analysis")
+    parser.add_argument("--files", type=int, default=100_000)
+    parser.add_argument("--size-kb", type=int, default=16)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dir", default=None, help="directory for the synthetic tree (default: temp)")
+    args = parser.parse_args()
+
+    root = Path(args.dir or tempfile.mkdtemp(prefix="bench_ransom_"))
+    try:
+        t0 = time.perf_counter()
+        operations = make_tree(root, args.files, args.size_kb * 1024)
+        print(f"tree: {args.files:,} files x {args.size_kb} KiB in {root} ({time.perf_counter() - t0:.1f} s)")
+
+        svc = RansomwareProtectionService(files_root=root)
+        t0 = time.perf_counter()
+        serial = svc.monitor_file_operations("bench", operations)
+        base = time.perf_counter() - t0
+        print(f"serial     : {base:7.2f} s  {args.files / base:10,.0f} files/s  protected={serial['files_protected']}")
+
+        workers = 1
+        while workers <= args.max_workers:
+            with svc.create_pool(workers) as pool:
+                list(pool.map(abs, range(workers)))  # warm up the pool
+                t0 = time.perf_counter()
+                result = svc.monitor_file_operations_parallel("bench", operations, batch_size=args.batch_size, executor=pool)
+                elapsed = time.perf_counter() - t0
+            assert result["files_protected"] == serial["files_protected"]
+            print(f"workers={workers:<3}: {elapsed:7.2f} s  {args.files / elapsed:10,.0f} files/s  speedup x{base / elapsed:.2f}")
+            workers *= 2
+    finally:
+        if args.dir is None:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Puntaje de riesgo incremental: eventos/s, costo del flush (recalcula los pendientes desde
+la base y escribe con un UPDATE por lote) y top-K desde el heap.
+
+Usa una base SQLite temporal (o PROYECTO_DATABASE_URL si está definida) para no tocar data.db.
+
+Uso: python -m proyecto.benchmarks.bench_risk_scoring --endpoints 10000 --events 500000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from proyecto.benchmarks._common import temp_env
+
+temp_env("bench_risk_")
+
+from sqlalchemy import insert, select
+
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.seguridad import Endpoint, Threat
+from proyecto.services.risk_scoring import RiskScoringEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental endpoint risk scoring")
+    parser.add_argument("--endpoints", type=int, default=10_000)
+    parser.add_argument("--events", type=int, default=500_000)
+    parser.add_argument("--batch", type=int, default=100, help="amenazas por commit simulado")
+    args = parser.parse_args()
+    init_db()
+
+    rnd = random.Random(15)
+    ids = [f"ep-{i:06d}" for i in range(args.endpoints)]
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        db.query(Endpoint).delete()
+        db.execute(insert(Endpoint), [{"id": i, "name": i, "last_seen": now} for i in ids])
+        db.commit()
+
+    engine = RiskScoringEngine(session_factory=SessionLocal)
+    severities = ["LOW", "MEDIUM", "HIGH", "CRITICAL"]
+    batches = [
+        [{"endpoint_id": rnd.choice(ids), "severity": rnd.choice(severities),
+          "detection_time": now - timedelta(seconds=rnd.randint(0, 7 * 86400))} for _ in range(args.batch)]
+        for _ in range(args.events // args.batch)
+    ]
+    with SessionLocal() as db:
+        db.query(Threat).delete()
+        db.execute(insert(Threat), [{**row, "id": f"t-{b}-{i}", "name": "bench"}
+                                    for b, rows in enumerate(batches) for i, row in enumerate(rows)])
+        db.commit()
+    t0 = time.perf_counter()
+    for rows in batches:
+        engine.observe_threats(rows)
+    elapsed = time.perf_counter() - t0
+    print(f"observe : {args.events / elapsed:>12,.0f} amenazas/s ({len(engine):,} endpoints)")
+
+    t0 = time.perf_counter()
+    written = engine.flush()
+    print(f"flush   : {written:,} risk_score en {(time.perf_counter() - t0) * 1e3:.0f} ms (UPDATE por lote)")
+
+    for rows in batches[:10]:
+        engine.observe_threats(rows)
+    t0 = time.perf_counter()
+    written = engine.flush()
+    print(f"flush   : {written:,} pendientes tras 10 lotes en {(time.perf_counter() - t0) * 1e3:.1f} ms")
+
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        top = engine.top_k(10)
+    print(f"top_k   : {(time.perf_counter() - t0) * 1e3:.3f} µs/consulta (heap, k=10)")
+    with SessionLocal() as db:
+        t0 = time.perf_counter()
+        for _ in range(100):
+            rows = db.execute(select(Endpoint.id, Endpoint.risk_score).order_by(Endpoint.risk_score.desc()).limit(10)).all()
+        print(f"SQL     : {(time.perf_counter() - t0) * 1e4:.0f} µs/consulta (ORDER BY sin índice)")
+    assert [r["risk_score"] for r in top] == [r.risk_score for r in rows]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Trabajos de análisis: rendimiento (archivos/s, MB/s) según la cantidad de workers.
+
+Genera --files archivos aleatorios de --size bytes en un directorio temporal, los reparte
+en --jobs trabajos de --endpoints endpoints distintos y los analiza con ScanScheduler para
+cada valor de --workers. La primera pasada calienta la caché de páginas del sistema.
+
+Uso: python -m proyecto.benchmarks.bench_scan_jobs --files 4000 --size 65536 --workers 1,2,4,8
+"""
+from pathlib import Path
+import os
+import argparse
+import time
+
+from proyecto.benchmarks._common import temp_env
+
+_TMPDIR = temp_env("bench_scan_jobs_")
+
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.app.jobs import ScanScheduler
+from proyecto.services.ransomware_protection import RansomwareProtectionService
+
+
+def make_tree(root: Path, jobs: int, files: int, size: int):
+    dirs = []
+    for j in range(jobs):
+        d = root / f"job{j}"
+        d.mkdir(parents=True, exist_ok=True)
+        dirs.append(str(d))
+    for i in range(files):
+        with open(Path(dirs[i % jobs]) / f"doc{i}.docx", "wb") as f:
+            f.write(os.urandom(size))
+    return dirs
+
+
+def run(service, dirs, endpoints, workers, per_endpoint, chunk_size):
+    scheduler = ScanScheduler(service, workers=workers, per_endpoint=per_endpoint, chunk_size=chunk_size,
+                              session_factory=SessionLocal)
+    scheduler.start(recover=False)
+    t0 = time.perf_counter()
+    ids = [scheduler.submit(f"ep-{i % endpoints}", [d])["id"] for i, d in enumerate(dirs)]
+    scheduler.wait()
+    elapsed = time.perf_counter() - t0
+    scheduler.stop()
+    jobs = [scheduler.get(job_id) for job_id in ids]
+    assert all(j["status"] == "COMPLETED" for j in jobs), [j["status"] for j in jobs]
+    return elapsed, sum(j["files_scanned"] for j in jobs), sum(j["bytes_scanned"] for j in jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark scan job throughput by worker count")
+    parser.add_argument("--files", type=int, default=4000)
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes por archivo")
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--endpoints", type=int, default=4)
+    parser.add_argument("--workers", default="1,2,4,8")
+    parser.add_argument("--per-endpoint", type=int, default=2)
+    parser.add_argument("--chunk-size", type=int, default=200)
+    args = parser.parse_args()
+
+    init_db()
+    dirs = make_tree(Path(_TMPDIR) / "files", args.jobs, args.files, args.size)
+    service = RansomwareProtectionService()
+    run(service, dirs, args.endpoints, 1, args.per_endpoint, args.chunk_size)  # caché de páginas
+
+    print(f"{os.cpu_count()} CPU, {args.files:,} archivos de {args.size // 1024} KiB en {args.jobs} trabajos "
+          f"de {args.endpoints} endpoints (máx. {args.per_endpoint} lotes por endpoint)")
+    print(f"{'workers':>8} {'s':>8} {'archivos/s':>12} {'MB/s':>8}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        elapsed, files, nbytes = run(service, dirs, args.endpoints, workers, args.per_endpoint, args.chunk_size)
+        print(f"{workers:>8} {elapsed:>8.2f} {files / elapsed:>12,.0f} {nbytes / elapsed / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
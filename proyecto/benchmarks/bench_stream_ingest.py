@@ -0,0 +1,108 @@
+"""Throughput y RSS máximo de los endpoints de ingesta NDJSON.
+
+Genera un upload sintético de tamaño arbitrario sin materializarlo en memoria y lo envía
+en chunks al endpoint mediante un cliente ASGI en proceso.
+
+Uso: python -m proyecto.benchmarks.bench_stream_ingest --gigabytes 2 --kind network
+"""
+import os
+import argparse
+import asyncio
+import json
+import resource
+import time
+
+# sin autenticación: se mide la ingesta, no la verificación de tokens (ver bench_auth)
+os.environ.setdefault("PROYECTO_AUTH_ENABLED", "0")
+
+import httpx
+
+from proyecto.app.database.database import init_db
+from proyecto.app.main import app
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss está en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _network_record(i: int) -> dict:
+    return {
+        "src": f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}",
+        "dst": "192.168.1.10",
+        "dst_port": i % 1024,
+        "protocol": "SSH" if i % 7 == 0 else "TCP",
+        "attempt_count": i % 9,
+        "flags": {"syn": i % 5 == 0, "ack": i % 3 == 0},
+        "timestamp": 1_700_000_000 + i / 10_000,
+    }
+
+
+def _file_record(i: int) -> dict:
+    ext = ("docx", "xlsx", "txt", "locked")[i % 4]
+    return {
+        "operation_type": "RENAME" if i % 4 == 3 else "WRITE",
+        "file_name": f"file{i}.{ext}",
+        "old_name": f"file{i}.docx",
+        "new_name": f"file{i}.{ext}",
+        "file_path": f"/home/user/file{i}.{ext}",
+    }
+
+
+async def _body(kind: str, total_bytes: int, chunk_bytes: int, stats: dict):
+    make = _network_record if kind == "network" else _file_record
+    sent = 0
+    i = 0
+    buf = []
+    size = 0
+    while sent < total_bytes:
+        line = json.dumps(make(i)).encode() + b"\n"
+        buf.append(line)
+        size += len(line)
+        i += 1
+        if size >= chunk_bytes:
+            yield b"".join(buf)
+            sent += size
+            buf, size = [], 0
+    if buf:
+        yield b"".join(buf)
+        sent += size
+    stats["records"] = i
+    stats["bytes"] = sent
+
+
+async def run(kind: str, gigabytes: float, chunk_kb: int, batch_size: int):
+    stats: dict = {}
+    url = "/api/v1/network/traffic/stream" if kind == "network" else "/api/v1/ransomware/file-operations/stream?endpoint_id=bench"
+    sep = "&" if "?" in url else "?"
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        t0 = time.perf_counter()
+        resp = await client.post(
+            f"{url}{sep}batch_size={batch_size}",
+            content=_body(kind, int(gigabytes * (1 << 30)), chunk_kb * 1024, stats),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+        elapsed = time.perf_counter() - t0
+    resp.raise_for_status()
+    result = resp.json()
+    assert result["records"] == stats["records"], result
+    print(f"kind: {kind}  uploaded: {stats['bytes'] / (1 << 20):,.0f} MiB  records: {stats['records']:,}")
+    print(f"elapsed: {elapsed:.1f} s  throughput: {stats['records'] / elapsed:,.0f} events/s"
+          f"  ({stats['bytes'] / (1 << 20) / elapsed:,.1f} MiB/s)")
+    print(f"peak RSS: {_peak_rss_mb():,.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark NDJSON streaming ingestion")
+    parser.add_argument("--kind", choices=["network", "files"], default="network")
+    parser.add_argument("--gigabytes", type=float, default=0.25)
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    init_db()
+    asyncio.run(run(args.kind, args.gigabytes, args.chunk_kb, args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
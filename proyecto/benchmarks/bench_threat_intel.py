@@ -0,0 +1,110 @@
+"""Compilación y consultas por lote del índice de inteligencia de amenazas (IOC).
+
+Genera un feed CSV sintético con N indicadores (IPs, rangos CIDR, SHA-256 y dominios),
+lo compila con build_index y mide consultas por lote contra el índice mapeado en memoria.
+Para hashes compara la búsqueda exacta sola contra el prefiltro de Bloom con tráfico
+mayormente benigno.
+
+Uso: python -m proyecto.benchmarks.bench_threat_intel --indicators 1000000 --queries 100000
+"""
+from pathlib import Path
+from collections import Counter
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from proyecto.services.threat_intelligence import BLOOM_FP_RATE, ThreatIntelIndex, build_index
+
+
+def _ip(rnd):
+    return f"{rnd.randint(1, 223)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}.{rnd.randint(0, 255)}"
+
+
+def _sha(rnd):
+    return "%064x" % rnd.getrandbits(256)
+
+
+def _domain(rnd):
+    return f"h{rnd.getrandbits(40):x}.{rnd.choice(['com', 'net', 'ru', 'io'])}"
+
+
+def write_feed(path, n, rnd):
+    """Feed con ~40% IPs (10% de ellas CIDR), ~40% hashes y ~20% dominios"""
+    samples = {"ip": [], "sha256": [], "domain": []}
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("type,value\n")
+        for i in range(n):
+            r = i % 10
+            if r < 4:
+                value = _ip(rnd) + ("/24" if r == 0 else "")
+                kind = "ip"
+            elif r < 8:
+                value, kind = _sha(rnd), "sha256"
+            else:
+                value, kind = _domain(rnd), "domain"
+            f.write(f"{kind},{value}\n")
+            if len(samples[kind]) < 1000:
+                samples[kind].append(value.split('/')[0])
+    return samples
+
+
+def _queries(samples, make, rnd, n, hit_ratio=0.1):
+    return [rnd.choice(samples) if rnd.random() < hit_ratio else make(rnd) for _ in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threat-intel IOC index build and batch lookups")
+    parser.add_argument("--indicators", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=100_000)
+    parser.add_argument("--bloom-fp-rate", type=float, default=BLOOM_FP_RATE)
+    args = parser.parse_args()
+
+    rnd = random.Random(12)
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = Path(tmp) / "feed.csv"
+        t0 = time.perf_counter()
+        samples = write_feed(feed, args.indicators, rnd)
+        print(f"feed      : {args.indicators:,} indicadores ({os.path.getsize(feed) / 1e6:.0f} MB) en {time.perf_counter() - t0:.1f} s")
+
+        t0 = time.perf_counter()
+        version = build_index([feed], Path(tmp) / "idx", args.bloom_fp_rate)
+        build = time.perf_counter() - t0
+        size = sum(p.stat().st_size for p in version.iterdir())
+        print(f"build     : {build:.1f} s, índice {size / 1e6:.1f} MB")
+
+        t0 = time.perf_counter()
+        index = ThreatIntelIndex.open_current(Path(tmp) / "idx")
+        print(f"open      : {(time.perf_counter() - t0) * 1e3:.2f} ms (mmap)")
+
+        for name, make, lookup in (
+            ("ips", _ip, index.lookup_ips),
+            ("hashes", _sha, index.lookup_hashes),
+            ("domains", lambda r: "www." + _domain(r), index.lookup_domains),
+        ):
+            queries = _queries(samples[{"ips": "ip", "hashes": "sha256", "domains": "domain"}[name]], make, rnd, args.queries)
+            t0 = time.perf_counter()
+            hits = sum(lookup(queries))
+            elapsed = time.perf_counter() - t0
+            print(f"{name:<10}: {args.queries / elapsed:>12,.0f} lookups/s  ({hits:,} hits)")
+
+        # hashes con 0.1% de IOC: prefiltro de Bloom contra búsqueda exacta en todos
+        queries = _queries(samples["sha256"], _sha, rnd, args.queries, hit_ratio=0.001)
+        bloom, stats = index.bloom, Counter()
+        t0 = time.perf_counter()
+        index.lookup_hashes(queries, stats)
+        t_bloom = time.perf_counter() - t0
+        index.bloom = None
+        t0 = time.perf_counter()
+        index.lookup_hashes(queries)
+        t_exact = time.perf_counter() - t0
+        index.bloom = bloom
+        print(f"exact only: {args.queries / t_exact:>12,.0f} lookups/s")
+        print(f"bloom+exact:{args.queries / t_bloom:>12,.0f} lookups/s  "
+              f"({stats['exact_lookups_avoided']:,} of {stats['hash_checks']:,} exact lookups avoided, "
+              f"{bloom.num_bits / 8 / 1e6:.1f} MB, k={bloom.num_hashes})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Dashboard de amenazas: rollups pre-agregados vs GROUP BY sobre la tabla threats.
+
+Siembra N amenazas repartidas en --days días (base SQLite temporal, o PROYECTO_DATABASE_URL),
+ejecuta el backfill y compara la latencia de las consultas del dashboard contra agregar
+la tabla cruda. La latencia de los rollups depende de la ventana, no del tamaño de la tabla.
+
+Uso: python -m proyecto.benchmarks.bench_threat_rollups --rows 50000000 --days 365
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from proyecto.benchmarks._common import median_ms, temp_env
+
+temp_env("bench_rollups_")
+
+from sqlalchemy import func, insert, select
+
+from proyecto.modelo.rollup import ThreatRollup
+from proyecto.modelo.seguridad import Threat
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.app.rollups import backfill, query_series, query_totals
+
+TYPES = ["RANSOMWARE", "MALWARE", "PHISHING", "ZERO_DAY"]
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+
+
+def seed(rows: int, days: int, chunk: int = 100_000):
+    rnd = random.Random(16)
+    now = datetime.utcnow()
+    span = days * 86400
+    with SessionLocal() as db:
+        for start in range(0, rows, chunk):
+            db.execute(insert(Threat), [{
+                "id": f"t{i}", "name": "bench", "type": rnd.choice(TYPES), "severity": rnd.choice(SEVERITIES),
+                "status": "BLOCKED", "detection_time": now - timedelta(seconds=rnd.randint(0, span)),
+            } for i in range(start, min(rows, start + chunk))])
+            db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark threat rollups vs raw aggregation")
+    parser.add_argument("--rows", type=int, default=50_000_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--raw-repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    init_db()
+    t0 = time.perf_counter()
+    seed(args.rows, args.days)
+    print(f"seed      : {args.rows:,} amenazas en {time.perf_counter() - t0:.1f} s")
+
+    with SessionLocal() as db:
+        t0 = time.perf_counter()
+        total = backfill(db)
+        buckets = db.execute(select(func.count()).select_from(ThreatRollup)).scalar_one()
+        print(f"backfill  : {total:,} amenazas -> {buckets:,} buckets en {time.perf_counter() - t0:.1f} s")
+
+        now = datetime.utcnow()
+        print(f"{'ventana':<10} {'rollup ms':>10} {'crudo ms':>10}")
+        for label, hours in (("6h", 6), ("24h", 24), ("7d", 24 * 7), ("90d", 24 * 90), (f"{args.days}d", 24 * args.days)):
+            since = now - timedelta(hours=hours)
+
+            def rollup():
+                query_series(db, since, now, by="severity")
+                query_totals(db, since, now)
+
+            def raw():
+                db.execute(select(Threat.severity, func.count()).where(Threat.detection_time >= since)
+                           .group_by(Threat.severity)).all()
+                db.execute(select(Threat.type, Threat.severity, func.count()).where(Threat.detection_time >= since)
+                           .group_by(Threat.type, Threat.severity)).all()
+
+            print(f"{label:<10} {median_ms(rollup, args.repeat):>10.2f} {median_ms(raw, args.raw_repeat):>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""Presupuesto de arranque: tiempo de import de ``proyecto.app.main`` y latencia de la primera petición.
+
+Cada medición corre en un proceso nuevo (como un worker de uvicorn recién iniciado) con una
+base SQLite temporal vacía:
+
+- import  : ``python -X importtime -c "import proyecto.app.main"``; se toma el tiempo
+            acumulado de ``proyecto.app.main`` y se listan los módulos propios más lentos
+- sin E/S : el import no debe crear la base (el esquema se crea en el lifespan) ni cargar
+            módulos pesados que solo usan algunas rutas (--forbid)
+- petición: arranque del lifespan y primera petición con TestClient
+
+Se usa la mediana de --runs procesos. Sale con código 1 si se supera algún presupuesto, para
+poder usarlo en CI.
+
+Uso: python -m proyecto.benchmarks.check_startup --import-budget-ms 1500 --request-budget-ms 300
+"""
+from pathlib import Path
+import sys
+import os
+import argparse
+import json
+import statistics
+import subprocess
+import tempfile
+
+from proyecto.benchmarks._common import REPO_ROOT
+
+# Se ejecuta en el proceso hijo: lifespan + primera petición, en ms
+_FIRST_REQUEST = """
+import json, time
+t0 = time.perf_counter()
+from proyecto.app.main import app
+from fastapi.testclient import TestClient
+t1 = time.perf_counter()
+with TestClient(app) as client:
+    t2 = time.perf_counter()
+    status = client.get(PATH).status_code
+    t3 = time.perf_counter()
+print(json.dumps({"import": (t1 - t0) * 1e3, "startup": (t2 - t1) * 1e3, "request": (t3 - t2) * 1e3,
+                  "status": status}))
+"""
+
+
+def _env(tmpdir: str) -> dict:
+    env = dict(os.environ)
+    env["PROYECTO_DATABASE_URL"] = f"sqlite:///{tmpdir}/startup.db"
+    env["PROYECTO_JWT_SECRET_FILE"] = f"{tmpdir}/jwt_secret"
+    # sin autenticación: la primera petición debe llegar a la base, no cortarse con un 401
+    env.setdefault("PROYECTO_AUTH_ENABLED", "0")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get("PYTHONPATH")]))
+    return env
+
+
+def measure_import(forbid):
+    """(ms acumulados de proyecto.app.main, módulos propios más lentos, prohibidos cargados, base creada)"""
+    with tempfile.TemporaryDirectory(prefix="check_startup_") as tmpdir:
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import proyecto.app.main"],
+                              env=_env(tmpdir), capture_output=True, text=True, cwd=tmpdir)
+        if proc.returncode != 0:
+            raise SystemExit(proc.stderr[-2000:])
+        db_created = Path(tmpdir, "startup.db").exists()
+    total = 0.0
+    own, loaded = [], set()
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if not self_us.strip().isdigit():
+            continue  # cabecera
+        name = name.strip()
+        loaded.add(name.split(".")[0])
+        if name.startswith("proyecto"):
+            own.append((int(self_us) / 1e3, name))
+        if name == "proyecto.app.main":
+            total = int(cumulative_us) / 1e3
+    own.sort(reverse=True)
+    return total, own[:8], sorted(set(forbid) & loaded), db_created
+
+
+def measure_first_request(path: str) -> dict:
+    with tempfile.TemporaryDirectory(prefix="check_startup_") as tmpdir:
+        proc = subprocess.run([sys.executable, "-c", f"PATH = {path!r}\n" + _FIRST_REQUEST],
+                              env=_env(tmpdir), capture_output=True, text=True, cwd=tmpdir)
+    if proc.returncode != 0:
+        raise SystemExit(proc.stderr[-2000:])
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check API import time and first-request latency budgets")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1500.0)
+    parser.add_argument("--request-budget-ms", type=float, default=300.0,
+                        help="presupuesto para la primera petición (sin contar el lifespan)")
+    parser.add_argument("--path", default="/api/v1/devices?limit=10")
+    parser.add_argument("--forbid", default="numpy,pandas,plotly",
+                        help="módulos que no deben cargarse al importar la app")
+    args = parser.parse_args()
+    forbid = [m for m in args.forbid.split(",") if m]
+
+    imports, slowest, forbidden, db_created = [], [], [], False
+    for _ in range(args.runs):
+        total, slowest, forbidden_run, created = measure_import(forbid)
+        imports.append(total)
+        forbidden = sorted(set(forbidden) | set(forbidden_run))
+        db_created |= created
+    requests = [measure_first_request(args.path) for _ in range(args.runs)]
+    import_ms = statistics.median(imports)
+    startup_ms = statistics.median(r["startup"] for r in requests)
+    request_ms = statistics.median(r["request"] for r in requests)
+
+    print(f"import proyecto.app.main: {import_ms:8.1f} ms (presupuesto {args.import_budget_ms:.0f} ms)")
+    for self_ms, name in slowest:
+        print(f"    {self_ms:7.1f} ms  {name}")
+    print(f"lifespan (esquema, bootstrap): {startup_ms:8.1f} ms")
+    print(f"primera petición {args.path}: {request_ms:8.1f} ms (presupuesto {args.request_budget_ms:.0f} ms), "
+          f"HTTP {requests[0]['status']}")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import {import_ms:.0f} ms > {args.import_budget_ms:.0f} ms")
+    if request_ms > args.request_budget_ms:
+        failures.append(f"primera petición {request_ms:.0f} ms > {args.request_budget_ms:.0f} ms")
+    if forbidden:
+        failures.append(f"módulos cargados al importar: {', '.join(forbidden)}")
+    if db_created:
+        failures.append("el import abrió la base de datos")
+    if any(r["status"] >= 500 for r in requests):
+        failures.append(f"la primera petición respondió {requests[0]['status']}")
+    for failure in failures:
+        print(f"FALLA: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""Suite de rendimiento reproducible: carga HTTP concurrente y micro-benchmarks de los detectores.
+
+Todo corre sin red externa y con semillas fijas:
+
+1. siembra una base SQLite temporal (o PROYECTO_DATABASE_URL) con dispositivos, endpoints y
+   amenazas sintéticos según --scale (o --devices/--endpoints/--threats) y crea un árbol de
+   archivos pequeño para los análisis de ransomware
+2. carga HTTP: --concurrency clientes httpx concurrentes contra la app, en proceso
+   (``--transport asgi``, sin sockets) o por HTTP local contra uvicorn en 127.0.0.1
+   (``--transport http``), en los escenarios:
+     devices_list     GET  /api/v1/devices (varias páginas y filtros)
+     features         GET  /api/v1/features
+     ransomware_scan  POST /api/v1/ransomware/scan (encolar; luego se espera a que terminen
+                      los trabajos y se informa archivos/s)
+3. micro-benchmarks: ``NetworkAttackDefenseService.analyze_network_traffic`` y
+   ``RansomwareProtectionService.monitor_file_operations`` sobre lotes generados
+
+Cada resultado tiene p50/p95/p99/media en ms y throughput, y se escribe como JSON (--out).
+Con --baseline se compara contra un JSON anterior y se marcan las regresiones (latencia que
+sube o throughput que baja más que --tolerance); el proceso sale con código 1 si hay alguna.
+``--compare ANTERIOR NUEVO`` solo compara dos archivos ya guardados.
+
+Con 1-2 CPU, clientes y servidor compiten por el mismo núcleo: comparar solo resultados
+tomados en la misma máquina y con los mismos parámetros (quedan registrados en "meta").
+
+Uso: python -m proyecto.benchmarks.suite --scale small --out bench.json [--baseline base.json]
+     python -m proyecto.benchmarks.suite --compare base.json bench.json
+"""
+from pathlib import Path
+import sys
+import os
+import argparse
+import asyncio
+import json
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import threading
+import time
+from datetime import datetime, timedelta
+
+from proyecto.benchmarks._common import REPO_ROOT, temp_env
+
+# todas las solicitudes de análisis se aceptan; la cola se mide, no el límite
+_TMPDIR = temp_env("bench_suite_", SCAN_MAX_PENDING_JOBS="1000000")
+# sin índice de IOC local: los resultados no dependen de lo que haya en proyecto/data
+os.environ.setdefault("PROYECTO_THREAT_INTEL_DIR", f"{_TMPDIR}/threat_intel")
+# el árbol de archivos a analizar se crea bajo _TMPDIR/scan
+os.environ.setdefault("PROYECTO_SCAN_ROOTS", f"{_TMPDIR}/scan")
+
+SCALES = {
+    "small": {"devices": 10_000, "endpoints": 1_000, "threats": 20_000},
+    "medium": {"devices": 100_000, "endpoints": 10_000, "threats": 200_000},
+    "large": {"devices": 1_000_000, "endpoints": 50_000, "threats": 1_000_000},
+}
+# comparados con --baseline: True si más alto es peor (p99 se informa pero con pocas
+# centenas de muestras es demasiado ruidoso para marcar regresiones)
+COMPARED = {"p50_ms": True, "p95_ms": True, "throughput_per_s": False}
+# parámetros que deben coincidir para que la comparación tenga sentido
+COMPARABLE_PARAMS = ("transport", "concurrency", "batch", "scan_files")
+SEED = 24
+# usuario con el que la carga HTTP se autentica (rol operator, como un agente)
+BENCH_USER = ("bench", "bench-password")
+
+
+def percentiles(samples):
+    """p50/p95/p99/media en ms a partir de duraciones en segundos"""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None, "mean_ms": None}
+    if len(samples) == 1:
+        cuts = samples * 99
+    else:
+        cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {
+        "p50_ms": round(cuts[49] * 1e3, 4),
+        "p95_ms": round(cuts[94] * 1e3, 4),
+        "p99_ms": round(cuts[98] * 1e3, 4),
+        "mean_ms": round(statistics.fmean(samples) * 1e3, 4),
+    }
+
+
+# -- datos sintéticos --------------------------------------------------------------------------
+
+def seed_database(devices: int, endpoints: int, threats: int, chunk: int = 50_000):
+    from sqlalchemy import insert
+
+    from proyecto.app.auth import create_user
+    from proyecto.app.database.database import SessionLocal, init_db
+    from proyecto.modelo.device import Device
+    from proyecto.modelo.seguridad import Endpoint, Threat
+
+    init_db()
+    rnd = random.Random(SEED)
+    now = datetime.utcnow()
+    endpoint_ids = [f"ep-{i:06d}" for i in range(endpoints)]
+    with SessionLocal() as db:
+        for start in range(0, devices, chunk):
+            db.execute(insert(Device), [
+                {"hostname": f"host-{i:07d}", "ip_address": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+                 "os": ("Linux", "Windows", "macOS")[i % 3], "last_seen": now - timedelta(seconds=i),
+                 "active": i % 7 != 0}
+                for i in range(start, min(start + chunk, devices))
+            ])
+        db.execute(insert(Endpoint), [
+            {"id": e, "name": e, "hostname": e, "endpoint_type": rnd.choice(["SERVER", "WORKSTATION", "LAPTOP"]),
+             "last_seen": now - timedelta(minutes=rnd.randint(0, 60 * 48))}
+            for e in endpoint_ids
+        ])
+        for start in range(0, threats, chunk):
+            db.execute(insert(Threat), [{
+                "id": f"t-{k}", "name": "bench", "type": rnd.choice(["MALWARE", "RANSOMWARE", "PHISHING"]),
+                "severity": rnd.choice(["LOW", "MEDIUM", "HIGH", "CRITICAL"]),
+                "status": "ACTIVE" if rnd.random() < 0.05 else "BLOCKED",
+                "endpoint_id": rnd.choice(endpoint_ids),
+                "detection_time": now - timedelta(minutes=rnd.randint(0, 60 * 24 * 30)),
+            } for k in range(start, min(start + chunk, threats))])
+        db.commit()
+        create_user(db, *BENCH_USER, role="operator")
+    return endpoint_ids
+
+
+def make_scan_tree(root: Path, files: int, size: int = 4096):
+    """Archivos pequeños; uno de cada 50 con nombre de nota de rescate o extensión de cifrado"""
+    rnd = random.Random(SEED)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(files):
+        if i % 50 == 0:
+            name = ("README_DECRYPT.txt", f"doc{i}.docx.locked")[i // 50 % 2]
+        else:
+            name = f"doc{i}.{rnd.choice(['docx', 'xlsx', 'pdf', 'jpg'])}"
+        path = root / name
+        path.write_bytes(rnd.randbytes(size))
+        paths.append(str(path))
+    return paths
+
+
+def make_packets(rnd: random.Random, n: int):
+    protocols = ["TCP", "UDP", "SSH", "RDP", "HTTP", "SMB"]
+    return [{
+        "src": f"10.0.{rnd.randint(0, 255)}.{rnd.randint(1, 254)}",
+        "dst": f"192.168.1.{rnd.randint(1, 254)}",
+        "dst_port": rnd.randint(1, 1024),
+        "protocol": rnd.choice(protocols),
+        "attempt_count": rnd.randint(0, 10),
+        "bytes": rnd.randint(40, 1500),
+        "flags": {"syn": rnd.random() < 0.1, "ack": rnd.random() < 0.5},
+    } for _ in range(n)]
+
+
+def make_file_operations(rnd: random.Random, n: int):
+    operations = []
+    for i in range(n):
+        kind = rnd.random()
+        name = f"file{i}.{rnd.choice(['docx', 'xlsx', 'pdf', 'txt', 'jpg'])}"
+        if kind < 0.05:
+            operations.append({"operation_type": "RENAME", "file_name": name, "file_path": f"/home/u/{name}",
+                               "new_name": name + rnd.choice([".locked", ".bak", ".encrypted"])})
+        elif kind < 0.07:
+            operations.append({"operation_type": "CREATE", "file_name": "HOW_TO_DECRYPT.txt",
+                               "file_path": "/home/u/HOW_TO_DECRYPT.txt"})
+        else:
+            operations.append({"operation_type": rnd.choice(["WRITE", "READ", "CREATE"]), "file_name": name,
+                               "file_path": f"/home/u/{name}", "file_count": rnd.randint(1, 120),
+                               "process_id": rnd.randint(100, 120)})
+    return operations
+
+
+# -- carga HTTP --------------------------------------------------------------------------------
+
+async def run_load(client, name: str, make_request, total: int, concurrency: int, warmup: int,
+                   ok_status=(200,)):
+    """Lanza ``total`` peticiones con ``concurrency`` clientes; ``make_request(i)`` -> (método, url, json)"""
+    for i in range(warmup):
+        method, url, body = make_request(i)
+        await client.request(method, url, json=body)
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, body = make_request(warmup + i)
+            t0 = time.perf_counter()
+            try:
+                response = await client.request(method, url, json=body)
+                await response.aread()
+                failed = response.status_code not in ok_status
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - t0)
+            errors += failed
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - t0
+    result = {"unit": "request", "count": len(latencies), "errors": errors, "concurrency": concurrency,
+              **percentiles(latencies), "throughput_per_s": round(len(latencies) / elapsed, 2)}
+    print(f"  {name:<18} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} ms  "
+          f"{result['throughput_per_s']:>9.1f} req/s  {errors} errores")
+    return result
+
+
+def _wait_for_scans(timeout: float = 600.0) -> float:
+    """Espera a que el pool de análisis quede vacío; devuelve los segundos esperados"""
+    from proyecto.services.registry import registry
+
+    scheduler = registry.get_optional("scan_jobs")
+    t0 = time.perf_counter()
+    while scheduler is not None and time.perf_counter() - t0 < timeout:
+        stats = scheduler.stats()
+        if not stats["units_in_flight"] and not stats["units_pending"]:
+            break
+        time.sleep(0.05)
+    return time.perf_counter() - t0
+
+
+async def http_scenarios(client, args, endpoint_ids, scan_paths):
+    rnd = random.Random(SEED)
+    # un único login (bcrypt); cada petición posterior solo verifica el token, como un agente real
+    response = await client.post("/api/v1/auth/token", data=dict(zip(("username", "password"), BENCH_USER)))
+    response.raise_for_status()
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    client.cookies.clear()
+    device_queries = ["limit=50", "limit=200", "limit=50&os=Linux", "limit=100&active=true"]
+    results = {}
+    results["http.devices_list"] = await run_load(
+        client, "devices_list", lambda i: ("GET", f"/api/v1/devices?{device_queries[i % len(device_queries)]}", None),
+        args.requests, args.concurrency, args.warmup)
+    results["http.features"] = await run_load(
+        client, "features", lambda i: ("GET", "/api/v1/features", None),
+        args.requests, args.concurrency, args.warmup)
+
+    def scan_request(i):
+        start = rnd.randrange(0, max(1, len(scan_paths) - args.scan_files))
+        return ("POST", "/api/v1/ransomware/scan",
+                {"endpoint_id": endpoint_ids[i % len(endpoint_ids)],
+                 "paths": scan_paths[start:start + args.scan_files]})
+
+    submit_started = time.perf_counter()
+    results["http.ransomware_scan"] = await run_load(
+        client, "ransomware_scan", scan_request, args.scan_requests, args.concurrency, 0, ok_status=(202,))
+    waited = await asyncio.to_thread(_wait_for_scans)
+    files = results["http.ransomware_scan"]["count"] * args.scan_files
+    elapsed = time.perf_counter() - submit_started
+    results["jobs.ransomware_scan"] = {"unit": "file", "count": files, "drain_s": round(waited, 3),
+                                      "throughput_per_s": round(files / elapsed, 2)}
+    print(f"  {'scan jobs':<18} {files:,} archivos en {elapsed:.2f} s "
+          f"({results['jobs.ransomware_scan']['throughput_per_s']:,.0f} archivos/s)")
+    return results
+
+
+async def _asgi_load(app, args, endpoint_ids, scan_paths):
+    import httpx
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await http_scenarios(client, args, endpoint_ids, scan_paths)
+
+
+async def _http_load(base_url, args, endpoint_ids, scan_paths):
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+        return await http_scenarios(client, args, endpoint_ids, scan_paths)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_http(args, endpoint_ids, scan_paths):
+    from proyecto.app.main import app
+
+    print(f"carga HTTP ({args.transport}, {args.concurrency} clientes)        p50      p95      p99")
+    if args.transport == "asgi":
+        return asyncio.run(_asgi_load(app, args, endpoint_ids, scan_paths))
+
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           access_log=False))
+    thread = threading.Thread(target=server.run, name="bench-uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise SystemExit("uvicorn did not start")
+        time.sleep(0.02)
+    try:
+        return asyncio.run(_http_load(f"http://127.0.0.1:{port}", args, endpoint_ids, scan_paths))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+# -- micro-benchmarks --------------------------------------------------------------------------
+
+def micro(name: str, fn, batches, events_per_batch: int, warmup: int = 3):
+    for batch in batches[:warmup]:
+        fn(batch)
+    latencies = []
+    t0 = time.perf_counter()
+    for batch in batches:
+        c0 = time.perf_counter()
+        fn(batch)
+        latencies.append(time.perf_counter() - c0)
+    elapsed = time.perf_counter() - t0
+    result = {"unit": "batch", "count": len(latencies), "batch_size": events_per_batch, **percentiles(latencies),
+              "throughput_per_s": round(len(latencies) * events_per_batch / elapsed, 2)}
+    print(f"  {name:<18} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} {result['p99_ms']:>8.2f} ms  "
+          f"{result['throughput_per_s']:>11,.0f} eventos/s")
+    return result
+
+
+def run_micro(args):
+    from proyecto.services.network_defense import NetworkAttackDefenseService, SlidingWindowDetector
+    from proyecto.services.ransomware_protection import RansomwareProtectionService
+
+    rnd = random.Random(SEED)
+    print(f"micro-benchmarks (lotes de {args.batch} eventos)      p50      p95      p99")
+    results = {}
+    network = NetworkAttackDefenseService(detector=SlidingWindowDetector())
+    packets = [{"packets": make_packets(rnd, args.batch)} for _ in range(args.iterations)]
+    results["micro.analyze_network_traffic"] = micro(
+        "network_traffic", network.analyze_network_traffic, packets, args.batch)
+    ransomware = RansomwareProtectionService()
+    operations = [make_file_operations(rnd, args.batch) for _ in range(args.iterations)]
+    results["micro.monitor_file_operations"] = micro(
+        "file_operations", lambda ops: ransomware.monitor_file_operations("ep-bench", ops), operations, args.batch)
+    return results
+
+
+# -- comparación -------------------------------------------------------------------------------
+
+def compare(baseline: dict, current: dict, tolerance: float):
+    """Lista de regresiones (texto) de ``current`` frente a ``baseline``"""
+    regressions = []
+    print(f"comparación con la línea base (tolerancia {tolerance:.0%})")
+    old_meta, new_meta = baseline.get("meta", {}), current.get("meta", {})
+    differs = [k for k in COMPARABLE_PARAMS
+               if old_meta.get("params", {}).get(k) != new_meta.get("params", {}).get(k)]
+    if old_meta.get("scale") != new_meta.get("scale"):
+        differs.append("scale")
+    if old_meta.get("cpu_count") != new_meta.get("cpu_count"):
+        differs.append("cpu_count")
+    if differs:
+        print(f"  AVISO: las corridas difieren en {', '.join(differs)}; los números no son comparables")
+    for key, base in sorted(baseline.get("results", {}).items()):
+        now = current.get("results", {}).get(key)
+        if now is None:
+            print(f"  {key}: falta en los resultados nuevos")
+            continue
+        for metric, higher_is_worse in COMPARED.items():
+            old, new = base.get(metric), now.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            flag = "REGRESIÓN" if worse else ""
+            print(f"  {key:<34} {metric:<17} {old:>12.3f} -> {new:>12.3f} ({change:+7.1%}) {flag}")
+            if worse:
+                regressions.append(f"{key} {metric} {old:.3f} -> {new:.3f} ({change:+.1%})")
+        if now.get("errors", 0) > base.get("errors", 0):
+            regressions.append(f"{key} errors {base.get('errors', 0)} -> {now['errors']}")
+    return regressions
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproducible API load test and detector micro-benchmarks")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--devices", type=int, help="sobrescribe el valor de --scale")
+    parser.add_argument("--endpoints", type=int, help="sobrescribe el valor de --scale")
+    parser.add_argument("--threats", type=int, help="sobrescribe el valor de --scale")
+    parser.add_argument("--transport", choices=["asgi", "http"], default="asgi")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000, help="peticiones por escenario GET")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--scan-requests", type=int, default=200)
+    parser.add_argument("--scan-files", type=int, default=20, help="archivos por solicitud de análisis")
+    parser.add_argument("--scan-tree", type=int, default=2000, help="archivos generados para los análisis")
+    parser.add_argument("--batch", type=int, default=1000, help="eventos por llamada en los micro-benchmarks")
+    parser.add_argument("--iterations", type=int, default=200, help="llamadas por micro-benchmark")
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--skip-micro", action="store_true")
+    parser.add_argument("--out", help="archivo JSON de resultados")
+    parser.add_argument("--baseline", help="JSON anterior contra el que se buscan regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="cambio relativo permitido")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CURRENT"),
+                        help="solo comparar dos JSON ya guardados")
+    args = parser.parse_args()
+
+    if args.compare:
+        regressions = compare(_load(args.compare[0]), _load(args.compare[1]), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESIÓN: {regression}")
+        sys.exit(1 if regressions else 0)
+
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    results = {}
+    if not args.skip_http:
+        t0 = time.perf_counter()
+        endpoint_ids = seed_database(**scale)
+        scan_paths = make_scan_tree(Path(_TMPDIR) / "scan", args.scan_tree)
+        print(f"base sembrada en {time.perf_counter() - t0:.1f} s: {scale['devices']:,} dispositivos, "
+              f"{scale['endpoints']:,} endpoints, {scale['threats']:,} amenazas")
+        results.update(run_http(args, endpoint_ids, scan_paths))
+    if not args.skip_micro:
+        results.update(run_micro(args))
+
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "scale": scale,
+            "params": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "compare")},
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"resultados en {args.out}")
+
+    if args.baseline:
+        regressions = compare(_load(args.baseline), report, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESIÓN: {regression}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
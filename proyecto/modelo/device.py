@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index
 # Reuse the Base declarative from seguridad.py
 try:
     from proyecto.modelo.seguridad import Base
@@ -9,12 +9,16 @@ except Exception:
 
 class Device(Base):
     __tablename__ = "devices"
+    __table_args__ = (
+        # Keyset pagination walks id DESC inside the filtered subset
+        Index("ix_devices_active_os_id", "active", "os", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    hostname = Column(String(128), nullable=False)
+    hostname = Column(String(128), nullable=False, index=True)
     ip_address = Column(String(64), nullable=True)
     os = Column(String(128), nullable=True)
-    last_seen = Column(DateTime, default=datetime.utcnow)
+    last_seen = Column(DateTime, default=datetime.utcnow, index=True)
     active = Column(Boolean, default=True)
 
     def to_dict(self):
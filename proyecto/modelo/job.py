@@ -0,0 +1,56 @@
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, Index
+# Reuse the Base declarative from seguridad.py
+try:
+    from proyecto.modelo.seguridad import Base
+except Exception:
+    from modelo.seguridad import Base
+
+
+class ScanJob(Base):
+    """Background file scan of one endpoint (see proyecto.app.jobs)"""
+    __tablename__ = "scan_jobs"
+    __table_args__ = (
+        # Job listings filtered by status, newest first
+        Index("ix_scan_jobs_status_created", "status", "created_at"),
+        Index("ix_scan_jobs_endpoint_created", "endpoint_id", "created_at"),
+    )
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    endpoint_id = Column(String(36), nullable=False)
+    status = Column(String(20), nullable=False, default="QUEUED")  # QUEUED, RUNNING, COMPLETED, FAILED, CANCELLED
+    paths = Column(JSON, nullable=False, default=list)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    files_total = Column(Integer, default=0)
+    files_scanned = Column(Integer, default=0)
+    bytes_scanned = Column(Integer, default=0)
+    chunks_total = Column(Integer, default=0)
+    chunks_done = Column(Integer, default=0)
+    suspicious_files = Column(Integer, default=0)
+    known_malicious = Column(Integer, default=0)
+    findings = Column(JSON)  # first suspicious/known-malicious files, capped
+    error = Column(Text)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "endpoint_id": self.endpoint_id,
+            "status": self.status,
+            "paths": self.paths or [],
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "files_total": self.files_total or 0,
+            "files_scanned": self.files_scanned or 0,
+            "bytes_scanned": self.bytes_scanned or 0,
+            "chunks_total": self.chunks_total or 0,
+            "chunks_done": self.chunks_done or 0,
+            "suspicious_files": self.suspicious_files or 0,
+            "known_malicious": self.known_malicious or 0,
+            "findings": self.findings or [],
+            "error": self.error,
+            "cancel_requested": self.status == "CANCELLED",
+        }
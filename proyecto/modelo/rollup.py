@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer, String, DateTime
+# Reuse the Base declarative from seguridad.py
+try:
+    from proyecto.modelo.seguridad import Base
+except Exception:
+    from modelo.seguridad import Base
+
+
+class ThreatRollup(Base):
+    """Threat counts per time bucket, type and severity (granularity m=minute, h=hour, d=day)"""
+    __tablename__ = "threat_rollups"
+
+    granularity = Column(String(1), primary_key=True)
+    bucket_start = Column(DateTime, primary_key=True)
+    type = Column(String(50), primary_key=True, default="")
+    severity = Column(String(20), primary_key=True, default="")
+    count = Column(Integer, nullable=False, default=0)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, Text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import uuid
@@ -23,6 +23,12 @@ class Endpoint(Base):
 
 class Threat(Base):
     __tablename__ = "threats"
+    __table_args__ = (
+        # Per-endpoint aggregates over recent time windows
+        Index("ix_threats_endpoint_time", "endpoint_id", "detection_time"),
+        # Time-range scans (rollup backfill, dashboards) filtered by severity
+        Index("ix_threats_time_severity", "detection_time", "severity"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(200), nullable=False)
@@ -36,6 +42,9 @@ class Threat(Base):
 
 class RansomwareIncident(Base):
     __tablename__ = "ransomware_incidents"
+    __table_args__ = (
+        Index("ix_ransomware_incidents_endpoint_time", "endpoint_id", "detection_time"),
+    )
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     endpoint_id = Column(String(36))
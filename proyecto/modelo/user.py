@@ -0,0 +1,46 @@
+from datetime import datetime
+import uuid
+from sqlalchemy import Column, String, Boolean, DateTime, Integer
+# Reuse the Base declarative from seguridad.py
+try:
+    from proyecto.modelo.seguridad import Base
+except Exception:
+    from modelo.seguridad import Base
+
+# admin: everything, including feature toggles, policies and user management;
+# operator: mutating API calls (devices, scans, ingestion) used by analysts and agents
+ROLES = ("admin", "operator")
+
+
+class User(Base):
+    """API user; passwords are only checked at login (see proyecto.app.auth)"""
+    __tablename__ = "users"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    username = Column(String(150), nullable=False, unique=True, index=True)
+    password_hash = Column(String(60), nullable=False)  # bcrypt, salt and cost included
+    role = Column(String(20), nullable=False, default="operator")
+    is_active = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_login = Column(DateTime)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "username": self.username,
+            "role": self.role,
+            "is_active": bool(self.is_active),
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "last_login": self.last_login.isoformat() if self.last_login else None,
+        }
+
+
+class TokenRevocation(Base):
+    """A revoked token (``jti``) or a per-user cutoff, read back by every worker (see proyecto.app.auth)"""
+    __tablename__ = "token_revocations"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    jti = Column(String(64))  # single token (logout)
+    user_id = Column(String(36))  # every token of the user issued up to ``cutoff``
+    cutoff = Column(Integer, nullable=False)  # exp of the token, or the iat cutoff (epoch seconds)
+    expires_at = Column(Integer, nullable=False, index=True)  # no token it rejects is still valid after this
@@ -0,0 +1,572 @@
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+import zlib
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos (un solo proceso por almacén)
+    fcntl = None
+
+import numpy as np
+
+# Parámetros de chunking por contenido (tamaño promedio ~64 KiB)
+MIN_CHUNK = 16 * 1024
+AVG_CHUNK = 64 * 1024
+MAX_CHUNK = 256 * 1024
+READ_SEGMENT = 4 * 1024 * 1024
+PACK_SIZE_LIMIT = 64 * 1024 * 1024
+# Un pack con menos de esta fracción de bytes vivos se reescribe durante el GC
+GC_REPACK_THRESHOLD = 0.5
+# Cada cuántos snapshots de un endpoint se escribe un manifiesto completo (checkpoint); los
+# demás solo guardan los archivos que cambiaron respecto del anterior
+CHECKPOINT_EVERY = 64
+# Tablas de archivos vigentes (último snapshot) que se mantienen en memoria, por endpoint
+MAX_CACHED_HEADS = 256
+
+_SNAPSHOT_ID = re.compile(r"[\w-]+")
+
+_MASK_BITS = AVG_CHUNK.bit_length() - 1
+_GEAR = np.random.default_rng(0x5EED).integers(0, 2**32, size=256, dtype=np.uint32)
+
+
+def _gear_hashes(data: bytes) -> np.ndarray:
+    """Bits bajos del gear hash (h = (h << 1) + G[b]) en cada posición del buffer.
+
+    Los ``_MASK_BITS`` bits bajos de h solo dependen de los últimos ``_MASK_BITS`` bytes,
+    así que se calculan con ese número de pasos vectoriales en lugar de un bucle por byte.
+    """
+    g = _GEAR[np.frombuffer(data, dtype=np.uint8)]
+    h = g.copy()
+    for j in range(1, _MASK_BITS):
+        h[j:] += g[:-j] << np.uint32(j)
+    return h
+
+
+def chunk_boundaries(data: bytes, final: bool = True) -> List[int]:
+    """Posiciones de corte (exclusivas) definidas por el contenido.
+
+    Con ``final=False`` no se corta el resto del buffer: el llamador lo concatena con el
+    siguiente segmento leído.
+    """
+    n = len(data)
+    if n == 0:
+        return []
+    mask = np.uint32(AVG_CHUNK - 1)
+    candidates = np.flatnonzero((_gear_hashes(data) & mask) == 0) + 1
+    cuts = []
+    pos = 0
+    while n - pos > MAX_CHUNK or (final and pos < n):
+        if n - pos <= MIN_CHUNK:
+            cuts.append(n)
+            break
+        i = np.searchsorted(candidates, pos + MIN_CHUNK)
+        cut = int(candidates[i]) if i < len(candidates) else n
+        cut = min(cut, pos + MAX_CHUNK)
+        if cut == n and not final:
+            break
+        cuts.append(cut)
+        pos = cut
+    return cuts
+
+
+def iter_file_chunks(path: str) -> Iterator[bytes]:
+    """Recorre un archivo en chunks definidos por contenido sin cargarlo completo"""
+    pending = b""
+    with open(path, "rb") as f:
+        while True:
+            segment = f.read(READ_SEGMENT)
+            final = not segment
+            data = pending + segment
+            start = 0
+            for cut in chunk_boundaries(data, final=final):
+                yield data[start:cut]
+                start = cut
+            pending = data[start:]
+            if final:
+                return
+
+
+class ChunkStore:
+    """Almacén local de backups direccionado por contenido y deduplicado.
+
+    - Los archivos se dividen en chunks definidos por contenido (gear hash), por lo que un
+      cambio local solo altera los chunks vecinos.
+    - Cada chunk se identifica por su SHA-256, se comprime con zlib y se agrega a un pack
+      ``packs/pack-NNNNNN.pack`` (solo append). ``index.log`` (también solo append) mapea
+      hash -> (pack, offset, largo).
+    - Un snapshot por ``endpoint_id`` es un manifiesto JSON de solo lectura con los archivos
+      que cambiaron respecto del snapshot anterior (``parent``) y los que se quitaron; cada
+      ``CHECKPOINT_EVERY`` snapshots se escribe uno completo. ``LATEST`` apunta al último y
+      su tabla de archivos se mantiene en memoria, así un snapshot cuesta lo proporcional a
+      los archivos indicados y a los bytes que cambiaron, no al historial. Los archivos sin
+      cambios (mismo tamaño y mtime) no se vuelven a leer.
+    - La restauración verifica el SHA-256 de cada chunk, detectando manipulación.
+    - ``gc`` elimina snapshots antiguos y reescribe solo los packs con pocos bytes vivos.
+
+    Varios procesos pueden compartir la raíz: las escrituras se serializan con ``flock``
+    sobre ``root/lock`` y al tomarlo cada proceso lee lo que los demás agregaron al índice.
+    Las restauraciones toman el mismo lock compartido, así ``gc`` no reescribe packs mientras
+    se leen.
+    """
+
+    def __init__(self, root: str, pack_size_limit: int = PACK_SIZE_LIMIT, compress_level: int = 3):
+        self.root = Path(root)
+        self.packs_dir = self.root / "packs"
+        self.snapshots_dir = self.root / "snapshots"
+        self.packs_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.log"
+        self.pack_size_limit = pack_size_limit
+        self.compress_level = compress_level
+        self._lock = threading.Lock()
+        # sha256 (bytes) -> (pack_id, offset, length, compressed)
+        self._index: Dict[bytes, Tuple[int, int, int, bool]] = {}
+        # hasta dónde se leyó index.log (y de qué inodo: gc lo reemplaza)
+        self._index_pos = 0
+        self._index_ino: Optional[int] = None
+        # endpoint -> (id del último snapshot, tabla de archivos, deltas desde el checkpoint)
+        self._heads: "OrderedDict[str, Tuple[str, Dict[str, Dict[str, Any]], int]]" = OrderedDict()
+        self._load_index()
+        self._pack_id = self._last_pack_id()
+
+    # -- índice y packs ------------------------------------------------------
+
+    def _load_index(self):
+        """Lee las entradas agregadas a index.log desde la última lectura (todas si se reescribió)"""
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._index_ino or st.st_size < self._index_pos:
+            self._index = {}
+            self._index_pos = 0
+            self._index_ino = st.st_ino
+        if st.st_size == self._index_pos:
+            return
+        with self.index_path.open("rb") as f:
+            f.seek(self._index_pos)
+            data = f.read(st.st_size - self._index_pos)
+        end = data.rfind(b"\n") + 1  # una línea sin \n final aún se está escribiendo (o quedó truncada)
+        for line in data[:end].decode("ascii").splitlines():
+            parts = line.split()
+            if len(parts) != 5:
+                continue  # línea truncada por una caída: el chunk se volverá a escribir
+            digest, pack_id, offset, length, flag = parts
+            self._index[bytes.fromhex(digest)] = (int(pack_id), int(offset), int(length), flag == "z")
+        self._index_pos += end
+
+    def _last_pack_id(self) -> int:
+        packs = [int(p.stem.split("-")[1]) for p in self.packs_dir.glob("pack-*.pack")]
+        return max(packs) if packs else 1
+
+    @contextmanager
+    def _exclusive(self):
+        """Bloqueo de escritura entre hilos y procesos; al entrar se incorpora lo escrito por otros"""
+        with self._lock:
+            lock_file = open(self.root / "lock", "a") if fcntl is not None else None
+            try:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._load_index()
+                self._pack_id = max(self._pack_id, self._last_pack_id())
+                yield
+            finally:
+                if lock_file is not None:
+                    lock_file.close()  # libera el flock
+
+    @contextmanager
+    def _shared(self):
+        """Bloqueo de lectura entre procesos (excluye a ``gc`` y a las escrituras, no a otras lecturas)"""
+        lock_file = open(self.root / "lock", "a") if fcntl is not None else None
+        try:
+            # mismo orden que _exclusive (primero el lock del proceso) para no bloquearse mutuamente
+            with self._lock:
+                if lock_file is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_SH)
+                self._load_index()  # chunks escritos por otros procesos
+                if lock_file is None:
+                    yield
+                    return
+            yield
+        finally:
+            if lock_file is not None:
+                lock_file.close()
+
+    def _pack_path(self, pack_id: int) -> Path:
+        return self.packs_dir / f"pack-{pack_id:06d}.pack"
+
+    def _write_chunks(self, chunks: List[Tuple[bytes, bytes]]) -> int:
+        """Agrega chunks nuevos (digest, datos) al pack actual; devuelve bytes escritos"""
+        written = 0
+        entries = []
+        pack = None
+        try:
+            for digest, data in chunks:
+                if digest in self._index:
+                    continue
+                packed = zlib.compress(data, self.compress_level)
+                compressed = len(packed) < len(data)
+                if not compressed:
+                    packed = data
+                if pack is None:
+                    pack = open(self._pack_path(self._pack_id), "ab")
+                if pack.tell() > 0 and pack.tell() + len(packed) > self.pack_size_limit:
+                    pack.flush()
+                    os.fsync(pack.fileno())
+                    pack.close()
+                    self._pack_id += 1
+                    pack = open(self._pack_path(self._pack_id), "ab")
+                offset = pack.tell()
+                pack.write(packed)
+                entry = (self._pack_id, offset, len(packed), compressed)
+                self._index[digest] = entry
+                entries.append((digest, entry))
+                written += len(packed)
+        finally:
+            if pack is not None:
+                pack.flush()
+                os.fsync(pack.fileno())
+                pack.close()
+        if entries:
+            # el índice se escribe después de que los datos están en disco
+            with self.index_path.open("a+b") as f:
+                size = f.seek(0, os.SEEK_END)
+                f.seek(size - 1 if size else 0)
+                if size and f.read(1) != b"\n":
+                    f.write(b"\n")  # cierra una línea truncada para no pegarle la siguiente entrada
+                f.write("".join(
+                    f"{d.hex()} {p} {o} {n} {'z' if z else 'r'}\n" for d, (p, o, n, z) in entries
+                ).encode("ascii"))
+                f.flush()
+                os.fsync(f.fileno())
+                self._index_pos = f.tell()
+                self._index_ino = os.fstat(f.fileno()).st_ino
+        return written
+
+    def read_chunk(self, digest: bytes) -> bytes:
+        return self._read_entry(digest, self._index[digest])
+
+    def _read_entry(self, digest: bytes, entry: Tuple[int, int, int, bool]) -> bytes:
+        pack_id, offset, length, compressed = entry
+        with open(self._pack_path(pack_id), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        if compressed:
+            data = zlib.decompress(data)
+        if hashlib.sha256(data).digest() != digest:
+            raise ValueError(f"chunk {digest.hex()} is corrupted or was tampered with")
+        return data
+
+    # -- snapshots -----------------------------------------------------------
+
+    def _endpoint_dir(self, endpoint_id: str) -> Path:
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in endpoint_id)
+        return self.snapshots_dir / safe
+
+    @staticmethod
+    def _read_manifest(d: Path, snapshot_id: str) -> Dict[str, Any]:
+        with (d / f"{snapshot_id}.json").open("r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _latest_id(d: Path) -> Optional[str]:
+        try:
+            return (d / "LATEST").read_text(encoding="ascii").strip() or None
+        except FileNotFoundError:
+            # almacenes anteriores al puntero: el manifiesto más reciente por nombre
+            manifests = sorted(d.glob("*.json")) if d.exists() else []
+            return manifests[-1].stem if manifests else None
+
+    def _materialize(self, d: Path, snapshot_id: str) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Tabla completa de archivos de un snapshot (último checkpoint + deltas) y cuántos deltas hubo"""
+        deltas = []
+        manifest = self._read_manifest(d, snapshot_id)
+        while not manifest.get("full", True):  # los manifiestos sin "full" son de antes de los deltas
+            deltas.append(manifest)
+            manifest = self._read_manifest(d, manifest["parent"])
+        files = dict(manifest["files"])
+        for delta in reversed(deltas):
+            for path in delta.get("removed", ()):
+                files.pop(path, None)
+            files.update(delta["files"])
+        return files, len(deltas)
+
+    def _head(self, endpoint_id: str) -> Optional[Tuple[str, Dict[str, Dict[str, Any]], int]]:
+        """Último snapshot del endpoint con su tabla de archivos (se relee si otro proceso escribió)"""
+        d = self._endpoint_dir(endpoint_id)
+        latest = self._latest_id(d)
+        if latest is None:
+            self._heads.pop(endpoint_id, None)
+            return None
+        head = self._heads.get(endpoint_id)
+        if head is None or head[0] != latest:
+            files, depth = self._materialize(d, latest)
+            head = (latest, files, depth)
+        self._heads[endpoint_id] = head
+        self._heads.move_to_end(endpoint_id)
+        while len(self._heads) > MAX_CACHED_HEADS:
+            self._heads.popitem(last=False)
+        return head
+
+    def list_snapshots(self, endpoint_id: str) -> List[Dict[str, Any]]:
+        """Manifiestos de un endpoint tal como se guardaron (los deltas solo traen lo que cambió),
+        del más antiguo al más reciente"""
+        d = self._endpoint_dir(endpoint_id)
+        if not d.exists():
+            return []
+        manifests = []
+        for p in sorted(d.glob("*.json")):
+            with p.open("r", encoding="utf-8") as f:
+                manifests.append(json.load(f))
+        return manifests
+
+    def latest_snapshot(self, endpoint_id: str) -> Optional[Dict[str, Any]]:
+        """Último snapshot con la tabla completa de archivos en ``files``"""
+        with self._lock:
+            head = self._head(endpoint_id)
+            if head is None:
+                return None
+            manifest = self._read_manifest(self._endpoint_dir(endpoint_id), head[0])
+            return dict(manifest, files=dict(head[1]), removed=[])
+
+    def snapshot(self, endpoint_id: str, paths: Iterable[str], prune_missing: bool = False) -> Dict[str, Any]:
+        """Crea un snapshot incremental con los archivos indicados.
+
+        Los archivos del snapshot anterior que no se incluyen se heredan tal cual (aunque
+        hayan sido borrados, salvo con ``prune_missing``); los incluidos se vuelven a leer
+        solo si cambió su tamaño o mtime. El manifiesto devuelto (y guardado) trae en
+        ``files`` solo los archivos nuevos o modificados, salvo en los checkpoints (``full``).
+        """
+        with self._exclusive():
+            head = self._head(endpoint_id)
+            parent_id, files, depth = head if head is not None else (None, {}, 0)
+            stats = {"files": 0, "unchanged": 0, "missing": 0, "bytes_read": 0, "new_chunks": 0, "bytes_stored": 0}
+            # con prune_missing se revisa toda la tabla: costo proporcional a los archivos respaldados
+            removed = [p for p in files if not os.path.exists(p)] if prune_missing else []
+            changed: Dict[str, Dict[str, Any]] = {}
+            for path in dict.fromkeys(paths):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    stats["missing"] += 1
+                    continue
+                previous = files.get(path)
+                if previous and previous["size"] == st.st_size and previous["mtime_ns"] == st.st_mtime_ns:
+                    stats["unchanged"] += 1
+                    continue
+                digests = []
+                new = []
+                for data in iter_file_chunks(path):
+                    digest = hashlib.sha256(data).digest()
+                    digests.append(digest.hex())
+                    if digest not in self._index:
+                        new.append((digest, data))
+                    stats["bytes_read"] += len(data)
+                    if len(new) >= 64:
+                        stats["new_chunks"] += len(new)
+                        stats["bytes_stored"] += self._write_chunks(new)
+                        new = []
+                stats["new_chunks"] += len(new)
+                stats["bytes_stored"] += self._write_chunks(new)
+                changed[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "chunks": digests}
+                stats["files"] += 1
+
+            full = parent_id is None or depth + 1 >= CHECKPOINT_EVERY
+            if full:
+                table = {p: e for p, e in files.items() if p not in set(removed)}
+                table.update(changed)
+            now = datetime.utcnow()
+            manifest = {
+                "id": f"{now.strftime('%Y%m%dT%H%M%S%f')}-{uuid.uuid4().hex[:8]}",
+                "endpoint_id": endpoint_id,
+                "created": now.isoformat(),
+                "parent": parent_id,
+                "full": full,
+                "files": table if full else changed,
+                "removed": [] if full else removed,
+                "stats": stats,
+            }
+            self._write_manifest(manifest)
+            self._set_latest(endpoint_id, manifest["id"])
+            # la tabla en memoria se actualiza en su lugar: costo proporcional a los cambios
+            for path in removed:
+                files.pop(path, None)
+            files.update(changed)
+            self._heads[endpoint_id] = (manifest["id"], files, 0 if full else depth + 1)
+            return manifest
+
+    def _write_manifest(self, manifest: Dict[str, Any], replace: bool = False):
+        d = self._endpoint_dir(manifest["endpoint_id"])
+        d.mkdir(parents=True, exist_ok=True)
+        path = d / f"{manifest['id']}.json"
+        # O_EXCL + solo lectura: un manifiesto nunca se sobreescribe (gc solo lo reemplaza
+        # por su versión completa, con el mismo contenido efectivo)
+        target = d / f".{manifest['id']}.json.tmp" if replace else path
+        fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o444)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+            f.flush()
+            os.fsync(f.fileno())
+        if replace:
+            os.replace(target, path)
+
+    def _set_latest(self, endpoint_id: str, snapshot_id: str):
+        d = self._endpoint_dir(endpoint_id)
+        tmp = d / "LATEST.tmp"
+        with tmp.open("w", encoding="ascii") as f:
+            f.write(snapshot_id)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, d / "LATEST")
+
+    def restore(
+        self,
+        endpoint_id: str,
+        dest_dir: str,
+        snapshot_id: Optional[str] = None,
+        paths: Optional[Iterable[str]] = None,
+    ) -> Dict[str, Any]:
+        """Restaura archivos de un snapshot (el último por defecto) bajo ``dest_dir``.
+
+        Levanta ValueError, antes de escribir nada, si alguna ruta del manifiesto resuelve
+        fuera de ``dest_dir`` (segmentos ``..`` o symlinks).
+        """
+        with self._shared():
+            return self._restore(endpoint_id, dest_dir, snapshot_id, paths)
+
+    def _restore(self, endpoint_id: str, dest_dir: str, snapshot_id: Optional[str],
+                 paths: Optional[Iterable[str]]) -> Dict[str, Any]:
+        d = self._endpoint_dir(endpoint_id)
+        if snapshot_id is None:
+            snapshot_id = self._latest_id(d)
+        elif not _SNAPSHOT_ID.fullmatch(snapshot_id) or not (d / f"{snapshot_id}.json").exists():
+            snapshot_id = None
+        if snapshot_id is None:
+            raise KeyError(f"no snapshot for endpoint {endpoint_id!r}")
+        files, _ = self._materialize(d, snapshot_id)
+        wanted = set(paths) if paths is not None else None
+        dest = Path(dest_dir).resolve()
+        targets = []
+        for path, entry in files.items():
+            if wanted is not None and path not in wanted:
+                continue
+            target = (dest / path.lstrip("/\\").replace(":", "")).resolve()
+            if target == dest or not target.is_relative_to(dest):
+                raise ValueError(f"snapshot path {path!r} resolves outside {dest_dir}")
+            targets.append((target, entry))
+        restored = 0
+        restored_bytes = 0
+        for target, entry in targets:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, "wb") as f:
+                for digest in entry["chunks"]:
+                    data = self.read_chunk(bytes.fromhex(digest))
+                    f.write(data)
+                    restored_bytes += len(data)
+            restored += 1
+        return {"snapshot_id": snapshot_id, "files_restored": restored, "bytes_restored": restored_bytes}
+
+    # -- recolección de basura ----------------------------------------------
+
+    def gc(self, keep_last: int = 10, repack_threshold: float = GC_REPACK_THRESHOLD) -> Dict[str, Any]:
+        """Elimina snapshots antiguos y libera espacio de chunks sin referencias.
+
+        El snapshot más antiguo que se conserva se reescribe completo (sus padres se borran).
+        Solo se reescriben los packs cuya fracción de bytes vivos cae bajo
+        ``repack_threshold``, así el trabajo es proporcional a lo que cambió.
+        """
+        with self._exclusive():
+            removed_snapshots = 0
+            live = set()
+            for endpoint_dir in self.snapshots_dir.iterdir():
+                if not endpoint_dir.is_dir():
+                    continue
+                manifests = sorted(endpoint_dir.glob("*.json"))
+                keep = manifests[-keep_last:] if keep_last > 0 else []
+                drop = manifests[:-keep_last] if keep_last > 0 else manifests
+                if drop and keep:
+                    oldest = self._read_manifest(endpoint_dir, keep[0].stem)
+                    if not oldest.get("full", True):
+                        files, _ = self._materialize(endpoint_dir, oldest["id"])
+                        self._write_manifest(dict(oldest, full=True, files=files, removed=[]), replace=True)
+                for p in drop:
+                    os.chmod(p, 0o644)
+                    p.unlink()
+                    removed_snapshots += 1
+                if not keep:
+                    (endpoint_dir / "LATEST").unlink(missing_ok=True)
+                for p in keep:
+                    with p.open("r", encoding="utf-8") as f:
+                        for entry in json.load(f)["files"].values():
+                            live.update(bytes.fromhex(d) for d in entry["chunks"])
+            self._heads.clear()
+
+            pack_total = {int(p.stem.split("-")[1]): p.stat().st_size for p in self.packs_dir.glob("pack-*.pack")}
+            pack_live: Dict[int, int] = {}
+            for digest, (pack_id, _, length, _) in self._index.items():
+                if digest in live:
+                    pack_live[pack_id] = pack_live.get(pack_id, 0) + length
+
+            rewrite = {
+                pack_id for pack_id, total in pack_total.items()
+                if pack_live.get(pack_id, 0) < total * repack_threshold
+            }
+            old_index = self._index
+            self._index = {d: e for d, e in old_index.items() if d in live and e[0] not in rewrite}
+            # los chunks vivos de packs reescritos van a packs nuevos, un pack a la vez
+            self._pack_id = max(list(pack_total) + [self._pack_id]) + 1
+            chunks_moved = bytes_rewritten = freed = 0
+            for pack_id in sorted(rewrite):
+                entries = sorted((e[1], d) for d, e in old_index.items() if e[0] == pack_id and d in live)
+                moved = [(digest, self._read_entry(digest, old_index[digest])) for _, digest in entries]
+                chunks_moved += len(moved)
+                bytes_rewritten += self._write_chunks(moved)
+                freed += pack_total[pack_id]
+            # el índice nuevo queda en disco antes de borrar los packs viejos: si el proceso cae
+            # entre ambos pasos solo sobran packs, nunca hay entradas que apunten a uno borrado
+            self._rewrite_index()
+            for pack_id in rewrite:
+                self._pack_path(pack_id).unlink()
+            return {
+                "snapshots_removed": removed_snapshots,
+                "packs_rewritten": len(rewrite),
+                "chunks_moved": chunks_moved,
+                "bytes_rewritten": bytes_rewritten,
+                "bytes_freed": freed,
+            }
+
+    def _rewrite_index(self):
+        tmp = self.index_path.with_suffix(".tmp")
+        with tmp.open("w", encoding="ascii") as f:
+            f.writelines(
+                f"{d.hex()} {p} {o} {n} {'z' if z else 'r'}\n" for d, (p, o, n, z) in self._index.items()
+            )
+            f.flush()
+            os.fsync(f.fileno())
+            self._index_pos = f.tell()
+        os.replace(tmp, self.index_path)
+        self._index_ino = os.stat(self.index_path).st_ino
+        if os.name == "posix":
+            # el rename también debe llegar a disco antes de que gc borre los packs reemplazados
+            fd = os.open(self.root, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def stats(self) -> Dict[str, Any]:
+        packs = list(self.packs_dir.glob("pack-*.pack"))
+        return {
+            "chunks": len(self._index),
+            "packs": len(packs),
+            "bytes_on_disk": sum(p.stat().st_size for p in packs),
+        }
@@ -0,0 +1,201 @@
+from typing import Dict, Any, Optional, Callable, Tuple
+from datetime import datetime
+from array import array
+import math
+import threading
+import time
+
+from proyecto.modelo.seguridad import RansomwareIncident
+
+# Vida media (segundos) de los contadores con decaimiento exponencial
+HALF_LIFE = 10.0
+# Tasas (eventos/s) a partir de las cuales cada componente del puntaje se satura
+WRITE_RATE_LIMIT = 50.0
+RENAME_RATE_LIMIT = 10.0
+# Escrituras con entropía (bits/byte) sobre este valor parecen contenido cifrado
+HIGH_ENTROPY = 7.2
+SCORE_THRESHOLD = 0.6
+RING_SIZE = 32
+# Procesos sin eventos durante este tiempo se descartan
+IDLE_TTL = 300.0
+SWEEP_EVERY = 10_000
+# Marcas de tiempo de los agentes más adelantadas que esto respecto al servidor se recortan
+MAX_CLOCK_SKEW = 5.0
+
+
+def _number(value) -> Optional[float]:
+    """El valor si es un número finito (no bool), si no None"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    return value
+
+
+def _extension(name) -> str:
+    return name.rsplit('.', 1)[-1].lower() if isinstance(name, str) else ''
+
+
+class _ProcessState:
+    __slots__ = ("last_ts", "last_seen", "writes", "renames", "ext_changes", "entropy", "ring_pos",
+                 "ring_count", "name", "alerted")
+
+    def __init__(self, ts: float, seen: float, name: Optional[str]):
+        # last_ts: reloj del agente (decaimiento); last_seen: reloj del servidor (descarte)
+        self.last_ts = ts
+        self.last_seen = seen
+        self.writes = 0.0
+        self.renames = 0.0
+        self.ext_changes = 0.0
+        self.entropy = array("f", bytes(4 * RING_SIZE))
+        self.ring_pos = 0
+        self.ring_count = 0
+        self.name = name
+        self.alerted = False
+
+
+class ProcessRateTracker:
+    """Detector de comportamiento por (endpoint_id, pid) con memoria O(procesos activos).
+
+    Cada proceso mantiene contadores con decaimiento exponencial de escrituras, renombres y
+    cambios de extensión, más un buffer circular de tamaño fijo con la entropía de las
+    últimas escrituras. El puntaje (0..1) combina tasa de escritura, tasa de renombres,
+    proporción de renombres que cambian la extensión y proporción de escrituras de alta
+    entropía. Al cruzar ``score_threshold`` se emite una alerta y, si hay ``session_factory``,
+    se guarda un ``RansomwareIncident``; el proceso vuelve a poder alertar cuando su puntaje
+    cae bajo el umbral. Es seguro usarlo desde varios hilos.
+
+    El decaimiento usa la marca de tiempo del evento (recortada a la hora del servidor si
+    viene adelantada), pero los procesos inactivos se descartan según el reloj del servidor,
+    así un evento con fecha futura no vacía el estado de los demás.
+    """
+
+    def __init__(
+        self,
+        half_life: float = HALF_LIFE,
+        score_threshold: float = SCORE_THRESHOLD,
+        idle_ttl: float = IDLE_TTL,
+        session_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.half_life = half_life
+        self.score_threshold = score_threshold
+        self.idle_ttl = idle_ttl
+        self.session_factory = session_factory
+        # un contador decaído converge a tasa * tau, con tau = half_life / ln 2
+        self._tau = half_life / math.log(2)
+        self._processes: Dict[Tuple[str, Any], _ProcessState] = {}
+        self._lock = threading.Lock()
+        self._events = 0
+        self.alerts_emitted = 0
+
+    def __len__(self) -> int:
+        return len(self._processes)
+
+    def observe(self, endpoint_id: str, event: Dict, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Procesa un evento de archivo; devuelve una alerta si el proceso cruzó el umbral.
+
+        ``now`` es la hora del servidor (por defecto ``time.time()``).
+        """
+        pid = event.get('pid')
+        if pid is None:
+            return None
+        clock = now if now is not None else time.time()
+        ts = _number(event.get('timestamp'))
+        if ts is None or ts > clock + MAX_CLOCK_SKEW:
+            ts = clock
+        key = (endpoint_id, pid)
+        with self._lock:
+            state = self._processes.get(key)
+            if state is None:
+                state = self._processes[key] = _ProcessState(ts, clock, event.get('process_name'))
+            state.last_seen = max(state.last_seen, clock)
+            if ts > state.last_ts:
+                decay = 0.5 ** ((ts - state.last_ts) / self.half_life)
+                state.writes *= decay
+                state.renames *= decay
+                state.ext_changes *= decay
+                state.last_ts = ts
+
+            op = event.get('operation_type')
+            if op == 'WRITE':
+                state.writes += _number(event.get('file_count')) or 1
+                entropy = _number(event.get('entropy'))
+                if entropy is not None:
+                    state.entropy[state.ring_pos] = entropy
+                    state.ring_pos = (state.ring_pos + 1) % RING_SIZE
+                    state.ring_count = min(state.ring_count + 1, RING_SIZE)
+            elif op == 'RENAME':
+                state.renames += 1
+                if _extension(event.get('old_name')) != _extension(event.get('new_name')):
+                    state.ext_changes += 1
+
+            self._events += 1
+            if self._events % SWEEP_EVERY == 0:
+                self._evict_idle_locked(clock)
+
+            score = self.score(state)
+            if score < self.score_threshold:
+                # la ráfaga terminó: una nueva vuelve a alertar
+                state.alerted = False
+                return None
+            if state.alerted:
+                return None
+            state.alerted = True
+            self.alerts_emitted += 1
+            alert = {
+                "endpoint_id": endpoint_id,
+                "pid": pid,
+                "name": state.name,
+                "score": round(score, 3),
+                "write_rate": round(state.writes / self._tau, 2),
+                "rename_rate": round(state.renames / self._tau, 2),
+                "timestamp": datetime.utcnow(),
+            }
+            counts = (int(round(state.writes + state.renames)), int(round(state.ext_changes)))
+        if self.session_factory is not None:
+            # fuera del lock: la escritura en la base no bloquea a los demás hilos
+            alert["incident_id"] = self._record_incident(endpoint_id, *counts)
+        return alert
+
+    def score(self, state: _ProcessState) -> float:
+        write_rate = state.writes / self._tau
+        rename_rate = state.renames / self._tau
+        ext_ratio = state.ext_changes / state.renames if state.renames >= 1 else 0.0
+        if state.ring_count:
+            high = sum(1 for e in state.entropy[:state.ring_count] if e >= HIGH_ENTROPY)
+            entropy_ratio = high / state.ring_count
+        else:
+            entropy_ratio = 0.0
+        return 0.25 * (
+            min(1.0, write_rate / WRITE_RATE_LIMIT)
+            + min(1.0, rename_rate / RENAME_RATE_LIMIT)
+            + min(1.0, ext_ratio)
+            + entropy_ratio
+        )
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Descarta procesos sin actividad reciente; devuelve cuántos se eliminaron"""
+        with self._lock:
+            return self._evict_idle_locked(now)
+
+    def _evict_idle_locked(self, now: Optional[float]) -> int:
+        cutoff = (now if now is not None else time.time()) - self.idle_ttl
+        idle = [k for k, s in self._processes.items() if s.last_seen < cutoff]
+        for k in idle:
+            del self._processes[k]
+        return len(idle)
+
+    def _record_incident(self, endpoint_id: str, files_targeted: int, encryption_attempts: int) -> str:
+        db = self.session_factory()
+        try:
+            incident = RansomwareIncident(
+                endpoint_id=endpoint_id,
+                files_targeted=files_targeted,
+                files_protected=0,
+                encryption_attempts=encryption_attempts,
+                backup_created=False,
+                status="BLOCKED",
+            )
+            db.add(incident)
+            db.commit()
+            return incident.id
+        finally:
+            db.close()
@@ -1,79 +1,240 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Tuple
+from sqlalchemy import func, case, select
 from sqlalchemy.orm import Session
-from datetime import datetime
-import random
+from datetime import datetime, timedelta
+import time
+
+from proyecto import config
+from proyecto.app.cache import TTLCache
+from proyecto.app import db_events
+from proyecto.app.metrics import metrics, observe_detector
+from proyecto.modelo.seguridad import Endpoint, Threat, RansomwareIncident
+
+# Ventanas de agregación (las consultas solo leen filas de la ventana más larga)
+WINDOWS = {"24h": timedelta(hours=24), "7d": timedelta(days=7), "30d": timedelta(days=30)}
+# Estados de amenaza que ya fueron contenidas
+CONTAINED_STATUSES = ("BLOCKED", "QUARANTINED", "RESOLVED")
+# Un endpoint sin reportarse durante este tiempo se considera desconectado
+OFFLINE_AFTER = timedelta(hours=24)
+# Hasta cuántos ids se filtran con IN; con más se agrega toda la flota y se filtra en memoria
+MAX_IN_IDS = 500
+_FLEET_KEY = ("__fleet__",)
+
+# Cache compartido por todas las instancias del servicio en el proceso
+_status_cache = TTLCache(maxsize=config.ENDPOINT_STATUS_CACHE_SIZE, ttl=config.ENDPOINT_STATUS_CACHE_TTL)
+
+
+def _invalidator(key: str):
+    """Callback de db_events que descarta del cache los endpoints cuyas filas cambiaron (y la vista
+    de flota); si no se sabe qué filas fueron (UPDATE/DELETE masivos) se vacía todo el cache"""
+    def invalidate(changes: List[Tuple[str, Dict[str, Any]]]):
+        if any(key not in values for _, values in changes):
+            _status_cache.clear()
+            return
+        _status_cache.invalidate([values[key] for _, values in changes] + [_FLEET_KEY])
+    return invalidate
+
+
+# Amenazas e incidentes nuevos, contenidos o resueltos (también cargas masivas con insert() de Core)
+db_events.on_change(Threat, _invalidator("endpoint_id"), core=True)
+db_events.on_change(RansomwareIncident, _invalidator("endpoint_id"), core=True)
+# Cambios de estado o datos del endpoint hechos con el ORM (las escrituras periódicas de
+# last_seen y risk_score van por Core y no se reportan: su efecto espera al TTL)
+db_events.on_change(Endpoint, _invalidator("id"))
+
+metrics.callback("endpoint_status_cache_hits_total", "Endpoint status cache hits",
+                 lambda: _status_cache.hits, kind="counter")
+metrics.callback("endpoint_status_cache_misses_total", "Endpoint status cache misses",
+                 lambda: _status_cache.misses, kind="counter")
+
 
 class EndpointProtectionService:
-    def __init__(self):
+    def __init__(self, cache: Optional[TTLCache] = None):
         self.protection_layers = [
             "signature_based",
             "behavioral_analysis",
             "machine_learning",
             "cloud_analysis"
         ]
-    
+        self.cache = cache if cache is not None else _status_cache
+
     def get_endpoint_security_status(self, db: Session, endpoint_id: str) -> Dict[str, Any]:
         """Obtiene el estado de seguridad completo de un endpoint"""
-        # Simular datos de protección en capas
-        protection_status = {
-            "antivirus": self._get_antivirus_status(),
-            "firewall": self._get_firewall_status(),
-            "behavior_monitoring": self._get_behavior_status(),
-            "ransomware_protection": self._get_ransomware_status(),
-            "web_protection": self._get_web_protection_status()
-        }
-        
-        return {
-            "endpoint_id": endpoint_id,
-            "overall_status": "PROTECTED",
-            "last_scan": datetime.utcnow(),
-            "threats_blocked": random.randint(0, 50),
-            "protection_status": protection_status,
-            "recommendations": self._get_security_recommendations()
-        }
-    
-    def _get_antivirus_status(self) -> Dict[str, Any]:
-        return {
-            "status": "ACTIVE",
-            "definitions_updated": True,
-            "last_update": datetime.utcnow(),
-            "threats_detected": random.randint(0, 10)
-        }
-    
-    def _get_firewall_status(self) -> Dict[str, Any]:
+        status = self.cache.get(endpoint_id)
+        if status is None:
+            status = self._compute_statuses(db, [endpoint_id])[endpoint_id]
+            self.cache.set(endpoint_id, status)
+        return status
+
+    def get_fleet_security_status(self, db: Session, endpoint_ids: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """Estado de muchos endpoints (toda la flota si ``endpoint_ids`` es None) en una pasada.
+
+        Se hace una consulta agregada (GROUP BY endpoint_id) por tabla en lugar de una por
+        endpoint; con ids explícitos solo se consultan los que no están en cache.
+        """
+        if endpoint_ids is None:
+            fleet = self.cache.get(_FLEET_KEY)
+            if fleet is None:
+                statuses = self._compute_statuses(db, None)
+                fleet = self._fleet_result(list(statuses.values()))
+                self.cache.set(_FLEET_KEY, fleet)
+                for endpoint_id, status in statuses.items():
+                    self.cache.set(endpoint_id, status)
+            return fleet
+
+        endpoint_ids = list(dict.fromkeys(endpoint_ids))
+        cached = {i: self.cache.get(i) for i in endpoint_ids}
+        missing = [i for i, status in cached.items() if status is None]
+        if missing:
+            computed = self._compute_statuses(db, missing)
+            for endpoint_id in missing:
+                cached[endpoint_id] = computed[endpoint_id]
+                self.cache.set(endpoint_id, computed[endpoint_id])
+        return self._fleet_result([cached[i] for i in endpoint_ids])
+
+    def _fleet_result(self, statuses: List[Dict[str, Any]]) -> Dict[str, Any]:
+        summary: Dict[str, int] = {}
+        for status in statuses:
+            summary[status["overall_status"]] = summary.get(status["overall_status"], 0) + 1
         return {
-            "status": "ACTIVE",
-            "rules_active": 45,
-            "blocked_connections": random.randint(100, 500)
+            "generated_at": datetime.utcnow(),
+            "total": len(statuses),
+            "summary": summary,
+            "endpoints": statuses,
         }
-    
-    def _get_behavior_status(self) -> Dict[str, Any]:
-        return {
-            "status": "MONITORING",
-            "suspicious_activities": random.randint(0, 5),
-            "processes_monitored": random.randint(50, 200)
+
+    def _compute_statuses(self, db: Session, endpoint_ids: Optional[List[str]]) -> Dict[str, Dict[str, Any]]:
+        t0 = time.perf_counter()
+        now = datetime.utcnow()
+        since = {name: now - delta for name, delta in WINDOWS.items()}
+        oldest = min(since.values())
+        filter_ids = endpoint_ids if endpoint_ids is not None and len(endpoint_ids) <= MAX_IN_IDS else None
+
+        def in_window(column, name):
+            return func.sum(case((column >= since[name], 1), else_=0))
+
+        threat_q = (
+            select(
+                Threat.endpoint_id,
+                *(in_window(Threat.detection_time, name).label(f"threats_{name}") for name in WINDOWS),
+                func.sum(case((Threat.status.in_(CONTAINED_STATUSES), 1), else_=0)).label("blocked"),
+                func.sum(case((Threat.status.in_(CONTAINED_STATUSES), 0), else_=1)).label("active"),
+                func.sum(case(((Threat.severity == "CRITICAL") & Threat.status.notin_(CONTAINED_STATUSES), 1), else_=0)).label("active_critical"),
+                func.sum(case(((Threat.severity.in_(("CRITICAL", "HIGH"))) & (Threat.detection_time >= since["24h"]), 1), else_=0)).label("high_24h"),
+                func.max(Threat.detection_time).label("last_threat"),
+            )
+            .where(Threat.detection_time >= oldest)
+            .group_by(Threat.endpoint_id)
+        )
+        incident_q = (
+            select(
+                RansomwareIncident.endpoint_id,
+                func.count().label("incidents"),
+                func.sum(case((RansomwareIncident.status == "BLOCKED", 1), else_=0)).label("blocked"),
+                in_window(RansomwareIncident.detection_time, "24h").label("incidents_24h"),
+                func.coalesce(func.sum(RansomwareIncident.files_targeted), 0).label("files_targeted"),
+                func.coalesce(func.sum(RansomwareIncident.files_protected), 0).label("files_protected"),
+                func.coalesce(func.sum(RansomwareIncident.encryption_attempts), 0).label("encryption_attempts"),
+                func.sum(case((RansomwareIncident.backup_created, 1), else_=0)).label("backups"),
+                func.max(RansomwareIncident.detection_time).label("last_incident"),
+            )
+            .where(RansomwareIncident.detection_time >= oldest)
+            .group_by(RansomwareIncident.endpoint_id)
+        )
+        endpoint_q = select(
+            Endpoint.id, Endpoint.name, Endpoint.hostname, Endpoint.status,
+            Endpoint.protection_status, Endpoint.last_seen, Endpoint.risk_score,
+        )
+        if filter_ids is not None:
+            threat_q = threat_q.where(Threat.endpoint_id.in_(filter_ids))
+            incident_q = incident_q.where(RansomwareIncident.endpoint_id.in_(filter_ids))
+            endpoint_q = endpoint_q.where(Endpoint.id.in_(filter_ids))
+
+        threats = {row.endpoint_id: row for row in db.execute(threat_q)}
+        incidents = {row.endpoint_id: row for row in db.execute(incident_q)}
+        endpoints = {row.id: row for row in db.execute(endpoint_q)}
+
+        if endpoint_ids is None:
+            endpoint_ids = list(dict.fromkeys([*endpoints, *threats, *incidents]))
+        statuses = {
+            endpoint_id: self._build_status(endpoint_id, endpoints.get(endpoint_id), threats.get(endpoint_id),
+                                            incidents.get(endpoint_id), now)
+            for endpoint_id in endpoint_ids
+            if endpoint_id is not None
         }
-    
-    def _get_ransomware_status(self) -> Dict[str, Any]:
-        return {
-            "status": "PROTECTED",
-            "backup_enabled": True,
-            "remediation_active": True,
-            "incidents_blocked": random.randint(0, 20)
+        # detecciones: endpoints comprometidos o en riesgo
+        flagged = sum(1 for st in statuses.values() if st["overall_status"] in ("COMPROMISED", "AT_RISK"))
+        observe_detector("endpoint_protection", "status_aggregation", time.perf_counter() - t0, len(statuses), flagged)
+        return statuses
+
+    def _build_status(self, endpoint_id: str, endpoint, threats, incidents, now: datetime) -> Dict[str, Any]:
+        threat_counts = {f"last_{name}": int(getattr(threats, f"threats_{name}") or 0) if threats else 0
+                         for name in WINDOWS}
+        active = int(threats.active or 0) if threats else 0
+        active_critical = int(threats.active_critical or 0) if threats else 0
+        high_24h = int(threats.high_24h or 0) if threats else 0
+        incidents_24h = int(incidents.incidents_24h or 0) if incidents else 0
+        unblocked_incidents = int(incidents.incidents - (incidents.blocked or 0)) if incidents else 0
+        last_seen = endpoint.last_seen if endpoint else None
+
+        if endpoint is None and threats is None and incidents is None:
+            overall = "UNKNOWN"
+        elif active_critical or unblocked_incidents:
+            overall = "COMPROMISED"
+        elif active or high_24h or incidents_24h:
+            overall = "AT_RISK"
+        elif last_seen is not None and now - last_seen > OFFLINE_AFTER:
+            overall = "OFFLINE"
+        else:
+            overall = "PROTECTED"
+
+        protection_status = {
+            "threats": {
+                **threat_counts,
+                "blocked": int(threats.blocked or 0) if threats else 0,
+                "active": active,
+                "active_critical": active_critical,
+                "high_severity_24h": high_24h,
+                "last_detection": threats.last_threat if threats else None,
+            },
+            "ransomware_protection": {
+                "incidents": int(incidents.incidents) if incidents else 0,
+                "incidents_blocked": int(incidents.blocked or 0) if incidents else 0,
+                "incidents_24h": incidents_24h,
+                "files_targeted": int(incidents.files_targeted) if incidents else 0,
+                "files_protected": int(incidents.files_protected) if incidents else 0,
+                "encryption_attempts": int(incidents.encryption_attempts) if incidents else 0,
+                "backups_created": int(incidents.backups or 0) if incidents else 0,
+                "last_incident": incidents.last_incident if incidents else None,
+            },
         }
-    
-    def _get_web_protection_status(self) -> Dict[str, Any]:
         return {
-            "status": "ACTIVE",
-            "malicious_sites_blocked": random.randint(50, 200),
-            "phishing_attempts_blocked": random.randint(10, 50)
+            "endpoint_id": endpoint_id,
+            "name": endpoint.name if endpoint else None,
+            "hostname": endpoint.hostname if endpoint else None,
+            "overall_status": overall,
+            "last_seen": last_seen,
+            "risk_score": endpoint.risk_score if endpoint else None,
+            "threats_blocked": protection_status["threats"]["blocked"],
+            "protection_status": protection_status,
+            "recommendations": self._get_security_recommendations(overall, protection_status),
+            "computed_at": now,
         }
-    
-    def _get_security_recommendations(self) -> List[str]:
-        recommendations = [
-            "Mantener el sistema operativo actualizado",
-            "Revisar políticas de firewall",
-            "Realizar escaneo completo semanal",
-            "Verificar configuraciones de backup"
-        ]
-        return random.sample(recommendations, 2)
\ No newline at end of file
+
+    def _get_security_recommendations(self, overall: str, protection_status: Dict[str, Any]) -> List[str]:
+        threats = protection_status["threats"]
+        ransomware = protection_status["ransomware_protection"]
+        recommendations = []
+        if threats["active_critical"]:
+            recommendations.append("Aislar el endpoint y remediar las amenazas críticas activas")
+        elif threats["active"]:
+            recommendations.append("Revisar y contener las amenazas activas")
+        if ransomware["incidents"] and ransomware["backups_created"] < ransomware["incidents"]:
+            recommendations.append("Verificar configuraciones de backup")
+        if threats["high_severity_24h"]:
+            recommendations.append("Realizar escaneo completo del endpoint")
+        if overall == "OFFLINE":
+            recommendations.append("Verificar conectividad del agente de protección")
+        if not recommendations:
+            recommendations.append("Mantener el sistema operativo actualizado")
+        return recommendations
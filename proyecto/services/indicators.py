@@ -0,0 +1,204 @@
+from typing import Dict, Iterable, List, Optional
+from pathlib import Path
+import os
+import threading
+import time
+
+# Valores por defecto (los que antes estaban fijos en ransomware_protection.py)
+DEFAULT_EXTENSION_KEYWORDS = ("crypt", "locked", "encrypted", "ransom")
+DEFAULT_BACKUP_EXTENSIONS = ("doc", "docx", "pdf", "xls", "xlsx", "ppt", "pptx")
+
+# Cada cuánto (segundos) se revisa el mtime del feed para recargarlo
+CHECK_INTERVAL = 5.0
+
+
+def file_extension(file_name: str) -> str:
+    """Última extensión en minúsculas, sin punto (el nombre completo si no tiene punto)"""
+    return file_name.rsplit('.', 1)[-1].lower()
+
+
+class AhoCorasick:
+    """Autómata Aho-Corasick: busca todos los patrones en una sola pasada por el texto.
+
+    El costo de ``search`` depende del largo del texto y no de la cantidad de patrones.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[bool] = [False]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._out.append(False)
+            state = nxt
+        self._out[state] = True
+
+    def _build_failure_links(self):
+        fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in self._goto[f]:
+                    f = fail[f]
+                fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] or self._out[fail[nxt]]
+        self._fail = fail
+
+    def search(self, text: str) -> bool:
+        """True si algún patrón aparece como substring de ``text``"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return len(self._goto)
+
+
+class IndicatorMatcher:
+    """Indicadores de ransomware compilados una vez y compartidos por todas las verificaciones.
+
+    - ``extensions``: extensiones exactas conocidas (p. ej. ``locky``), índice por set.
+    - ``extension_keywords``: substrings dentro de la extensión (p. ej. ``crypt``).
+    - ``note_patterns``: substrings en el nombre de archivo de notas de rescate.
+    - ``backup_extensions``: extensiones de archivos que se deben respaldar.
+    Todo se compara en minúsculas.
+    """
+
+    def __init__(
+        self,
+        extensions: Iterable[str] = (),
+        extension_keywords: Iterable[str] = DEFAULT_EXTENSION_KEYWORDS,
+        note_patterns: Iterable[str] = (),
+        backup_extensions: Iterable[str] = DEFAULT_BACKUP_EXTENSIONS,
+    ):
+        self.extensions = frozenset(e.lower().lstrip('.') for e in extensions)
+        self.extension_keywords = AhoCorasick(k.lower() for k in extension_keywords)
+        self.note_patterns = AhoCorasick(p.lower() for p in note_patterns)
+        self.backup_extensions = frozenset(e.lower().lstrip('.') for e in backup_extensions)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "IndicatorMatcher":
+        """Carga un feed de texto: una entrada ``tipo:valor`` por línea.
+
+        Tipos: ``ext`` (por defecto si no hay prefijo), ``keyword``, ``note`` y ``backup``.
+        Las líneas vacías o que empiezan con ``#`` se ignoran. Si el feed no trae entradas
+        ``keyword`` o ``backup`` se usan los valores por defecto.
+        """
+        entries: Dict[str, List[str]] = {"ext": [], "keyword": [], "note": [], "backup": []}
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                kind, sep, value = line.partition(':')
+                if not sep:
+                    kind, value = "ext", line
+                kind = kind.strip().lower()
+                if kind in entries and value.strip():
+                    entries[kind].append(value.strip())
+        return cls(
+            extensions=entries["ext"],
+            extension_keywords=entries["keyword"] or DEFAULT_EXTENSION_KEYWORDS,
+            note_patterns=entries["note"],
+            backup_extensions=entries["backup"] or DEFAULT_BACKUP_EXTENSIONS,
+        )
+
+    def is_ransomware_extension(self, file_name: str) -> bool:
+        ext = file_extension(file_name)
+        return ext in self.extensions or self.extension_keywords.search(ext)
+
+    def is_ransom_note(self, file_name: str) -> bool:
+        return self.note_patterns.search(file_name.lower())
+
+    def is_backup_candidate(self, file_name: str) -> bool:
+        return file_extension(file_name) in self.backup_extensions
+
+
+class IndicatorFeed:
+    """Matcher compartido que se recompila cuando cambia el archivo del feed (hot reload)"""
+
+    def __init__(self, path: Optional[Path] = None, check_interval: float = CHECK_INTERVAL):
+        self.path = path
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._stamp = None
+        self._next_check = 0.0
+        self._matcher = IndicatorMatcher()
+        self.reload()
+
+    def __getstate__(self):
+        # Se envía a los procesos del pool: el matcher actual y la ruta, para seguir recargando ahí
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        if self.path is None:
+            return None
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload(self) -> bool:
+        """Recompila si el feed cambió; devuelve True si se reemplazó el matcher"""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp == self._stamp:
+                return False
+            try:
+                matcher = IndicatorMatcher.from_file(self.path) if stamp is not None else IndicatorMatcher()
+            except (OSError, UnicodeDecodeError):
+                return False  # se mantiene el último matcher válido
+            self._matcher = matcher
+            self._stamp = stamp
+            return True
+
+    @property
+    def matcher(self) -> IndicatorMatcher:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self._matcher
+
+
+_default_feed: Optional[IndicatorFeed] = None
+
+
+def get_default_feed() -> IndicatorFeed:
+    """Feed compartido del proceso, configurado con PROYECTO_INDICATORS_FILE"""
+    global _default_feed
+    if _default_feed is None:
+        try:
+            from proyecto import config
+        except Exception:
+            import config
+        _default_feed = IndicatorFeed(config.INDICATORS_FILE)
+    return _default_feed
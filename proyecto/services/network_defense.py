@@ -1,8 +1,269 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Mapping, Optional, Hashable
 from datetime import datetime
+from array import array
+import math
+import time
+
+import numpy as np
+
+from proyecto.app.metrics import observe_detector
+from proyecto.services.policy_engine import PolicyEngine
+from proyecto.services.threat_intelligence import ThreatIntelService
+
+# Servicios en los que un número alto de intentos indica fuerza bruta
+BRUTE_FORCE_PROTOCOLS = ("SSH", "RDP")
+BRUTE_FORCE_MAX_ATTEMPTS = 5
+
+# Columnas aceptadas por el modo batch (ver packets_to_columns)
+PACKET_COLUMNS = ("syn", "ack", "protocol", "attempt_count", "src", "dst")
+
+_PORT_SCAN_THREAT = {
+    "is_threat": True,
+    "threat_type": "PORT_SCANNING",
+    "severity": "MEDIUM",
+    "action": "BLOCKED"
+}
+
+_MALICIOUS_IP_THREAT = {
+    "is_threat": True,
+    "threat_type": "MALICIOUS_IP",
+    "severity": "HIGH",
+    "action": "BLOCKED"
+}
+
+_BRUTE_FORCE_THREAT = {
+    "is_threat": True,
+    "threat_type": "BRUTE_FORCE",
+    "severity": "HIGH",
+    "action": "BLOCKED"
+}
+
+
+def packets_to_columns(packets: List[Dict]) -> Dict[str, np.ndarray]:
+    """Convierte una lista de paquetes (dicts) al formato columnar del modo batch"""
+    flags = [p.get('flags') or {} for p in packets]
+    return {
+        "syn": np.fromiter((bool(f.get('syn', False)) for f in flags), dtype=bool, count=len(packets)),
+        "ack": np.fromiter((bool(f.get('ack', False)) for f in flags), dtype=bool, count=len(packets)),
+        "protocol": np.array([p.get('protocol') for p in packets], dtype=object),
+        "attempt_count": np.fromiter((p.get('attempt_count', 0) or 0 for p in packets), dtype=np.int64, count=len(packets)),
+        "src": np.array([p.get('src') for p in packets], dtype=object),
+        "dst": np.array([p.get('dst') for p in packets], dtype=object),
+    }
+
+# Acciones de política que cortan la conexión; el resto (p. ej. ALERT) solo la reporta
+BLOCKING_ACTIONS = frozenset({"BLOCK", "BLOCKED", "DROP", "DENY", "QUARANTINE"})
+
+
+def _blocks(threat: Dict[str, Any]) -> bool:
+    return str(threat.get("action") or "").upper() in BLOCKING_ACTIONS
+
+
+def _policy_threat(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Amenaza a partir de la primera regla de política que cumple el paquete"""
+    return {
+        "is_threat": True,
+        "threat_type": match["threat_type"],
+        "severity": match["severity"],
+        "action": match["action"],
+        "policy_ids": list(match["policy_ids"]),
+    }
+
+
+class _CountMinSketch:
+    """Count-min sketch de tamaño fijo (depth x width contadores de 32 bits)"""
+
+    __slots__ = ("width", "depth", "table")
+
+    def __init__(self, width: int, depth: int):
+        self.width = width
+        self.depth = depth
+        self.table = array("I", bytes(4 * width * depth))
+
+    def cells(self, key: Hashable) -> List[int]:
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, ((h >> 32) & 0xFFFFFFFF) | 1
+        w = self.width
+        return [row * w + (h1 + row * h2) % w for row in range(self.depth)]
+
+    def add(self, cells: List[int], amount: int = 1):
+        table = self.table
+        for c in cells:
+            table[c] += amount
+
+    def clear(self):
+        self.table = array("I", bytes(4 * self.width * self.depth))
+
+
+class _BloomBits:
+    """Filtro de Bloom mínimo sobre un bytearray de tamaño fijo"""
+
+    __slots__ = ("nbits", "hashes", "bits")
+
+    def __init__(self, nbits: int, hashes: int):
+        self.nbits = nbits
+        self.hashes = hashes
+        self.bits = bytearray(nbits // 8)
+
+    def positions(self, key: Hashable) -> List[int]:
+        h = hash(key)
+        h1, h2 = h & 0xFFFFFFFF, ((h >> 32) & 0xFFFFFFFF) | 1
+        n = self.nbits
+        return [(h1 + i * h2) % n for i in range(self.hashes)]
+
+    def contains(self, positions: List[int]) -> bool:
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in positions)
+
+    def add(self, positions: List[int]):
+        bits = self.bits
+        for p in positions:
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def clear(self):
+        self.bits = bytearray(self.nbits // 8)
+
+
+class SlidingWindowDetector:
+    """Detector con estado de escaneo de puertos y fuerza bruta sobre ventanas de tiempo.
+
+    La ventana se divide en ``window_seconds / bucket_seconds`` buckets en anillo. Cada
+    bucket tiene un filtro de Bloom con los pares (origen, puerto destino) ya vistos y dos
+    count-min sketches: puertos distintos por origen e intentos fallidos por
+    (origen, servicio). Al avanzar el tiempo los buckets vencidos se vacían, por lo que la
+    memoria es fija sin importar cuántos orígenes o paquetes se procesen.
+
+    Los conteos son estimaciones en ambos sentidos: los sketches pueden sobreestimar y un
+    falso positivo del filtro de Bloom hace que un puerto nuevo no se cuente (subestima).
+    El filtro se dimensiona para ``expected_pairs`` pares distintos por bucket con tasa
+    ``bloom_fp_rate``; con más pares la tasa crece y los escaneos se detectan más tarde.
+    Las marcas de tiempo más adelantadas que el reloj del servidor (más ``max_clock_skew``)
+    se recortan a la hora del servidor, para que un cliente no pueda adelantar la ventana.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 60.0,
+        bucket_seconds: float = 10.0,
+        port_scan_threshold: int = 20,
+        brute_force_threshold: int = BRUTE_FORCE_MAX_ATTEMPTS,
+        sketch_width: int = 1 << 14,
+        sketch_depth: int = 4,
+        expected_pairs: int = 250_000,
+        bloom_fp_rate: float = 0.01,
+        max_clock_skew: float = 5.0,
+    ):
+        if bucket_seconds <= 0 or window_seconds < bucket_seconds:
+            raise ValueError("window_seconds must be >= bucket_seconds > 0")
+        if expected_pairs < 1 or not 0 < bloom_fp_rate < 1:
+            raise ValueError("expected_pairs must be >= 1 and bloom_fp_rate in (0, 1)")
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = max(1, int(round(window_seconds / bucket_seconds)))
+        self.window_seconds = self.num_buckets * bucket_seconds
+        self.port_scan_threshold = port_scan_threshold
+        self.brute_force_threshold = brute_force_threshold
+        self.max_clock_skew = max_clock_skew
+
+        bloom_bits = max(64, int(math.ceil(-expected_pairs * math.log(bloom_fp_rate) / (math.log(2) ** 2))))
+        bloom_bits = (bloom_bits + 7) // 8 * 8
+        bloom_hashes = max(1, int(round(bloom_bits / expected_pairs * math.log(2))))
+        self._seen_ports = [_BloomBits(bloom_bits, bloom_hashes) for _ in range(self.num_buckets)]
+        self._distinct_ports = [_CountMinSketch(sketch_width, sketch_depth) for _ in range(self.num_buckets)]
+        self._failed_attempts = [_CountMinSketch(sketch_width, sketch_depth) for _ in range(self.num_buckets)]
+        self._current_bucket: Optional[int] = None
+        self.packets_observed = 0
+
+    def memory_bytes(self) -> int:
+        """Memoria usada por las estructuras (constante tras la construcción)"""
+        total = sum(len(b.bits) for b in self._seen_ports)
+        total += sum(len(c.table) * c.table.itemsize for c in self._distinct_ports + self._failed_attempts)
+        return total
+
+    def _advance(self, bucket: int):
+        """Mueve el anillo hasta ``bucket`` vaciando los buckets que salen de la ventana"""
+        if self._current_bucket is None:
+            self._current_bucket = bucket
+            return
+        if bucket <= self._current_bucket:
+            return
+        steps = min(bucket - self._current_bucket, self.num_buckets)
+        for b in range(bucket - steps + 1, bucket + 1):
+            slot = b % self.num_buckets
+            self._seen_ports[slot].clear()
+            self._distinct_ports[slot].clear()
+            self._failed_attempts[slot].clear()
+        self._current_bucket = bucket
+
+    @staticmethod
+    def _estimate(sketches: List[_CountMinSketch], cells: List[int]) -> int:
+        return min(sum(s.table[c] for s in sketches) for c in cells)
+
+    def observe(self, packet: Dict, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Procesa un paquete y devuelve las alertas generadas al cruzar un umbral.
+
+        Usa ``packet['timestamp']`` (epoch en segundos) si es un número finito y no está en el
+        futuro; si falta, no es válido o está adelantado, ``now`` o la hora actual. Cada origen
+        genera una sola alerta por regla mientras permanezca sobre el umbral.
+        """
+        src = packet.get('src')
+        if src is None:
+            return []
+        clock = now if now is not None else time.time()
+        ts = packet.get('timestamp')
+        if isinstance(ts, bool) or not isinstance(ts, (int, float)) or not math.isfinite(ts):
+            ts = clock
+        elif ts > clock + self.max_clock_skew:
+            ts = clock
+        bucket = int(ts // self.bucket_seconds)
+        self._advance(bucket)
+        if bucket <= self._current_bucket - self.num_buckets:
+            # Paquete más antiguo que la ventana: ya no aporta a la detección
+            return []
+        slot = bucket % self.num_buckets
+        self.packets_observed += 1
+        alerts = []
+
+        flags = packet.get('flags') or {}
+        dst_port = packet.get('dst_port')
+        if dst_port is not None and flags.get('syn', False) and not flags.get('ack', False):
+            positions = self._seen_ports[slot].positions((src, dst_port))
+            if not any(bloom.contains(positions) for bloom in self._seen_ports):
+                self._seen_ports[slot].add(positions)
+                cells = self._distinct_ports[slot].cells(src)
+                before = self._estimate(self._distinct_ports, cells)
+                self._distinct_ports[slot].add(cells)
+                after = self._estimate(self._distinct_ports, cells)
+                if before <= self.port_scan_threshold < after:
+                    alerts.append(dict(_PORT_SCAN_THREAT, source=src, detection="SLIDING_WINDOW", distinct_ports=after))
+
+        service = packet.get('protocol')
+        if service in BRUTE_FORCE_PROTOCOLS and not packet.get('auth_success', False):
+            cells = self._failed_attempts[slot].cells((src, service))
+            before = self._estimate(self._failed_attempts, cells)
+            self._failed_attempts[slot].add(cells)
+            after = self._estimate(self._failed_attempts, cells)
+            if before <= self.brute_force_threshold < after:
+                alerts.append(dict(_BRUTE_FORCE_THREAT, source=src, service=service, detection="SLIDING_WINDOW", failed_attempts=after))
+
+        return alerts
+
+    def observe_many(self, packets: List[Dict], now: Optional[float] = None) -> List[Dict[str, Any]]:
+        alerts = []
+        for packet in packets:
+            alerts.extend(self.observe(packet, now))
+        return alerts
+
 
 class NetworkAttackDefenseService:
-    def __init__(self):
+    def __init__(self, detector: Optional[SlidingWindowDetector] = None,
+                 threat_intel: Optional[ThreatIntelService] = None,
+                 policy_engine: Optional[PolicyEngine] = None):
+        # Si se entrega un detector, su estado se conserva entre llamadas a analyze_network_traffic
+        self.detector = detector
+        # ThreatIntelService opcional: origen/destino en listas de IOC se bloquean primero
+        self.threat_intel = threat_intel
+        # Con un PolicyEngine, las políticas NETWORK activas se aplican a los paquetes sin otra amenaza
+        self.policy_engine = policy_engine
         self.network_threats = [
             "port_scanning",
             "brute_force_attempts",
@@ -14,12 +275,47 @@ class NetworkAttackDefenseService:
         """Analiza tráfico de red en busca de ataques"""
         threats_detected = []
         blocked_connections = 0
+        packets = traffic_data.get('packets', [])
+        n = len(packets)
+        t0 = time.perf_counter()
+        known_bad = self._lookup_known_bad(
+            [p.get('src') for p in packets], [p.get('dst') for p in packets]
+        )
+        t1 = time.perf_counter()
+        policy_matches = self.policy_engine.evaluate_batch("NETWORK", packets) if self.policy_engine is not None else None
+        t2 = time.perf_counter()
+        # Detecciones por detector; el tiempo de la ventana deslizante se acumula paquete a paquete
+        rule_hits = policy_hits = window_alerts = 0
+        window_time = 0.0
         
-        for packet in traffic_data.get('packets', []):
-            threat_analysis = self._analyze_packet(packet)
+        for i, packet in enumerate(packets):
+            if known_bad is not None and known_bad[i]:
+                threat_analysis = dict(_MALICIOUS_IP_THREAT)
+            else:
+                threat_analysis = self._analyze_packet(packet)
+                rule_hits += bool(threat_analysis.get('is_threat'))
+            if not threat_analysis.get('is_threat') and policy_matches is not None and policy_matches[i]:
+                threat_analysis = _policy_threat(policy_matches[i][0])
+                policy_hits += 1
             if threat_analysis.get('is_threat'):
                 threats_detected.append(threat_analysis)
-                blocked_connections += 1
+                if _blocks(threat_analysis):
+                    blocked_connections += 1
+            if self.detector is not None:
+                w0 = time.perf_counter()
+                alerts = self.detector.observe(packet)
+                window_time += time.perf_counter() - w0
+                window_alerts += len(alerts)
+                threats_detected.extend(alerts)
+        t3 = time.perf_counter()
+
+        if known_bad is not None:
+            observe_detector("network_defense", "threat_intel", t1 - t0, n, sum(known_bad))
+        if policy_matches is not None:
+            observe_detector("network_defense", "policies", t2 - t1, n, policy_hits)
+        observe_detector("network_defense", "packet_rules", t3 - t2 - window_time, n, rule_hits)
+        if self.detector is not None:
+            observe_detector("network_defense", "sliding_window", window_time, n, window_alerts)
         
         return {
             "analysis_time": datetime.utcnow(),
@@ -28,42 +324,90 @@ class NetworkAttackDefenseService:
             "recommended_actions": self._get_network_recommendations(threats_detected)
         }
     
+    def analyze_network_traffic_batch(self, columns: Mapping[str, Any]) -> Dict[str, Any]:
+        """Analiza tráfico en formato columnar evaluando las reglas como máscaras vectorizadas.
+
+        ``columns`` puede ser un dict de arrays/listas o un ``pandas.DataFrame`` con las
+        columnas ``syn``, ``ack``, ``protocol`` y ``attempt_count`` (``src``/``dst`` opcionales).
+        Devuelve la misma estructura que ``analyze_network_traffic`` más ``rule_counts``.
+        """
+        t0 = time.perf_counter()
+        syn = np.asarray(columns["syn"], dtype=bool)
+        n = len(syn)
+        ack = np.asarray(columns["ack"], dtype=bool) if "ack" in columns else np.zeros(n, dtype=bool)
+        protocol = np.asarray(columns["protocol"]) if "protocol" in columns else np.full(n, None, dtype=object)
+        attempts = np.asarray(columns["attempt_count"]) if "attempt_count" in columns else np.zeros(n, dtype=np.int64)
+
+        known_bad = self._lookup_known_bad(
+            columns["src"] if "src" in columns else [None] * n,
+            columns["dst"] if "dst" in columns else [None] * n,
+        )
+        malicious_ip = np.asarray(known_bad, dtype=bool) if known_bad is not None else np.zeros(n, dtype=bool)
+
+        # Mismo orden de prioridad que analyze_network_traffic: IOC, escaneo de puertos, fuerza bruta
+        port_scan = ~malicious_ip & syn & ~ack
+        brute_force = ~malicious_ip & ~port_scan & np.isin(protocol, BRUTE_FORCE_PROTOCOLS) & (attempts > BRUTE_FORCE_MAX_ATTEMPTS)
+
+        is_threat = malicious_ip | port_scan | brute_force
+        templates = (_BRUTE_FORCE_THREAT, _PORT_SCAN_THREAT, _MALICIOUS_IP_THREAT)
+        kinds = port_scan.astype(np.int8) + 2 * malicious_ip.astype(np.int8)
+        threats_detected = [dict(templates[k]) for k in kinds[is_threat].tolist()]
+        observe_detector("network_defense", "batch_rules", time.perf_counter() - t0, n, len(threats_detected))
+
+        return {
+            "analysis_time": datetime.utcnow(),
+            "threats_detected": threats_detected,
+            "connections_blocked": sum(1 for t in threats_detected if _blocks(t)),
+            "recommended_actions": self._get_network_recommendations(threats_detected),
+            "packets_analyzed": n,
+            "rule_counts": {
+                "MALICIOUS_IP": int(malicious_ip.sum()),
+                "PORT_SCANNING": int(port_scan.sum()),
+                "BRUTE_FORCE": int(brute_force.sum()),
+            },
+        }
+
+    def _lookup_known_bad(self, sources, destinations) -> Optional[List[bool]]:
+        """Consulta en lote origen y destino contra el índice de IOC (None si no hay índice)"""
+        index = self.threat_intel.index if self.threat_intel is not None else None
+        if index is None:
+            return None
+        n = len(sources)
+        hits = index.lookup_ips(
+            [str(ip) if ip is not None else "" for ip in list(sources) + list(destinations)]
+        )
+        return [a or b for a, b in zip(hits[:n], hits[n:])]
+
     def _analyze_packet(self, packet: Dict) -> Dict[str, Any]:
         """Analiza paquetes individuales en busca de amenazas"""
         # Detectar escaneo de puertos
         if self._is_port_scan(packet):
-            return {
-                "is_threat": True,
-                "threat_type": "PORT_SCANNING",
-                "severity": "MEDIUM",
-                "action": "BLOCKED"
-            }
+            return dict(_PORT_SCAN_THREAT)
         
         # Detectar intentos de fuerza bruta
         if self._is_brute_force(packet):
-            return {
-                "is_threat": True,
-                "threat_type": "BRUTE_FORCE",
-                "severity": "HIGH",
-                "action": "BLOCKED"
-            }
+            return dict(_BRUTE_FORCE_THREAT)
         
         return {"is_threat": False}
     
     def _is_port_scan(self, packet: Dict) -> bool:
         """Detecta patrones de escaneo de puertos"""
         # Lógica simplificada para detección
-        return packet.get('flags', {}).get('syn', False) and not packet.get('flags', {}).get('ack', False)
+        flags = packet.get('flags') or {}
+        return flags.get('syn', False) and not flags.get('ack', False)
     
     def _is_brute_force(self, packet: Dict) -> bool:
         """Detecta patrones de fuerza bruta"""
         # Lógica simplificada para detección
-        return (packet.get('protocol') == 'SSH' or packet.get('protocol') == 'RDP') and packet.get('attempt_count', 0) > 5
+        return packet.get('protocol') in BRUTE_FORCE_PROTOCOLS and (packet.get('attempt_count') or 0) > BRUTE_FORCE_MAX_ATTEMPTS
     
     def _get_network_recommendations(self, threats: List[Dict]) -> List[str]:
         """Genera recomendaciones basadas en amenazas detectadas"""
         recommendations = []
         
+        if any(t['threat_type'] == 'MALICIOUS_IP' for t in threats):
+            recommendations.append("Bloquear en el perímetro las IP reportadas por inteligencia de amenazas")
+        
         if any(t['threat_type'] == 'PORT_SCANNING' for t in threats):
             recommendations.append("Reforzar reglas de firewall para puertos sensibles")
         
@@ -0,0 +1,616 @@
+"""Evaluación compilada de las SecurityPolicy activas.
+
+Cada política guarda sus reglas en ``settings``::
+
+    {"rules": [{"name": "ssh-fuerza-bruta",
+                "match": {"protocol": {"in": ["SSH", "RDP"]}, "attempt_count": {"gt": 5}},
+                "threat_type": "BRUTE_FORCE", "severity": "HIGH", "action": "BLOCKED"}]}
+
+Las claves de ``match`` son campos del evento (``flags.syn`` para campos anidados) y los
+valores un literal (igualdad) o ``{operador: valor}`` con los operadores de ``OPERATORS``.
+
+Al compilar, cada condición se normaliza (``eq`` pasa a ``in`` de un elemento, ``ne`` a
+``not_in``, varias condiciones sobre el mismo campo se combinan) y se comparte entre todas
+las reglas que la usan; las reglas con el mismo conjunto de condiciones dentro de un tipo de
+política se fusionan en una sola con todas sus salidas. Cada regla queda indexada por su
+condición ``in`` más selectiva (campo -> valor -> reglas), de modo que un evento solo evalúa
+las reglas cuyo valor ancla coincide más las que no tienen ancla. El resto de condiciones se
+ordena por costo / (1 - tasa de aprobación), empezando por priores estáticos y reordenando
+con las tasas observadas; el resultado de cada condición se memoiza por evento.
+
+Los cambios de ``is_active`` o ``settings`` solo recompilan la política afectada (se compara
+una huella de sus campos) y luego se reconstruye el índice, que es barato. Los cambios
+confirmados en el proceso se aplican al instante (``db_events``); los de otros workers se
+recogen releyendo la tabla cada ``refresh_interval`` segundos. Los contadores de
+estadísticas no usan lock: son aproximados con varios hilos evaluando a la vez.
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterable, Tuple, FrozenSet
+from bisect import bisect_left, bisect_right
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from proyecto.modelo.seguridad import SecurityPolicy
+
+logger = logging.getLogger(__name__)
+
+POLICY_TYPES = ("RANSOMWARE", "NETWORK", "WEB", "BEHAVIORAL")
+OPERATORS = ("eq", "ne", "in", "not_in", "gt", "gte", "lt", "lte", "suffix", "contains", "exists")
+
+# Eventos evaluados entre dos reordenamientos de condiciones según las tasas observadas
+REORDER_EVERY = 20000
+
+# Tasa de aprobación supuesta antes de observar eventos y costo relativo por operador
+_PRIOR_PASS = {"in": 0.1, "not_in": 0.9, "gt": 0.3, "gte": 0.3, "lt": 0.3, "lte": 0.3,
+               "suffix": 0.1, "contains": 0.1, "exists": 0.5}
+_COST = {"in": 1.0, "not_in": 1.0, "exists": 1.0, "gt": 1.2, "gte": 1.2, "lt": 1.2, "lte": 1.2,
+         "suffix": 2.0, "contains": 2.0}
+# Peso (en eventos) del prior frente a lo observado
+_PRIOR_WEIGHT = 20
+
+# Clave normalizada de una condición: (campo, operador, valor)
+ConditionKey = Tuple[str, str, Any]
+
+
+class PolicyError(ValueError):
+    """Reglas de una política con formato inválido"""
+
+
+def _getter(field: str) -> Callable[[Dict], Any]:
+    parts = field.split(".")
+    if len(parts) == 1:
+        def get(event, key=field):
+            return event.get(key)
+        return get
+
+    def get_nested(event):
+        for part in parts:
+            if not isinstance(event, dict):
+                return None
+            event = event.get(part)
+        return event
+    return get_nested
+
+
+def _hashable_set(field: str, values) -> FrozenSet:
+    if not isinstance(values, (list, tuple, set, frozenset)):
+        values = [values]
+    try:
+        return frozenset(values)
+    except TypeError:
+        raise PolicyError(f"{field}: values must be scalars")
+
+
+def _number(field: str, op: str, value) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise PolicyError(f"{field}: '{op}' needs a number")
+    return value
+
+
+def _strings(field: str, op: str, value) -> Tuple[str, ...]:
+    values = [value] if isinstance(value, str) else value
+    if not isinstance(values, (list, tuple)) or not values or not all(isinstance(v, str) for v in values):
+        raise PolicyError(f"{field}: '{op}' needs a string or a list of strings")
+    return tuple(sorted({v.lower() for v in values}))
+
+
+def _normalize_match(match: Dict[str, Any]) -> Optional[FrozenSet[ConditionKey]]:
+    """Condiciones normalizadas de una regla; None si nunca puede cumplirse"""
+    if not isinstance(match, dict) or not match:
+        raise PolicyError("match must be a non-empty object")
+    by_field: Dict[str, Dict[str, Any]] = {}
+    for field, spec in match.items():
+        if not isinstance(field, str) or not field:
+            raise PolicyError("field names must be non-empty strings")
+        ops = spec if isinstance(spec, dict) else {"eq": spec}
+        if not ops:
+            raise PolicyError(f"{field}: empty condition")
+        merged = by_field.setdefault(field, {})
+        for op, value in ops.items():
+            if op not in OPERATORS:
+                raise PolicyError(f"{field}: unknown operator '{op}'")
+            if op in ("eq", "in"):
+                values = _hashable_set(field, value)
+                merged["in"] = merged["in"] & values if "in" in merged else values
+            elif op in ("ne", "not_in"):
+                merged["not_in"] = merged.get("not_in", frozenset()) | _hashable_set(field, value)
+            elif op in ("gt", "gte"):
+                merged[op] = max(merged.get(op, float("-inf")), _number(field, op, value))
+            elif op in ("lt", "lte"):
+                merged[op] = min(merged.get(op, float("inf")), _number(field, op, value))
+            elif op in ("suffix", "contains"):
+                values = _strings(field, op, value)
+                # varias listas para el mismo operador: se exige cada una (se guardan por separado)
+                merged.setdefault(op, set()).add(values)
+            elif op == "exists":
+                if not isinstance(value, bool):
+                    raise PolicyError(f"{field}: 'exists' needs true or false")
+                if merged.get("exists", value) != value:
+                    return None
+                merged["exists"] = value
+
+    keys = set()
+    for field, ops in by_field.items():
+        if "in" in ops:
+            allowed = ops["in"] - ops.pop("not_in", frozenset())
+            if not allowed:
+                return None
+            ops["in"] = allowed
+        for op, value in ops.items():
+            if op in ("suffix", "contains"):
+                keys.update((field, op, v) for v in value)
+            else:
+                keys.add((field, op, value))
+    return frozenset(keys)
+
+
+def _compile_test(field: str, op: str, value: Any) -> Callable[[Dict, Dict], bool]:
+    """Predicado ``test(event, memo)`` de una condición, sin capas para campos de primer nivel"""
+    nested = "." in field
+    get = _getter(field)
+    if op == "in":
+        if nested:
+            def test(event, memo):
+                try:
+                    return get(event) in value
+                except TypeError:  # valor no hashable en el evento
+                    return False
+        else:
+            def test(event, memo):
+                try:
+                    return event.get(field) in value
+                except TypeError:
+                    return False
+        return test
+    if op == "not_in":
+        def test_not_in(event, memo):
+            try:
+                return get(event) not in value
+            except TypeError:
+                return True
+        return test_not_in
+    if op == "exists":
+        if value:
+            return lambda event, memo: get(event) is not None
+        return lambda event, memo: get(event) is None
+    if op == "suffix":
+        def test_suffix(event, memo):
+            x = get(event)
+            return isinstance(x, str) and x.lower().endswith(value)
+        return test_suffix
+    if op == "contains":
+        def test_contains(event, memo):
+            x = get(event)
+            if not isinstance(x, str):
+                return False
+            x = x.lower()
+            return any(v in x for v in value)
+        return test_contains
+    # umbral suelto; en el índice se reemplaza por la búsqueda en su _ThresholdFamily
+    family = _ThresholdFamily(field, op, [value])
+    return family.test_for(value)
+
+
+class _ThresholdFamily:
+    """Umbrales de un mismo (campo, operador): una búsqueda binaria por evento resuelve todos.
+
+    ``locate`` devuelve un índice ``i`` tal que el umbral en la posición ``k`` se cumple si
+    ``k < i`` (gt/gte) o si ``k >= i`` (lt/lte); los valores no numéricos no cumplen ninguno.
+    """
+
+    __slots__ = ("field", "op", "thresholds", "positions", "get", "bisect", "upper")
+
+    def __init__(self, field: str, op: str, thresholds: Iterable[float]):
+        self.field = field
+        self.op = op
+        self.thresholds = sorted({float(t) for t in thresholds})
+        self.positions = {t: k for k, t in enumerate(self.thresholds)}
+        self.get = _getter(field)
+        self.bisect = bisect_left if op in ("gt", "lte") else bisect_right
+        self.upper = op in ("gt", "gte")
+
+    def locate(self, event: Dict) -> int:
+        x = self.get(event)
+        if isinstance(x, bool) or not isinstance(x, (int, float)):
+            return 0 if self.upper else len(self.thresholds)
+        return self.bisect(self.thresholds, x)
+
+    def test_for(self, threshold: float) -> Callable[[Dict, Dict], bool]:
+        k = self.positions[float(threshold)]
+        locate = self.locate
+        family = self
+
+        if self.upper:
+            def test(event, memo):
+                i = memo.get(family)
+                if i is None:
+                    i = memo[family] = locate(event)
+                return k < i
+        else:
+            def test(event, memo):
+                i = memo.get(family)
+                if i is None:
+                    i = memo[family] = locate(event)
+                return k >= i
+        return test
+
+
+class _Condition:
+    """Condición compartida entre reglas, con contadores para estimar su selectividad"""
+
+    __slots__ = ("key", "test", "cost", "prior", "evaluated", "passed")
+
+    def __init__(self, key: ConditionKey):
+        self.key = key
+        field, op, value = key
+        self.test = _compile_test(field, op, value)
+        self.cost = _COST[op] + (0.1 * len(value) if op in ("suffix", "contains") else 0.0)
+        self.prior = min(0.9, _PRIOR_PASS[op] * len(value)) if op == "in" else _PRIOR_PASS[op]
+        self.evaluated = 0
+        self.passed = 0
+
+    def pass_rate(self) -> float:
+        return (self.passed + self.prior * _PRIOR_WEIGHT) / (self.evaluated + _PRIOR_WEIGHT)
+
+    def rank(self) -> float:
+        # orden óptimo para conjunciones independientes: costo / probabilidad de descartar
+        return self.cost / max(1.0 - self.pass_rate(), 1e-6)
+
+
+class _Rule:
+    """Regla fusionada: condiciones (sin la del ancla) y salidas de todas las reglas equivalentes"""
+
+    __slots__ = ("conditions", "outcomes")
+
+    def __init__(self, conditions: List[_Condition], outcomes: Tuple[Dict[str, Any], ...]):
+        self.conditions = conditions
+        self.outcomes = outcomes
+
+
+class _RuleSet:
+    """Reglas compiladas de un tipo de política"""
+
+    __slots__ = ("anchors", "unanchored", "rules")
+
+    def __init__(self):
+        # [(getter, {valor: [reglas]})], un índice por campo ancla
+        self.anchors: List[Tuple[Callable[[Dict], Any], Dict[Any, List[_Rule]]]] = []
+        self.unanchored: List[_Rule] = []
+        self.rules: List[_Rule] = []
+
+
+class _CompiledPolicy:
+    __slots__ = ("id", "name", "policy_type", "fingerprint", "rules", "active")
+
+    def __init__(self, policy_id: str, name: str, policy_type: str, fingerprint: str,
+                 rules: List[Tuple[FrozenSet[ConditionKey], Dict[str, Any]]], active: bool):
+        self.id = policy_id
+        self.name = name
+        self.policy_type = policy_type
+        self.fingerprint = fingerprint
+        self.rules = rules
+        self.active = active
+
+
+def compile_rules(settings: Optional[Dict[str, Any]]) -> List[Tuple[FrozenSet[ConditionKey], Dict[str, Any]]]:
+    """Valida y normaliza las reglas de ``settings``; lanza PolicyError si el formato es inválido"""
+    if settings is None:
+        return []
+    if not isinstance(settings, dict):
+        raise PolicyError("settings must be an object")
+    rules = settings.get("rules", [])
+    if not isinstance(rules, list):
+        raise PolicyError("rules must be a list")
+    compiled = []
+    for i, rule in enumerate(rules):
+        if not isinstance(rule, dict):
+            raise PolicyError(f"rule {i} must be an object")
+        name = rule.get("name") or f"rule-{i}"
+        try:
+            keys = _normalize_match(rule.get("match"))
+        except PolicyError as e:
+            raise PolicyError(f"rule '{name}': {e}")
+        threat_type = rule.get("threat_type")
+        if not isinstance(threat_type, str) or not threat_type:
+            raise PolicyError(f"rule '{name}': threat_type is required")
+        if keys is None:
+            logger.info("rule '%s' can never match; skipped", name)
+            continue
+        compiled.append((keys, {
+            "rule": str(name),
+            "threat_type": threat_type,
+            "severity": str(rule.get("severity") or "MEDIUM"),
+            "action": str(rule.get("action") or "ALERT"),
+        }))
+    return compiled
+
+
+def _fingerprint(policy_type: Optional[str], settings: Any, is_active: Any) -> str:
+    raw = json.dumps([policy_type, settings, bool(is_active)], sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class PolicyEngine:
+    def __init__(self, session_factory: Optional[Callable[[], Session]] = None,
+                 reorder_every: int = REORDER_EVERY, refresh_interval: Optional[float] = None):
+        # Con session_factory, la primera evaluación carga las políticas de la base y, con
+        # refresh_interval, se vuelven a leer periódicamente (cambios de otros procesos)
+        self.session_factory = session_factory
+        self.reorder_every = reorder_every
+        self.refresh_interval = refresh_interval
+        self._lock = threading.RLock()
+        self._refreshing = threading.Lock()
+        self._next_refresh = 0.0
+        self._loaded = False
+        self._policies: Dict[str, _CompiledPolicy] = {}
+        self._errors: Dict[str, str] = {}
+        self._conditions: Dict[ConditionKey, _Condition] = {}
+        self._rulesets: Dict[str, _RuleSet] = {}
+        self._since_reorder = 0
+        self.events_evaluated = 0
+        self.policies_compiled = 0
+        self.rebuilds = 0
+        self.last_rebuild_seconds = 0.0
+
+    # -- carga y cambios ------------------------------------------------------------------
+
+    def load(self, db: Session) -> int:
+        """Sincroniza con la tabla completa; solo recompila las políticas cuya huella cambió"""
+        with self._lock:
+            rows = db.execute(select(
+                SecurityPolicy.id, SecurityPolicy.name, SecurityPolicy.policy_type,
+                SecurityPolicy.settings, SecurityPolicy.is_active,
+            )).all()
+            seen = set()
+            changed = False
+            for policy_id, name, policy_type, settings, is_active in rows:
+                seen.add(policy_id)
+                changed |= self._upsert(policy_id, name, policy_type, settings, is_active)
+            for policy_id in [p for p in list(self._policies) + list(self._errors) if p not in seen]:
+                changed |= self._remove(policy_id)
+            self._loaded = True
+            if changed or not self._rulesets:
+                self._rebuild()
+            return len(rows)
+
+    def refresh(self, db: Session) -> int:
+        return self.load(db)
+
+    def upsert(self, policy_id: str, name: str, policy_type: Optional[str],
+               settings: Optional[Dict[str, Any]], is_active: bool = True) -> bool:
+        """Agrega o actualiza una política; devuelve True si hubo que recompilarla"""
+        with self._lock:
+            changed = self._upsert(policy_id, name, policy_type, settings, is_active)
+            if changed:
+                self._rebuild()
+            return changed
+
+    def remove(self, policy_id: str) -> bool:
+        with self._lock:
+            changed = self._remove(policy_id)
+            if changed:
+                self._rebuild()
+            return changed
+
+    def apply_changes(self, changes: List[Tuple[str, Dict[str, Any]]]):
+        """Callback de db_events.on_change para SecurityPolicy"""
+        with self._lock:
+            if not self._loaded:
+                return  # la carga inicial leerá el estado confirmado
+            changed = False
+            for op, values in changes:
+                policy_id = values.get("id")
+                if policy_id is None:
+                    continue
+                if op == "delete":
+                    changed |= self._remove(policy_id)
+                else:
+                    changed |= self._upsert(policy_id, values.get("name"), values.get("policy_type"),
+                                            values.get("settings"), values.get("is_active", True))
+            if changed:
+                self._rebuild()
+
+    def _upsert(self, policy_id, name, policy_type, settings, is_active) -> bool:
+        # is_active nulo cuenta como activa, igual que el default de la columna
+        is_active = is_active is None or bool(is_active)
+        fingerprint = _fingerprint(policy_type, settings, is_active)
+        current = self._policies.get(policy_id)
+        if current is not None and current.fingerprint == fingerprint:
+            if current.name != name:
+                current.name = name
+            return False
+        try:
+            rules = compile_rules(settings) if is_active else []
+        except PolicyError as e:
+            logger.warning("policy %s (%s) not compiled: %s", policy_id, name, e)
+            self._errors[policy_id] = str(e)
+            return self._policies.pop(policy_id, None) is not None
+        self._errors.pop(policy_id, None)
+        self._policies[policy_id] = _CompiledPolicy(policy_id, name, policy_type, fingerprint, rules, is_active)
+        self.policies_compiled += 1
+        return True
+
+    def _remove(self, policy_id: str) -> bool:
+        self._errors.pop(policy_id, None)
+        return self._policies.pop(policy_id, None) is not None
+
+    def _rebuild(self):
+        """Fusiona reglas equivalentes y arma el índice de anclas de cada tipo de política"""
+        t0 = time.perf_counter()
+        merged: Dict[Tuple[str, FrozenSet[ConditionKey]], Dict[Tuple[str, str, str], Dict[str, Any]]] = {}
+        for policy in self._policies.values():
+            if not policy.active or not policy.rules:
+                continue
+            for keys, outcome in policy.rules:
+                outcomes = merged.setdefault((policy.policy_type, keys), {})
+                ident = (outcome["threat_type"], outcome["severity"], outcome["action"])
+                target = outcomes.get(ident)
+                if target is None:
+                    target = outcomes[ident] = {
+                        "threat_type": outcome["threat_type"], "severity": outcome["severity"],
+                        "action": outcome["action"], "rules": [], "policy_ids": [],
+                    }
+                if outcome["rule"] not in target["rules"]:
+                    target["rules"].append(outcome["rule"])
+                if policy.id not in target["policy_ids"]:
+                    target["policy_ids"].append(policy.id)
+
+        # las condiciones se conservan entre recompilaciones para no perder lo observado
+        used = {key for _, keys in merged for key in keys}
+        conditions = {key: self._conditions.get(key) or _Condition(key) for key in used}
+        thresholds: Dict[Tuple[str, str], List[_Condition]] = {}
+        for condition in conditions.values():
+            if condition.key[1] in ("gt", "gte", "lt", "lte"):
+                thresholds.setdefault(condition.key[:2], []).append(condition)
+        for (field, op), members in thresholds.items():
+            family = _ThresholdFamily(field, op, (c.key[2] for c in members))
+            for condition in members:
+                condition.test = family.test_for(condition.key[2])
+
+        rulesets: Dict[str, _RuleSet] = {}
+        anchor_tables: Dict[str, Dict[str, Dict[Any, List[_Rule]]]] = {}
+        for (policy_type, keys), outcomes in merged.items():
+            ruleset = rulesets.setdefault(policy_type, _RuleSet())
+            rule_conditions = [conditions[key] for key in keys]
+            anchor = min((c for c in rule_conditions if c.key[1] == "in"),
+                         key=lambda c: (c.pass_rate(), c.key[0]), default=None)
+            rest = sorted((c for c in rule_conditions if c is not anchor), key=_Condition.rank)
+            rule = _Rule(rest, tuple(outcomes.values()))
+            ruleset.rules.append(rule)
+            if anchor is None:
+                ruleset.unanchored.append(rule)
+                continue
+            table = anchor_tables.setdefault(policy_type, {}).setdefault(anchor.key[0], {})
+            for value in anchor.key[2]:
+                table.setdefault(value, []).append(rule)
+        for policy_type, tables in anchor_tables.items():
+            rulesets[policy_type].anchors = [(_getter(field), table) for field, table in sorted(tables.items())]
+
+        self._conditions = conditions
+        self._rulesets = rulesets
+        self.rebuilds += 1
+        self.last_rebuild_seconds = time.perf_counter() - t0
+
+    def _reorder(self):
+        """Reordena las condiciones de cada regla con las tasas de aprobación observadas"""
+        for ruleset in list(self._rulesets.values()):
+            for rule in ruleset.rules:
+                rule.conditions = sorted(rule.conditions, key=_Condition.rank)
+
+    def _ensure_loaded(self):
+        if self.session_factory is None:
+            return
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    with self.session_factory() as db:
+                        self.load(db)
+                    self._next_refresh = time.monotonic() + (self.refresh_interval or 0.0)
+            return
+        if self.refresh_interval is None or time.monotonic() < self._next_refresh:
+            return
+        # una sola relectura a la vez; los demás hilos siguen evaluando con las reglas actuales
+        if not self._refreshing.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            with self.session_factory() as db:
+                self.load(db)
+        except Exception:
+            logger.exception("policy refresh failed; keeping the current rules")
+        finally:
+            self._refreshing.release()
+
+    # -- evaluación -----------------------------------------------------------------------
+
+    def evaluate(self, policy_type: str, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self.evaluate_batch(policy_type, [event])[0]
+
+    def evaluate_batch(self, policy_type: str, events: Iterable[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        """Salidas de las reglas que cumple cada evento, alineadas con ``events``.
+
+        Las salidas (``threat_type``, ``severity``, ``action``, ``rules``, ``policy_ids``)
+        se comparten entre llamadas: copiarlas antes de modificarlas.
+        """
+        self._ensure_loaded()
+        ruleset = self._rulesets.get(policy_type)
+        events = events if isinstance(events, list) else list(events)
+        if ruleset is None:
+            return [[] for _ in events]
+        anchors, unanchored = ruleset.anchors, ruleset.unanchored
+        results = []
+        for event in events:
+            candidates = list(unanchored)
+            for get, table in anchors:
+                value = get(event)
+                try:
+                    rules = table.get(value)
+                except TypeError:  # valor no hashable
+                    continue
+                if rules:
+                    candidates.extend(rules)
+            matches = []
+            if candidates:
+                memo: Dict[_Condition, bool] = {}
+                for rule in candidates:
+                    for condition in rule.conditions:
+                        passed = memo.get(condition)
+                        if passed is None:
+                            passed = memo[condition] = condition.test(event, memo)
+                            condition.evaluated += 1
+                            if passed:
+                                condition.passed += 1
+                        if not passed:
+                            break
+                    else:
+                        matches.extend(rule.outcomes)
+            results.append(matches)
+        self.events_evaluated += len(events)
+        self._since_reorder += len(events)
+        if self._since_reorder >= self.reorder_every:
+            self._since_reorder = 0
+            self._reorder()
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        with self._lock:
+            policies = list(self._policies.values())
+            rulesets = dict(self._rulesets)
+            return {
+                "policies": len(policies) + len(self._errors),
+                "active": sum(1 for p in policies if p.active),
+                "invalid": dict(self._errors),
+                "rules": sum(len(p.rules) for p in policies if p.active),
+                "compiled_rules": {t: len(r.rules) for t, r in rulesets.items()},
+                "unanchored_rules": {t: len(r.unanchored) for t, r in rulesets.items()},
+                "conditions": len(self._conditions),
+                "events_evaluated": self.events_evaluated,
+                "condition_evaluations": sum(c.evaluated for c in self._conditions.values()),
+                "policies_compiled": self.policies_compiled,
+                "rebuilds": self.rebuilds,
+                "last_rebuild_ms": round(self.last_rebuild_seconds * 1000, 3),
+            }
+
+
+_default_engine: Optional[PolicyEngine] = None
+
+
+def get_default_engine() -> PolicyEngine:
+    """Motor compartido del proceso; se recompila con los cambios confirmados de SecurityPolicy"""
+    global _default_engine
+    if _default_engine is None:
+        from proyecto.app import db_events
+        from proyecto.app.database.database import SessionLocal
+
+        from proyecto import config
+
+        engine = PolicyEngine(session_factory=SessionLocal, refresh_interval=config.POLICY_REFRESH_INTERVAL)
+        db_events.on_change(SecurityPolicy, engine.apply_changes)
+        _default_engine = engine
+    return _default_engine
@@ -1,15 +1,126 @@
-
-## 3. services/ransomware_protection.py
-
-
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Callable
+from concurrent.futures import Executor, ProcessPoolExecutor
 from datetime import datetime, timedelta
+from pathlib import Path
 from sqlalchemy.orm import Session
+import errno
 import hashlib
 import json
+import os
+import stat
+import time
+
+from proyecto import config
+from proyecto.app.metrics import observe_detector
+from proyecto.modelo.seguridad import RansomwareIncident
+from proyecto.services.backup_store import ChunkStore
+from proyecto.services.behavior_monitor import ProcessRateTracker
+from proyecto.services.indicators import IndicatorFeed, get_default_feed
+from proyecto.services.policy_engine import PolicyEngine
+from proyecto.services.threat_intelligence import ThreatIntelIndex, ThreatIntelService
+
+# Tamaño de bloque para leer archivos al calcular hashes (sin copiar el archivo completo)
+HASH_CHUNK_SIZE = 1 << 20
+PIPELINE_BATCH_SIZE = 500
+
+
+# Banderas de apertura: sin seguir symlinks y sin bloquear en FIFOs (no existen en Windows)
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, "O_NOFOLLOW", 0) | getattr(os, "O_NONBLOCK", 0) | getattr(os, "O_BINARY", 0)
+
+
+def hash_file(path: str, chunk_size: int = HASH_CHUNK_SIZE, max_bytes: Optional[int] = None) -> str:
+    """SHA-256 del contenido de un archivo leyendo en bloques sobre un buffer reutilizable.
+
+    Solo abre archivos regulares: symlinks, FIFOs y dispositivos (que podrían bloquear la
+    lectura o no terminar nunca) y archivos de más de ``max_bytes`` levantan OSError. El tipo
+    se comprueba sobre el descriptor ya abierto, así no se puede cambiar el archivo entre la
+    comprobación y la lectura.
+    """
+    fd = os.open(path, _OPEN_FLAGS)
+    with open(fd, "rb", buffering=0) as f:
+        st = os.fstat(fd)
+        if not stat.S_ISREG(st.st_mode):
+            raise OSError(errno.EINVAL, "not a regular file", path)
+        if max_bytes is not None and st.st_size > max_bytes:
+            raise OSError(errno.EFBIG, f"larger than {max_bytes} bytes", path)
+        h = hashlib.sha256()
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            h.update(view[:n])
+    return h.hexdigest()
+
+
+def path_under_root(root: Path, path: str) -> Optional[Path]:
+    """``path`` (absoluto o relativo) tomado dentro de ``root``; None si resuelve fuera de la raíz.
+
+    Se eliminan la barra inicial y los ``:`` de unidad, y ``..`` y symlinks se resuelven
+    antes de comparar, así ninguna ruta del cliente sale de la raíz.
+    """
+    root = root.resolve()
+    target = (root / path.lstrip("/\\").replace(":", "")).resolve()
+    return target if target.is_relative_to(root) else None
+
+
+def _resolve_path(operation: Dict, files_root: Optional[Path]) -> Optional[str]:
+    """Archivo regular bajo ``files_root`` al que se refiere la operación (None sin raíz)"""
+    file_path = operation.get('file_path')
+    if files_root is None or not isinstance(file_path, str) or not file_path:
+        return None
+    file_name = operation.get('file_name')
+    for candidate in (file_path, os.path.join(file_path, file_name) if isinstance(file_name, str) else None):
+        target = path_under_root(files_root, candidate) if candidate else None
+        if target is not None and target.is_file():
+            return str(target)
+    return None
+
+
+_worker_service = None
+
+
+def _init_worker(files_root: Optional[Path], indicators: IndicatorFeed):
+    """Inicializador del pool: cada proceso crea su servicio con la configuración del padre"""
+    global _worker_service
+    _worker_service = RansomwareProtectionService(files_root=files_root, indicators=indicators)
+
+
+def _analyze_operations_batch(operations: List[Dict]) -> List[tuple]:
+    """Ejecutado en los procesos del pool: (sospechosa, backup o None) por operación"""
+    svc = _worker_service
+    if svc is None:
+        raise RuntimeError("worker pool was not created with RansomwareProtectionService.create_pool")
+    results = []
+    for operation in operations:
+        backup = svc._create_file_backup(operation) if svc._should_backup_file(operation) else None
+        results.append((svc._is_suspicious_operation(operation), backup))
+    return results
 
 class RansomwareProtectionService:
-    def __init__(self):
+    def __init__(
+        self,
+        backup_store: Optional[ChunkStore] = None,
+        indicators: Optional[IndicatorFeed] = None,
+        behavior_tracker: Optional[ProcessRateTracker] = None,
+        threat_intel: Optional[ThreatIntelService] = None,
+        policy_engine: Optional[PolicyEngine] = None,
+        files_root: Optional[Path] = None,
+    ):
+        # Raíz donde los agentes replican sus archivos: solo ahí se leen contenidos para los
+        # backups; sin raíz, el backup es el hash de los metadatos reportados por el cliente
+        self.files_root = Path(files_root) if files_root is not None else None
+        # Con un ChunkStore, los archivos protegidos se guardan en snapshots incrementales
+        self.backup_store = backup_store
+        # Con un ProcessRateTracker, se bloquean procesos con ráfagas de escritura/renombre
+        self.behavior_tracker = behavior_tracker
+        # Con un ThreatIntelService, los hashes de archivos se comparan contra los IOC
+        self.threat_intel = threat_intel
+        # Con un PolicyEngine, las operaciones que cumplen políticas RANSOMWARE activas son sospechosas
+        self.policy_engine = policy_engine
+        # Indicadores compilados una vez por proceso (extensiones, notas de rescate, backup)
+        self.indicators = indicators or get_default_feed()
         self.ransomware_indicators = [
             "encryption_patterns",
             "file_extension_changes",
@@ -21,56 +132,261 @@ class RansomwareProtectionService:
         """Monitorea operaciones de archivo en tiempo real para detectar ransomware"""
         suspicious_activities = []
         protected_files = 0
+        # backup (o None) por operación, alineado con file_operations
+        backups = []
+        # el tiempo de las copias se acumula aparte para no atribuirlo a los indicadores
+        backup_time = 0.0
+        t0 = time.perf_counter()
         
         for operation in file_operations:
             if self._is_suspicious_operation(operation):
                 suspicious_activities.append(operation)
             
             # Crear copia de seguridad automática
+            backup = None
             if self._should_backup_file(operation):
-                self._create_file_backup(operation)
+                b0 = time.perf_counter()
+                backup = self._create_file_backup(operation)
+                backup_time += time.perf_counter() - b0
                 protected_files += 1
+            backups.append(backup)
+        elapsed = time.perf_counter() - t0
+        n = len(file_operations)
+        observe_detector("ransomware", "indicators", elapsed - backup_time, n, len(suspicious_activities))
+        observe_detector("ransomware", "backup", backup_time, protected_files)
         
+        return self._build_result(endpoint_id, file_operations, suspicious_activities, protected_files, backups)
+
+    def monitor_file_operations_parallel(
+        self,
+        endpoint_id: str,
+        file_operations: List[Dict],
+        workers: Optional[int] = None,
+        batch_size: int = PIPELINE_BATCH_SIZE,
+        executor: Optional[Executor] = None,
+    ) -> Dict[str, Any]:
+        """Igual que monitor_file_operations, repartiendo lotes entre un pool de procesos.
+
+        El hash del contenido de cada archivo (la parte costosa) se calcula en los procesos
+        del pool; los resultados se combinan en el orden original. Se puede pasar un
+        ``executor`` creado con ``create_pool`` para no pagar el arranque del pool en cada llamada.
+        """
+        t0 = time.perf_counter()
+        batches = [file_operations[i:i + batch_size] for i in range(0, len(file_operations), batch_size)]
+        own_executor = executor is None
+        if own_executor:
+            executor = self.create_pool(workers)
+        try:
+            batch_results = list(executor.map(_analyze_operations_batch, batches))
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+        suspicious_activities = []
+        protected_files = 0
+        backups = []
+        for batch, results in zip(batches, batch_results):
+            for operation, (suspicious, backup) in zip(batch, results):
+                if suspicious:
+                    suspicious_activities.append(operation)
+                if backup is not None:
+                    protected_files += 1
+                backups.append(backup)
+        # indicadores y copias corren juntos en el pool: se mide la etapa completa
+        observe_detector("ransomware", "parallel_pipeline", time.perf_counter() - t0, len(file_operations),
+                         len(suspicious_activities))
+
+        return self._build_result(endpoint_id, file_operations, suspicious_activities, protected_files, backups)
+
+    def create_pool(self, workers: Optional[int] = None) -> ProcessPoolExecutor:
+        """Pool de procesos cuyos workers analizan con la misma configuración que este servicio"""
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(self.files_root, self.indicators))
+
+    def scan_files(self, endpoint_id: str, paths: List[str],
+                   should_stop: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """Analiza archivos en disco: nombre (notas de rescate, extensiones) y SHA-256 contra los IOC.
+
+        Pensado para un lote de un trabajo de análisis; ``should_stop`` se consulta entre
+        archivos para poder cancelar sin esperar a que termine el lote.
+        """
+        t0 = time.perf_counter()
+        operations = []
+        bytes_scanned = 0
+        for path in paths:
+            if should_stop is not None and should_stop():
+                break
+            operation = {"operation_type": "SCAN", "file_path": path, "file_name": os.path.basename(path)}
+            try:
+                operation["sha256"] = hash_file(path, max_bytes=config.HASH_MAX_FILE_BYTES)
+                bytes_scanned += os.path.getsize(path)
+            except OSError:
+                operation["error"] = "unreadable"
+            operations.append(operation)
+        suspicious = [op for op in operations if self._is_suspicious_operation(op)]
+        # Los archivos legítimos candidatos a backup se guardan antes de que puedan cifrarse
+        flagged = {id(op) for op in suspicious}
+        protect = [op["file_path"] for op in operations
+                   if "sha256" in op and id(op) not in flagged and self._should_backup_file(op)]
+        known = []
+        index = self.threat_intel.index if self.threat_intel is not None else None
+        if index is not None:
+            hits = index.lookup_hashes([op.get("sha256") or "" for op in operations], self.threat_intel.hash_stats)
+            known = [op for op, hit in zip(operations, hits) if hit]
+        observe_detector("ransomware", "file_scan", time.perf_counter() - t0, len(operations),
+                         len(suspicious) + len(known))
         return {
+            "endpoint_id": endpoint_id,
+            "files_scanned": len(operations),
+            "bytes_scanned": bytes_scanned,
+            "unreadable": sum(1 for op in operations if "error" in op),
+            "suspicious_activities": suspicious,
+            "known_malicious": known,
+            "files_protected": len(protect) if self.backup_store is not None else 0,
+            "backup_snapshot": self._snapshot_paths(endpoint_id, protect) if self.backup_store is not None else None,
+        }
+
+    def _build_result(self, endpoint_id: str, file_operations: List[Dict], suspicious_activities: List[Dict],
+                      protected_files: int, backups: List[Optional[Dict]]) -> Dict[str, Any]:
+        n = len(file_operations)
+        # Una sola lectura: el índice puede cambiar de versión (o dejar de existir) entre dos accesos
+        index = self.threat_intel.index if self.threat_intel is not None else None
+        if index is not None:
+            t0 = time.perf_counter()
+            known = self._known_malicious(index, file_operations, backups)
+            observe_detector("ransomware", "threat_intel", time.perf_counter() - t0, n, len(known))
+            seen = {id(op) for op in suspicious_activities}
+            suspicious_activities.extend(op for op in known if id(op) not in seen)
+        policy_matches = 0
+        if self.policy_engine is not None:
+            t0 = time.perf_counter()
+            seen = {id(op) for op in suspicious_activities}
+            for operation, matches in zip(file_operations,
+                                          self.policy_engine.evaluate_batch("RANSOMWARE", file_operations)):
+                if matches:
+                    policy_matches += 1
+                    if id(operation) not in seen:
+                        suspicious_activities.append(operation)
+            observe_detector("ransomware", "policies", time.perf_counter() - t0, n, policy_matches)
+        result = {
             "endpoint_id": endpoint_id,
             "timestamp": datetime.utcnow(),
             "suspicious_activities": suspicious_activities,
             "files_protected": protected_files,
             "threat_level": "HIGH" if suspicious_activities else "LOW"
         }
+        if index is not None:
+            result["known_malicious_files"] = len(known)
+        if self.policy_engine is not None:
+            result["policy_matches"] = policy_matches
+        if self.behavior_tracker is not None:
+            # El tracker tiene estado: se alimenta en orden, también en el modo paralelo
+            t0 = time.perf_counter()
+            result["blocked_processes"] = self._track_behavior(endpoint_id, file_operations)
+            observe_detector("ransomware", "behavior", time.perf_counter() - t0, n, len(result["blocked_processes"]))
+            if result["blocked_processes"]:
+                result["threat_level"] = "HIGH"
+        if self.backup_store is not None:
+            result["backup_snapshot"] = self._snapshot_backups(endpoint_id, backups)
+        return result
+
+    def _track_behavior(self, endpoint_id: str, file_operations: List[Dict]) -> List[Dict[str, Any]]:
+        blocked = []
+        for operation in file_operations:
+            alert = self.behavior_tracker.observe(endpoint_id, operation)
+            if alert is not None:
+                action = self.block_malicious_process(alert)
+                action["score"] = alert["score"]
+                action["incident_id"] = alert.get("incident_id")
+                blocked.append(action)
+        return blocked
+
+    def _known_malicious(self, index: ThreatIntelIndex, file_operations: List[Dict],
+                         backups: List[Optional[Dict]]) -> List[Dict]:
+        """Operaciones cuyo SHA-256 (calculado o reportado por el agente) está en los IOC"""
+        hashes = [
+            backup["hash"] if backup is not None and backup.get("content_hashed") else operation.get('sha256') or ""
+            for operation, backup in zip(file_operations, backups)
+        ]
+        hits = index.lookup_hashes(hashes, self.threat_intel.hash_stats)
+        return [op for op, hit in zip(file_operations, hits) if hit]
+
+    def _snapshot_backups(self, endpoint_id: str, backups: List[Optional[Dict]]) -> Optional[str]:
+        """Guarda en el ChunkStore los archivos respaldados; devuelve el id del snapshot"""
+        return self._snapshot_paths(endpoint_id, [b["path"] for b in backups if b is not None and b.get("path")])
+
+    def _snapshot_paths(self, endpoint_id: str, paths: List[str]) -> Optional[str]:
+        if not paths:
+            return None
+        try:
+            return self.backup_store.snapshot(endpoint_id, paths)["id"]
+        except OSError:
+            return None
+
+    def record_incident(self, db: Session, endpoint_id: str, files_targeted: int, files_protected: int,
+                        backup_snapshot: Optional[str] = None,
+                        encryption_attempts: Optional[int] = None) -> RansomwareIncident:
+        """Registra un RansomwareIncident (de un flujo de operaciones o de un trabajo de análisis)"""
+        incident = RansomwareIncident(
+            endpoint_id=endpoint_id,
+            files_targeted=files_targeted,
+            files_protected=files_protected,
+            encryption_attempts=encryption_attempts if encryption_attempts is not None else files_targeted,
+            # Solo hay backup real si el ChunkStore creó un snapshot
+            backup_created=bool(backup_snapshot),
+        )
+        db.add(incident)
+        db.commit()
+        db.refresh(incident)
+        return incident
     
     def _is_suspicious_operation(self, operation: Dict) -> bool:
         """Detecta operaciones sospechosas de ransomware"""
+        matcher = self.indicators.matcher
         # Detectar cambios masivos de extensiones
         if operation.get('operation_type') == 'RENAME':
-            old_ext = operation.get('old_name', '').split('.')[-1].lower()
-            new_ext = operation.get('new_name', '').split('.')[-1].lower()
-            
-            suspicious_extensions = ['crypt', 'locked', 'encrypted', 'ransom']
-            if any(ext in new_ext for ext in suspicious_extensions):
+            new_name = operation.get('new_name') or ''
+            if matcher.is_ransomware_extension(new_name) or matcher.is_ransom_note(new_name):
                 return True
         
+        # Archivos encontrados en un análisis: notas de rescate o extensiones de cifrado
+        if operation.get('operation_type') == 'SCAN':
+            file_name = operation.get('file_name') or ''
+            return matcher.is_ransomware_extension(file_name) or matcher.is_ransom_note(file_name)
+
+        # Detectar notas de rescate creadas en el equipo
+        if operation.get('operation_type') in ('CREATE', 'WRITE') and matcher.is_ransom_note(operation.get('file_name') or ''):
+            return True
+        
         # Detectar múltiples operaciones de escritura en poco tiempo
-        if operation.get('operation_type') == 'WRITE' and operation.get('file_count', 0) > 100:
+        if operation.get('operation_type') == 'WRITE' and (operation.get('file_count') or 0) > 100:
             return True
             
         return False
     
     def _should_backup_file(self, operation: Dict) -> bool:
         """Determina si se debe crear backup del archivo"""
-        important_extensions = ['.doc', '.docx', '.pdf', '.xls', '.xlsx', '.ppt', '.pptx']
-        file_extension = operation.get('file_name', '').split('.')[-1].lower()
-        
-        return any(ext in file_extension for ext in important_extensions)
+        return self.indicators.matcher.is_backup_candidate(operation.get('file_name') or '')
     
     def _create_file_backup(self, operation: Dict):
         """Crea copia de seguridad a prueba de manipulación"""
-        # En producción, aquí se implementaría el sistema real de backup
+        path = _resolve_path(operation, self.files_root)
+        file_hash = None
+        if path is not None:
+            try:
+                file_hash = hash_file(path, max_bytes=config.HASH_MAX_FILE_BYTES)
+            except OSError:
+                path = None
+        if file_hash is None:
+            # Sin acceso al archivo: hash de los metadatos reportados
+            file_hash = hashlib.sha256(json.dumps(operation, sort_keys=True, default=str).encode()).hexdigest()
         backup_data = {
             "file_path": operation.get('file_path'),
             "file_name": operation.get('file_name'),
             "backup_time": datetime.utcnow(),
-            "hash": hashlib.sha256(json.dumps(operation).encode()).hexdigest()
+            "hash": file_hash,
+            "content_hashed": path is not None,
+            "path": path
         }
         return backup_data
     
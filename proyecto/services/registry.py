@@ -0,0 +1,158 @@
+"""Registro perezoso de los servicios usados por la API.
+
+Importar los módulos de servicios (numpy, índices de IOC, etc.) y crear sus instancias
+cuesta tiempo de arranque en cada worker aunque la mayoría de las rutas no los use. El
+registro solo comprueba con ``importlib.util.find_spec`` que el módulo y sus dependencias
+existen (sin importarlos) y crea la instancia compartida en el primer ``get``. Si el import
+o la construcción fallan, el servicio queda marcado como no disponible.
+"""
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+from importlib import import_module
+from importlib.util import find_spec
+from types import ModuleType
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceUnavailable(RuntimeError):
+    """El módulo del servicio (o una dependencia) no existe o no pudo inicializarse"""
+
+
+class _Entry:
+    __slots__ = ("name", "module", "factory", "requires", "available", "instance", "error")
+
+    def __init__(self, name: str, module: str, factory: Callable[[ModuleType], Any], requires: Tuple[str, ...]):
+        self.name = name
+        self.module = module
+        self.factory = factory
+        self.requires = requires
+        self.available: Optional[bool] = None
+        self.instance: Any = None
+        self.error: Optional[str] = None
+
+
+def _module_exists(name: str) -> bool:
+    try:
+        return find_spec(name) is not None
+    except (ImportError, ValueError):  # paquete padre inexistente
+        return False
+
+
+class ServiceRegistry:
+    def __init__(self):
+        self._entries: Dict[str, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, module: str, factory: Callable[[ModuleType], Any],
+                 requires: Iterable[str] = ()):
+        """``factory(modulo)`` devuelve la instancia compartida; ``requires`` son módulos externos"""
+        with self._lock:
+            self._entries[name] = _Entry(name, module, factory, tuple(requires))
+
+    def available(self, name: str) -> bool:
+        """True si el módulo y sus dependencias existen (sin importarlos) y no falló al cargarse"""
+        entry = self._entries.get(name)
+        if entry is None:
+            return False
+        if entry.available is None:
+            entry.available = all(_module_exists(m) for m in (entry.module,) + entry.requires)
+        return entry.available
+
+    def loaded(self, name: str) -> bool:
+        entry = self._entries.get(name)
+        return entry is not None and entry.instance is not None
+
+    def get(self, name: str) -> Any:
+        """Instancia compartida del servicio, creada en la primera llamada"""
+        entry = self._entries.get(name)
+        if entry is None:
+            raise ServiceUnavailable(f"unknown service '{name}'")
+        if entry.instance is not None:
+            return entry.instance
+        with self._lock:
+            if entry.instance is not None:
+                return entry.instance
+            if not self.available(name):
+                raise ServiceUnavailable(entry.error or f"service '{name}' is not installed")
+            try:
+                entry.instance = entry.factory(import_module(entry.module))
+            except Exception as e:
+                logger.exception("service %s failed to load", name)
+                entry.available = False
+                entry.error = f"service '{name}' failed to load: {e}"
+                raise ServiceUnavailable(entry.error) from e
+            return entry.instance
+
+    def get_optional(self, name: str) -> Any:
+        """Como get, pero None si el servicio no está disponible"""
+        try:
+            return self.get(name)
+        except ServiceUnavailable:
+            return None
+
+    def status(self) -> Dict[str, bool]:
+        return {name: self.available(name) for name in sorted(self._entries)}
+
+    def details(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {"available": self.available(name), "loaded": entry.instance is not None, "error": entry.error}
+            for name, entry in sorted(self._entries.items())
+        }
+
+
+registry = ServiceRegistry()
+
+
+def _threat_intel(m):
+    from proyecto import config
+    # Índice de IOC compartido; las consultas se omiten hasta que exista un índice en THREAT_INTEL_DIR
+    return m.ThreatIntelService(config.THREAT_INTEL_DIR)
+
+
+def _backup_store(m):
+    from proyecto import config
+    return m.ChunkStore(str(config.BACKUP_DIR))
+
+
+def _behavior_tracker(m):
+    from proyecto.app.database.database import SessionLocal
+    # Estado por proceso compartido por todos los lotes del worker; las alertas quedan como incidentes
+    return m.ProcessRateTracker(session_factory=SessionLocal)
+
+
+def _ransomware(m):
+    from proyecto import config
+    # Solo hay contenidos que respaldar si los agentes replican sus archivos bajo AGENT_FILES_ROOT
+    backup_store = registry.get_optional("backup_store") if config.AGENT_FILES_ROOT is not None else None
+    return m.RansomwareProtectionService(threat_intel=registry.get_optional("threat_intel"),
+                                         policy_engine=registry.get_optional("policy_engine"),
+                                         backup_store=backup_store,
+                                         behavior_tracker=registry.get_optional("behavior_tracker"),
+                                         files_root=config.AGENT_FILES_ROOT)
+
+
+def _network_defense(m):
+    # Ventana deslizante compartida: los escaneos repartidos en varias cargas se siguen detectando
+    from proyecto import config
+    detector = m.SlidingWindowDetector(expected_pairs=config.NETWORK_WINDOW_EXPECTED_PAIRS)
+    return m.NetworkAttackDefenseService(detector=detector,
+                                         threat_intel=registry.get_optional("threat_intel"),
+                                         policy_engine=registry.get_optional("policy_engine"))
+
+
+def _scan_jobs(m):
+    # El servicio de análisis (y numpy) se carga con el primer lote, no al iniciar el pool
+    return m.get_default_scheduler(service_factory=lambda: registry.get("ransomware"))
+
+
+registry.register("threat_intel", "proyecto.services.threat_intelligence", _threat_intel, requires=("numpy",))
+registry.register("policy_engine", "proyecto.services.policy_engine", lambda m: m.get_default_engine())
+registry.register("backup_store", "proyecto.services.backup_store", _backup_store)
+registry.register("behavior_tracker", "proyecto.services.behavior_monitor", _behavior_tracker)
+registry.register("ransomware", "proyecto.services.ransomware_protection", _ransomware, requires=("numpy",))
+registry.register("network_defense", "proyecto.services.network_defense", _network_defense, requires=("numpy",))
+registry.register("endpoint_protection", "proyecto.services.endpoint_protection", lambda m: m.EndpointProtectionService())
+registry.register("risk_scoring", "proyecto.services.risk_scoring", lambda m: m.get_default_engine())
+registry.register("scan_jobs", "proyecto.app.jobs", _scan_jobs)
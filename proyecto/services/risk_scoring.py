@@ -0,0 +1,359 @@
+from typing import Dict, Any, Optional, Callable, List, Iterable, Tuple
+from datetime import datetime, timezone
+import heapq
+import logging
+import math
+import threading
+import time
+
+from sqlalchemy import bindparam, select, update
+
+from proyecto.modelo.seguridad import Endpoint, Threat, RansomwareIncident
+
+logger = logging.getLogger(__name__)
+
+# Vida media (horas) de los agregados de amenazas e incidentes
+HALF_LIFE_HOURS = 72.0
+# Peso de cada amenaza según severidad y de cada incidente de ransomware
+SEVERITY_WEIGHTS = {"CRITICAL": 10.0, "HIGH": 5.0, "MEDIUM": 2.0, "LOW": 0.5}
+INCIDENT_WEIGHT = 15.0
+# Con esta carga ponderada la parte por amenazas llega a ~63 de 80 puntos
+LOAD_SCALE = 40.0
+# Puntos extra por no reportarse: 1 por hora desde STALE_AFTER_HOURS, hasta STALE_MAX
+STALE_AFTER_HOURS = 24.0
+STALE_MAX = 20.0
+# Se ignoran en la carga inicial los eventos con peso decaído por debajo de este valor
+BOOTSTRAP_HALF_LIVES = 10
+FLUSH_INTERVAL = 5.0
+# Endpoints por consulta (cláusula IN) al recalcular los puntajes pendientes desde la base
+FLUSH_BATCH = 500
+
+
+def _severity_weight(severity: Optional[str]) -> float:
+    return SEVERITY_WEIGHTS.get((severity or "").upper(), 1.0)
+
+
+def _epoch(ts: Optional[datetime]) -> float:
+    """Segundos desde epoch de un datetime naive en UTC (como los guarda el modelo)"""
+    if ts is None:
+        return time.time()
+    return ts.replace(tzinfo=timezone.utc).timestamp() if ts.tzinfo is None else ts.timestamp()
+
+
+class _EndpointRisk:
+    __slots__ = ("ref_ts", "load", "incidents", "last_seen", "score", "version", "computed_at")
+
+    def __init__(self, ts: float):
+        self.ref_ts = ts
+        self.load = 0.0
+        self.incidents = 0.0
+        self.last_seen: Optional[float] = None
+        self.score = 0.0
+        self.version = 0
+        self.computed_at = 0.0
+
+
+class RiskScoringEngine:
+    """Puntaje de riesgo incremental (0..100) por endpoint para ``Endpoint.risk_score``.
+
+    Cada endpoint guarda agregados con decaimiento exponencial: la carga de amenazas
+    ponderada por severidad y la cantidad de incidentes de ransomware, más su ``last_seen``.
+    Un evento nuevo solo actualiza los agregados de su endpoint y lo marca como pendiente;
+    ``flush`` recalcula los pendientes desde la base y los escribe con un UPDATE por lote.
+    Cada worker solo ve los inserts de su propio proceso, así que lo que se escribe en
+    ``endpoints.risk_score`` sale siempre de lo persistido (todos los procesos) y no de los
+    agregados en memoria; varios workers pueden hacer ``flush`` sin pisarse con puntajes
+    parciales. El top-K sale de un
+    heap con borrado perezoso, sin recorrer la tabla; ``refresh_stale`` recalcula (también
+    vía heap) los puntajes calculados hace más de ``max_age`` para que reflejen el decaimiento.
+    """
+
+    def __init__(
+        self,
+        half_life_hours: float = HALF_LIFE_HOURS,
+        session_factory: Optional[Callable[[], Any]] = None,
+    ):
+        self.half_life = half_life_hours * 3600.0
+        self.session_factory = session_factory
+        self._lock = threading.RLock()
+        self._endpoints: Dict[str, _EndpointRisk] = {}
+        self._dirty: set = set()
+        # (-score, version, endpoint_id) y (computed_at, version, endpoint_id)
+        self._by_score: List[Tuple[float, int, str]] = []
+        self._by_age: List[Tuple[float, int, str]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.updates_written = 0
+
+    def __len__(self) -> int:
+        return len(self._endpoints)
+
+    def _state(self, endpoint_id: str, ts: float) -> _EndpointRisk:
+        state = self._endpoints.get(endpoint_id)
+        if state is None:
+            state = self._endpoints[endpoint_id] = _EndpointRisk(ts)
+        return state
+
+    def _add(self, state: _EndpointRisk, ts: float, load: float = 0.0, incidents: float = 0.0):
+        # los agregados se expresan en el instante ref_ts; un evento más antiguo entra ya decaído
+        if ts > state.ref_ts:
+            decay = 0.5 ** ((ts - state.ref_ts) / self.half_life)
+            state.load *= decay
+            state.incidents *= decay
+            state.ref_ts = ts
+            weight = 1.0
+        else:
+            weight = 0.5 ** ((state.ref_ts - ts) / self.half_life)
+        state.load += load * weight
+        state.incidents += incidents * weight
+
+    def score(self, state: _EndpointRisk, now: Optional[float] = None) -> float:
+        now = now if now is not None else time.time()
+        decay = 0.5 ** (max(0.0, now - state.ref_ts) / self.half_life)
+        load = (state.load + INCIDENT_WEIGHT * state.incidents) * decay
+        value = 80.0 * (1.0 - math.exp(-load / LOAD_SCALE))
+        if state.last_seen is not None:
+            stale_hours = (now - state.last_seen) / 3600.0 - STALE_AFTER_HOURS
+            value += min(STALE_MAX, max(0.0, stale_hours))
+        return round(min(100.0, value), 2)
+
+    def _rescore(self, endpoint_id: str, now: float, dirty: bool = True):
+        state = self._endpoints[endpoint_id]
+        state.score = self.score(state, now)
+        state.version += 1
+        state.computed_at = now
+        heapq.heappush(self._by_score, (-state.score, state.version, endpoint_id))
+        heapq.heappush(self._by_age, (now, state.version, endpoint_id))
+        if dirty:
+            self._dirty.add(endpoint_id)
+        # compacta los heaps cuando las entradas obsoletas superan a las vigentes
+        if len(self._by_score) > 4 * len(self._endpoints) + 1024:
+            self._compact()
+
+    def _compact(self):
+        self._by_score = [(-s.score, s.version, e) for e, s in self._endpoints.items()]
+        self._by_age = [(s.computed_at, s.version, e) for e, s in self._endpoints.items()]
+        heapq.heapify(self._by_score)
+        heapq.heapify(self._by_age)
+
+    def observe_threats(self, rows: Iterable[Dict[str, Any]], now: Optional[float] = None):
+        """Agrega amenazas nuevas (dicts con endpoint_id, severity, detection_time)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            touched = set()
+            for row in rows:
+                endpoint_id = row.get("endpoint_id")
+                if endpoint_id is None:
+                    continue
+                ts = _epoch(row.get("detection_time"))
+                self._add(self._state(endpoint_id, ts), ts, load=_severity_weight(row.get("severity")))
+                touched.add(endpoint_id)
+            for endpoint_id in touched:
+                self._rescore(endpoint_id, now)
+
+    def observe_incidents(self, rows: Iterable[Dict[str, Any]], now: Optional[float] = None):
+        """Agrega incidentes de ransomware nuevos (dicts con endpoint_id, detection_time)"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            touched = set()
+            for row in rows:
+                endpoint_id = row.get("endpoint_id")
+                if endpoint_id is None:
+                    continue
+                ts = _epoch(row.get("detection_time"))
+                self._add(self._state(endpoint_id, ts), ts, incidents=1.0)
+                touched.add(endpoint_id)
+            for endpoint_id in touched:
+                self._rescore(endpoint_id, now)
+
+    def observe_endpoints(self, rows: Iterable[Dict[str, Any]]):
+        """Registra endpoints nuevos (dicts con id y last_seen)"""
+        for row in rows:
+            if row.get("id") is not None and row.get("last_seen") is not None:
+                self.touch(row["id"], row["last_seen"])
+
+    def touch(self, endpoint_id: str, last_seen: datetime, now: Optional[float] = None):
+        """Actualiza ``last_seen`` (componente de inactividad) de un endpoint"""
+        now = now if now is not None else time.time()
+        with self._lock:
+            ts = _epoch(last_seen)
+            state = self._state(endpoint_id, ts)
+            state.last_seen = ts
+            self._rescore(endpoint_id, now)
+
+    def top_k(self, k: int = 10) -> List[Dict[str, Any]]:
+        """Los ``k`` endpoints de mayor puntaje; O(k log n) más las entradas obsoletas"""
+        with self._lock:
+            result, kept = [], []
+            while self._by_score and len(result) < k:
+                item = heapq.heappop(self._by_score)
+                neg_score, version, endpoint_id = item
+                state = self._endpoints.get(endpoint_id)
+                if state is None or state.version != version:
+                    continue
+                kept.append(item)
+                result.append({
+                    "endpoint_id": endpoint_id,
+                    "risk_score": -neg_score,
+                    "computed_at": datetime.utcfromtimestamp(state.computed_at),
+                })
+            for item in kept:
+                heapq.heappush(self._by_score, item)
+            return result
+
+    def refresh_stale(self, max_age: float, now: Optional[float] = None) -> int:
+        """Recalcula los puntajes calculados hace más de ``max_age`` segundos"""
+        now = now if now is not None else time.time()
+        refreshed = 0
+        with self._lock:
+            cutoff = now - max_age
+            while self._by_age and self._by_age[0][0] < cutoff:
+                computed_at, version, endpoint_id = heapq.heappop(self._by_age)
+                state = self._endpoints.get(endpoint_id)
+                if state is None or state.version != version:
+                    continue
+                old = state.score
+                self._rescore(endpoint_id, now)
+                if state.score == old:
+                    self._dirty.discard(endpoint_id)
+                refreshed += 1
+        return refreshed
+
+    def flush(self, db=None) -> int:
+        """Recalcula desde la base los puntajes pendientes y los escribe con un UPDATE por lote"""
+        with self._lock:
+            if not self._dirty:
+                return 0
+            pending = list(self._dirty)
+            self._dirty = set()
+        own = db is None
+        if own:
+            db = self.session_factory()
+        try:
+            now = time.time()
+            persisted = self._persisted_states(db, pending, now)
+            with self._lock:
+                # el estado en memoria pasa a ser el persistido (incluye eventos de otros procesos);
+                # un evento que llegue mientras tanto vuelve a marcar el endpoint como pendiente
+                for endpoint_id in pending:
+                    if endpoint_id not in persisted:
+                        # sin fila en endpoints (id inventado o borrado): no se sigue ni se lista
+                        self._endpoints.pop(endpoint_id, None)
+                for endpoint_id, state in persisted.items():
+                    current = self._endpoints.get(endpoint_id)
+                    state.version = current.version if current is not None else 0
+                    self._endpoints[endpoint_id] = state
+                    self._rescore(endpoint_id, now, dirty=False)
+                params = [{"b_id": e, "b_score": s.score} for e, s in persisted.items()]
+            if params:
+                table = Endpoint.__table__
+                db.execute(
+                    update(table).where(table.c.id == bindparam("b_id")).values(risk_score=bindparam("b_score")),
+                    params,
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            with self._lock:
+                self._dirty.update(pending)
+            raise
+        finally:
+            if own:
+                db.close()
+        self.updates_written += len(params)
+        return len(params)
+
+    def _persisted_states(self, db, endpoint_ids: List[str], now: float) -> Dict[str, _EndpointRisk]:
+        """Agregados de cada endpoint (existente) calculados con las filas guardadas en la base"""
+        since = datetime.utcfromtimestamp(now - BOOTSTRAP_HALF_LIVES * self.half_life)
+        states: Dict[str, _EndpointRisk] = {}
+        for i in range(0, len(endpoint_ids), FLUSH_BATCH):
+            chunk = endpoint_ids[i:i + FLUSH_BATCH]
+            for endpoint_id, last_seen in db.execute(select(Endpoint.id, Endpoint.last_seen).where(Endpoint.id.in_(chunk))):
+                state = states[endpoint_id] = _EndpointRisk(now)
+                state.last_seen = _epoch(last_seen) if last_seen is not None else None
+            threats = db.execute(
+                select(Threat.endpoint_id, Threat.severity, Threat.detection_time)
+                .where(Threat.endpoint_id.in_(chunk), Threat.detection_time >= since)
+            )
+            for endpoint_id, severity, detection_time in threats:
+                state = states.get(endpoint_id)
+                if state is not None:
+                    self._add(state, _epoch(detection_time), load=_severity_weight(severity))
+            incidents = db.execute(
+                select(RansomwareIncident.endpoint_id, RansomwareIncident.detection_time)
+                .where(RansomwareIncident.endpoint_id.in_(chunk), RansomwareIncident.detection_time >= since)
+            )
+            for endpoint_id, detection_time in incidents:
+                state = states.get(endpoint_id)
+                if state is not None:
+                    self._add(state, _epoch(detection_time), incidents=1.0)
+        return states
+
+    def bootstrap(self, db, now: Optional[float] = None) -> int:
+        """Carga inicial única desde la base (solo eventos dentro de BOOTSTRAP_HALF_LIVES)"""
+        now = now if now is not None else time.time()
+        since = datetime.utcfromtimestamp(now - BOOTSTRAP_HALF_LIVES * self.half_life)
+        threats = db.execute(
+            select(Threat.endpoint_id, Threat.severity, Threat.detection_time)
+            .where(Threat.detection_time >= since)
+            .execution_options(yield_per=10_000)
+        )
+        for rows in threats.mappings().partitions():
+            self.observe_threats(rows, now)
+        incidents = db.execute(
+            select(RansomwareIncident.endpoint_id, RansomwareIncident.detection_time)
+            .where(RansomwareIncident.detection_time >= since)
+            .execution_options(yield_per=10_000)
+        )
+        for rows in incidents.mappings().partitions():
+            self.observe_incidents(rows, now)
+        for endpoint_id, last_seen in db.execute(select(Endpoint.id, Endpoint.last_seen)):
+            if last_seen is not None:
+                self.touch(endpoint_id, last_seen, now)
+        return len(self._endpoints)
+
+    def start(self, interval: float = FLUSH_INTERVAL, max_age: Optional[float] = None):
+        """Hilo en segundo plano que refresca puntajes viejos y hace ``flush`` periódicamente"""
+        if self._thread is not None:
+            return
+        max_age = max_age if max_age is not None else self.half_life / 24
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.refresh_stale(max_age)
+                    self.flush()
+                except Exception:
+                    logger.exception("risk score flush failed")
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="risk-scoring", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.flush()
+
+
+_default_engine: Optional[RiskScoringEngine] = None
+
+
+def get_default_engine() -> RiskScoringEngine:
+    """Motor compartido del proceso, alimentado por los inserts confirmados de amenazas/incidentes"""
+    global _default_engine
+    if _default_engine is None:
+        from proyecto import config
+        from proyecto.app import db_events
+        from proyecto.app.database.database import SessionLocal
+
+        engine = RiskScoringEngine(config.RISK_HALF_LIFE_HOURS, session_factory=SessionLocal)
+        db_events.on_insert(Threat, engine.observe_threats)
+        db_events.on_insert(RansomwareIncident, engine.observe_incidents)
+        db_events.on_insert(Endpoint, engine.observe_endpoints)
+        _default_engine = engine
+    return _default_engine
@@ -0,0 +1,495 @@
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from collections import Counter
+from datetime import datetime
+import math
+from pathlib import Path
+import argparse
+import csv
+import hashlib
+import ipaddress
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto (segundos) se revisa si hay una versión nueva del índice
+CHECK_INTERVAL = 5.0
+# Tasa de falsos positivos por defecto del filtro de Bloom de hashes
+BLOOM_FP_RATE = 0.01
+
+_SHA256_RE = re.compile(r"^[0-9a-fA-F]{64}$")
+# Patrones STIX simples: [ipv4-addr:value = '...'], [file:hashes.'SHA-256' = '...'], etc.
+_STIX_RE = re.compile(r"\[\s*([\w-]+):([\w.'-]+)\s*=\s*'([^']+)'\s*\]")
+_STIX_TYPES = {
+    "ipv4-addr": "ip",
+    "ipv6-addr": "ip",
+    "domain-name": "domain",
+    "url": "url",
+}
+
+
+def _domain_key_hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") & 0x7FFFFFFFFFFFFFFF
+
+
+def _reversed_label_paths(domain: str) -> List[str]:
+    """'a.evil.com' -> ['com.', 'com.evil.', 'com.evil.a.'] (caminos del trie de etiquetas)"""
+    labels = domain.strip().strip('.').lower().split('.')
+    paths = []
+    path = ""
+    for label in reversed(labels):
+        if not label:
+            continue
+        path += label + "."
+        paths.append(path)
+    return paths
+
+
+def classify_indicator(value: str, kind: Optional[str] = None) -> Optional[Tuple[str, str]]:
+    """Normaliza un indicador a (tipo, valor) con tipo en ip/sha256/domain"""
+    value = value.strip()
+    if not value:
+        return None
+    kind = (kind or "").strip().lower()
+    if kind in ("sha256", "hash", "file", "sha-256") or (not kind and _SHA256_RE.match(value)):
+        return ("sha256", value.lower()) if _SHA256_RE.match(value) else None
+    if kind in ("url",):
+        host = re.sub(r"^[a-z]+://", "", value, flags=re.I).split('/')[0].split(':')[0]
+        return classify_indicator(host)
+    if kind in ("domain", "hostname", "domain-name"):
+        return ("domain", value.lower().strip('.'))
+    try:
+        ipaddress.ip_network(value, strict=False)
+        return ("ip", value)
+    except ValueError:
+        if kind in ("ip", "cidr", "ipv4", "ipv6"):
+            return None
+    return ("domain", value.lower().strip('.'))
+
+
+def iter_feed(path: Path) -> Iterator[Tuple[str, str]]:
+    """Indicadores de un feed CSV (columnas type/value o una columna) o JSON estilo STIX"""
+    path = Path(path)
+    if path.suffix.lower() == ".json":
+        with path.open("r", encoding="utf-8") as f:
+            data = json.load(f)
+        objects = data.get("objects", data.get("indicators", [])) if isinstance(data, dict) else data
+        for obj in objects:
+            if isinstance(obj, str):
+                item = classify_indicator(obj)
+            elif "pattern" in obj:
+                for stix_type, prop, value in _STIX_RE.findall(obj["pattern"]):
+                    kind = "sha256" if stix_type == "file" and "256" in prop else _STIX_TYPES.get(stix_type)
+                    item = classify_indicator(value, kind) if kind else None
+                    if item:
+                        yield item
+                continue
+            else:
+                item = classify_indicator(str(obj.get("value", "")), obj.get("type"))
+            if item:
+                yield item
+        return
+
+    with path.open("r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        lowered = [h.strip().lower() for h in header]
+        value_col = next((lowered.index(c) for c in ("value", "indicator", "ioc") if c in lowered), None)
+        type_col = lowered.index("type") if "type" in lowered else None
+        if value_col is None:
+            # sin encabezado: la primera columna es el valor
+            value_col = 0
+            item = classify_indicator(header[0]) if header else None
+            if item:
+                yield item
+        for row in reader:
+            if len(row) <= value_col or row[value_col].startswith('#'):
+                continue
+            kind = row[type_col] if type_col is not None and len(row) > type_col else None
+            item = classify_indicator(row[value_col], kind)
+            if item:
+                yield item
+
+
+def _merge_intervals(starts: List[int], ends: List[int]) -> Tuple[List[int], List[int]]:
+    order = sorted(range(len(starts)), key=starts.__getitem__)
+    merged_s: List[int] = []
+    merged_e: List[int] = []
+    for i in order:
+        s, e = starts[i], ends[i]
+        if merged_e and s <= merged_e[-1] + 1:
+            if e > merged_e[-1]:
+                merged_e[-1] = e
+        else:
+            merged_s.append(s)
+            merged_e.append(e)
+    return merged_s, merged_e
+
+
+def build_index(feeds: Iterable[Path], root: Path, bloom_fp_rate: float = BLOOM_FP_RATE) -> Path:
+    """Compila los feeds en una versión nueva del índice bajo ``root`` y la publica.
+
+    La versión (incluido el filtro de Bloom de hashes) se escribe en un directorio propio y
+    luego se actualiza ``root/CURRENT`` con un rename atómico, de modo que los lectores
+    nunca ven un índice a medio escribir.
+    """
+    _check_fp_rate(bloom_fp_rate)  # antes de leer los feeds
+    root = Path(root)
+    v4_s: List[int] = []
+    v4_e: List[int] = []
+    v6_s: List[int] = []
+    v6_e: List[int] = []
+    hashes = set()
+    domains = set()
+    sources = []
+    for feed in feeds:
+        sources.append(str(feed))
+        for kind, value in iter_feed(feed):
+            if kind == "ip":
+                net = ipaddress.ip_network(value, strict=False)
+                start, end = int(net.network_address), int(net.broadcast_address)
+                if net.version == 4:
+                    v4_s.append(start)
+                    v4_e.append(end)
+                else:
+                    v6_s.append(start)
+                    v6_e.append(end)
+            elif kind == "sha256":
+                hashes.add(bytes.fromhex(value))
+            else:
+                paths = _reversed_label_paths(value)
+                if paths:
+                    domains.add(paths[-1])
+
+    version = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    out = root / version
+    out.mkdir(parents=True)
+    v4_s, v4_e = _merge_intervals(v4_s, v4_e)
+    v6_s, v6_e = _merge_intervals(v6_s, v6_e)
+    np.save(out / "ipv4_start.npy", np.array(v4_s, dtype=np.uint32))
+    np.save(out / "ipv4_end.npy", np.array(v4_e, dtype=np.uint32))
+    np.save(out / "ipv6_start.npy", np.array([x.to_bytes(16, "big") for x in v6_s], dtype="S16"))
+    np.save(out / "ipv6_end.npy", np.array([x.to_bytes(16, "big") for x in v6_e], dtype="S16"))
+    sha256 = np.array(sorted(hashes), dtype="S32")
+    np.save(out / "sha256.npy", sha256)
+    bloom = HashBloomFilter.build(sha256, bloom_fp_rate)
+    bloom.save(out / "sha256_bloom.npy")
+    domain_hashes = np.array(sorted({_domain_key_hash(d) for d in domains}), dtype=np.int64)
+    np.save(out / "domains.npy", domain_hashes)
+    meta = {
+        "version": version,
+        "built": datetime.utcnow().isoformat(),
+        "sources": sources,
+        "counts": {
+            "ipv4_ranges": len(v4_s),
+            "ipv6_ranges": len(v6_s),
+            "sha256": len(hashes),
+            "domains": len(domain_hashes),
+        },
+        "bloom": {"num_bits": bloom.num_bits, "num_hashes": bloom.num_hashes, "fp_rate": bloom_fp_rate},
+    }
+    with (out / "meta.json").open("w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+    tmp = root / f".CURRENT-{uuid.uuid4().hex[:8]}"
+    tmp.write_text(version, encoding="ascii")
+    os.replace(tmp, root / "CURRENT")
+    return out
+
+
+def prune_versions(root: Path, keep: int = 2):
+    """Borra versiones antiguas del índice dejando las ``keep`` más recientes"""
+    root = Path(root)
+    current = (root / "CURRENT").read_text(encoding="ascii").strip()
+    versions = sorted(p for p in root.iterdir() if p.is_dir() and not p.name.startswith('.'))
+    for p in versions[:-keep] if keep > 0 else versions:
+        if p.name != current:
+            shutil.rmtree(p, ignore_errors=True)
+
+
+def _check_fp_rate(fp_rate: float):
+    if not 0 < fp_rate < 1:  # también rechaza NaN
+        raise ValueError(f"bloom fp_rate must be between 0 and 1 (exclusive), got {fp_rate!r}")
+
+
+class HashBloomFilter:
+    """Filtro de Bloom sobre digests SHA-256, usado antes de la búsqueda exacta.
+
+    Un SHA-256 ya es uniforme, así que las ``num_hashes`` posiciones salen de los primeros
+    16 bytes del digest (doble hashing ``h1 + i*h2``) sin volver a hashear. Los bits se
+    guardan como un array ``uint8`` en ``.npy`` y se abren con memory-mapping.
+    """
+
+    def __init__(self, bits: np.ndarray, num_bits: int, num_hashes: int):
+        self.bits = bits
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+
+    @classmethod
+    def build(cls, digests: np.ndarray, fp_rate: float = BLOOM_FP_RATE) -> "HashBloomFilter":
+        """Filtro dimensionado para ``fp_rate``; ValueError si no está en el intervalo (0, 1)"""
+        _check_fp_rate(fp_rate)
+        n = max(len(digests), 1)
+        num_bits = max(64, int(math.ceil(-n * math.log(fp_rate) / (math.log(2) ** 2))))
+        num_bits = (num_bits + 7) // 8 * 8
+        num_hashes = max(1, int(round(num_bits / n * math.log(2)))) if len(digests) else 1
+        bloom = cls(np.zeros(num_bits // 8, dtype=np.uint8), num_bits, num_hashes)
+        if len(digests):
+            pos = bloom._positions(digests).ravel()
+            np.bitwise_or.at(bloom.bits, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+        return bloom
+
+    @classmethod
+    def load(cls, path: Path, num_bits: int, num_hashes: int) -> "HashBloomFilter":
+        return cls(np.load(path, mmap_mode="r"), num_bits, num_hashes)
+
+    def save(self, path: Path):
+        np.save(path, np.asarray(self.bits))
+
+    def _positions(self, digests: np.ndarray) -> np.ndarray:
+        words = np.frombuffer(np.ascontiguousarray(digests).tobytes(), dtype="<u8").reshape(-1, 4)
+        h1 = words[:, 0]
+        h2 = words[:, 1] | np.uint64(1)
+        i = np.arange(self.num_hashes, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return (h1[:, None] + i[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def might_contain(self, digests: np.ndarray) -> np.ndarray:
+        """False = seguro que no está; True = puede estar (requiere búsqueda exacta)"""
+        if len(digests) == 0:
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(digests)
+        bits = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+
+class ThreatIntelIndex:
+    """Una versión del índice de IOC, abierta con memory-mapping (sin re-parsear feeds).
+
+    - IPv4/IPv6: arrays ordenados de intervalos [inicio, fin] sin solapamiento (CIDR).
+    - SHA-256: array ordenado de digests de 32 bytes, con un filtro de Bloom delante que
+      descarta la mayoría de los hashes benignos sin tocar el array.
+    - Dominios: trie de etiquetas invertidas ("com.evil.") guardado como el array ordenado
+      de los hashes de 64 bits de cada camino terminal; un dominio coincide si alguno de
+      sus caminos (el propio dominio o un padre) está en el índice.
+    Todas las búsquedas son por lote y usan ``np.searchsorted``.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+        def load(name: str) -> np.ndarray:
+            return np.load(self.path / name, mmap_mode="r")
+
+        self.ipv4_start = load("ipv4_start.npy")
+        self.ipv4_end = load("ipv4_end.npy")
+        self.ipv6_start = load("ipv6_start.npy")
+        self.ipv6_end = load("ipv6_end.npy")
+        self.sha256 = load("sha256.npy")
+        self.domains = load("domains.npy")
+        with (self.path / "meta.json").open("r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        bloom = self.meta.get("bloom")
+        self.bloom: Optional[HashBloomFilter] = None
+        if bloom and (self.path / "sha256_bloom.npy").exists():
+            self.bloom = HashBloomFilter.load(self.path / "sha256_bloom.npy", bloom["num_bits"], bloom["num_hashes"])
+
+    @classmethod
+    def open_current(cls, root: Path) -> Optional["ThreatIntelIndex"]:
+        current = Path(root) / "CURRENT"
+        if not current.exists():
+            return None
+        return cls(Path(root) / current.read_text(encoding="ascii").strip())
+
+    @property
+    def version(self) -> str:
+        return self.meta["version"]
+
+    @staticmethod
+    def _in_intervals(starts: np.ndarray, ends: np.ndarray, values: np.ndarray) -> np.ndarray:
+        if len(starts) == 0 or len(values) == 0:
+            return np.zeros(len(values), dtype=bool)
+        idx = np.searchsorted(starts, values, side="right") - 1
+        valid = idx >= 0
+        hit = np.zeros(len(values), dtype=bool)
+        hit[valid] = ends[idx[valid]] >= values[valid]
+        return hit
+
+    def lookup_ips(self, ips: Iterable[str]) -> List[bool]:
+        ips = list(ips)
+        result = np.zeros(len(ips), dtype=bool)
+        v4_pos, v4_val, v6_pos, v6_val = [], [], [], []
+        for i, ip in enumerate(ips):
+            try:
+                addr = ipaddress.ip_address(ip)
+            except (ValueError, TypeError):
+                continue
+            if addr.version == 4:
+                v4_pos.append(i)
+                v4_val.append(int(addr))
+            else:
+                v6_pos.append(i)
+                v6_val.append(addr.packed)
+        if v4_pos:
+            result[v4_pos] = self._in_intervals(self.ipv4_start, self.ipv4_end, np.array(v4_val, dtype=np.uint32))
+        if v6_pos:
+            result[v6_pos] = self._in_intervals(self.ipv6_start, self.ipv6_end, np.array(v6_val, dtype="S16"))
+        return result.tolist()
+
+    def lookup_hashes(self, hashes: Iterable[str], stats: Optional[Counter] = None) -> List[bool]:
+        """Busca hashes SHA-256 (hex); ``stats`` acumula cuántos resolvió el filtro de Bloom"""
+        hashes = list(hashes)
+        result = np.zeros(len(hashes), dtype=bool)
+        pos, values = [], []
+        for i, h in enumerate(hashes):
+            if h and len(h) == 64:
+                try:
+                    values.append(bytes.fromhex(h))
+                    pos.append(i)
+                except ValueError:
+                    pass
+        if not pos:
+            return result.tolist()
+        pos = np.array(pos)
+        arr = np.array(values, dtype="S32")
+        checked = len(arr)
+        if self.bloom is not None:
+            candidates = self.bloom.might_contain(arr)
+            pos, arr = pos[candidates], arr[candidates]
+        hits = 0
+        if len(arr) and len(self.sha256):
+            idx = np.searchsorted(self.sha256, arr)
+            idx_clipped = np.minimum(idx, len(self.sha256) - 1)
+            found = (idx < len(self.sha256)) & (self.sha256[idx_clipped] == arr)
+            result[pos] = found
+            hits = int(found.sum())
+        if stats is not None:
+            stats["hash_checks"] += checked
+            stats["exact_lookups"] += len(arr)
+            stats["exact_lookups_avoided"] += checked - len(arr)
+            stats["hash_hits"] += hits
+        return result.tolist()
+
+    def lookup_domains(self, domains: Iterable[str]) -> List[bool]:
+        domains = list(domains)
+        owners, keys = [], []
+        for i, d in enumerate(domains):
+            for path in _reversed_label_paths(d or ""):
+                owners.append(i)
+                keys.append(_domain_key_hash(path))
+        result = np.zeros(len(domains), dtype=bool)
+        if keys and len(self.domains):
+            arr = np.array(keys, dtype=np.int64)
+            idx = np.minimum(np.searchsorted(self.domains, arr), len(self.domains) - 1)
+            hits = self.domains[idx] == arr
+            result[np.array(owners)[hits]] = True
+        return result.tolist()
+
+
+class ThreatIntelService:
+    """Acceso compartido al índice vigente; cambia de versión sin reiniciar el proceso"""
+
+    def __init__(self, root: Path, check_interval: float = CHECK_INTERVAL):
+        self.root = Path(root)
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._next_check = 0.0
+        self._current_name: Optional[str] = None
+        # Versión que no se pudo abrir: no se reintenta (ni se vuelve a loguear) hasta que CURRENT cambie
+        self._failed_name: Optional[str] = None
+        self._index: Optional[ThreatIntelIndex] = None
+        # Contadores acumulados del prefiltro de hashes (sobreviven a los cambios de versión)
+        self.hash_stats: Counter = Counter()
+        self.reload()
+
+    def reload(self) -> bool:
+        """Abre la versión apuntada por CURRENT si cambió; si no se puede abrir, se mantiene la anterior"""
+        with self._lock:
+            try:
+                name = (self.root / "CURRENT").read_text(encoding="ascii").strip()
+            except OSError:
+                return False
+            if name in (self._current_name, self._failed_name):
+                return False
+            try:
+                index = ThreatIntelIndex(self.root / name)
+            except Exception:
+                logger.exception("could not open threat intel index %s; keeping %s", name, self._current_name)
+                self._failed_name = name
+                return False
+            self._index = index
+            self._current_name = name
+            self._failed_name = None
+            return True
+
+    @property
+    def index(self) -> Optional[ThreatIntelIndex]:
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.reload()
+        return self._index
+
+    def lookup_ips(self, ips: Iterable[str]) -> List[bool]:
+        index = self.index
+        ips = list(ips)
+        return index.lookup_ips(ips) if index is not None else [False] * len(ips)
+
+    def lookup_hashes(self, hashes: Iterable[str]) -> List[bool]:
+        index = self.index
+        hashes = list(hashes)
+        return index.lookup_hashes(hashes, self.hash_stats) if index is not None else [False] * len(hashes)
+
+    def lookup_domains(self, domains: Iterable[str]) -> List[bool]:
+        index = self.index
+        domains = list(domains)
+        return index.lookup_domains(domains) if index is not None else [False] * len(domains)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del prefiltro: búsquedas exactas evitadas y falsos positivos observados"""
+        index = self._index
+        stats = dict(self.hash_stats)
+        checks = stats.get("hash_checks", 0)
+        exact = stats.get("exact_lookups", 0)
+        false_positives = exact - stats.get("hash_hits", 0)
+        negatives = checks - stats.get("hash_hits", 0)
+        stats.update({
+            "version": index.version if index is not None else None,
+            "bloom": index.meta.get("bloom") if index is not None else None,
+            "avoided_ratio": round(stats.get("exact_lookups_avoided", 0) / checks, 4) if checks else 0.0,
+            "observed_fp_rate": round(false_positives / negatives, 6) if negatives else 0.0,
+        })
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compila feeds de IOC (CSV / JSON estilo STIX) en el índice")
+    parser.add_argument("feeds", nargs="+", type=Path)
+    parser.add_argument("--out", type=Path, default=None, help="directorio del índice (config.THREAT_INTEL_DIR)")
+    parser.add_argument("--keep", type=int, default=2, help="versiones a conservar")
+    parser.add_argument("--bloom-fp-rate", type=float, default=None,
+                        help="falsos positivos del filtro de Bloom (config.THREAT_INTEL_BLOOM_FP_RATE)")
+    args = parser.parse_args()
+    if args.out is None or args.bloom_fp_rate is None:
+        from proyecto import config
+        args.out = args.out or config.THREAT_INTEL_DIR
+        args.bloom_fp_rate = args.bloom_fp_rate or config.THREAT_INTEL_BLOOM_FP_RATE
+    t0 = time.perf_counter()
+    out = build_index(args.feeds, args.out, args.bloom_fp_rate)
+    prune_versions(args.out, args.keep)
+    with (out / "meta.json").open("r", encoding="utf-8") as f:
+        print(json.dumps(json.load(f)["counts"]), f"({time.perf_counter() - t0:.1f} s) -> {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 // Simple admin UI: carga features y servicios, permite togglear features
 async function fetchJSON(path, opts) {
   const res = await fetch(path, opts);
+  // session expired or revoked: back to the login form
+  if (res.status === 401) { location.href = '/admin/login'; }
   if (!res.ok) throw new Error(`${res.status} ${res.statusText}`);
   return res.json();
 }
 
+// Element with plain-text content: server data (names, hostnames, ids) is never parsed as HTML
+function textEl(tag, text, style) {
+  const e = document.createElement(tag);
+  e.textContent = text == null ? '' : String(text);
+  if (style) e.style.cssText = style;
+  return e;
+}
+
 function makeSwitch(enabled){
   const s = document.createElement('div');
   s.className = 'switch' + (enabled ? ' on' : '');
@@ -22,7 +32,8 @@ function renderFeatures(features) {
     const row = document.createElement('div');
     row.className = 'feature';
     const title = document.createElement('div');
-    title.innerHTML = `<div style="font-weight:600">${info.name || key}</div><div style="font-size:12px;color:var(--muted)">${key}</div>`;
+    title.appendChild(textEl('div', info.name || key, 'font-weight:600'));
+    title.appendChild(textEl('div', key, 'font-size:12px;color:var(--muted)'));
     const ctrl = makeSwitch(info.enabled);
     ctrl.onclick = async () => {
       try{
@@ -30,9 +41,7 @@ function renderFeatures(features) {
         await fetchJSON(`/api/v1/features/${encodeURIComponent(key)}`, {
           method:'PUT',headers:{'Content-Type':'application/json'},body:JSON.stringify({enabled: !info.enabled})
         });
-        info.enabled = !info.enabled;
-        if(info.enabled) ctrl.classList.add('on'); else ctrl.classList.remove('on');
-        updateSummary();
+        // the server pushes the change back over /ws/events; no re-fetch needed
       }catch(e){ alert('Error: '+e.message) }
       finally{ ctrl.classList.remove('disabled') }
     };
@@ -50,7 +59,9 @@ async function loadServices() {
     let up = 0;
     for (const [k, v] of Object.entries(data.services || {})) {
       const d = document.createElement('div');
-      d.innerHTML = `<strong>${k}</strong>: <span class="${v ? 'status-ok' : 'status-bad'}">${v ? 'Disponible' : 'No disponible'}</span>`;
+      const state = textEl('span', v ? 'Disponible' : 'No disponible');
+      state.className = v ? 'status-ok' : 'status-bad';
+      d.append(textEl('strong', k), ': ', state);
       el.appendChild(d);
       if (v) up++;
     }
@@ -64,6 +75,7 @@ async function loadFeatures(){
   try{
     const data = await fetchJSON('/api/v1/features');
     const f = data.features || {};
+    currentFeatures = f;
     renderFeatures(f);
     let active = Object.values(f).filter(x=>x.enabled).length;
     document.getElementById('num-features').innerText = active;
@@ -78,6 +90,53 @@ function updateSummary(){
   loadServices();
 }
 
+// Live updates: the server pushes change events instead of the UI polling
+let currentFeatures = {};
+let devicesReloadTimer = null;
+
+function applyFeatureEvent(ev) {
+  const key = ev.key.replace(/^feature:/, '');
+  currentFeatures[key] = Object.assign({}, currentFeatures[key], ev.data);
+  renderFeatures(currentFeatures);
+  document.getElementById('num-features').innerText = Object.values(currentFeatures).filter(x => x.enabled).length;
+}
+
+function scheduleDevicesReload() {
+  // coalesce bursts (bulk imports, many edits) into a single reload of the first page
+  if (devicesReloadTimer) return;
+  devicesReloadTimer = setTimeout(() => { devicesReloadTimer = null; fetchDevices(); }, 300);
+}
+
+function applyDeviceEvent(ev) {
+  const row = document.querySelector(`[data-device-id="${ev.data.id}"]`);
+  if (ev.type === 'updated' && row) {
+    row.replaceWith(renderDeviceRow(ev.data));
+  } else if (ev.type === 'deleted' && row) {
+    row.remove();
+  } else {
+    scheduleDevicesReload();
+  }
+}
+
+function handleEvent(ev) {
+  if (ev.type === 'resync') { updateSummary(); fetchDevices(); return; }
+  if (ev.topic === 'features') applyFeatureEvent(ev);
+  else if (ev.topic === 'devices') applyDeviceEvent(ev);
+  else if (ev.topic === 'threats') simulateAlert(`${ev.data.severity || ''} ${ev.data.name} (${ev.data.endpoint_id || '—'})`);
+  else if (ev.topic === 'scans' && ev.data.done) simulateAlert(`Análisis de ${ev.data.endpoint_id}${ev.data.status ? ' (' + ev.data.status + ')' : ''}: ${ev.data.suspicious_activities} actividades sospechosas`);
+}
+
+function connectEvents(retryMs = 1000) {
+  const proto = location.protocol === 'https:' ? 'wss' : 'ws';
+  const ws = new WebSocket(`${proto}://${location.host}/ws/events`);
+  ws.onopen = () => { retryMs = 1000; };
+  ws.onmessage = (msg) => JSON.parse(msg.data).forEach(handleEvent);
+  ws.onclose = () => {
+    // reconnect with backoff and reload, since events may have been missed meanwhile
+    setTimeout(() => { updateSummary(); fetchDevices(); connectEvents(Math.min(retryMs * 2, 30000)); }, retryMs);
+  };
+}
+
 // Demo helpers: simulate scan, alerts and export
 async function simulateScan() {
   const featuresEl = document.getElementById('features-list');
@@ -101,7 +160,9 @@ async function simulateScan() {
   fake.recommendations.forEach(r => {
     const d = document.createElement('div');
     d.className = 'feature';
-    d.innerHTML = `<div>${r}</div><div class="status-bad">Recomendado</div>`;
+    const tag = textEl('div', 'Recomendado');
+    tag.className = 'status-bad';
+    d.append(textEl('div', r), tag);
     featuresEl.appendChild(d);
   });
   document.getElementById('num-features').innerText = fake.vulnerabilities;
@@ -112,54 +173,74 @@ async function simulateScan() {
 async function simulateAlert(seedMsg) {
   const el = document.getElementById('services-status');
   const a = document.createElement('div');
-  a.innerHTML = `<strong>ALERTA</strong>: ${seedMsg}`;
+  a.append(textEl('strong', 'ALERTA'), `: ${seedMsg}`);
   a.style.color = '#ffb86b';
   el.prepend(a);
 }
 
-// Devices CRUD client
-async function fetchDevices() {
+// Devices CRUD client (keyset pagination: the API returns next_cursor for the following page)
+const DEVICES_PAGE_SIZE = 50;
+let devicesCursor = null;
+
+async function fetchDevices(append = false) {
   try {
-    const res = await fetch('/api/v1/devices');
-    const j = await res.json();
-    renderDevices(j.devices || []);
+    const params = new URLSearchParams({ limit: DEVICES_PAGE_SIZE });
+    if (append && devicesCursor) params.set('cursor', devicesCursor);
+    const j = await fetchJSON(`/api/v1/devices?${params}`);
+    devicesCursor = j.next_cursor || null;
+    renderDevices(j.devices || [], append);
   } catch (e) {
     document.getElementById('devices-list').innerText = 'Error cargando dispositivos: ' + e.message;
   }
 }
 
-function renderDevices(devices) {
+function renderDevices(devices, append = false) {
   const el = document.getElementById('devices-list');
-  el.innerHTML = '';
-  if (devices.length === 0) {
+  if (!append) el.innerHTML = '';
+  const oldMore = document.getElementById('devices-more');
+  if (oldMore) oldMore.remove();
+  if (!append && devices.length === 0) {
     el.innerText = 'No hay dispositivos registrados.';
     return;
   }
-  devices.forEach(d => {
-    const row = document.createElement('div');
-    row.className = 'feature';
-    row.innerHTML = `<div>
-        <div style="font-weight:600">${d.hostname} <span style="font-size:12px;color:var(--muted)">(${d.ip_address || '—'})</span></div>
-        <div style="font-size:12px;color:var(--muted)">${d.os || ''} • Últ. conexión: ${d.last_seen? d.last_seen.split('T')[0] : '—'}</div>
-      </div>`;
-    const controls = document.createElement('div');
-    const edit = document.createElement('button');
-    edit.className = 'btn';
-    edit.innerText = 'Editar';
-    edit.onclick = () => showDeviceForm(d);
-    const del = document.createElement('button');
-    del.className = 'btn ghost';
-    del.innerText = 'Eliminar';
-    del.onclick = async () => {
-      if (!confirm('Eliminar dispositivo?')) return;
-      await fetch(`/api/v1/devices/${d.id}`, { method: 'DELETE' });
-      fetchDevices();
-    };
-    controls.appendChild(edit);
-    controls.appendChild(del);
-    row.appendChild(controls);
-    el.appendChild(row);
-  });
+  devices.forEach(d => el.appendChild(renderDeviceRow(d)));
+  if (devicesCursor) {
+    const more = document.createElement('button');
+    more.id = 'devices-more';
+    more.className = 'btn ghost';
+    more.innerText = 'Cargar más';
+    more.onclick = () => fetchDevices(true);
+    el.appendChild(more);
+  }
+}
+
+function renderDeviceRow(d) {
+  const row = document.createElement('div');
+  row.className = 'feature';
+  row.dataset.deviceId = d.id;
+  const info = document.createElement('div');
+  const name = textEl('div', `${d.hostname} `, 'font-weight:600');
+  name.appendChild(textEl('span', `(${d.ip_address || '—'})`, 'font-size:12px;color:var(--muted)'));
+  info.appendChild(name);
+  info.appendChild(textEl('div', `${d.os || ''} • Últ. conexión: ${d.last_seen ? d.last_seen.split('T')[0] : '—'}`,
+                          'font-size:12px;color:var(--muted)'));
+  row.appendChild(info);
+  const controls = document.createElement('div');
+  const edit = document.createElement('button');
+  edit.className = 'btn';
+  edit.innerText = 'Editar';
+  edit.onclick = () => showDeviceForm(d);
+  const del = document.createElement('button');
+  del.className = 'btn ghost';
+  del.innerText = 'Eliminar';
+  del.onclick = async () => {
+    if (!confirm('Eliminar dispositivo?')) return;
+    await fetch(`/api/v1/devices/${d.id}`, { method: 'DELETE' });
+  };
+  controls.appendChild(edit);
+  controls.appendChild(del);
+  row.appendChild(controls);
+  return row;
 }
 
 function showDeviceForm(d) {
@@ -198,7 +279,6 @@ async function saveDevice() {
       await fetch('/api/v1/devices', { method: 'POST', headers: {'Content-Type':'application/json'}, body: JSON.stringify(payload) });
     }
     hideDeviceForm();
-    fetchDevices();
   } catch (e) {
     alert('Error guardando dispositivo: ' + e.message);
   }
@@ -215,7 +295,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
   document.getElementById('refresh').onclick = updateSummary;
   updateSummary();
-  setInterval(updateSummary, 30000);
+  connectEvents();
 
   const scanBtn = document.getElementById('demo-scan');
   if (scanBtn) scanBtn.onclick = () => simulateScan();
@@ -0,0 +1,9 @@
+import os
+import tempfile
+
+# Los tests nunca tocan proyecto/data.db ni proyecto/data
+_TMPDIR = tempfile.mkdtemp(prefix="proyecto_tests_")
+os.environ.setdefault("PROYECTO_DATABASE_URL", f"sqlite:///{_TMPDIR}/test.db")
+os.environ.setdefault("PROYECTO_THREAT_INTEL_DIR", f"{_TMPDIR}/threat_intel")
+os.environ.setdefault("PROYECTO_JWT_SECRET_FILE", f"{_TMPDIR}/jwt_secret")
+os.environ.setdefault("PROYECTO_BACKUP_DIR", f"{_TMPDIR}/backups")
@@ -0,0 +1,33 @@
+import pytest
+
+from proyecto.app.auth import InvalidToken, TokenService
+from proyecto.app.database.database import SessionLocal, init_db
+
+
+@pytest.fixture
+def workers():
+    init_db()
+    return [TokenService("test-secret", ttl=600, session_factory=SessionLocal) for _ in range(2)]
+
+
+def test_logout_on_one_worker_is_seen_by_the_others_after_sync(workers):
+    a, b = workers
+    token, claims = a.issue({"id": "u-logout", "username": "ana", "role": "operator"})
+    assert b.verify(token)["jti"] == claims["jti"]
+    a.revoke(claims)
+    with pytest.raises(InvalidToken):
+        a.verify(token)
+    b.sync()
+    with pytest.raises(InvalidToken):
+        b.verify(token)
+
+
+def test_user_cutoffs_are_shared_and_expired_rows_dropped(workers):
+    a, b = workers
+    token, _ = a.issue({"id": "u-disabled", "username": "beto", "role": "operator"})
+    a.revoke_user("u-disabled")
+    assert b.sync() >= 1
+    with pytest.raises(InvalidToken):
+        b.verify(token)
+    late = TokenService("test-secret", ttl=600, session_factory=SessionLocal, clock=lambda: 4e9)
+    assert late.sync() == 0
@@ -0,0 +1,149 @@
+import pytest
+
+from proyecto.services.backup_store import ChunkStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ChunkStore(str(tmp_path / "store"))
+
+
+def _forge_snapshot(store, endpoint_id, files):
+    """Manifest written as-is (like a tampered or foreign snapshot directory)"""
+    manifest = {"id": "99990101T000000000000-forged", "endpoint_id": endpoint_id, "created": "9999-01-01T00:00:00",
+                "parent": None, "files": files, "stats": {}}
+    store._write_manifest(manifest)
+    return manifest
+
+
+def test_restore_round_trip(store, tmp_path):
+    source = tmp_path / "src" / "report.docx"
+    source.parent.mkdir()
+    source.write_bytes(b"quarterly numbers" * 5000)
+    store.snapshot("ep1", [str(source)])
+    result = store.restore("ep1", str(tmp_path / "out"))
+    assert result["files_restored"] == 1
+    assert (tmp_path / "out" / str(source).lstrip("/")).read_bytes() == source.read_bytes()
+
+
+@pytest.mark.parametrize("path", ["../../x", "/a/../../../x", "a/../.."])
+def test_restore_rejects_paths_outside_dest_dir(store, tmp_path, path):
+    source = tmp_path / "src.docx"
+    source.write_bytes(b"payload")
+    entry = store.snapshot("ep1", [str(source)])["files"][str(source)]
+    forged = _forge_snapshot(store, "ep1", {"ok.docx": entry, path: entry})
+    dest = tmp_path / "a" / "b" / "out"
+    with pytest.raises(ValueError):
+        store.restore("ep1", str(dest), snapshot_id=forged["id"])
+    assert not (tmp_path / "a" / "x").exists() and not (tmp_path / "x").exists()
+    assert not (dest / "ok.docx").exists()  # nothing is written when any path is rejected
+
+
+def test_restore_rejects_symlinks_leaving_dest_dir(store, tmp_path):
+    source = tmp_path / "src.docx"
+    source.write_bytes(b"payload")
+    entry = store.snapshot("ep1", [str(source)])["files"][str(source)]
+    forged = _forge_snapshot(store, "ep1", {"link/x.docx": entry})
+    dest = tmp_path / "out"
+    dest.mkdir()
+    (dest / "link").symlink_to(tmp_path / "elsewhere", target_is_directory=True)
+    with pytest.raises(ValueError):
+        store.restore("ep1", str(dest), snapshot_id=forged["id"])
+
+
+def test_restore_rejects_unknown_snapshot_ids(store, tmp_path):
+    source = tmp_path / "src.docx"
+    source.write_bytes(b"payload")
+    store.snapshot("ep1", [str(source)])
+    for snapshot_id in ("../../index", "missing"):
+        with pytest.raises(KeyError):
+            store.restore("ep1", str(tmp_path / "out"), snapshot_id=snapshot_id)
+
+
+def test_delta_snapshots_store_only_changes(store, tmp_path, monkeypatch):
+    monkeypatch.setattr("proyecto.services.backup_store.CHECKPOINT_EVERY", 2)
+    a, b = tmp_path / "a.docx", tmp_path / "b.docx"
+    a.write_bytes(b"alpha" * 1000)
+    b.write_bytes(b"beta" * 1000)
+    first = store.snapshot("ep1", [str(a), str(b)])
+    assert first["full"] and set(first["files"]) == {str(a), str(b)}
+
+    b.write_bytes(b"changed" * 1000)
+    second = store.snapshot("ep1", [str(a), str(b)])
+    assert not second["full"] and second["parent"] == first["id"]
+    assert set(second["files"]) == {str(b)}
+
+    a.unlink()
+    third = store.snapshot("ep1", [], prune_missing=True)
+    assert third["full"]  # CHECKPOINT_EVERY alcanzado
+    assert set(third["files"]) == {str(b)}
+
+    latest = store.latest_snapshot("ep1")
+    assert latest["id"] == third["id"] and set(latest["files"]) == {str(b)}
+    # un ChunkStore nuevo (otro proceso) reconstruye la tabla desde los manifiestos
+    reopened = ChunkStore(str(store.root))
+    reopened.restore("ep1", str(tmp_path / "out"), snapshot_id=second["id"])
+    out = tmp_path / "out"
+    assert (out / str(a).lstrip("/")).read_bytes() == b"alpha" * 1000
+    assert (out / str(b).lstrip("/")).read_bytes() == b"changed" * 1000
+
+
+def test_gc_rewrites_oldest_kept_delta_as_checkpoint(store, tmp_path):
+    source = tmp_path / "doc.docx"
+    for i in range(4):
+        source.write_bytes(f"version {i} ".encode() * 2000)
+        store.snapshot("ep1", [str(source)])
+    result = store.gc(keep_last=2)
+    assert result["snapshots_removed"] == 2
+    kept = store.list_snapshots("ep1")
+    assert kept[0]["full"] and not kept[1]["full"]
+    store.restore("ep1", str(tmp_path / "out"), snapshot_id=kept[0]["id"])
+    assert (tmp_path / "out" / str(source).lstrip("/")).read_bytes() == b"version 2 " * 2000
+    store.restore("ep1", str(tmp_path / "out"))
+    assert (tmp_path / "out" / str(source).lstrip("/")).read_bytes() == b"version 3 " * 2000
+
+
+def test_gc_interrupted_before_the_index_rewrite_keeps_old_packs(store, tmp_path, monkeypatch):
+    source = tmp_path / "doc.docx"
+    for i in range(4):
+        source.write_bytes(f"version {i} ".encode() * 2000)
+        store.snapshot("ep1", [str(source)])
+
+    def crash():
+        raise RuntimeError("killed")
+
+    monkeypatch.setattr(store, "_rewrite_index", crash)
+    with pytest.raises(RuntimeError):
+        store.gc(keep_last=1, repack_threshold=1.0)
+    reopened = ChunkStore(str(store.root))
+    reopened.restore("ep1", str(tmp_path / "out"))
+    assert (tmp_path / "out" / str(source).lstrip("/")).read_bytes() == b"version 3 " * 2000
+    # the old index still lists the dead chunks: their packs must exist for dedup to reuse them
+    source.write_bytes(b"version 0 " * 2000)
+    reopened.snapshot("ep1", [str(source)])
+    reopened.restore("ep1", str(tmp_path / "out"))
+    assert (tmp_path / "out" / str(source).lstrip("/")).read_bytes() == b"version 0 " * 2000
+
+
+def test_restore_holds_the_shared_lock(store, tmp_path, monkeypatch):
+    fcntl = pytest.importorskip("fcntl")
+    source = tmp_path / "doc.docx"
+    source.write_bytes(b"payload" * 1000)
+    store.snapshot("ep1", [str(source)])
+    seen = []
+    read_chunk = store.read_chunk
+
+    def probe(digest):
+        with open(store.root / "lock", "a") as other:
+            fcntl.flock(other, fcntl.LOCK_SH | fcntl.LOCK_NB)  # other readers are fine
+            fcntl.flock(other, fcntl.LOCK_UN)
+            try:
+                fcntl.flock(other, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                seen.append("exclusive")
+            except BlockingIOError:
+                seen.append("blocked")
+        return read_chunk(digest)
+
+    monkeypatch.setattr(store, "read_chunk", probe)
+    store.restore("ep1", str(tmp_path / "out"))
+    assert seen and set(seen) == {"blocked"}
@@ -0,0 +1,60 @@
+import threading
+
+from proyecto.services.behavior_monitor import ProcessRateTracker
+
+
+def _burst(tracker, start, n=60, pid=42):
+    alerts = []
+    for i in range(n):
+        event = {"pid": pid, "operation_type": "RENAME", "old_name": f"f{i}.docx", "new_name": f"f{i}.docx.locked",
+                 "timestamp": start + i * 0.01}
+        write = {"pid": pid, "operation_type": "WRITE", "file_count": 5, "entropy": 7.9, "timestamp": start + i * 0.01}
+        alerts.extend(a for a in (tracker.observe("ep1", event), tracker.observe("ep1", write)) if a is not None)
+    return alerts
+
+
+def test_alerts_once_per_burst_and_again_after_the_score_drops():
+    tracker = ProcessRateTracker(half_life=1.0)
+    assert len(_burst(tracker, 1000.0)) == 1
+    assert len(_burst(tracker, 1001.0)) == 0  # still above the threshold
+    # quiet long enough for the decayed counters (and the score) to fall below the threshold
+    assert tracker.observe("ep1", {"pid": 42, "operation_type": "WRITE", "entropy": 1.0, "timestamp": 1100.0}) is None
+    assert len(_burst(tracker, 1100.0)) == 1
+
+
+def test_concurrent_observers_share_state_safely():
+    tracker = ProcessRateTracker(half_life=1.0)
+    alerts = []
+
+    def run():
+        alerts.extend(_burst(tracker, 1000.0, n=200))
+
+    threads = [threading.Thread(target=run) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(alerts) == 1 and len(tracker) == 1
+
+
+def test_registry_injects_the_tracker_into_the_ransomware_service():
+    from proyecto.services.registry import registry
+
+    assert isinstance(registry.get("ransomware").behavior_tracker, ProcessRateTracker)
+
+
+def test_null_or_invalid_fields_are_ignored():
+    tracker = ProcessRateTracker()
+    for event in ({"pid": 1, "operation_type": "WRITE", "timestamp": None, "file_count": None, "entropy": None},
+                  {"pid": 1, "operation_type": "RENAME", "old_name": None, "new_name": None},
+                  {"pid": 1, "operation_type": "WRITE", "timestamp": "soon", "file_count": "9", "entropy": "high"}):
+        assert tracker.observe("ep1", event, now=1000.0) is None
+    assert len(tracker) == 1
+
+
+def test_future_timestamps_do_not_evict_other_processes():
+    tracker = ProcessRateTracker(idle_ttl=60.0)
+    tracker.observe("ep1", {"pid": 1, "operation_type": "WRITE"}, now=1000.0)
+    tracker.observe("ep1", {"pid": 2, "operation_type": "WRITE", "timestamp": 1e15}, now=1001.0)
+    assert tracker.evict_idle(now=1010.0) == 0 and len(tracker) == 2
+    assert tracker.evict_idle(now=1100.0) == 2
@@ -0,0 +1,73 @@
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.app.device_import import upsert_devices
+from proyecto.modelo.device import Device
+
+
+def _hostnames(db, ids):
+    return {d.id: d.hostname for d in db.query(Device).filter(Device.id.in_(ids))}
+
+
+def test_new_and_existing_devices_are_split_into_inserts_and_updates():
+    init_db()
+    with SessionLocal() as db:
+        existing = Device(hostname="imp-existing", ip_address="10.9.0.1", os="Linux")
+        db.add(existing)
+        db.commit()
+        results = upsert_devices(db, [
+            {"hostname": "imp-new-1", "os": "Windows"},
+            {"hostname": "imp-existing", "os": "macOS"},
+            {"hostname": "imp-new-2", "active": "no"},
+        ])
+        assert [r["status"] for r in results] == ["created", "updated", "created"]
+        assert [r["row"] for r in results] == [0, 1, 2]
+        assert results[1]["id"] == existing.id
+        db.expire_all()
+        assert existing.os == "macOS" and existing.ip_address == "10.9.0.1"
+        new = db.get(Device, results[2]["id"])
+        assert new.hostname == "imp-new-2" and new.active is False
+        assert db.query(Device).filter(Device.hostname == "imp-existing").count() == 1
+
+
+def test_returned_ids_follow_input_order_across_chunks():
+    init_db()
+    rows = [{"hostname": f"imp-order-{i:03d}", "ip_address": f"10.8.0.{i}"} for i in range(50)]
+    with SessionLocal() as db:
+        results = upsert_devices(db, rows, chunk_size=7)
+        assert [r["row"] for r in results] == list(range(50))
+        assert all(r["status"] == "created" for r in results)
+        by_id = _hostnames(db, [r["id"] for r in results])
+        assert [by_id[r["id"]] for r in results] == [row["hostname"] for row in rows]
+        # a second import of the same payload only updates
+        again = upsert_devices(db, rows, chunk_size=7)
+        assert [r["id"] for r in again] == [r["id"] for r in results]
+        assert all(r["status"] == "updated" for r in again)
+
+
+def test_duplicates_and_invalid_rows_in_one_chunk():
+    init_db()
+    with SessionLocal() as db:
+        results = upsert_devices(db, [
+            {"hostname": "imp-dup", "os": "Linux"},
+            "not an object",
+            {"os": "Linux"},
+            {"hostname": "imp-dup", "os": "Windows"},
+        ], row_offset=10)
+        assert [r["row"] for r in results] == [10, 11, 12, 13]
+        assert [r["status"] for r in results] == ["created", "error", "error", "updated"]
+        assert results[0]["id"] == results[3]["id"]
+        # later rows win
+        assert db.get(Device, results[0]["id"]).os == "Windows"
+
+
+def test_ip_key_cannot_create_devices_without_hostname():
+    init_db()
+    with SessionLocal() as db:
+        db.add(Device(hostname="imp-by-ip", ip_address="10.7.0.1"))
+        db.commit()
+        results = upsert_devices(db, [
+            {"ip_address": "10.7.0.1", "os": "FreeBSD"},
+            {"ip_address": "10.7.0.2", "os": "FreeBSD"},
+        ], key="ip_address")
+        assert results[0]["status"] == "updated"
+        assert results[1] == {"row": 1, "status": "error", "error": "hostname is required"}
+        assert db.query(Device).filter(Device.ip_address == "10.7.0.2").count() == 0
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+from sqlalchemy import insert, update
+
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.services.endpoint_protection import EndpointProtectionService
+from proyecto.modelo.seguridad import Endpoint, Threat
+
+
+def _status(endpoint_id):
+    with SessionLocal() as db:
+        return EndpointProtectionService().get_endpoint_security_status(db, endpoint_id)["overall_status"]
+
+
+def test_cached_status_is_invalidated_by_new_and_resolved_threats():
+    init_db()
+    with SessionLocal() as db:
+        db.add(Endpoint(id="ep-cache", name="ep-cache", last_seen=datetime.utcnow()))
+        db.commit()
+    assert _status("ep-cache") == "PROTECTED"
+    with SessionLocal() as db:
+        threat = Threat(name="t", severity="CRITICAL", status="ACTIVE", endpoint_id="ep-cache")
+        db.add(threat)
+        db.commit()
+        assert _status("ep-cache") == "COMPROMISED"
+        threat.status = "RESOLVED"
+        db.commit()
+    # contained, but still a critical threat from the last 24 h
+    assert _status("ep-cache") == "AT_RISK"
+
+
+def test_core_inserts_and_bulk_updates_invalidate_too():
+    init_db()
+    with SessionLocal() as db:
+        db.add(Endpoint(id="ep-core", name="ep-core", last_seen=datetime.utcnow()))
+        db.commit()
+    assert _status("ep-core") == "PROTECTED"
+    with SessionLocal() as db:
+        db.execute(insert(Threat), [{"name": "t", "severity": "CRITICAL", "status": "ACTIVE", "endpoint_id": "ep-core"}])
+        db.commit()
+    assert _status("ep-core") == "COMPROMISED"
+    with SessionLocal() as db:
+        db.execute(update(Threat).where(Threat.endpoint_id == "ep-core").values(status="QUARANTINED"))
+        db.commit()
+    assert _status("ep-core") == "AT_RISK"
+
+
+def test_endpoint_updates_invalidate_its_status():
+    init_db()
+    with SessionLocal() as db:
+        endpoint = Endpoint(id="ep-edit", name="before", last_seen=datetime.utcnow())
+        db.add(endpoint)
+        db.commit()
+        service = EndpointProtectionService()
+        assert service.get_endpoint_security_status(db, "ep-edit")["name"] == "before"
+        endpoint.name = "after"
+        db.commit()
+        assert service.get_endpoint_security_status(db, "ep-edit")["name"] == "after"
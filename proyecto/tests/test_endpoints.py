@@ -0,0 +1,89 @@
+import os
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from proyecto import config
+from proyecto.app.auth import get_default_tokens
+from proyecto.api.endpoints import _scan_path, start_ransomware_scan
+
+
+@pytest.fixture
+def scan_root(tmp_path, monkeypatch):
+    root = tmp_path / "agents"
+    (root / "ep1").mkdir(parents=True)
+    (root / "ep1" / "a.docx").write_bytes(b"a")
+    (tmp_path / "etc").mkdir()
+    os.symlink(tmp_path / "etc", root / "ep1" / "escape")
+    monkeypatch.setattr(config, "SCAN_ROOTS", [root])
+    return root
+
+
+def test_scan_paths_must_resolve_under_a_scan_root(scan_root, tmp_path):
+    assert _scan_path(str(scan_root / "ep1")) == str((scan_root / "ep1").resolve())
+    assert _scan_path(str(scan_root / "ep1" / ".." / "ep1" / "a.docx")) == str((scan_root / "ep1" / "a.docx").resolve())
+    for path in ("/etc", str(tmp_path / "etc"), str(scan_root / "ep1" / "escape"), str(scan_root / ".." / "etc"),
+                 str(scan_root / "missing")):
+        assert _scan_path(path) is None
+
+
+def test_scan_request_outside_the_roots_is_rejected(scan_root):
+    with pytest.raises(HTTPException) as exc:
+        start_ransomware_scan({"endpoint_id": "ep1", "paths": [str(scan_root / "ep1"), "/etc"]})
+    assert exc.value.status_code == 400 and "/etc" in exc.value.detail
+
+
+def test_no_scan_roots_refuses_every_path(scan_root, monkeypatch):
+    monkeypatch.setattr(config, "SCAN_ROOTS", [])
+    assert _scan_path(str(scan_root / "ep1")) is None
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from proyecto.app.main import app
+
+    monkeypatch.setattr(config, "AUTH_ENABLED", True)
+    return TestClient(app)  # sin lifespan: no arranca servicios
+
+
+def _token():
+    token, _ = get_default_tokens().issue({"id": "u1", "username": "reader", "role": "operator"})
+    return token
+
+
+@pytest.mark.parametrize("path", [
+    "/api/v1/jobs", "/api/v1/jobs/abc", "/api/v1/policies", "/api/v1/policies/stats", "/metrics",
+    "/api/v1/devices", "/api/v1/devices/abc", "/api/v1/async/devices", "/api/v1/async/devices/abc",
+    "/api/v1/endpoints/status", "/api/v1/endpoints/risk/top", "/api/v1/endpoints/abc/status",
+    "/api/v1/threat-intel/stats", "/api/v1/features", "/api/v1/services/status",
+    "/api/v1/dashboard/threats/timeseries", "/api/v1/dashboard/threats/summary",
+    "/api/v1/heartbeats/online", "/api/v1/heartbeats/stats", "/api/v1/auth/me",
+])
+def test_reads_require_a_token(client, path):
+    assert client.get(path).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": f"Bearer {_token()}"}).status_code == 200
+
+
+def test_health_and_login_stay_public(client):
+    assert client.get("/api/v1/health").status_code == 200
+    response = client.post("/api/v1/auth/token", data={"username": "nobody", "password": "wrong-password"})
+    assert response.status_code == 401 and response.json()["detail"] == "Incorrect username or password"
+
+
+def test_event_socket_rejects_handshakes_without_a_valid_token(client):
+    for url, headers in (("/ws/events", {}), ("/ws/events?token=forged", {}),
+                         ("/ws/events", {"Authorization": "Bearer forged"})):
+        with pytest.raises(WebSocketDisconnect) as exc:
+            with client.websocket_connect(url, headers=headers):
+                pass
+        assert exc.value.code == 1008
+    token = _token()
+    for url, kwargs in ((f"/ws/events?token={token}", {}),
+                        ("/ws/events", {"headers": {"Authorization": f"Bearer {token}"}})):
+        with client.websocket_connect(url, **kwargs):
+            pass
+    client.cookies.set("access_token", token)
+    with client.websocket_connect("/ws/events"):
+        pass
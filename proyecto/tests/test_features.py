@@ -0,0 +1,93 @@
+import json
+import os
+
+import pytest
+
+from proyecto.app import features
+from proyecto.app.features import FeatureStore
+
+DEFAULTS = {
+    "a": {"name": "A", "enabled": True},
+    "b": {"name": "B", "enabled": False},
+}
+
+
+@pytest.fixture
+def path(tmp_path):
+    # never the real proyecto/data/features.json
+    return tmp_path / "features.json"
+
+
+def _write(path, data):
+    # the way another worker writes it: temp file + rename
+    tmp = path.with_name("external.tmp")
+    tmp.write_text(json.dumps(data), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def test_missing_file_is_created_with_defaults(path):
+    store = FeatureStore(path, DEFAULTS)
+    assert json.loads(path.read_text(encoding="utf-8")) == DEFAULTS
+    assert store.snapshot() == DEFAULTS
+    assert store.is_enabled("a") and not store.is_enabled("b") and not store.is_enabled("missing")
+
+
+def test_set_persists_and_notifies(path):
+    store = FeatureStore(path, DEFAULTS)
+    seen = []
+    unsubscribe = store.subscribe(lambda changes, version: seen.append((changes, version)))
+    version = store.version
+    assert store.set("b", True)
+    assert json.loads(path.read_text(encoding="utf-8"))["b"] == {"name": "B", "enabled": True}
+    assert seen == [({"b": {"name": "B", "enabled": True}}, version + 1)]
+    # no temp files left behind
+    assert [p.name for p in path.parent.iterdir()] == ["features.json"]
+    # unknown keys and no-op writes do not notify
+    assert not store.set("missing", True)
+    store.set("b", True)
+    unsubscribe()
+    store.set("a", False)
+    assert len(seen) == 1
+
+
+def test_failed_persist_keeps_file_and_snapshot(path, monkeypatch):
+    store = FeatureStore(path, DEFAULTS)
+    before = path.read_text(encoding="utf-8")
+
+    def fail(src, dst):
+        raise OSError("disk full")
+    monkeypatch.setattr(features.os, "replace", fail)
+    with pytest.raises(OSError):
+        store.set("a", False)
+    assert path.read_text(encoding="utf-8") == before
+    assert store.is_enabled("a")
+    assert [p.name for p in path.parent.iterdir()] == ["features.json"]
+
+
+def test_external_edits_are_reloaded(path):
+    store = FeatureStore(path, DEFAULTS, check_interval=0)
+    seen = []
+    store.subscribe(lambda changes, version: seen.append(changes))
+    _write(path, {"a": {"enabled": False}, "unknown": {"enabled": True}})
+    assert not store.is_enabled("a")
+    # merged with the defaults; unknown keys are ignored
+    assert store.snapshot() == {"a": {"name": "A", "enabled": False}, "b": {"name": "B", "enabled": False}}
+    assert seen == [{"a": {"name": "A", "enabled": False}}]
+
+
+def test_reload_is_rate_limited(path):
+    store = FeatureStore(path, DEFAULTS, check_interval=3600)
+    store.snapshot()
+    _write(path, {"a": {"enabled": False}})
+    assert store.is_enabled("a")
+    # writes always check the file first, so the edit is not overwritten
+    store.set("b", True)
+    assert json.loads(path.read_text(encoding="utf-8"))["a"]["enabled"] is False
+    assert not store.is_enabled("a")
+
+
+def test_unreadable_file_keeps_last_good_snapshot(path):
+    store = FeatureStore(path, DEFAULTS, check_interval=0)
+    store.set("b", True)
+    path.write_text("{not json", encoding="utf-8")
+    assert store.snapshot()["b"]["enabled"] is True
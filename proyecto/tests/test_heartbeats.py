@@ -0,0 +1,51 @@
+from datetime import datetime, timedelta
+
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.app.heartbeats import HeartbeatBuffer
+from proyecto.modelo.seguridad import Endpoint
+from proyecto.services.risk_scoring import RiskScoringEngine
+
+
+def _endpoint(endpoint_id):
+    with SessionLocal() as db:
+        if db.get(Endpoint, endpoint_id) is None:
+            db.add(Endpoint(id=endpoint_id, name=endpoint_id, last_seen=datetime.utcnow()))
+            db.commit()
+
+
+def test_unknown_ids_are_dropped_and_never_reach_the_risk_engine():
+    init_db()
+    _endpoint("hb-known")
+    engine = RiskScoringEngine(session_factory=SessionLocal)
+    flushed = {}
+    buffer = HeartbeatBuffer(on_endpoints_flushed=lambda seen: [flushed.update(seen),
+                                                                [engine.touch(k, ts) for k, ts in seen.items()]])
+    unknown = []
+    accepted = buffer.record_many([("endpoint", "hb-known", "PROTECTED"), ("endpoint", "hb-bogus", None),
+                                   ("device", 999_999, None)], unknown=unknown)
+    assert accepted == 1
+    assert unknown == [("endpoint", "hb-bogus"), ("device", 999_999)]
+    assert [item["id"] for item in buffer.online("endpoint", 60)] == ["hb-known"]
+    buffer.flush()
+    assert set(flushed) == {"hb-known"} and len(engine) == 1
+
+
+def test_silent_agents_are_evicted_after_the_retention():
+    init_db()
+    _endpoint("hb-old")
+    buffer = HeartbeatBuffer(retention=60)
+    past = datetime.utcnow() - timedelta(seconds=120)
+    buffer.record_many([("endpoint", "hb-old", None)], now=past)
+    assert buffer.evict() == 0  # still pending a write
+    buffer.flush()
+    assert buffer.evict() == 1
+    assert buffer.last_seen("endpoint", "hb-old") is None and buffer.stats()["tracked"]["endpoint"] == 0
+
+
+def test_risk_flush_drops_endpoints_without_a_row():
+    init_db()
+    engine = RiskScoringEngine(session_factory=SessionLocal)
+    engine.touch("hb-ghost", datetime.utcnow())
+    assert len(engine) == 1
+    engine.flush()
+    assert len(engine) == 0 and engine.top_k(10) == []
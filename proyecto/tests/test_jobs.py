@@ -0,0 +1,21 @@
+import os
+
+from proyecto.app.jobs import list_files
+
+
+def test_list_files_returns_only_regular_files_within_the_size_cap(tmp_path):
+    root = tmp_path / "scan"
+    (root / "sub").mkdir(parents=True)
+    (root / "a.docx").write_bytes(b"a")
+    (root / "sub" / "b.docx").write_bytes(b"b")
+    (root / "big.iso").write_bytes(b"x" * 2048)
+    os.mkfifo(root / "pipe")
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "secret.docx").write_bytes(b"s")
+    os.symlink(outside / "secret.docx", root / "link.docx")
+    os.symlink(outside, root / "linkdir")
+
+    files = list_files([str(root), str(root / "link.docx"), str(root / "pipe")], limit=100, max_bytes=1024)
+    assert files == [str(root / "a.docx"), str(root / "sub" / "b.docx")]
+    assert list_files([str(root / "linkdir")], limit=100) == []
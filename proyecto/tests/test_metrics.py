@@ -0,0 +1,127 @@
+import threading
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from proyecto.app import metrics
+from proyecto.app.metrics import MetricsMiddleware, MetricsRegistry, instrument_engine
+from proyecto.app.profiler import ProfilerBusy, SamplingProfiler, collapsed, summary
+
+
+def test_render_counters_and_histograms():
+    registry = MetricsRegistry()
+    hits = registry.counter("hits_total", "Hits\nby path", ("path",))
+    hits.inc(labels=('/a"b',))
+    hits.inc(2, labels=('/a"b',))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+    assert registry.render() == "\n".join([
+        "# HELP hits_total Hits\\nby path",
+        "# TYPE hits_total counter",
+        'hits_total{path="/a\\"b"} 3',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1.0"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 3.65",
+        "latency_seconds_count 4",
+    ]) + "\n"
+
+
+def test_registration_is_idempotent_per_type():
+    registry = MetricsRegistry()
+    counter = registry.counter("events_total", "Events")
+    assert registry.counter("events_total", "Events") is counter
+    with pytest.raises(ValueError):
+        registry.histogram("events_total", "Events")
+
+
+def test_callback_metrics_are_read_at_scrape_time():
+    registry = MetricsRegistry()
+    queue = {("scan",): 2}
+    registry.callback("queue_depth", "Pending jobs", lambda: queue, labelnames=("queue",))
+    registry.callback("broken", "Raises", lambda: 1 / 0)
+    assert 'queue_depth{queue="scan"} 2' in registry.render()
+    queue[("scan",)] = 5
+    rendered = registry.render()
+    assert 'queue_depth{queue="scan"} 5' in rendered
+    # a failing callback is left out instead of breaking the scrape
+    assert "broken" not in rendered
+
+
+def test_middleware_labels_requests_by_route_template():
+    router = APIRouter()
+
+    @router.get("/items/{item_id}")
+    def item(item_id: int):
+        return {"id": item_id}
+    app = FastAPI()
+    app.include_router(router, prefix="/api/test")
+    app.add_middleware(MetricsMiddleware)
+    labels = ("GET", "/api/test/items/{item_id}")
+    before = metrics.HTTP_REQUESTS.value(labels + ("200",))
+    unmatched = metrics.HTTP_REQUESTS.value(("GET", "<unmatched>", "404"))
+    with TestClient(app) as client:
+        assert client.get("/api/test/items/1").status_code == 200
+        assert client.get("/api/test/items/2").status_code == 200
+        assert client.get("/api/test/nope/3").status_code == 404
+    assert metrics.HTTP_REQUESTS.value(labels + ("200",)) == before + 2
+    assert metrics.HTTP_REQUESTS.value(("GET", "<unmatched>", "404")) == unmatched + 1
+    assert metrics.HTTP_DURATION.count(labels) >= 2
+
+
+def test_engine_statements_are_counted_by_operation():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    selects = metrics.DB_DURATION.count(("SELECT",))
+    errors = metrics.DB_ERRORS.value(("SELECT",))
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+    assert metrics.DB_DURATION.count(("SELECT",)) == selects + 1
+    assert metrics.DB_ERRORS.value(("SELECT",)) == errors + 1
+
+
+def _spin(stop):
+    while not stop.is_set():
+        pass
+
+
+def test_profiler_samples_busy_threads_and_skips_idle_ones():
+    stop, idle = threading.Event(), threading.Event()
+    threads = [threading.Thread(target=_spin, args=(stop,), name="spinner"),
+               threading.Thread(target=idle.wait, name="parked")]
+    for t in threads:
+        t.start()
+    try:
+        profile = SamplingProfiler().profile(0.2, interval=0.005)
+    finally:
+        stop.set()
+        idle.set()
+        for t in threads:
+            t.join()
+    assert profile["samples"] > 0 and profile["idle_skipped"] > 0
+    threads_seen = {key[0] for key in profile["stacks"]}
+    assert "spinner" in threads_seen and "parked" not in threads_seen
+    lines = collapsed(profile).splitlines()
+    assert any(line.startswith("thread:spinner;") and f"{__name__}:_spin " in line for line in lines)
+    top = summary(profile)["top_leaves"]
+    assert f"{__name__}:_spin" in [leaf["frame"] for leaf in top]
+
+
+def test_profiler_runs_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    thread = threading.Thread(target=profiler.profile, args=(0.3,))
+    thread.start()
+    while not profiler.running and thread.is_alive():
+        pass
+    with pytest.raises(ProfilerBusy):
+        profiler.profile(0.01)
+    thread.join()
+    assert not profiler.running
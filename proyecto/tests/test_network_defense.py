@@ -0,0 +1,56 @@
+import pytest
+
+from proyecto.services.network_defense import NetworkAttackDefenseService, SlidingWindowDetector
+from proyecto.services.policy_engine import PolicyEngine
+
+
+def _syn(port, **extra):
+    return dict({"src": "10.0.0.9", "dst_port": port, "flags": {"syn": True, "ack": False}}, **extra)
+
+
+@pytest.mark.parametrize("timestamp", [None, "1700000000", float("nan"), True])
+def test_observe_uses_now_for_missing_or_invalid_timestamp(timestamp):
+    detector = SlidingWindowDetector(port_scan_threshold=3)
+    alerts = []
+    for port in range(5):
+        alerts += detector.observe(_syn(port, timestamp=timestamp), now=1000.0)
+    assert [a["threat_type"] for a in alerts] == ["PORT_SCANNING"]
+    assert detector.packets_observed == 5
+
+
+def test_observe_without_timestamp_or_now_uses_current_time():
+    detector = SlidingWindowDetector()
+    assert detector.observe({"src": "10.0.0.9", "protocol": "SSH", "timestamp": None}) == []
+    assert detector.packets_observed == 1
+
+
+def test_only_blocking_policy_actions_count_as_blocked_connections():
+    engine = PolicyEngine()
+    engine.upsert("p-alert", "telnet", "NETWORK", {"rules": [
+        {"match": {"protocol": "TELNET"}, "threat_type": "CLEARTEXT", "severity": "LOW", "action": "ALERT"}]})
+    engine.upsert("p-block", "smb", "NETWORK", {"rules": [
+        {"match": {"protocol": "SMB"}, "threat_type": "LATERAL", "severity": "HIGH", "action": "BLOCKED"}]})
+    svc = NetworkAttackDefenseService(policy_engine=engine)
+    result = svc.analyze_network_traffic({"packets": [
+        {"src": "10.0.0.1", "dst": "10.0.0.2", "protocol": "TELNET"},
+        {"src": "10.0.0.1", "dst": "10.0.0.3", "protocol": "SMB"},
+    ]})
+    assert [t["threat_type"] for t in result["threats_detected"]] == ["CLEARTEXT", "LATERAL"]
+    assert result["connections_blocked"] == 1
+
+
+def test_future_timestamps_cannot_push_the_window_ahead():
+    detector = SlidingWindowDetector(port_scan_threshold=3)
+    assert detector.observe(_syn(9999, timestamp=1e15), now=1000.0) == []
+    alerts = []
+    for port in range(5):
+        alerts += detector.observe(_syn(port, timestamp=1000.0 + port), now=1000.0 + port)
+    assert [a["threat_type"] for a in alerts] == ["PORT_SCANNING"]
+
+
+def test_bloom_filter_is_sized_from_expected_pairs():
+    small = SlidingWindowDetector(expected_pairs=1000)
+    large = SlidingWindowDetector(expected_pairs=1_000_000)
+    assert large._seen_ports[0].nbits > 900 * small._seen_ports[0].nbits
+    with pytest.raises(ValueError):
+        SlidingWindowDetector(bloom_fp_rate=0)
@@ -0,0 +1,25 @@
+from sqlalchemy import delete
+
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.seguridad import SecurityPolicy
+from proyecto.services.policy_engine import PolicyEngine
+
+RULES = {"rules": [{"match": {"protocol": "SMB"}, "threat_type": "LATERAL", "severity": "HIGH", "action": "BLOCKED"}]}
+
+
+def test_changes_committed_by_another_process_are_picked_up_on_refresh():
+    init_db()
+    with SessionLocal() as db:
+        db.execute(delete(SecurityPolicy))
+        db.commit()
+    # a worker that did not commit the change (no db_events listener) but refreshes periodically
+    worker = PolicyEngine(session_factory=SessionLocal, refresh_interval=0.0)
+    never = PolicyEngine(session_factory=SessionLocal)
+    event = {"protocol": "SMB"}
+    assert worker.evaluate("NETWORK", event) == [] and never.evaluate("NETWORK", event) == []
+
+    with SessionLocal() as db:
+        db.add(SecurityPolicy(id="pol-smb", name="smb", policy_type="NETWORK", settings=RULES, is_active=True))
+        db.commit()
+    assert [m["threat_type"] for m in worker.evaluate("NETWORK", event)] == ["LATERAL"]
+    assert never.evaluate("NETWORK", event) == []
@@ -0,0 +1,94 @@
+import asyncio
+import json
+import threading
+
+from proyecto.app.pubsub import Broker
+
+
+def _decoded(batch):
+    return [json.loads(e) for e in batch]
+
+
+def test_events_are_coalesced_by_key_in_order_of_latest_change():
+    async def run():
+        broker = Broker(ring_size=64)
+        sub = broker.subscribe()
+        broker.publish("devices", {"os": "Linux"}, key="device:1")
+        broker.publish("devices", {"os": "Linux"}, key="device:2")
+        broker.publish("threats", {"id": "t1"}, type="created")
+        broker.publish("devices", {"os": "Windows"}, key="device:1")
+        broker.publish("threats", {"id": "t2"}, type="created")
+        return sub, _decoded(await sub.get())
+
+    sub, events = asyncio.run(run())
+    assert [(e["key"], e["data"]) for e in events] == [
+        ("device:2", {"os": "Linux"}),
+        (None, {"id": "t1"}),
+        ("device:1", {"os": "Windows"}),
+        (None, {"id": "t2"}),
+    ]
+    assert sub.coalesced == 1 and sub.delivered == 4 and sub.lag() == 0
+
+
+def test_topic_filter_and_start_position():
+    async def run():
+        broker = Broker(ring_size=64)
+        broker.publish("devices", {"before": True}, key="device:0")
+        sub = broker.subscribe(topics=["threats"])
+        broker.publish("devices", {}, key="device:1")
+        broker.publish("threats", {"id": "t1"})
+        return _decoded(await sub.get())
+
+    assert [e["data"] for e in asyncio.run(run())] == [{"id": "t1"}]
+
+
+def test_client_lagging_past_the_ring_gets_one_resync():
+    async def run():
+        broker = Broker(ring_size=8)
+        sub = broker.subscribe()
+        for i in range(20):
+            broker.publish("threats", {"id": i})
+        first = _decoded(await sub.get())
+        broker.publish("threats", {"id": "next"})
+        second = _decoded(await sub.get())
+        return sub, first, second
+
+    sub, first, second = asyncio.run(run())
+    assert first == [{"topic": "system", "type": "resync"}]
+    assert [e["data"] for e in second] == [{"id": "next"}]
+    assert sub.resyncs == 1
+
+
+def test_batch_larger_than_maxsize_after_coalescing_resyncs():
+    async def run():
+        broker = Broker(ring_size=64)
+        small = broker.subscribe(maxsize=3)
+        for i in range(10):
+            broker.publish("devices", {"n": i}, key=f"device:{i % 3}")
+        coalesced = _decoded(await small.get())
+        for i in range(4):
+            broker.publish("devices", {"n": i}, key=f"device:{i}")
+        return coalesced, _decoded(await small.get())
+
+    coalesced, overflow = asyncio.run(run())
+    assert [e["data"]["n"] for e in coalesced] == [7, 8, 9]
+    assert overflow == [{"topic": "system", "type": "resync"}]
+
+
+def test_waiting_reader_is_woken_by_publish_from_another_thread():
+    async def run():
+        broker = Broker(ring_size=64)
+        sub = broker.subscribe()
+        getter = asyncio.ensure_future(sub.get())
+        await asyncio.sleep(0)
+        assert not getter.done()
+        thread = threading.Thread(target=broker.publish, args=("scans", {"job": 1}), kwargs={"key": "scan:1"})
+        thread.start()
+        batch = await asyncio.wait_for(getter, timeout=5)
+        thread.join()
+        sub.close()
+        return broker, _decoded(batch)
+
+    broker, events = asyncio.run(run())
+    assert [e["data"] for e in events] == [{"job": 1}]
+    assert len(broker) == 0
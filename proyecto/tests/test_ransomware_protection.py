@@ -0,0 +1,86 @@
+import hashlib
+import os
+
+import pytest
+
+from proyecto.services.ransomware_protection import RansomwareProtectionService, hash_file
+
+
+def _backup(svc, file_path, file_name="report.docx"):
+    return svc._create_file_backup({"operation_type": "WRITE", "file_path": file_path, "file_name": file_name})
+
+
+@pytest.fixture
+def agent_root(tmp_path):
+    root = tmp_path / "agents"
+    (root / "ep1").mkdir(parents=True)
+    (root / "ep1" / "report.docx").write_bytes(b"quarterly numbers")
+    (tmp_path / "secret.docx").write_bytes(b"server file")
+    return root
+
+
+def test_backup_hashes_files_under_the_agent_root(agent_root):
+    backup = _backup(RansomwareProtectionService(files_root=agent_root), "/ep1/report.docx")
+    assert backup["content_hashed"]
+    assert backup["hash"] == hashlib.sha256(b"quarterly numbers").hexdigest()
+
+
+@pytest.mark.parametrize("file_path", ["../secret.docx", "ep1/../../secret.docx", "ep1/link.docx", "ep1/fifo.docx"])
+def test_backup_never_reads_outside_the_root_or_special_files(agent_root, file_path):
+    os.symlink(agent_root.parent / "secret.docx", agent_root / "ep1" / "link.docx")
+    os.mkfifo(agent_root / "ep1" / "fifo.docx")
+    backup = _backup(RansomwareProtectionService(files_root=agent_root), file_path)
+    assert not backup["content_hashed"] and backup["path"] is None
+
+
+def test_without_root_backups_are_client_metadata(agent_root):
+    backup = _backup(RansomwareProtectionService(), str(agent_root / "ep1" / "report.docx"))
+    assert not backup["content_hashed"]
+
+
+def test_hash_file_refuses_fifos_and_large_files(tmp_path):
+    os.mkfifo(tmp_path / "fifo")
+    with pytest.raises(OSError):
+        hash_file(str(tmp_path / "fifo"))  # would block forever if it were opened for reading
+    (tmp_path / "big").write_bytes(b"x" * 100)
+    with pytest.raises(OSError):
+        hash_file(str(tmp_path / "big"), max_bytes=10)
+
+
+def test_protected_files_are_snapshotted_and_recorded(agent_root, tmp_path):
+    from proyecto.app.database.database import SessionLocal, init_db
+    from proyecto.services.backup_store import ChunkStore
+
+    store = ChunkStore(str(tmp_path / "backups"))
+    svc = RansomwareProtectionService(files_root=agent_root, backup_store=store)
+    result = svc.monitor_file_operations("ep1", [
+        {"operation_type": "WRITE", "file_path": "ep1/report.docx", "file_name": "report.docx"},
+        {"operation_type": "CREATE", "file_path": "ep1/README_DECRYPT.txt", "file_name": "README_DECRYPT.txt"},
+    ])
+    assert result["files_protected"] == 1 and result["backup_snapshot"]
+    assert store.latest_snapshot("ep1")["id"] == result["backup_snapshot"]
+
+    init_db()
+    with SessionLocal() as db:
+        incident = svc.record_incident(db, "ep1", len(result["suspicious_activities"]), result["files_protected"],
+                                       backup_snapshot=result["backup_snapshot"])
+        assert incident.backup_created and incident.files_protected == 1
+
+
+def test_parallel_workers_use_the_custom_indicator_feed(agent_root, tmp_path):
+    from proyecto.services.indicators import IndicatorFeed
+
+    feed_file = tmp_path / "indicators.txt"
+    feed_file.write_text("ext:zzz\nnote:pay_me\nbackup:odt\n", encoding="utf-8")
+    svc = RansomwareProtectionService(files_root=agent_root, indicators=IndicatorFeed(feed_file))
+    operations = [
+        {"operation_type": "RENAME", "file_path": "ep1/a.odt", "file_name": "a.odt", "new_name": "a.odt.zzz"},
+        {"operation_type": "CREATE", "file_path": "ep1/PAY_ME.txt", "file_name": "PAY_ME.txt"},
+        {"operation_type": "WRITE", "file_path": "ep1/b.odt", "file_name": "b.odt"},
+        {"operation_type": "RENAME", "file_path": "ep1/c.docx", "file_name": "c.docx", "new_name": "c.docx.locked"},
+    ] * 5
+    serial = svc.monitor_file_operations("ep1", operations)
+    parallel = svc.monitor_file_operations_parallel("ep1", operations, workers=2, batch_size=3)
+    assert len(serial["suspicious_activities"]) == 15
+    assert parallel["suspicious_activities"] == serial["suspicious_activities"]
+    assert parallel["files_protected"] == serial["files_protected"] == 10
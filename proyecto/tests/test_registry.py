@@ -0,0 +1,78 @@
+import sys
+import threading
+
+import pytest
+
+from proyecto.services.registry import ServiceRegistry, ServiceUnavailable
+
+
+@pytest.fixture
+def module(tmp_path, monkeypatch):
+    """Importable module that is not loaded yet"""
+    (tmp_path / "lazy_registry_service.py").write_text("class Service:\n    pass\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.delitem(sys.modules, "lazy_registry_service", raising=False)
+    yield "lazy_registry_service"
+    sys.modules.pop("lazy_registry_service", None)
+
+
+def test_module_is_imported_and_built_on_first_get_only(module):
+    calls = []
+    registry = ServiceRegistry()
+    registry.register("svc", module, lambda m: calls.append(m) or m.Service())
+    assert registry.available("svc")
+    assert module not in sys.modules and not registry.loaded("svc") and calls == []
+
+    instance = registry.get("svc")
+    assert registry.get("svc") is instance and registry.get_optional("svc") is instance
+    assert module in sys.modules and registry.loaded("svc") and len(calls) == 1
+    assert registry.details() == {"svc": {"available": True, "loaded": True, "error": None}}
+
+
+def test_concurrent_first_gets_build_one_instance(module):
+    started = threading.Event()
+    calls = []
+
+    def factory(m):
+        calls.append(m)
+        started.wait(1)
+        return m.Service()
+    registry = ServiceRegistry()
+    registry.register("svc", module, factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("svc"))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    started.set()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1 and len(results) == 8 and len({id(r) for r in results}) == 1
+
+
+def test_missing_module_or_dependency_is_unavailable(module):
+    registry = ServiceRegistry()
+    registry.register("no_module", "proyecto.services.does_not_exist", lambda m: m)
+    registry.register("no_parent", "no_such_package.service", lambda m: m)
+    registry.register("no_dependency", module, lambda m: m.Service(), requires=("no_such_dependency",))
+    assert registry.status() == {"no_dependency": False, "no_module": False, "no_parent": False}
+    for name in ("no_module", "no_parent", "no_dependency", "unknown"):
+        with pytest.raises(ServiceUnavailable):
+            registry.get(name)
+        assert registry.get_optional(name) is None
+    assert module not in sys.modules
+
+
+def test_failed_factory_marks_the_service_unavailable(module):
+    calls = []
+
+    def factory(m):
+        calls.append(m)
+        raise RuntimeError("boom")
+    registry = ServiceRegistry()
+    registry.register("svc", module, factory)
+    with pytest.raises(ServiceUnavailable, match="boom"):
+        registry.get("svc")
+    # not retried on every request
+    assert registry.get_optional("svc") is None and len(calls) == 1
+    assert registry.details()["svc"] == {"available": False, "loaded": False,
+                                         "error": "service 'svc' failed to load: boom"}
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.seguridad import Endpoint, Threat
+from proyecto.services.risk_scoring import RiskScoringEngine
+
+
+def test_flush_writes_scores_from_persisted_state_of_all_workers():
+    init_db()
+    now = datetime.utcnow()
+    threats = [{"endpoint_id": "risk-ep", "severity": "CRITICAL", "detection_time": now} for _ in range(6)]
+    with SessionLocal() as db:
+        db.add(Endpoint(id="risk-ep", name="risk-ep", last_seen=now))
+        db.add_all(Threat(name="t", **row) for row in threats)
+        db.commit()
+    # each worker only observed the threats inserted by its own process
+    worker_a, worker_b = (RiskScoringEngine(session_factory=SessionLocal) for _ in range(2))
+    worker_a.observe_threats(threats[:3])
+    worker_b.observe_threats(threats[3:])
+    partial = worker_b.top_k(1)[0]["risk_score"]
+
+    worker_a.flush()
+    assert worker_b.flush() == 1
+    with SessionLocal() as db:
+        stored = db.get(Endpoint, "risk-ep").risk_score
+    assert stored > partial
+    assert worker_a.top_k(1)[0]["risk_score"] == worker_b.top_k(1)[0]["risk_score"] == stored
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete, select
+
+from proyecto.api.dashboard import threats_summary
+from proyecto.app import rollups
+from proyecto.app.database.database import SessionLocal, init_db
+from proyecto.modelo.rollup import ThreatRollup
+from proyecto.modelo.seguridad import Threat
+
+DAY = datetime(2024, 3, 5)
+
+
+@pytest.fixture
+def db():
+    init_db()
+    with SessionLocal() as session:
+        session.execute(delete(ThreatRollup))
+        session.execute(delete(Threat))
+        session.execute(Threat.__table__.insert(), [
+            {"id": f"r-{i}", "name": "t", "type": "MALWARE" if i % 2 else "PHISHING",
+             "severity": "HIGH" if i % 3 else None, "detection_time": DAY + timedelta(minutes=7 * i, seconds=i)}
+            for i in range(300)
+        ])
+        session.commit()
+        yield session
+
+
+def _buckets(session):
+    return sorted(session.execute(select(ThreatRollup.granularity, ThreatRollup.bucket_start, ThreatRollup.type,
+                                         ThreatRollup.severity, ThreatRollup.count)).all())
+
+
+def test_python_backfill_matches_the_sql_backfill(db, monkeypatch):
+    assert rollups.backfill(db, DAY, DAY + timedelta(days=3)) == 300
+    expected = _buckets(db)
+    monkeypatch.setattr(rollups, "_SQL_BUCKET_DIALECTS", ())  # e.g. mssql, oracle
+    assert rollups.backfill(db, DAY, DAY + timedelta(days=3)) == 300
+    assert _buckets(db) == expected
+
+
+def test_dashboard_window_accepts_offsets(db):
+    rollups.backfill(db, DAY, DAY + timedelta(days=3))
+    plus_two = timezone(timedelta(hours=2))
+    summary = threats_summary(hours=24, since=DAY.replace(tzinfo=timezone.utc).astimezone(plus_two),
+                              until=None, db=db)
+    assert summary["since"] == DAY and summary["since"].tzinfo is None
+    assert summary["total"] == 300
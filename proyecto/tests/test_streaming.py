@@ -0,0 +1,86 @@
+import asyncio
+import json
+
+from proyecto.api.streaming import (FILE_OPERATION_FIELDS, PACKET_FIELDS, RejectedRecords, check_fields,
+                                    iter_ndjson_batches)
+
+
+async def _chunks(*records):
+    yield "\n".join(json.dumps(r) for r in records).encode()
+
+
+def _collect(records, fields):
+    rejected = RejectedRecords()
+
+    async def run():
+        return [b async for b in iter_ndjson_batches(_chunks(*records), 10, validate=check_fields(fields),
+                                                     rejected=rejected)]
+    return asyncio.run(run()), rejected
+
+
+def test_packets_with_wrong_types_are_skipped_with_line_numbers():
+    batches, rejected = _collect([
+        {"src": "10.0.0.1", "flags": "S"},
+        {"src": "10.0.0.1", "dst_port": 22, "flags": {"syn": True}},
+        {"src": "10.0.0.1", "attempt_count": True},
+        {"src": "10.0.0.1", "attempt_count": 10 ** 30},
+        {"src": "10.0.0.1", "timestamp": None},
+    ], PACKET_FIELDS)
+    assert [len(b) for b in batches] == [2]
+    assert rejected.count == 3
+    assert [s["line"] for s in rejected.samples] == [1, 3, 4]
+
+
+def test_file_operations_require_string_names():
+    batches, rejected = _collect([
+        {"operation_type": "RENAME", "file_path": 5},
+        {"operation_type": "RENAME", "new_name": ["x"]},
+        {"operation_type": "WRITE", "entropy": float("nan")},
+        {"operation_type": "RENAME", "file_name": "a.docx", "new_name": "a.docx.locked", "pid": 42},
+    ], FILE_OPERATION_FIELDS)
+    assert batches == [[{"operation_type": "RENAME", "file_name": "a.docx", "new_name": "a.docx.locked", "pid": 42}]]
+    assert rejected.samples == [
+        {"line": 1, "error": "'file_path' must be a string"},
+        {"line": 2, "error": "'new_name' must be a string"},
+        {"line": 3, "error": "'entropy' must be finite"},
+    ]
+
+
+def test_null_fields_are_dropped_as_not_reported():
+    batches, rejected = _collect([
+        {"operation_type": "RENAME", "new_name": None},
+        {"operation_type": "WRITE", "file_count": None, "file_name": None},
+    ], FILE_OPERATION_FIELDS)
+    assert rejected.count == 0
+    assert batches == [[{"operation_type": "RENAME"}, {"operation_type": "WRITE"}]]
+
+
+def _stream(path, records):
+    from fastapi.testclient import TestClient
+
+    from proyecto import config
+    from proyecto.app.database.database import init_db
+    from proyecto.app.main import app
+
+    init_db()
+    body = "\n".join(json.dumps(r) for r in records)
+    original = config.AUTH_ENABLED
+    config.AUTH_ENABLED = False
+    try:
+        return TestClient(app).post(path, content=body, headers={"Content-Type": "application/x-ndjson"})
+    finally:
+        config.AUTH_ENABLED = original
+
+
+def test_streams_accept_null_valued_fields():
+    response = _stream("/api/v1/ransomware/file-operations/stream?endpoint_id=ep-null", [
+        {"operation_type": "RENAME", "new_name": None},
+        {"operation_type": "WRITE", "file_count": None},
+        {"file_name": None},
+    ])
+    assert response.status_code == 200, response.text
+    response = _stream("/api/v1/network/traffic/stream", [
+        {"src": "1.1.1.1", "protocol": "SSH", "attempt_count": None},
+        {"src": "1.1.1.1", "flags": None},
+    ])
+    assert response.status_code == 200, response.text
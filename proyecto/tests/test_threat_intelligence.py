@@ -0,0 +1,34 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from proyecto.services.threat_intelligence import HashBloomFilter, ThreatIntelService, build_index
+
+BAD_HASH = hashlib.sha256(b"malware").hexdigest()
+
+
+def test_reload_keeps_the_previous_index_when_a_version_cannot_be_opened(tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text(f"type,value\nsha256,{BAD_HASH}\n", encoding="utf-8")
+    root = tmp_path / "ti"
+    build_index([feed], root)
+    service = ThreatIntelService(root, check_interval=0)
+    previous = service.index
+    assert service.lookup_hashes([BAD_HASH]) == [True]
+
+    (root / "broken").mkdir()
+    (root / "CURRENT").write_text("broken", encoding="ascii")
+    assert service.reload() is False
+    assert service.index is previous
+    assert service.lookup_hashes([BAD_HASH]) == [True]
+
+
+@pytest.mark.parametrize("fp_rate", [0, 1, -0.5, 1.5, float("nan")])
+def test_bloom_filter_rejects_fp_rates_outside_zero_one(tmp_path, fp_rate):
+    digests = np.array([hashlib.sha256(b"x").digest()], dtype="S32")
+    with pytest.raises(ValueError):
+        HashBloomFilter.build(digests, fp_rate)
+    with pytest.raises(ValueError):
+        build_index([], tmp_path / "ti", bloom_fp_rate=fp_rate)
+    assert not (tmp_path / "ti").exists()